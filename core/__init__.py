@@ -3,7 +3,7 @@
 """
 # Импортируем только базовые модули без циклических зависимостей
 from .config import Config
-from .database import DatabaseManager, Proxy, MonitoringTask, FoundItem, AppSettings
+from .database import DatabaseManager, Proxy, MonitoringTask, FoundItem, AppSettings, StickerCatalogEntry, AssetProperties
 from .models import (
     SearchFilters, FloatRange, PatternList, PatternRange,
     StickersFilter, StickerInfo, ParsedItemData, ItemBasePrice
@@ -17,6 +17,8 @@ __all__ = [
     'MonitoringTask',
     'FoundItem',
     'AppSettings',
+    'StickerCatalogEntry',
+    'AssetProperties',
     'SearchFilters',
     'FloatRange',
     'PatternList',
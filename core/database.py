@@ -4,11 +4,11 @@
 """
 import json
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import String, Integer, Float, Boolean, Text, DateTime, JSON
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import String, Integer, Float, Boolean, Text, DateTime, JSON, Index, Computed, Select, select, text
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
 from sqlalchemy.types import TypeDecorator
 from sqlalchemy.sql import func
 
@@ -18,6 +18,32 @@ class Base(DeclarativeBase):
     pass
 
 
+class JSONBData(TypeDecorator):
+    """JSONB, который принимает и словарь/список, и JSON-строку (прежний формат TEXT-колонок)."""
+    impl = JSONB
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if isinstance(value, str):
+            return json.loads(value) if value else None
+        return value
+
+
+def _jsonb_number(field: str, sql_type: str) -> str:
+    """Выражение генерируемой колонки: число из item_data_json или NULL, если там не число."""
+    return (
+        f"CASE WHEN jsonb_typeof(item_data_json->'{field}') = 'number' "
+        f"THEN (item_data_json->>'{field}')::{sql_type} END"
+    )
+
+
+def item_data_to_text(item_data: Any) -> str:
+    """item_data_json в виде JSON-строки (формат уведомлений; из JSONB приходит словарь)."""
+    if isinstance(item_data, str):
+        return item_data
+    return json.dumps(item_data or {}, ensure_ascii=False)
+
+
 class Proxy(Base):
     """Модель для хранения прокси-серверов."""
     __tablename__ = "proxies"
@@ -41,6 +67,11 @@ class Proxy(Base):
 class MonitoringTask(Base):
     """Модель для задач мониторинга предметов."""
     __tablename__ = "monitoring_tasks"
+    __table_args__ = (
+        # Поиск наступивших задач планировщиком (TaskScheduler)
+        Index("ix_monitoring_tasks_due", "next_check", postgresql_where=text("is_active"),
+              postgresql_ops={"next_check": "NULLS FIRST"}),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False, comment="Название задачи мониторинга")
@@ -79,14 +110,31 @@ class MonitoringTask(Base):
 class FoundItem(Base):
     """Модель для хранения найденных предметов."""
     __tablename__ = "found_items"
+    __table_args__ = (
+        # Дубликаты лотов отсекаются вставкой INSERT ... ON CONFLICT DO NOTHING
+        Index("uq_found_items_task_listing", "task_id", "listing_id", unique=True),
+        # Выборки по задаче (последние, лучшие float, паттерн, цена наклеек) идут по индексам
+        Index("ix_found_items_task_found_at", "task_id", "found_at"),
+        Index("ix_found_items_task_float", "task_id", "float_value"),
+        Index("ix_found_items_task_pattern", "task_id", "pattern"),
+        Index("ix_found_items_task_stickers_price", "task_id", "total_stickers_price"),
+        Index("ix_found_items_item_data_gin", "item_data_json", postgresql_using="gin",
+              postgresql_ops={"item_data_json": "jsonb_path_ops"}),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     task_id: Mapped[int] = mapped_column(Integer, nullable=False, comment="ID задачи мониторинга")
+    listing_id: Mapped[Optional[str]] = mapped_column(String(32), nullable=True, comment="ID лота на Steam Market")
     item_name: Mapped[str] = mapped_column(String(255), nullable=False, comment="Название предмета")
     price: Mapped[float] = mapped_column(Float, nullable=False, comment="Цена предмета")
     
-    # Данные предмета (хранятся как JSON)
-    item_data_json: Mapped[str] = mapped_column(Text, nullable=False, comment="JSON с данными предмета (float, pattern, stickers и т.д.)")
+    # Данные предмета (хранятся как JSONB)
+    item_data_json: Mapped[dict] = mapped_column(JSONBData(none_as_null=True), nullable=False, comment="JSONB с данными предмета (float, pattern, stickers и т.д.)")
+    
+    # Часто используемые поля item_data_json - генерируемые колонки (вычисляет Postgres, индексируются)
+    float_value: Mapped[Optional[float]] = mapped_column(Float, Computed(_jsonb_number("float_value", "double precision"), persisted=True), comment="Float из item_data_json")
+    pattern: Mapped[Optional[int]] = mapped_column(Integer, Computed(_jsonb_number("pattern", "numeric::integer"), persisted=True), comment="Паттерн из item_data_json")
+    total_stickers_price: Mapped[Optional[float]] = mapped_column(Float, Computed(_jsonb_number("total_stickers_price", "double precision"), persisted=True), comment="Цена наклеек из item_data_json")
     
     # Статус уведомления
     notification_sent: Mapped[bool] = mapped_column(Boolean, default=False, comment="Отправлено ли уведомление")
@@ -94,22 +142,167 @@ class FoundItem(Base):
     
     # Ссылки
     market_url: Mapped[Optional[str]] = mapped_column(String(512), nullable=True, comment="URL страницы на Steam Market")
-    inspect_links: Mapped[Optional[str]] = mapped_column(Text, nullable=True, comment="Inspect ссылки (JSON массив)")
+    inspect_links: Mapped[Optional[list]] = mapped_column(JSONBData(none_as_null=True), nullable=True, comment="Inspect ссылки (JSONB массив)")
     
     found_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), comment="Время обнаружения")
     
     def get_item_data(self) -> Dict[str, Any]:
         """Получает данные предмета как словарь."""
-        return json.loads(self.item_data_json)
+        if isinstance(self.item_data_json, str):
+            return json.loads(self.item_data_json)
+        return self.item_data_json or {}
     
     def set_item_data(self, data: Dict[str, Any]):
         """Устанавливает данные предмета из словаря."""
-        self.item_data_json = json.dumps(data, ensure_ascii=False)
+        self.item_data_json = data
     
     def __repr__(self):
         return f"<FoundItem(id={self.id}, task_id={self.task_id}, item={self.item_name}, price=${self.price:.2f})>"
 
 
+async def insert_found_item(session: AsyncSession, values: Dict[str, Any]) -> Optional[int]:
+    """
+    Сохраняет найденный предмет, если лота с таким listing_id у задачи еще нет.
+    
+    Одна вставка INSERT ... ON CONFLICT (task_id, listing_id) DO NOTHING RETURNING id:
+    проверка дубликата идет по уникальному индексу и не зависит от гонок между воркерами.
+    Предметы без listing_id (NULL) не конфликтуют между собой.
+    
+    Args:
+        session: Сессия БД (коммит - на стороне вызывающего)
+        values: Значения колонок FoundItem
+        
+    Returns:
+        ID нового предмета или None, если лот уже сохранен
+    """
+    if values.get("listing_id") is not None:
+        values = {**values, "listing_id": str(values["listing_id"])}
+    stmt = (
+        pg_insert(FoundItem)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=["task_id", "listing_id"])
+        .returning(FoundItem.id)
+    )
+    result = await session.execute(stmt)
+    return result.scalar_one_or_none()
+
+
+async def insert_found_items(session: AsyncSession, rows: List[Dict[str, Any]]) -> List[Tuple[int, Optional[str]]]:
+    """
+    Сохраняет пачку найденных предметов одной вставкой.
+    
+    Многострочный INSERT ... ON CONFLICT (task_id, listing_id) DO NOTHING RETURNING id, listing_id:
+    уже сохраненные лоты пропускаются индексом, в ответе - только новые строки.
+    
+    Args:
+        session: Сессия БД (коммит - на стороне вызывающего)
+        rows: Значения колонок FoundItem для каждого предмета
+        
+    Returns:
+        Список (id, listing_id) сохраненных предметов
+    """
+    if not rows:
+        return []
+    rows = [
+        {**values, "listing_id": str(values["listing_id"])} if values.get("listing_id") is not None else values
+        for values in rows
+    ]
+    stmt = (
+        pg_insert(FoundItem)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["task_id", "listing_id"])
+        .returning(FoundItem.id, FoundItem.listing_id)
+    )
+    result = await session.execute(stmt)
+    return [(row[0], row[1]) for row in result.all()]
+
+
+# Колонки найденного предмета для списков (без item_data_json)
+FOUND_ITEM_SUMMARY_COLUMNS = (
+    FoundItem.id,
+    FoundItem.task_id,
+    FoundItem.item_name,
+    FoundItem.price,
+    FoundItem.float_value,
+    FoundItem.pattern,
+    FoundItem.total_stickers_price,
+    FoundItem.market_url,
+    FoundItem.found_at,
+)
+
+
+def recent_found_items_query(task_id: Optional[int] = None, limit: int = 10) -> Select:
+    """
+    Последние найденные предметы (по индексу (task_id, found_at), без загрузки item_data_json).
+    
+    Args:
+        task_id: ID задачи (None - по всем задачам)
+        limit: Количество записей
+        
+    Returns:
+        SELECT по колонкам FOUND_ITEM_SUMMARY_COLUMNS
+    """
+    query = select(*FOUND_ITEM_SUMMARY_COLUMNS)
+    if task_id is not None:
+        query = query.where(FoundItem.task_id == task_id)
+    return query.order_by(FoundItem.found_at.desc()).limit(limit)
+
+
+def best_floats_query(task_id: int, since: Optional[datetime] = None, limit: int = 10) -> Select:
+    """
+    Предметы задачи с наименьшим float (по индексу (task_id, float_value)).
+    
+    Args:
+        task_id: ID задачи
+        since: Учитывать только найденные после этого времени (опционально)
+        limit: Количество записей
+        
+    Returns:
+        SELECT по колонкам FOUND_ITEM_SUMMARY_COLUMNS
+    """
+    query = select(*FOUND_ITEM_SUMMARY_COLUMNS).where(
+        FoundItem.task_id == task_id,
+        FoundItem.float_value.is_not(None)
+    )
+    if since is not None:
+        query = query.where(FoundItem.found_at >= since)
+    return query.order_by(FoundItem.float_value).limit(limit)
+
+
+class StickerCatalogEntry(Base):
+    """Модель для локального каталога цен наклеек (обновляется фоновым обходом поиска Steam Market)."""
+    __tablename__ = "sticker_catalog"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(String(255), unique=True, nullable=False, comment="market_hash_name наклейки")
+    normalized_name: Mapped[str] = mapped_column(String(255), nullable=False, index=True, comment="Название без префикса 'Sticker |' в нижнем регистре")
+    price: Mapped[Optional[float]] = mapped_column(Float, nullable=True, comment="Минимальная цена продажи")
+    volume: Mapped[int] = mapped_column(Integer, default=0, comment="Количество лотов на продаже")
+    appid: Mapped[int] = mapped_column(Integer, default=730, comment="ID приложения Steam")
+    currency: Mapped[int] = mapped_column(Integer, default=1, comment="Валюта (1 = USD)")
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<StickerCatalogEntry(name={self.name}, price={self.price}, volume={self.volume})>"
+
+
+class AssetProperties(Base):
+    """Модель для неизменяемых свойств предмета (float, паттерн), полученных через inspect API."""
+    __tablename__ = "asset_properties"
+    
+    asset_id: Mapped[str] = mapped_column(String(32), primary_key=True, comment="ID ассета (параметр A inspect ссылки)")
+    d_param: Mapped[Optional[str]] = mapped_column(String(32), nullable=True, index=True, comment="Параметр D inspect ссылки")
+    appid: Mapped[int] = mapped_column(Integer, default=730, comment="ID приложения Steam")
+    float_value: Mapped[Optional[float]] = mapped_column(Float, nullable=True, comment="Float предмета")
+    pattern: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, comment="Паттерн (paint seed)")
+    data: Mapped[dict] = mapped_column(JSONB(none_as_null=True), nullable=False, comment="Полный ответ inspect API")
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<AssetProperties(asset_id={self.asset_id}, float={self.float_value}, pattern={self.pattern})>"
+
+
 class AppSettings(Base):
     """Модель для настроек приложения."""
     __tablename__ = "app_settings"
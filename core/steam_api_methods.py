@@ -9,6 +9,25 @@ from urllib.parse import quote
 from loguru import logger
 import httpx
 
+from core.config import Config
+from core.utils.two_tier_cache import TwoTierCache
+
+
+# Варианты предметов и проверка hash_name меняются редко, а запросы к Steam дорогие
+_item_variants_cache = TwoTierCache(
+    "item_variants",
+    ttl=3600,
+    max_items=Config.REFERENCE_CACHE_MAX_ITEMS,
+    stale_ttl=3600,
+    negative_ttl=Config.REFERENCE_CACHE_NEGATIVE_TTL
+)
+_hash_name_cache = TwoTierCache(
+    "hash_name_valid",
+    ttl=300,
+    max_items=Config.REFERENCE_CACHE_MAX_ITEMS,
+    negative_ttl=Config.REFERENCE_CACHE_NEGATIVE_TTL
+)
+
 
 class SteamAPIMethods:
     """Миксин с методами работы с Steam Market API."""
@@ -21,12 +40,35 @@ class SteamAPIMethods:
         Получает все варианты предмета (разные износы) через searchsuggestionsresults API.
         Возвращает список вариантов для дальнейшего парсинга каждого.
         
+        Результат кэшируется (память процесса + Redis), пустой список для
+        несуществующего названия - на REFERENCE_CACHE_NEGATIVE_TTL секунд.
+        
         Args:
             item_name: Название предмета для поиска
             
         Returns:
             Список вариантов предмета с их hash_name и извлеченной степенью износа
         """
+        variants = await _item_variants_cache.get_or_load(
+            item_name,
+            lambda: self._fetch_item_variants(item_name),
+            redis_service=getattr(self, "redis_service", None),
+            # None - ошибка запроса (429, нет прокси), такой результат не кэшируем
+            cacheable=lambda result: result is not None,
+            negative=lambda result: not result
+        )
+        return variants or []
+    
+    async def _fetch_item_variants(self, item_name: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Запрашивает варианты предмета у Steam.
+        
+        Args:
+            item_name: Название предмета для поиска
+            
+        Returns:
+            Список вариантов (пустой, если предмет не найден) или None при ошибке запроса
+        """
         await self._ensure_client()
         
         # ВАЖНО: Если есть proxy_manager, получаем прокси для этого запроса
@@ -67,15 +109,15 @@ class SteamAPIMethods:
                             logger.info(f"✅ get_item_variants: Получен прокси ID={proxy.id} после проверки")
                         else:
                             logger.error(f"❌ get_item_variants: После проверки все еще нет доступных прокси")
-                            return []
+                            return None
                     else:
                         logger.warning(f"⚠️ get_item_variants: После проверки не найдено работающих прокси")
-                        return []
+                        return None
                 except Exception as check_error:
                     logger.error(f"❌ get_item_variants: Ошибка при проверке прокси: {check_error}")
                     import traceback
                     logger.debug(f"Traceback: {traceback.format_exc()}")
-                    return []
+                    return None
         
         params = {"q": item_name}
         
@@ -163,18 +205,18 @@ class SteamAPIMethods:
                                         continue
                                     else:
                                         logger.error(f"❌ get_item_variants: После проверки все еще нет доступных прокси")
-                                        return []
+                                        return None
                                 else:
                                     logger.warning(f"⚠️ get_item_variants: После проверки не найдено работающих прокси")
-                                    return []
+                                    return None
                             except Exception as check_error:
                                 logger.error(f"❌ get_item_variants: Ошибка при проверке прокси: {check_error}")
                                 import traceback
                                 logger.debug(f"Traceback: {traceback.format_exc()}")
-                                return []
+                                return None
                     else:
                         logger.error(f"❌ Нет ProxyManager для переключения прокси")
-                        return []
+                        return None
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -216,7 +258,7 @@ class SteamAPIMethods:
                 else:
                     logger.error(f"❌ Ошибка поиска вариантов: {response.status_code}")
                     if response.status_code != 429:  # 429 уже обработано выше
-                        return []
+                        return None
                     # Для 429 продолжаем цикл
                     continue
                     
@@ -268,16 +310,19 @@ class SteamAPIMethods:
                     continue
                 else:
                     logger.error(f"❌ Достигнут лимит попыток для '{item_name}'")
-                    return []
+                    return None
         
         # Если дошли сюда, значит все попытки исчерпаны
         logger.error(f"❌ Не удалось получить варианты для '{item_name}' после {max_proxy_switches} попыток")
-        return []
+        return None
     
     async def validate_hash_name(self, appid: int, hash_name: str) -> Tuple[bool, Optional[int]]:
         """
         Проверяет корректность hash_name и возвращает количество доступных лотов.
         
+        Результат кэшируется (память процесса + Redis), невалидное название -
+        на REFERENCE_CACHE_NEGATIVE_TTL секунд.
+        
         Args:
             appid: ID приложения
             hash_name: Хэш-имя предмета для проверки
@@ -285,6 +330,31 @@ class SteamAPIMethods:
         Returns:
             Tuple[bool, Optional[int]]: (валидность, количество лотов или None)
         """
+        result = await _hash_name_cache.get_or_load(
+            f"{appid}:{hash_name}",
+            lambda: self._check_hash_name(appid, hash_name),
+            redis_service=getattr(self, "redis_service", None),
+            # None - API не ответил (429, нет прокси), такой результат не кэшируем
+            cacheable=lambda checked: checked is not None,
+            negative=lambda checked: not checked[0]
+        )
+        if result is None:
+            return False, None
+        # Из Redis кортеж приходит списком
+        is_valid, total_count = result
+        return is_valid, total_count
+    
+    async def _check_hash_name(self, appid: int, hash_name: str) -> Optional[Tuple[bool, Optional[int]]]:
+        """
+        Запрашивает первую страницу лотов и проверяет hash_name.
+        
+        Args:
+            appid: ID приложения
+            hash_name: Хэш-имя предмета для проверки
+            
+        Returns:
+            (валидность, количество лотов или None) или None, если API не ответил
+        """
         logger.info(f"🔍 validate_hash_name: Начинаю проверку '{hash_name}' (appid={appid})")
         logger.info(f"   Прокси: {self.proxy[:50] if self.proxy else 'нет'}...")
         logger.info(f"   ProxyManager: {'есть' if self.proxy_manager else 'нет'}")
@@ -316,7 +386,7 @@ class SteamAPIMethods:
             # ВАЖНО: Если render_data is None, это может быть из-за 429 ошибок
             # Но с ProxyManager 429 должны обрабатываться автоматически через переключение прокси
             # Если все равно None, значит либо нет доступных прокси, либо предмет действительно невалиден
-            return False, None
+            return None
         
         total_count = render_data.get('total_count', 0)
         success = render_data.get('success', False)
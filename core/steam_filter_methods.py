@@ -399,6 +399,12 @@ class SteamFilterMethods:
         Returns:
             Базовая цена в USD или None
         """
+        if not force_update:
+            # D из общего хранилища: прокси и запрос к Steam не нужны
+            base_price = self.base_price_manager.get_stored_price(item_name, appid)
+            if base_price is not None:
+                return base_price
+        
         proxy_for_request = self.proxy
         if self.proxy_manager:
             proxy_obj = await self.proxy_manager.get_next_proxy(force_refresh=False)
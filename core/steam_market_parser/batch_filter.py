@@ -0,0 +1,140 @@
+"""
+Пакетная проверка лотов страницы по скомпилированному плану фильтров.
+
+Все лоты страницы сначала проверяются дешевыми фильтрами плана (цена, паттерн,
+float, тип предмета/количество наклеек), и дальше, к проверке наклеек и БД,
+передаются только индексы прошедших лотов. Отсеиваются только лоты, которые
+FilterService гарантированно отклонил бы, поэтому итоговый результат не меняется.
+
+Есть два вычислителя с одинаковым результатом: построчный (по умолчанию) и
+векторный на NumPy (vectorized=True), который загружает колонки лотов в массивы
+и применяет фильтры масками. Сборка колонок из объектов ListingRecord дороже
+самих проверок, поэтому на страницах рынка векторный вариант медленнее
+построчного (см. scripts/benchmark_batch_filter.py); он пригодится, когда
+колонки приходят уже в виде массивов.
+"""
+from typing import List, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from services.filter_plan import FilterPlan
+from .listing_record import ListingRecord
+
+
+# Полцента: запас на округление цены до центов
+_PRICE_ROUNDING = 0.005
+
+
+class ListingColumns:
+    """Колонки лотов страницы для векторной проверки."""
+
+    __slots__ = ("size", "price", "float_value", "pattern", "is_stattrak", "is_keychain", "sticker_count", "names")
+
+    def __init__(self, records: Sequence[ListingRecord]):
+        size = len(records)
+        self.size = size
+        self.price = np.fromiter(
+            (r.item_price if r.item_price is not None else np.nan for r in records), dtype=np.float64, count=size
+        )
+        self.float_value = np.fromiter(
+            (r.float_value if r.float_value is not None else np.nan for r in records), dtype=np.float64, count=size
+        )
+        # -1 - паттерн неизвестен
+        self.pattern = np.fromiter(
+            (r.pattern if r.pattern is not None else -1 for r in records), dtype=np.int64, count=size
+        )
+        self.is_stattrak = np.fromiter((bool(r.is_stattrak) for r in records), dtype=bool, count=size)
+        self.is_keychain = np.fromiter((r.item_type == "keychain" for r in records), dtype=bool, count=size)
+        self.sticker_count = np.fromiter((len(r.stickers) if r.stickers else 0 for r in records), dtype=np.int64, count=size)
+        self.names = [r.item_name for r in records]
+
+
+def _batch_mask(columns: ListingColumns, plan: FilterPlan):
+    """Возвращает булеву маску лотов, прошедших дешевые фильтры плана."""
+    mask = np.ones(columns.size, dtype=bool)
+
+    if plan.max_price is not None:
+        # FilterService сравнивает цену, округленную до центов (sell_price_text),
+        # поэтому отсеиваем только цены, превышающие max_price больше чем на полцента
+        mask &= np.isnan(columns.price) | (columns.price <= plan.max_price + _PRICE_ROUNDING)
+
+    if plan.pattern_mode is not None:
+        pattern = columns.pattern
+        known = pattern >= 0
+        if plan.pattern_mode == "list":
+            allowed = np.fromiter(plan.pattern_set, dtype=np.int64, count=len(plan.pattern_set))
+            in_list = known & np.isin(pattern, allowed)
+            # Фильтр для другого типа предмета не применяется
+            if plan.pattern_item_type == "keychain":
+                mask &= ~columns.is_keychain | in_list
+            elif plan.pattern_item_type == "skin":
+                mask &= columns.is_keychain | in_list
+            else:
+                mask &= in_list
+            # Ранний отсев как в is_pattern_excluded (брелки по модулю 1000)
+            normalized = np.where(pattern > 999, pattern % 1000, pattern)
+            mask &= ~known | np.isin(normalized, allowed)
+        else:
+            mask &= known & (pattern >= plan.pattern_min) & (pattern <= plan.pattern_max)
+
+    if plan.float_min is not None:
+        float_value = columns.float_value
+        mask &= ~np.isnan(float_value) & (float_value >= plan.float_min) & (float_value <= plan.float_max)
+        # Брелок не проходит фильтр float в любом случае
+        mask &= ~columns.is_keychain
+
+    if plan.has_stickers_filter:
+        mask &= ~columns.is_keychain
+        if plan.needs_sticker_prices:
+            mask &= columns.is_keychain | (columns.sticker_count > 0)
+        if plan.required_stickers_count:
+            mask &= columns.is_keychain | (columns.sticker_count >= plan.required_stickers_count)
+
+    # Название обычно одно на всю страницу - проверяем уникальные значения
+    names_ok = {name: plan.check_item_name(name) for name in set(columns.names)}
+    if not all(names_ok.values()):
+        mask &= np.fromiter((names_ok[name] for name in columns.names), dtype=bool, count=columns.size)
+
+    return mask
+
+
+def _scalar_candidates(records: Sequence[ListingRecord], plan: FilterPlan) -> List[int]:
+    """Построчная проверка тем же планом (без NumPy)."""
+    candidates = []
+    for index, record in enumerate(records):
+        if plan.is_pattern_excluded(record.pattern):
+            continue
+        price = round(record.item_price, 2) if record.item_price is not None else None
+        if plan.first_failure(price, record.pattern, record.float_value, record.item_type, record.item_name):
+            continue
+        if not plan.check_type_constraints(record.item_type, len(record.stickers) if record.stickers else 0):
+            continue
+        candidates.append(index)
+    return candidates
+
+
+def select_candidates(
+    records: Sequence[ListingRecord],
+    plan: FilterPlan,
+    vectorized: bool = False
+) -> List[int]:
+    """
+    Отбирает лоты страницы, которые стоит передавать проверке наклеек и БД.
+
+    Args:
+        records: Лоты страницы
+        plan: Скомпилированный план фильтров задачи
+        vectorized: Проверять масками NumPy (если NumPy установлен)
+
+    Returns:
+        Индексы лотов, прошедших цену, паттерн, float и тип/количество наклеек
+    """
+    if not records:
+        return []
+    if not vectorized or np is None:
+        return _scalar_candidates(records, plan)
+    mask = _batch_mask(ListingColumns(records), plan)
+    return np.flatnonzero(mask).tolist()
@@ -18,6 +18,7 @@ from ..models import ParsedItemData, SearchFilters
 from .logger_utils import log_both
 from .item_page_parser import parse_item_page
 from .listing_page_parser import parse_listing_page
+from services.task_cancellation import task_cancellation
 
 
 class ListingParser:
@@ -171,18 +172,11 @@ class ListingParser:
         while page_num <= MAX_PAGES_TO_PARSE:
             # Проверяем, активна ли задача (для немедленной остановки)
             if task:
-                # Обновляем задачу из БД для проверки актуального статуса
+                # Токен отмены обновляется подписчиком канала; без него статус читается из БД
                 try:
-                    from sqlalchemy import select
-                    from core import MonitoringTask
-                    if db_session:
-                        result = await db_session.execute(
-                            select(MonitoringTask).where(MonitoringTask.id == task.id)
-                        )
-                        db_task = result.scalar_one_or_none()
-                        if db_task and not db_task.is_active:
-                            log("info", f"🛑 Задача {task.id} деактивирована, останавливаем парсинг")
-                            break
+                    if await task_cancellation.is_cancelled(task.id, db_session):
+                        log("info", f"🛑 Задача {task.id} деактивирована, останавливаем парсинг")
+                        break
                 except Exception as e:
                     log("warning", f"⚠️ Ошибка при проверке статуса задачи: {e}")
             
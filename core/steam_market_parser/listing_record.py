@@ -0,0 +1,184 @@
+"""
+Компактные записи лотов для горячего цикла парсинга.
+
+ListingRecord / StickerRecord используют __slots__ и не выполняют валидацию:
+они проходят весь путь обхода страниц -> фильтрация -> сохранение,
+а в Pydantic-модели (ParsedItemData / StickerInfo) превращаются только
+на границах API и БД через to_parsed_item().
+
+Интерфейс атрибутов совпадает с ParsedItemData, поэтому FilterService
+и process_item_result работают с записями без изменений.
+"""
+from typing import Any, Dict, List, Optional
+
+from ..models import ParsedItemData, StickerInfo
+
+
+class StickerRecord:
+    """Наклейка без валидации (аналог StickerInfo)."""
+
+    __slots__ = ("position", "wear", "price", "name")
+
+    def __init__(
+        self,
+        position: Optional[int] = None,
+        wear: Optional[str] = None,
+        price: Optional[float] = None,
+        name: Optional[str] = None
+    ):
+        self.position = position
+        self.wear = wear
+        self.price = price
+        self.name = name
+
+    @classmethod
+    def from_any(cls, sticker: Any) -> "StickerRecord":
+        """
+        Создает запись из StickerInfo, словаря или другой StickerRecord.
+
+        Args:
+            sticker: Исходная наклейка
+
+        Returns:
+            StickerRecord
+        """
+        if isinstance(sticker, cls):
+            return sticker
+        if isinstance(sticker, dict):
+            return cls(
+                sticker.get("position"),
+                sticker.get("wear"),
+                sticker.get("price"),
+                sticker.get("name")
+            )
+        return cls(
+            getattr(sticker, "position", None),
+            getattr(sticker, "wear", None),
+            getattr(sticker, "price", None),
+            getattr(sticker, "name", None)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Возвращает словарь с полями StickerInfo."""
+        return {
+            "position": self.position,
+            "wear": self.wear,
+            "price": self.price,
+            "name": self.name
+        }
+
+    def to_model(self) -> StickerInfo:
+        """Преобразует запись в StickerInfo (граница API/БД)."""
+        return StickerInfo.model_validate(self.to_dict())
+
+    def __repr__(self) -> str:
+        return f"StickerRecord(position={self.position!r}, name={self.name!r}, price={self.price!r})"
+
+
+class ListingRecord:
+    """Лот на странице без валидации (аналог ParsedItemData)."""
+
+    __slots__ = (
+        "float_value",
+        "pattern",
+        "stickers",
+        "total_stickers_price",
+        "item_name",
+        "item_price",
+        "inspect_links",
+        "item_type",
+        "is_stattrak",
+        "listing_id"
+    )
+
+    def __init__(
+        self,
+        float_value: Optional[float] = None,
+        pattern: Optional[int] = None,
+        stickers: Optional[List[StickerRecord]] = None,
+        total_stickers_price: float = 0.0,
+        item_name: Optional[str] = None,
+        item_price: Optional[float] = None,
+        inspect_links: Optional[List[str]] = None,
+        item_type: Optional[str] = None,
+        is_stattrak: bool = False,
+        listing_id: Optional[str] = None
+    ):
+        self.float_value = float_value
+        self.pattern = pattern
+        self.stickers = stickers if stickers is not None else []
+        self.total_stickers_price = total_stickers_price
+        self.item_name = item_name
+        self.item_price = item_price
+        self.inspect_links = inspect_links if inspect_links is not None else []
+        self.item_type = item_type
+        self.is_stattrak = is_stattrak
+        self.listing_id = listing_id
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ListingRecord":
+        """
+        Создает запись из словаря (формат serialize_parsed_item / item_data_json).
+
+        Args:
+            data: Словарь с полями ParsedItemData
+
+        Returns:
+            ListingRecord
+        """
+        return cls(
+            float_value=data.get("float_value"),
+            pattern=data.get("pattern"),
+            stickers=[StickerRecord.from_any(s) for s in data.get("stickers") or []],
+            total_stickers_price=data.get("total_stickers_price") or 0.0,
+            item_name=data.get("item_name"),
+            item_price=data.get("item_price"),
+            inspect_links=list(data.get("inspect_links") or []),
+            item_type=data.get("item_type"),
+            is_stattrak=bool(data.get("is_stattrak", False)),
+            listing_id=data.get("listing_id")
+        )
+
+    @classmethod
+    def from_parsed_item(cls, parsed_data: ParsedItemData) -> "ListingRecord":
+        """Создает запись из ParsedItemData (или другого объекта с теми же атрибутами)."""
+        if isinstance(parsed_data, cls):
+            return parsed_data
+        return cls(
+            float_value=parsed_data.float_value,
+            pattern=parsed_data.pattern,
+            stickers=[StickerRecord.from_any(s) for s in parsed_data.stickers or []],
+            total_stickers_price=parsed_data.total_stickers_price or 0.0,
+            item_name=parsed_data.item_name,
+            item_price=parsed_data.item_price,
+            inspect_links=list(parsed_data.inspect_links or []),
+            item_type=parsed_data.item_type,
+            is_stattrak=parsed_data.is_stattrak,
+            listing_id=parsed_data.listing_id
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Возвращает JSON-сериализуемый словарь с полями ParsedItemData."""
+        return {
+            "float_value": self.float_value,
+            "pattern": self.pattern,
+            "stickers": [StickerRecord.from_any(s).to_dict() for s in self.stickers],
+            "total_stickers_price": self.total_stickers_price,
+            "item_name": self.item_name,
+            "item_price": self.item_price,
+            "inspect_links": self.inspect_links,
+            "item_type": self.item_type,
+            "is_stattrak": self.is_stattrak,
+            "listing_id": self.listing_id
+        }
+
+    def to_parsed_item(self) -> ParsedItemData:
+        """Преобразует запись в ParsedItemData с валидацией (граница API/БД)."""
+        return ParsedItemData.model_validate(self.to_dict())
+
+    def __repr__(self) -> str:
+        return (
+            f"ListingRecord(listing_id={self.listing_id!r}, item_name={self.item_name!r}, "
+            f"price={self.item_price!r}, float={self.float_value!r}, pattern={self.pattern!r}, "
+            f"stickers={len(self.stickers)})"
+        )
@@ -3,11 +3,39 @@
 """
 import asyncio
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from ..models import ParsedItemData, SearchFilters
+from ..models import SearchFilters
+from core.config import Config
 from parsers import detect_item_type
-from .process_results import process_item_result
+from .batch_filter import select_candidates
+from .listing_record import ListingRecord, StickerRecord
+from .process_results import FoundItemBatch, evaluate_item_result, process_item_result
+from services.filter_plan import get_filter_plan
+from services.seen_listings import seen_listings
+from services.task_match_index import IndexedTask, TaskMatchIndex, task_match_index
+
+
+async def drop_seen_listings(page_listings: List[dict], task_id: Optional[int], redis_service) -> List[dict]:
+    """
+    Убирает со страницы лоты, уже сохраненные для задачи (один запрос к Redis на страницу).
+
+    Args:
+        page_listings: Список лотов на странице
+        task_id: ID задачи (без задачи лоты не отсеиваются)
+        redis_service: Сервис Redis
+
+    Returns:
+        Лоты, которые еще не сохранялись
+    """
+    if not task_id or not page_listings or not Config.SEEN_FILTER_ENABLED:
+        return page_listings
+    seen = await seen_listings.contains_many(
+        redis_service, task_id, (listing.get('listing_id') for listing in page_listings)
+    )
+    if not seen:
+        return page_listings
+    return [listing for listing in page_listings if str(listing.get('listing_id')) not in seen]
 
 
 async def process_page_listings(
@@ -23,10 +51,13 @@ async def process_page_listings(
     page_num: int,
     log_func,
     max_listings_time: float = 120.0
-) -> List[ParsedItemData]:
+) -> List[ListingRecord]:
     """
     Обрабатывает лоты на странице: проверяет фильтры и сохраняет результаты.
     
+    Лоты представлены компактными ListingRecord (без валидации Pydantic),
+    в ParsedItemData они преобразуются только на границах API/БД.
+    
     Args:
         parser: Экземпляр SteamMarketParser
         page_listings: Список лотов на странице
@@ -42,64 +73,41 @@ async def process_page_listings(
         max_listings_time: Максимальное время на обработку всех лотов (секунды)
         
     Returns:
-        Список подходящих лотов (ParsedItemData)
+        Список подходящих лотов (ListingRecord)
     """
     page_matching_listings = []
     listings_processed = 0
+    is_stattrak = "StatTrak" in hash_name or "StatTrak™" in hash_name
     listings_processing_start = datetime.now()
     
-    for listing in page_listings:
+    # Уже сохраненные лоты задачи не проверяем фильтрами и не сохраняем повторно
+    total_listings = len(page_listings)
+    page_listings = await drop_seen_listings(page_listings, task.id if task else None, redis_service)
+    if len(page_listings) < total_listings:
+        log_func("debug", f"    ⏭️ Воркер {worker_id}, страница {page_num}: Пропущено {total_listings - len(page_listings)} уже сохраненных лотов")
+    
+    # ПАКЕТНАЯ ПРОВЕРКА: цена, паттерн, float и тип/количество наклеек проверяются сразу для всей страницы,
+    # до проверки наклеек и БД доходят только прошедшие лоты
+    records = [build_listing_record(listing, hash_name, is_stattrak) for listing in page_listings]
+    candidates = select_candidates(records, get_filter_plan(filters))
+    if len(candidates) < len(records):
+        log_func("debug", f"    ⏭️ Воркер {worker_id}, страница {page_num}: Пакетной проверкой отсеяно {len(records) - len(candidates)}/{len(records)} лотов")
+    
+    # Подходящие лоты страницы сохраняются одной вставкой после проверки всей страницы
+    batch = FoundItemBatch(task) if task and worker_db_session else None
+    
+    for index in candidates:
         # Проверяем, не превышен ли таймаут обработки лотов
         listings_elapsed = (datetime.now() - listings_processing_start).total_seconds()
         if listings_elapsed > max_listings_time:
-            log_func("warning", f"    ⏱️ Воркер {worker_id}, страница {page_num}: Превышен таймаут обработки лотов ({max_listings_time}с), обработано {listings_processed}/{len(page_listings)} лотов, пропускаем остальные")
+            log_func("warning", f"    ⏱️ Воркер {worker_id}, страница {page_num}: Превышен таймаут обработки лотов ({max_listings_time}с), обработано {listings_processed}/{len(candidates)} лотов, пропускаем остальные")
             break
         
-        listing_price = listing.get('price', 0.0)
-        listing_id = listing.get('listing_id')
-        listing_pattern = listing.get('pattern')
-        listing_float = listing.get('float_value')
-        stickers = listing.get('stickers', [])
-        inspect_link = listing.get('inspect_link')
-        
-        # Создаем ParsedItemData
-        item_type = detect_item_type(
-            hash_name or "",
-            listing_float is not None,
-            len(stickers) > 0
-        )
-        if listing_pattern is not None and listing_pattern > 999:
-            item_type = "keychain"
-        
-        is_stattrak = "StatTrak" in hash_name or "StatTrak™" in hash_name
-        
-        parsed_data = ParsedItemData(
-            float_value=listing_float,
-            pattern=listing_pattern,
-            stickers=stickers,
-            total_stickers_price=0.0,
-            item_name=hash_name,
-            item_price=listing_price,
-            inspect_links=[inspect_link] if inspect_link else [],
-            item_type=item_type,
-            is_stattrak=is_stattrak,
-            listing_id=listing_id
-        )
-        
-        # РАННЯЯ ПРОВЕРКА ПАТТЕРНА: если паттерн известен и не подходит - пропускаем сразу
-        # Это предотвращает обработку предметов, которые точно не пройдут фильтры
-        if listing_pattern is not None and filters.pattern_list:
-            target_patterns = filters.pattern_list.patterns if filters.pattern_list else []
-            if target_patterns:
-                # Нормализуем паттерн (для keychain берем остаток от деления на 1000)
-                normalized_pattern = listing_pattern % 1000 if listing_pattern > 999 else listing_pattern
-                if normalized_pattern not in target_patterns:
-                    log_func("debug", f"    ⏭️ Воркер {worker_id}, страница {page_num}: Пропускаем предмет с паттерном {listing_pattern} (нормализован: {normalized_pattern}), не в списке {target_patterns}")
-                    continue
+        parsed_data = records[index]
         
         # Проверяем фильтры без сохранения в БД
         item_dict = {
-            "sell_price_text": f"${listing_price:.2f}",
+            "sell_price_text": f"${parsed_data.item_price:.2f}",
             "asset_description": {"market_hash_name": hash_name},
             "name": hash_name
         }
@@ -108,12 +116,11 @@ async def process_page_listings(
             # ВАЖНО: Обрабатываем результат СРАЗУ после нахождения, а не после всех страниц
             # Это гарантирует, что уведомления отправляются немедленно
             if task and worker_db_session:
-                log_func("info", f"    🔄 Воркер {worker_id}: Найден подходящий предмет, обрабатываем СРАЗУ (task={task.id})")
+                log_func("info", f"    🔄 Воркер {worker_id}: Найден подходящий предмет, проверяем для сохранения (task={task.id})")
                 try:
-                    log_func("info", f"    📝 Воркер {worker_id}: Вызываем process_item_result для немедленной обработки...")
-                    # Обрабатываем результат сразу (сохранение в БД + отправка уведомления) с таймаутом
+                    # Полная проверка (наклейки и т.д.) сразу, сохранение и уведомление - пачкой страницы
                     try:
-                        saved = await asyncio.wait_for(
+                        accepted = await asyncio.wait_for(
                             process_item_result(
                                 parser=parser,
                                 task=task,
@@ -121,7 +128,8 @@ async def process_page_listings(
                                 filters=filters,
                                 db_session=worker_db_session,
                                 redis_service=redis_service,
-                                task_logger=task_logger
+                                task_logger=task_logger,
+                                batch=batch
                             ),
                             timeout=30.0  # Таймаут 30 секунд для обработки результата
                         )
@@ -131,13 +139,9 @@ async def process_page_listings(
                         page_matching_listings.append(parsed_data)
                         continue
                     
-                    if saved:
-                        log_func("info", f"    │ ✅✅✅ ВСЕ ФИЛЬТРЫ ПРОЙДЕНЫ И ПРЕДМЕТ СОХРАНЕН СРАЗУ!")
+                    if accepted:
+                        log_func("info", f"    │ ✅✅✅ ВСЕ ФИЛЬТРЫ ПРОЙДЕНЫ, ПРЕДМЕТ ДОБАВЛЕН В ПАЧКУ СОХРАНЕНИЯ")
                         log_func("info", f"    └────────────────────────────────────────────────────────────────────")
-                        # ВАЖНО: НЕ добавляем в page_matching_listings, если результат уже обработан
-                        # Это предотвратит повторную обработку через ResultsProcessorService
-                        # Уведомление уже отправлено в process_item_result
-                        log_func("info", f"    ℹ️ Предмет уже обработан и уведомление отправлено, не добавляем в список для повторной обработки")
                     else:
                         log_func("info", f"    │ ❌ НЕ ПРОШЕЛ ФИЛЬТРЫ ИЛИ УЖЕ СУЩЕСТВУЕТ В БД")
                         log_func("info", f"    └────────────────────────────────────────────────────────────────────")
@@ -155,5 +159,203 @@ async def process_page_listings(
         
         listings_processed += 1
     
+    if batch:
+        batch_size = len(batch)
+        try:
+            saved = await asyncio.wait_for(
+                batch.flush(worker_db_session, redis_service=redis_service, task_logger=task_logger),
+                timeout=30.0
+            )
+            log_func("info", f"    💾 Воркер {worker_id}, страница {page_num}: Сохранено {saved} из {batch_size} подходящих лотов одной вставкой")
+        except Exception as flush_error:
+            log_func("error", f"    ⚠️ Воркер {worker_id}, страница {page_num}: Ошибка сохранения пачки: {type(flush_error).__name__}: {str(flush_error)[:200]}")
+            # Несохраненные лоты обработает ResultsProcessorService
+            page_matching_listings.extend(batch.records)
+    
     return page_matching_listings
 
+
+def build_listing_record(listing: dict, hash_name: str, is_stattrak: bool) -> ListingRecord:
+    """
+    Создает компактную запись лота из лота страницы (после link_listings_with_assets).
+    
+    Args:
+        listing: Лот со страницы (price, listing_id, pattern, float_value, stickers, inspect_link)
+        hash_name: Хэш-имя предмета
+        is_stattrak: Является ли предмет StatTrak
+        
+    Returns:
+        ListingRecord
+    """
+    listing_pattern = listing.get('pattern')
+    listing_float = listing.get('float_value')
+    stickers = [StickerRecord.from_any(s) for s in listing.get('stickers', [])]
+    inspect_link = listing.get('inspect_link')
+    
+    item_type = detect_item_type(
+        hash_name or "",
+        listing_float is not None,
+        len(stickers) > 0
+    )
+    if listing_pattern is not None and listing_pattern > 999:
+        item_type = "keychain"
+    
+    return ListingRecord(
+        float_value=listing_float,
+        pattern=listing_pattern,
+        stickers=stickers,
+        total_stickers_price=0.0,
+        item_name=hash_name,
+        item_price=listing.get('price', 0.0),
+        inspect_links=[inspect_link] if inspect_link else [],
+        item_type=item_type,
+        is_stattrak=is_stattrak,
+        listing_id=listing.get('listing_id')
+    )
+
+
+def is_pattern_excluded(pattern: Optional[int], filters: SearchFilters) -> bool:
+    """
+    Ранняя проверка паттерна по списку паттернов фильтра.
+    
+    Args:
+        pattern: Паттерн лота (None если неизвестен)
+        filters: Фильтры поиска
+        
+    Returns:
+        True если паттерн известен и точно не входит в список
+    """
+    # Битовая маска паттернов берется из скомпилированного плана фильтров
+    return get_filter_plan(filters).is_pattern_excluded(pattern)
+
+
+async def filter_page_listings(
+    parser,
+    page_listings: List[dict],
+    hash_name: str,
+    filters: SearchFilters,
+    worker_id: int,
+    page_num: int,
+    log_func,
+    max_listings_time: float = 120.0
+) -> List[ListingRecord]:
+    """
+    Проверяет фильтры для лотов страницы без сохранения в БД (этап фильтрации пайплайна).
+    
+    Args:
+        parser: Экземпляр SteamMarketParser
+        page_listings: Список лотов на странице
+        hash_name: Хэш-имя предмета
+        filters: Фильтры поиска
+        worker_id: ID воркера
+        page_num: Номер страницы
+        log_func: Функция для логирования
+        max_listings_time: Максимальное время на обработку всех лотов (секунды)
+        
+    Returns:
+        Список лотов, прошедших фильтры
+    """
+    matched = []
+    is_stattrak = "StatTrak" in hash_name or "StatTrak™" in hash_name
+    started = datetime.now()
+    
+    records = [build_listing_record(listing, hash_name, is_stattrak) for listing in page_listings]
+    candidates = select_candidates(records, get_filter_plan(filters))
+    
+    for processed, index in enumerate(candidates):
+        if (datetime.now() - started).total_seconds() > max_listings_time:
+            log_func("warning", f"    ⏱️ Воркер {worker_id}, страница {page_num}: Превышен таймаут фильтрации ({max_listings_time}с), обработано {processed}/{len(candidates)} лотов")
+            break
+        
+        record = records[index]
+        item_dict = {
+            "sell_price_text": f"${record.item_price:.2f}",
+            "asset_description": {"market_hash_name": hash_name},
+            "name": hash_name
+        }
+        if await parser.filter_service.matches_filters(item_dict, filters, record):
+            matched.append(record)
+    
+    return matched
+
+
+async def match_other_tasks(
+    parser,
+    page_listings: List[dict],
+    hash_name: str,
+    filters: SearchFilters,
+    task_id: int,
+    redis_service,
+    log_func,
+    index: Optional[TaskMatchIndex] = None
+) -> List[Tuple[IndexedTask, ListingRecord, Dict[str, Any]]]:
+    """
+    Проверяет лоты страницы одной задачи для остальных активных задач того же предмета.
+    
+    Кандидаты для каждого лота берутся из индекса задач (цена, паттерн, float, тип),
+    уже сохраненные задачей лоты отсеиваются фильтром сохраненных, остальные проходят
+    полную проверку (наклейки, FilterService) через evaluate_item_result.
+    
+    Args:
+        parser: Экземпляр SteamMarketParser
+        page_listings: Список лотов на странице
+        hash_name: Хэш-имя предмета
+        filters: Фильтры задачи, для которой загружена страница (appid и валюта цен)
+        task_id: ID этой задачи
+        redis_service: Сервис Redis
+        log_func: Функция для логирования
+        index: Индекс задач (по умолчанию индекс процесса)
+        
+    Returns:
+        (задача, лот, значения колонок FoundItem) для лотов, прошедших фильтры других задач
+    """
+    index = index or task_match_index
+    # Группа индекса объединяет состояния и StatTrak, а страница - это один hash_name
+    # в одной валюте: берем только задачи, которые загружали бы ту же страницу сами
+    others = []
+    for other_id in index.tasks_for_item(hash_name):
+        other = index.task(other_id)
+        if (
+            other_id != task_id and other is not None and other.item_name == hash_name
+            and other.appid == filters.appid and other.filters.currency == filters.currency
+        ):
+            others.append(other_id)
+    if not others or not page_listings:
+        return []
+    
+    is_stattrak = "StatTrak" in hash_name or "StatTrak™" in hash_name
+    allowed = set(others)
+    by_task: Dict[int, List[ListingRecord]] = {}
+    for listing in page_listings:
+        record = build_listing_record(listing, hash_name, is_stattrak)
+        candidates = index.candidates(
+            hash_name, record.item_price, record.float_value, record.pattern,
+            record.item_type, len(record.stickers) if record.stickers else 0
+        )
+        for other_id in candidates & allowed:
+            by_task.setdefault(other_id, []).append(record)
+    
+    matched = []
+    for other_id, records in by_task.items():
+        other = index.task(other_id)
+        if other is None:
+            continue
+        if Config.SEEN_FILTER_ENABLED:
+            seen = await seen_listings.contains_many(redis_service, other_id, (record.listing_id for record in records))
+            records = [record for record in records if str(record.listing_id) not in seen]
+        for record in records:
+            try:
+                values = await asyncio.wait_for(
+                    evaluate_item_result(parser, other, record, other.filters, redis_service=redis_service),
+                    timeout=30.0
+                )
+            except Exception as e:
+                # Лот найдет собственная проверка задачи
+                log_func("warning", f"    ⚠️ Лот {record.listing_id} для задачи {other_id}: {type(e).__name__}: {str(e)[:200]}")
+                continue
+            if values is not None:
+                matched.append((other, record, values))
+    
+    if matched:
+        log_func("info", f"    🗂️ Задача {task_id}: {len(matched)} лотов страницы подходят другим задачам предмета")
+    return matched
@@ -0,0 +1,276 @@
+"""
+Источники страниц лотов для пайплайна и распределение страниц между репликами.
+
+ListPageSource - прежняя Redis очередь (список): страницы берут только
+загрузчики процесса, который ее создал.
+
+Для больших задач (от PAGE_JOBS_MIN_PAGES страниц) страницы публикуются в
+Redis Stream запуска page_jobs:run:{run_id}:pages с группой потребителей
+"pages". Запуск регистрируется в множестве page_jobs:runs, поэтому страницы
+может забрать любая реплика ParsingWorker (services.page_jobs.PageJobHelper):
+- XREADGROUP выдает каждую страницу одному потребителю;
+- страница подтверждается (XACK), когда ее найденные лоты сохранены (или
+  записаны в Redis), либо после окончательной ошибки;
+- страницы упавшего потребителя забираются через XAUTOCLAIM, когда они
+  висят неподтвержденными дольше PAGE_JOBS_CLAIM_IDLE.
+
+Барьер завершения: все записи выданы группе (last-delivered-id равен
+последнему id потока) и ни одна не ждет подтверждения. Реплика-координатор
+ждет его (не дольше PAGE_JOBS_BARRIER_TIMEOUT) и только потом собирает
+результаты задачи из Redis.
+"""
+import json
+import os
+import socket
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from uuid import uuid4
+
+from ..config import Config
+from ..models import SearchFilters
+
+
+RUNS_KEY = "page_jobs:runs"
+GROUP = "pages"
+RUN_TTL = 24 * 3600  # Страховка: метаданные запуска удаляются, даже если координатор упал
+
+# Запуски, которые координирует текущий процесс (помощник их не берет)
+local_runs: Set[str] = set()
+
+
+def run_key(run_id: str) -> str:
+    return f"page_jobs:run:{run_id}"
+
+
+def stream_key(run_id: str) -> str:
+    return f"page_jobs:run:{run_id}:pages"
+
+
+def consumer_name() -> str:
+    """Имя потребителя группы: хост и PID реплики."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _is_missing_group(error: Exception) -> bool:
+    """Поток или группа удалены (координатор закрыл запуск)."""
+    return "NOGROUP" in str(error) or "no such key" in str(error).lower()
+
+
+class ListPageSource:
+    """Страницы из Redis списка (загрузчики одного процесса)."""
+
+    def __init__(self, redis_service, queue_key: str):
+        self.redis_service = redis_service
+        self.queue_key = queue_key
+
+    async def next(self, timeout: float = 5.0) -> Optional[str]:
+        return await self.redis_service.rpop(self.queue_key, timeout=timeout)
+
+    async def exhausted(self) -> bool:
+        return await self.redis_service.llen(self.queue_key) == 0
+
+    async def done(self, page_num: int, ok: bool = True) -> None:
+        """Страница из списка уже удалена при получении."""
+
+
+class StreamPageSource:
+    """Страницы запуска из Redis Stream (любая реплика)."""
+
+    def __init__(
+        self,
+        redis_service,
+        run_id: str,
+        consumer: Optional[str] = None,
+        wait_all: bool = False,
+        claim_idle: Optional[float] = None,
+        barrier_timeout: Optional[float] = None,
+        log_func: Optional[Callable] = None
+    ):
+        """
+        Args:
+            redis_service: Сервис Redis
+            run_id: ID запуска
+            consumer: Имя потребителя (по умолчанию хост-PID)
+            wait_all: Координатор: источник исчерпан только на барьере завершения
+            claim_idle: Через сколько секунд забирать неподтвержденные страницы (по умолчанию PAGE_JOBS_CLAIM_IDLE)
+            barrier_timeout: Максимальное ожидание барьера (по умолчанию PAGE_JOBS_BARRIER_TIMEOUT)
+            log_func: Функция для логирования
+        """
+        self.redis_service = redis_service
+        self.run_id = run_id
+        self.stream = stream_key(run_id)
+        self.consumer = consumer or consumer_name()
+        self.wait_all = wait_all
+        self.claim_idle = Config.PAGE_JOBS_CLAIM_IDLE if claim_idle is None else claim_idle
+        self.deadline = time.monotonic() + (Config.PAGE_JOBS_BARRIER_TIMEOUT if barrier_timeout is None else barrier_timeout)
+        self.log_func = log_func
+        self._entries: Dict[int, str] = {}  # page_num -> id записи потока
+        self._closed = False
+        self.read = 0
+        self.reclaimed = 0
+        self.acked = 0
+
+    def _log(self, level: str, message: str) -> None:
+        if self.log_func:
+            self.log_func(level, message)
+
+    async def next(self, timeout: float = 5.0) -> Optional[str]:
+        """
+        Следующая страница: новая запись группы, иначе зависшая у другого потребителя.
+
+        Returns:
+            JSON страницы или None, если брать нечего
+        """
+        if self._closed:
+            return None
+        client = self.redis_service._client
+        try:
+            response = await client.xreadgroup(
+                GROUP, self.consumer, {self.stream: ">"}, count=1, block=max(1, int(timeout * 1000))
+            )
+            if response:
+                entry_id, fields = response[0][1][0]
+                self.read += 1
+            else:
+                claimed = await client.xautoclaim(
+                    self.stream, GROUP, self.consumer, int(self.claim_idle * 1000), start_id="0-0", count=1
+                )
+                messages = claimed[1] if claimed else []
+                if not messages:
+                    return None
+                entry_id, fields = messages[0]
+                self.reclaimed += 1
+                self._log("warning", f"♻️ Страницы: Забрана зависшая страница {entry_id} запуска {self.run_id}")
+        except Exception as e:
+            if _is_missing_group(e):
+                self._closed = True
+                return None
+            raise
+
+        page_data_str = (fields or {}).get("page")
+        try:
+            page_num = json.loads(page_data_str)["page_num"]
+        except (TypeError, ValueError, KeyError):
+            # Запись удалена или повреждена - подтверждаем, чтобы не держать барьер
+            await self._ack(entry_id, ok=False)
+            return None
+        self._entries[page_num] = entry_id
+        return page_data_str
+
+    async def exhausted(self) -> bool:
+        if self._closed or not self.wait_all:
+            return True
+        if time.monotonic() >= self.deadline:
+            self._log("warning", f"⏱️ Страницы: Барьер запуска {self.run_id} не достигнут за отведенное время")
+            return True
+        try:
+            return await barrier_reached(self.redis_service, self.run_id)
+        except Exception as e:
+            if _is_missing_group(e):
+                return True
+            raise
+
+    async def done(self, page_num: int, ok: bool = True) -> None:
+        """Подтверждает страницу (после сохранения ее лотов или окончательной ошибки)."""
+        entry_id = self._entries.pop(page_num, None)
+        if entry_id is not None:
+            await self._ack(entry_id, ok)
+
+    async def _ack(self, entry_id: str, ok: bool) -> None:
+        client = self.redis_service._client
+        try:
+            acked = await client.xack(self.stream, GROUP, entry_id)
+            if acked:
+                # Повторно обработанная (забранная) страница не считается дважды
+                self.acked += 1
+                await client.hincrby(run_key(self.run_id), "done" if ok else "failed", 1)
+        except Exception as e:
+            if not _is_missing_group(e):
+                self._log("warning", f"⚠️ Страницы: Не удалось подтвердить страницу {entry_id}: {e}")
+
+
+async def create_page_run(redis_service, task, appid: int, hash_name: str, filters: SearchFilters, pages: List[str]) -> str:
+    """
+    Публикует страницы задачи в поток и регистрирует запуск для других реплик.
+
+    Args:
+        redis_service: Сервис Redis
+        task: Задача мониторинга
+        appid: ID приложения
+        hash_name: Хэш-имя предмета
+        filters: Фильтры поиска
+        pages: JSON страниц (в порядке обработки)
+
+    Returns:
+        ID запуска
+    """
+    client = redis_service._client
+    run_id = f"{task.id}-{uuid4().hex[:8]}"
+    stream = stream_key(run_id)
+    await client.xgroup_create(stream, GROUP, id="0", mkstream=True)
+    pipe = client.pipeline(transaction=False)
+    for page in pages:
+        pipe.xadd(stream, {"page": page})
+    pipe.hset(run_key(run_id), mapping={
+        "task_id": task.id,
+        "appid": appid,
+        "hash_name": hash_name,
+        "filters": filters.model_dump_json(),
+        "total": len(pages),
+        "done": 0,
+        "failed": 0,
+    })
+    pipe.expire(run_key(run_id), RUN_TTL)
+    pipe.expire(stream, RUN_TTL)
+    pipe.sadd(RUNS_KEY, run_id)
+    await pipe.execute()
+    local_runs.add(run_id)
+    return run_id
+
+
+async def barrier_reached(redis_service, run_id: str) -> bool:
+    """Все страницы запуска выданы и подтверждены."""
+    client = redis_service._client
+    stream = stream_key(run_id)
+    info = await client.xinfo_stream(stream)
+    groups = await client.xinfo_groups(stream)
+    group = next((g for g in groups if g.get("name") == GROUP), None)
+    if group is None:
+        return True
+    return group.get("pending", 0) == 0 and group.get("last-delivered-id") == info.get("last-generated-id")
+
+
+async def has_undelivered(redis_service, run_id: str) -> bool:
+    """Есть ли у запуска страницы, которые еще никому не выданы."""
+    client = redis_service._client
+    stream = stream_key(run_id)
+    try:
+        info = await client.xinfo_stream(stream)
+        groups = await client.xinfo_groups(stream)
+    except Exception as e:
+        if _is_missing_group(e):
+            return False
+        raise
+    group = next((g for g in groups if g.get("name") == GROUP), None)
+    return group is not None and group.get("last-delivered-id") != info.get("last-generated-id")
+
+
+async def page_run_progress(redis_service, run_id: str) -> Tuple[int, int, int]:
+    """
+    Прогресс запуска.
+
+    Returns:
+        (подтверждено успешно, с ошибкой, всего)
+    """
+    meta = await redis_service._client.hgetall(run_key(run_id))
+    return int(meta.get("done", 0)), int(meta.get("failed", 0)), int(meta.get("total", 0))
+
+
+async def close_page_run(redis_service, run_id: str) -> None:
+    """Удаляет поток и метаданные запуска."""
+    local_runs.discard(run_id)
+    client = redis_service._client
+    pipe = client.pipeline(transaction=False)
+    pipe.srem(RUNS_KEY, run_id)
+    pipe.delete(stream_key(run_id), run_key(run_id))
+    await pipe.execute()
@@ -4,6 +4,7 @@
 from typing import Dict, List, Optional
 from parsers import ItemPageParser
 from core.utils.sticker_parser import StickerParser
+from .parallel_listing_prefilter import read_asset_properties
 
 
 def extract_assets_data(render_data: dict, worker_id: int, page_num: int, log_func) -> Dict[str, dict]:
@@ -26,29 +27,10 @@ def extract_assets_data(render_data: dict, worker_id: int, page_num: int, log_fu
         for contextid, items in app_assets.items():
             for itemid, item in items.items():
                 itemid = str(itemid)
-                pattern = None
-                float_value = None
                 stickers = []
                 
                 # Парсим asset_properties для паттерна и float
-                if 'asset_properties' in item:
-                    props = item['asset_properties']
-                    for prop in props:
-                        prop_id = prop.get('propertyid')
-                        # propertyid=1 для скинов, propertyid=3 для брелков
-                        # Проверяем оба, но не перезаписываем, если паттерн уже найден
-                        if (prop_id == 1 or prop_id == 3) and pattern is None:
-                            pattern = prop.get('int_value')
-                            try:
-                                pattern = int(pattern) if pattern is not None else None
-                            except (ValueError, TypeError):
-                                pattern = None
-                        elif prop_id == 2:
-                            float_value_raw = prop.get('float_value')
-                            try:
-                                float_value = float(float_value_raw) if float_value_raw is not None else None
-                            except (ValueError, TypeError):
-                                float_value = None
+                pattern, float_value = read_asset_properties(item)
                 
                 # Парсим descriptions для наклеек используя StickerParser
                 if 'descriptions' in item:
@@ -90,7 +72,11 @@ def parse_page_listings(render_data: dict, worker_id: int, page_num: int, log_fu
         return []
     
     parser_obj = ItemPageParser(results_html)
-    return parser_obj.get_all_listings()
+    try:
+        return parser_obj.get_all_listings()
+    finally:
+        # Лоты не ссылаются на DOM, поэтому дерево страницы освобождаем сразу
+        parser_obj.release()
 
 
 def link_listings_with_assets(
@@ -1,6 +1,7 @@
 """
 Модуль для параллельного парсинга страниц лотов.
-Использует Redis очередь для распределения страниц между воркерами.
+Использует Redis очередь для распределения страниц между воркерами;
+страницы больших задач делятся между репликами (parallel_listing_page_jobs).
 """
 import asyncio
 import json
@@ -13,6 +14,11 @@ from core.steam_market_parser.logger_utils import log_both
 from core.steam_market_parser.page_range_optimizer import build_optimized_pages_list
 from .parallel_listing_utils import get_available_proxies, get_random_proxy
 from .parallel_listing_worker import process_page_from_queue
+from .parallel_listing_pipeline import run_listing_pipeline
+from .parallel_listing_page_jobs import StreamPageSource, close_page_run, create_page_run, page_run_progress
+from core.config import Config
+from services.seen_listings import seen_listings
+from services.concurrency_controller import concurrency_controller
 
 
 async def parse_listings_parallel(
@@ -83,8 +89,9 @@ async def parse_listings_parallel(
     
     log("info", f"🌐 Доступно прокси: {len(available_proxies)}")
     
-    # Параллельно n = proxies_count / 3 запросов
-    max_concurrent = max(1, len(available_proxies) // 3)
+    # Доступные прокси делятся между выполняющимися задачами воркера (ConcurrencyController);
+    # без контроллера - n = proxies_count / 3 запросов
+    max_concurrent = concurrency_controller.page_workers(len(available_proxies))
     log("info", f"🔄 Параллельный парсинг: максимум {max_concurrent} одновременных воркеров (из {len(available_proxies)} прокси)")
     
     # Проверяем наличие Redis для очереди
@@ -105,6 +112,13 @@ async def parse_listings_parallel(
     queue_key = f"parsing:pages:task_{task.id if task else 'unknown'}"
     log("info", f"📋 Создаем Redis очередь страниц: {queue_key}")
     
+    # Страницы большой задачи делятся между репликами воркера (Redis Stream)
+    use_page_jobs = (
+        Config.PAGE_JOBS_ENABLED and Config.LISTING_PIPELINE_ENABLED
+        and task is not None and total_pages >= Config.PAGE_JOBS_MIN_PAGES
+    )
+    page_run_id = None
+    
     # Добавляем все страницы в Redis очередь (в обратном порядке, чтобы брать с первой)
     try:
         log("info", f"📥 Добавляем {len(pages_to_fetch)} страниц в Redis очередь...")
@@ -119,10 +133,18 @@ async def parse_listings_parallel(
             })
             page_data_list.append(page_data)
         
-        # Добавляем все страницы в очередь (LPUSH добавляет в начало, поэтому добавляем в обратном порядке)
-        await redis_service.lpush(queue_key, *reversed(page_data_list))
-        queue_length = await redis_service.llen(queue_key)
-        log("info", f"✅ Добавлено {len(pages_to_fetch)} страниц в очередь (длина очереди: {queue_length})")
+        if use_page_jobs:
+            # Большая задача: страницы в потоке запуска, их могут забрать другие реплики
+            try:
+                page_run_id = await create_page_run(redis_service, task, appid, hash_name, filters, page_data_list)
+                log("info", f"🌍 Страницы опубликованы для всех реплик: запуск {page_run_id} ({len(page_data_list)} страниц)")
+            except Exception as e:
+                log("warning", f"⚠️ Не удалось опубликовать страницы для реплик, используем локальную очередь: {e}")
+        if page_run_id is None:
+            # Добавляем все страницы в очередь (LPUSH добавляет в начало, поэтому добавляем в обратном порядке)
+            await redis_service.lpush(queue_key, *reversed(page_data_list))
+            queue_length = await redis_service.llen(queue_key)
+            log("info", f"✅ Добавлено {len(pages_to_fetch)} страниц в очередь (длина очереди: {queue_length})")
     except Exception as e:
         log("error", f"❌ Ошибка при добавлении страниц в очередь: {e}")
         import traceback
@@ -138,15 +160,26 @@ async def parse_listings_parallel(
     task_start_times = {}  # page_num -> start_time
     task_stages = {}  # page_num -> current_stage
     
-    # Запускаем воркеры параллельно
-    log("info", f"🚀 Запускаем {max_concurrent} воркеров для обработки страниц из Redis очереди...")
+    # Фильтр сохраненных лотов задачи пересобирается из БД, если его нет в Redis
+    if task and db_manager and Config.SEEN_FILTER_ENABLED:
+        seen_session = None
+        try:
+            seen_session = await db_manager.get_session()
+            await seen_listings.ensure(redis_service, task.id, seen_session)
+        except Exception as e:
+            log("warning", f"⚠️ Не удалось подготовить фильтр сохраненных лотов: {e}")
+        finally:
+            if seen_session is not None:
+                await seen_session.close()
     
-    workers = [
-        asyncio.create_task(
-            process_page_from_queue(
-                worker_id=worker_id,
-                queue_key=queue_key,
-                redis_service=redis_service,
+    if Config.LISTING_PIPELINE_ENABLED:
+        # Потоковый пайплайн: загрузка, парсинг, сохранение и уведомления идут параллельно
+        page_source = None
+        if page_run_id is not None:
+            # Координатор ждет, пока все страницы запуска подтвердят (в том числе другие реплики)
+            page_source = StreamPageSource(redis_service, page_run_id, wait_all=True, log_func=log)
+        try:
+            await run_listing_pipeline(
                 parser=parser,
                 appid=appid,
                 hash_name=hash_name,
@@ -154,25 +187,52 @@ async def parse_listings_parallel(
                 task=task,
                 db_manager=db_manager,
                 task_logger=task_logger,
-                redis_service_for_notifications=redis_service,
+                redis_service=redis_service,
+                queue_key=queue_key,
                 available_proxies=available_proxies,
                 max_retries=max_retries,
                 total_pages=total_pages,
+                fetchers=max_concurrent,
                 task_start_times=task_start_times,
                 task_stages=task_stages,
-                log_func=log
+                log_func=log,
+                parsers=Config.LISTING_PIPELINE_PARSERS,
+                queue_size=Config.LISTING_PIPELINE_QUEUE_SIZE,
+                persist_batch=Config.LISTING_PIPELINE_PERSIST_BATCH,
+                page_source=page_source
             )
+        except Exception as e:
+            log("error", f"❌ Ошибка при выполнении пайплайна: {e}")
+            import traceback
+            log("error", f"   Traceback: {traceback.format_exc()}")
+        finally:
+            if page_run_id is not None:
+                try:
+                    done_pages, failed_pages, _ = await page_run_progress(redis_service, page_run_id)
+                    log("info", f"🌍 Запуск {page_run_id}: подтверждено {done_pages} страниц, с ошибкой {failed_pages}, "
+                                f"этой репликой {page_source.acked} (забрано зависших {page_source.reclaimed})")
+                    await close_page_run(redis_service, page_run_id)
+                except Exception as e:
+                    log("warning", f"⚠️ Не удалось закрыть запуск {page_run_id}: {e}")
+    else:
+        await _run_queue_workers(
+            max_concurrent=max_concurrent,
+            queue_key=queue_key,
+            redis_service=redis_service,
+            parser=parser,
+            appid=appid,
+            hash_name=hash_name,
+            filters=filters,
+            task=task,
+            db_manager=db_manager,
+            task_logger=task_logger,
+            available_proxies=available_proxies,
+            max_retries=max_retries,
+            total_pages=total_pages,
+            task_start_times=task_start_times,
+            task_stages=task_stages,
+            log=log
         )
-        for worker_id in range(1, max_concurrent + 1)
-    ]
-    
-    # Ждем завершения всех воркеров
-    try:
-        await asyncio.gather(*workers, return_exceptions=True)
-    except Exception as e:
-        log("error", f"❌ Ошибка при выполнении воркеров: {e}")
-        import traceback
-        log("error", f"   Traceback: {traceback.format_exc()}")
     
     # Очищаем очередь после завершения
     try:
@@ -240,3 +300,62 @@ async def parse_listings_parallel(
         log("info", f"ℹ️ Список результатов пуст - все найденные предметы уже обработаны сразу (уведомления отправлены)")
     
     return matching_listings
+
+
+async def _run_queue_workers(
+    max_concurrent: int,
+    queue_key: str,
+    redis_service,
+    parser,
+    appid: int,
+    hash_name: str,
+    filters: SearchFilters,
+    task,
+    db_manager,
+    task_logger,
+    available_proxies: List,
+    max_retries: int,
+    total_pages: int,
+    task_start_times: dict,
+    task_stages: dict,
+    log
+) -> None:
+    """
+    Последовательные воркеры (загрузка -> парсинг -> сохранение в одном цикле).
+    Используются, если потоковый пайплайн отключен (LISTING_PIPELINE_ENABLED=false).
+    """
+    # Запускаем воркеры параллельно
+    log("info", f"🚀 Запускаем {max_concurrent} воркеров для обработки страниц из Redis очереди...")
+    
+    workers = [
+        asyncio.create_task(
+            process_page_from_queue(
+                worker_id=worker_id,
+                queue_key=queue_key,
+                redis_service=redis_service,
+                parser=parser,
+                appid=appid,
+                hash_name=hash_name,
+                filters=filters,
+                task=task,
+                db_manager=db_manager,
+                task_logger=task_logger,
+                redis_service_for_notifications=redis_service,
+                available_proxies=available_proxies,
+                max_retries=max_retries,
+                total_pages=total_pages,
+                task_start_times=task_start_times,
+                task_stages=task_stages,
+                log_func=log
+            )
+        )
+        for worker_id in range(1, max_concurrent + 1)
+    ]
+    
+    # Ждем завершения всех воркеров
+    try:
+        await asyncio.gather(*workers, return_exceptions=True)
+    except Exception as e:
+        log("error", f"❌ Ошибка при выполнении воркеров: {e}")
+        import traceback
+        log("error", f"   Traceback: {traceback.format_exc()}")
@@ -0,0 +1,728 @@
+"""
+Потоковый пайплайн обработки страниц лотов с обратным давлением.
+
+Этапы соединены ограниченными asyncio.Queue, поэтому сеть, CPU и БД работают
+одновременно, а медленный этап притормаживает предыдущие (а не копит память):
+
+    Redis очередь страниц (список или поток запуска, см. parallel_listing_page_jobs)
+        -> N загрузчиков (прокси, /render/ API)
+        -> M парсеров (HTML/assets в потоке + фильтры и цены наклеек)
+        -> 1 сохранитель (только БД: пачки лотов, одна сессия)
+        -> 1 отправитель уведомлений (Redis pub/sub)
+
+Парсер проверяет лоты страницы и для других активных задач того же предмета
+(индекс services.task_match_index): подходящие лоты сохраняются для этих задач
+сразу, без отдельной загрузки тех же страниц.
+
+Каждый этап ведет собственные метрики (StageMetrics).
+
+Помимо длины очередей, загруженные страницы ограничены бюджетом памяти
+(MemoryBudget, общий для всех задач процесса): загрузчик не берет следующую
+страницу, пока разобранные страницы не освободят место.
+"""
+import asyncio
+import json
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Union
+
+from ..config import Config
+from ..models import SearchFilters
+from .listing_record import ListingRecord
+from .parallel_listing_page_jobs import ListPageSource
+from .parallel_listing_utils import get_random_proxy
+from .parallel_listing_page_parser import extract_assets_data, parse_page_listings, link_listings_with_assets
+from .parallel_listing_listings_processor import drop_seen_listings, filter_page_listings, match_other_tasks
+from .parallel_listing_prefilter import AssetPrefilter, PruneCounters, prefilter_render_data
+from .parallel_listing_redis_storage import save_page_results_to_redis
+from .process_results import FoundItemBatch, evaluate_item_result, store_item_result
+from services.task_cancellation import task_cancellation
+
+
+# Маркер завершения этапа
+_STOP = object()
+
+
+class StageMetrics:
+    """Метрики одного этапа пайплайна."""
+
+    __slots__ = ("name", "workers", "processed", "errors", "busy_seconds", "wait_seconds", "max_queue_depth")
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.processed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0  # Время полезной работы
+        self.wait_seconds = 0.0  # Время ожидания входных данных / места в следующей очереди
+        self.max_queue_depth = 0  # Максимальная глубина входной очереди
+
+    def observe_queue(self, queue: asyncio.Queue) -> None:
+        """Запоминает глубину входной очереди этапа."""
+        depth = queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    def to_dict(self) -> Dict[str, float]:
+        """Возвращает метрики в виде словаря."""
+        return {
+            "workers": self.workers,
+            "processed": self.processed,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "wait_seconds": round(self.wait_seconds, 3),
+            "max_queue_depth": self.max_queue_depth
+        }
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: воркеров={self.workers}, обработано={self.processed}, ошибок={self.errors}, "
+            f"работа={self.busy_seconds:.1f}с, ожидание={self.wait_seconds:.1f}с, макс. очередь={self.max_queue_depth}"
+        )
+
+
+class MemoryBudget:
+    """
+    Ограничение суммарного размера страниц, ожидающих парсинга.
+
+    Загрузчик резервирует оценку размера страницы перед передачей парсерам,
+    парсер освобождает ее после разбора. Одна страница больше бюджета
+    пропускается, только если бюджет свободен (иначе она ждала бы вечно).
+    """
+
+    def __init__(self, limit_bytes: int):
+        self.limit_bytes = max(1, int(limit_bytes))
+        self.used_bytes = 0
+        self.peak_bytes = 0
+        self.throttled = 0  # Сколько раз загрузчик ждал освобождения памяти
+        self._condition: Optional[asyncio.Condition] = None
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self, nbytes: int) -> None:
+        """Резервирует nbytes, ожидая освобождения бюджета при необходимости."""
+        condition = self._get_condition()
+        async with condition:
+            if self.used_bytes and self.used_bytes + nbytes > self.limit_bytes:
+                self.throttled += 1
+                await condition.wait_for(lambda: not self.used_bytes or self.used_bytes + nbytes <= self.limit_bytes)
+            self.used_bytes += nbytes
+            self.peak_bytes = max(self.peak_bytes, self.used_bytes)
+
+    async def release(self, nbytes: int) -> None:
+        """Освобождает ранее зарезервированные nbytes."""
+        condition = self._get_condition()
+        async with condition:
+            self.used_bytes = max(0, self.used_bytes - nbytes)
+            condition.notify_all()
+
+    def __str__(self) -> str:
+        return (
+            f"память: лимит={self.limit_bytes / 1048576:.0f}МБ, занято={self.used_bytes / 1048576:.1f}МБ, "
+            f"пик={self.peak_bytes / 1048576:.1f}МБ, ожиданий={self.throttled}"
+        )
+
+
+# Общий бюджет процесса (создается для текущего event loop)
+_shared_budget: Optional[MemoryBudget] = None
+_shared_budget_loop = None
+
+
+def get_shared_memory_budget() -> MemoryBudget:
+    """
+    Возвращает бюджет памяти, общий для всех пайплайнов процесса.
+
+    Returns:
+        MemoryBudget размером Config.LISTING_PIPELINE_MEMORY_BUDGET_MB
+    """
+    global _shared_budget, _shared_budget_loop
+    loop = asyncio.get_running_loop()
+    if _shared_budget is None or _shared_budget_loop is not loop:
+        _shared_budget = MemoryBudget(Config.LISTING_PIPELINE_MEMORY_BUDGET_MB * 1024 * 1024)
+        _shared_budget_loop = loop
+    return _shared_budget
+
+
+def estimate_render_data_size(render_data: dict) -> int:
+    """
+    Грубая оценка памяти, занимаемой ответом /render/ API.
+
+    Args:
+        render_data: Данные /render/ API
+
+    Returns:
+        Оценка в байтах (HTML + ~2 КБ на asset и лот)
+    """
+    size = sys.getsizeof(render_data.get('results_html') or '')
+    for items in ((render_data.get('assets') or {}).get('730') or {}).values():
+        size += 2048 * len(items)
+    size += 2048 * len(render_data.get('listinginfo') or {})
+    return size
+
+
+class _QueueNotifier:
+    """Адаптер publish() для store_item_result: передает уведомление этапу уведомлений."""
+
+    def __init__(self, queue: asyncio.Queue):
+        self._queue = queue
+
+    async def publish(self, channel: str, message: Dict) -> None:
+        await self._queue.put((channel, message))
+
+
+async def fetch_page_render_data(
+    parser,
+    appid: int,
+    hash_name: str,
+    page_start: int,
+    page_count: int,
+    page_proxy,
+    timeout: float = 120.0
+) -> Optional[dict]:
+    """
+    Загружает страницу лотов через /render/ API с указанным прокси.
+
+    Args:
+        parser: Экземпляр SteamMarketParser (используется как фабрика временного парсера)
+        appid: ID приложения
+        hash_name: Хэш-имя предмета
+        page_start: Смещение страницы
+        page_count: Количество лотов на странице
+        page_proxy: Прокси для запроса
+        timeout: Таймаут запроса (секунды)
+
+    Returns:
+        Данные /render/ API или None
+    """
+    temp_parser = parser.__class__(
+        proxy=page_proxy.url,
+        timeout=20,
+        redis_service=parser.redis_service,
+        proxy_manager=parser.proxy_manager
+    )
+    try:
+        await temp_parser._ensure_client()
+        temp_parser._client.headers.update(temp_parser._get_browser_headers())
+        return await asyncio.wait_for(
+            temp_parser._fetch_render_api(appid, hash_name, start=page_start, count=page_count),
+            timeout=timeout
+        )
+    finally:
+        try:
+            await temp_parser.close()
+        except Exception:
+            pass
+
+
+def parse_render_data(
+    render_data: dict,
+    worker_id: int,
+    page_num: int,
+    log_func: Callable,
+    prefilter: Optional[AssetPrefilter] = None,
+    counters: Optional[PruneCounters] = None
+) -> List[dict]:
+    """
+    CPU-часть обработки страницы: ранний отсев + assets + HTML + связывание лотов с assets.
+
+    Args:
+        render_data: Данные /render/ API
+        worker_id: ID воркера
+        page_num: Номер страницы
+        log_func: Функция для логирования
+        prefilter: Условия раннего отсева по asset_properties (опционально)
+        counters: Счетчики отсева страницы (опционально)
+
+    Returns:
+        Список лотов с pattern, float_value и stickers
+    """
+    pruned_listing_ids = set()
+    if prefilter is not None:
+        render_data, pruned_listing_ids = prefilter_render_data(render_data, prefilter, counters)
+        if pruned_listing_ids and not render_data.get('listinginfo'):
+            # Все лоты страницы отсеяны - HTML и наклейки не разбираем
+            if counters is not None:
+                counters.pages_without_html += 1
+            return []
+
+    assets_data_map = extract_assets_data(render_data, worker_id, page_num, log_func)
+    page_listings = parse_page_listings(render_data, worker_id, page_num, log_func)
+    if pruned_listing_ids:
+        page_listings = [
+            listing for listing in page_listings
+            if str(listing.get('listing_id')) not in pruned_listing_ids
+        ]
+    link_listings_with_assets(page_listings, render_data, assets_data_map, worker_id, page_num, log_func)
+    return page_listings
+
+
+async def run_listing_pipeline(
+    parser,
+    appid: int,
+    hash_name: str,
+    filters: SearchFilters,
+    task,
+    db_manager,
+    task_logger,
+    redis_service,
+    queue_key: str,
+    available_proxies: List,
+    max_retries: int,
+    total_pages: int,
+    fetchers: int,
+    task_start_times: Dict[int, datetime],
+    task_stages: Dict[int, str],
+    log_func: Callable,
+    parsers: int = 2,
+    queue_size: int = 4,
+    persist_batch: int = 20,
+    memory_budget: Optional[MemoryBudget] = None,
+    page_source=None
+) -> Dict[str, Union[StageMetrics, PruneCounters]]:
+    """
+    Обрабатывает страницы из Redis очереди потоковым пайплайном.
+
+    Args:
+        parser: Экземпляр SteamMarketParser
+        appid: ID приложения
+        hash_name: Хэш-имя предмета
+        filters: Фильтры поиска
+        task: Задача мониторинга
+        db_manager: Менеджер БД
+        task_logger: Логгер задачи
+        redis_service: Сервис Redis (очередь страниц, результаты, уведомления)
+        queue_key: Ключ Redis очереди страниц
+        available_proxies: Список доступных прокси
+        max_retries: Максимальное количество попыток загрузки страницы
+        total_pages: Общее количество страниц
+        fetchers: Количество загрузчиков
+        task_start_times: page_num -> время начала (для диагностики зависаний)
+        task_stages: page_num -> текущий этап (для диагностики зависаний)
+        log_func: Функция для логирования
+        parsers: Количество парсеров
+        queue_size: Размер очередей между этапами
+        persist_batch: Максимальный размер пачки сохранения
+        memory_budget: Бюджет памяти страниц (по умолчанию общий бюджет процесса)
+        page_source: Источник страниц (по умолчанию Redis список queue_key)
+
+    Returns:
+        Метрики этапов {fetch, parse, persist, notify} и счетчики отсева лотов {prune}
+    """
+    task_id = task.id if task else 0
+    can_persist = task is not None and db_manager is not None
+
+    parse_queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+    persist_queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size * persist_batch))
+    notify_queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size * persist_batch))
+
+    metrics = {
+        "fetch": StageMetrics("загрузка", fetchers),
+        "parse": StageMetrics("парсинг", parsers),
+        "persist": StageMetrics("сохранение", 1 if can_persist else 0),
+        "notify": StageMetrics("уведомления", 1 if can_persist else 0),
+    }
+    prune_counters = PruneCounters()
+    if memory_budget is None:
+        memory_budget = get_shared_memory_budget()
+    if page_source is None:
+        page_source = ListPageSource(redis_service, queue_key)
+    # Фильтры задачи компилируются один раз на запуск пайплайна
+    prefilter = AssetPrefilter.from_filters(filters)
+
+    # Лоты страницы, которые еще не сохранил сохранитель: страница подтверждается
+    # в источнике только после сохранения (или записи в Redis) всех ее лотов
+    unpersisted: Dict[int, int] = {}
+
+    async def records_persisted(page_num: int, count: int) -> None:
+        left = unpersisted.get(page_num, 0) - count
+        if left > 0:
+            unpersisted[page_num] = left
+            return
+        unpersisted.pop(page_num, None)
+        await page_source.done(page_num, ok=True)
+
+    # Сессия для проверки активности задачи (используется загрузчиками по очереди)
+    control_session = None
+    control_lock = asyncio.Lock()
+
+    async def is_task_active() -> bool:
+        nonlocal control_session
+        if not can_persist:
+            return True
+        # Пока слушается канал отмены, статус задачи - флаг в памяти
+        if task_cancellation.listening:
+            return not task_cancellation.token(task_id).cancelled
+        async with control_lock:
+            try:
+                if control_session is None:
+                    control_session = await asyncio.wait_for(db_manager.get_session(), timeout=10.0)
+                from sqlalchemy import select
+                from core import MonitoringTask
+                result = await control_session.execute(
+                    select(MonitoringTask.is_active).where(MonitoringTask.id == task_id)
+                )
+                is_active = result.scalar_one_or_none()
+                await control_session.rollback()
+                return is_active is not False
+            except Exception as e:
+                log_func("warning", f"⚠️ Пайплайн: Ошибка при проверке статуса задачи {task_id}: {e}")
+                return True
+
+    async def fetcher(worker_id: int) -> None:
+        stage = metrics["fetch"]
+        while True:
+            wait_start = time.monotonic()
+            page_data_str = await page_source.next(timeout=5.0)
+            stage.wait_seconds += time.monotonic() - wait_start
+            if not page_data_str:
+                if await page_source.exhausted():
+                    return
+                continue
+
+            try:
+                page_data = json.loads(page_data_str)
+                page_num = page_data["page_num"]
+                page_start = page_data["page_start"]
+                page_count = page_data["page_count"]
+            except Exception as e:
+                stage.errors += 1
+                log_func("error", f"    ❌ Загрузчик {worker_id}: Ошибка при разборе данных страницы: {e}")
+                continue
+
+            if not await is_task_active():
+                log_func("info", f"🛑 Загрузчик {worker_id}: Задача {task_id} деактивирована, пропускаем страницу {page_num}")
+                await page_source.done(page_num, ok=False)
+                continue
+
+            task_start_times[page_num] = datetime.now()
+            busy_start = time.monotonic()
+            render_data = None
+            for attempt in range(max_retries):
+                page_proxy = get_random_proxy(available_proxies)
+                if not page_proxy:
+                    log_func("warning", f"    ⚠️ Загрузчик {worker_id}, страница {page_num}: Нет доступных прокси (попытка {attempt + 1}/{max_retries})")
+                    await asyncio.sleep(2.0)
+                    continue
+
+                task_stages[page_num] = f"загрузка (прокси {page_proxy.id}, попытка {attempt + 1})"
+                try:
+                    render_data = await fetch_page_render_data(parser, appid, hash_name, page_start, page_count, page_proxy)
+                except Exception as e:
+                    error_msg = "Timeout" if isinstance(e, asyncio.TimeoutError) else str(e)[:200]
+                    log_func("error", f"    ❌ Загрузчик {worker_id}, страница {page_num}: {type(e).__name__}: {error_msg} (попытка {attempt + 1}/{max_retries})")
+                    if parser.proxy_manager:
+                        is_429 = "429" in error_msg or "Too Many Requests" in error_msg
+                        await parser.proxy_manager.mark_proxy_used(page_proxy, success=False, error=error_msg, is_429_error=is_429)
+                    render_data = None
+                    await asyncio.sleep(2.0)
+                    continue
+
+                if not render_data or not render_data.get('results_html'):
+                    log_func("warning", f"    ⚠️ Загрузчик {worker_id}, страница {page_num}: Прокси ID={page_proxy.id} не вернул данные (попытка {attempt + 1}/{max_retries})")
+                    render_data = None
+                    await asyncio.sleep(2.0)
+                    continue
+
+                if parser.proxy_manager:
+                    await parser.proxy_manager.mark_proxy_used(page_proxy, success=True)
+                break
+            stage.busy_seconds += time.monotonic() - busy_start
+
+            if render_data is None:
+                stage.errors += 1
+                log_func("error", f"    ❌ Загрузчик {worker_id}, страница {page_num}: Не удалось загрузить после {max_retries} попыток")
+                task_start_times.pop(page_num, None)
+                task_stages.pop(page_num, None)
+                await page_source.done(page_num, ok=False)
+                continue
+
+            stage.processed += 1
+            task_stages[page_num] = "ожидание_парсинга"
+            metrics["parse"].observe_queue(parse_queue)
+            put_start = time.monotonic()
+            # Страница занимает бюджет памяти до конца разбора
+            page_size = estimate_render_data_size(render_data)
+            await memory_budget.acquire(page_size)
+            await parse_queue.put((page_num, render_data, page_size))
+            del render_data
+            stage.wait_seconds += time.monotonic() - put_start
+
+    async def page_parser(worker_id: int) -> None:
+        stage = metrics["parse"]
+        while True:
+            wait_start = time.monotonic()
+            item = await parse_queue.get()
+            stage.wait_seconds += time.monotonic() - wait_start
+            if item is _STOP:
+                return
+
+            page_num, render_data, page_size = item
+            del item
+            busy_start = time.monotonic()
+            # Страницу с найденными лотами подтверждает сохранитель
+            ack_on_persist = False
+            try:
+                task_stages[page_num] = "парсинг_данных"
+                # HTML/assets разбираются в потоке, чтобы не блокировать event loop загрузчиков.
+                # Счетчики страницы заполняются в потоке и суммируются уже в event loop
+                page_counters = PruneCounters()
+                try:
+                    page_listings = await asyncio.to_thread(
+                        parse_render_data, render_data, worker_id, page_num, log_func, prefilter, page_counters
+                    )
+                finally:
+                    # Ответ API больше не нужен: лоты не ссылаются ни на JSON, ни на DOM
+                    del render_data
+                    await memory_budget.release(page_size)
+
+                task_stages[page_num] = "фильтрация"
+                # Все лоты страницы (до фильтра сохраненных этой задачей) - для других задач предмета
+                page_all = page_listings
+                if can_persist:
+                    unseen = await drop_seen_listings(page_listings, task_id, redis_service)
+                    page_counters.pruned_seen += len(page_listings) - len(unseen)
+                    page_listings = unseen
+                matched = await filter_page_listings(
+                    parser=parser,
+                    page_listings=page_listings,
+                    hash_name=hash_name,
+                    filters=filters,
+                    worker_id=worker_id,
+                    page_num=page_num,
+                    log_func=log_func
+                )
+                page_counters.pruned_filters += len(page_listings) - len(matched)
+                page_counters.matched += len(matched)
+                prune_counters.add(page_counters)
+
+                accepted = []
+                unchecked: List[ListingRecord] = []
+                if can_persist:
+                    # Цены наклеек (сетевые запросы) запрашиваются здесь, а не в сохранителе,
+                    # чтобы этап БД не ждал их и не задерживал вставки остальных лотов
+                    task_stages[page_num] = "цены_наклеек"
+                    for record in matched:
+                        try:
+                            values = await asyncio.wait_for(
+                                evaluate_item_result(
+                                    parser, task, record, filters,
+                                    redis_service=redis_service, task_logger=task_logger
+                                ),
+                                timeout=30.0
+                            )
+                        except Exception as e:
+                            stage.errors += 1
+                            log_func("error", f"    ⚠️ Парсер {worker_id}: Ошибка при проверке лота {record.listing_id}: {type(e).__name__}: {str(e)[:200]}")
+                            # Непроверенные лоты уходят в Redis для ResultsProcessorService
+                            unchecked.append(record)
+                            continue
+                        if values is not None:
+                            accepted.append((task, record, values))
+                    if Config.TASK_MATCH_INDEX_ENABLED:
+                        accepted.extend(await match_other_tasks(
+                            parser, page_all, hash_name, filters, task_id, redis_service, log_func
+                        ))
+                stage.busy_seconds += time.monotonic() - busy_start
+
+                if can_persist:
+                    if unchecked:
+                        await save_page_results_to_redis(redis_service, task_id, page_num, unchecked, log_func)
+                    put_start = time.monotonic()
+                    if accepted:
+                        unpersisted[page_num] = len(accepted)
+                        ack_on_persist = True
+                    for item_task, record, values in accepted:
+                        metrics["persist"].observe_queue(persist_queue)
+                        await persist_queue.put((page_num, item_task, record, values))
+                    stage.wait_seconds += time.monotonic() - put_start
+                else:
+                    await save_page_results_to_redis(redis_service, task_id, page_num, matched, log_func)
+
+                if task and redis_service and redis_service._client:
+                    try:
+                        await redis_service._client.incr(f"parsing:completed:task_{task_id}")
+                    except Exception:
+                        pass
+
+                stage.processed += 1
+                if not ack_on_persist:
+                    await page_source.done(page_num, ok=True)
+                log_func("info", f"    ✅ Парсер {worker_id}, страница {page_num}/{total_pages}: Лотов {len(page_listings)}, подходящих {len(matched)}")
+                # Не держим данные страницы, пока парсер ждет следующую
+                del page_listings, page_all, matched
+            except Exception as e:
+                stage.errors += 1
+                stage.busy_seconds += time.monotonic() - busy_start
+                log_func("error", f"    ❌ Парсер {worker_id}, страница {page_num}: {type(e).__name__}: {str(e)[:200]}")
+                if not ack_on_persist:
+                    await page_source.done(page_num, ok=False)
+            finally:
+                task_start_times.pop(page_num, None)
+                task_stages.pop(page_num, None)
+
+    async def persister(session) -> None:
+        stage = metrics["persist"]
+        notifier = _QueueNotifier(notify_queue)
+        try:
+            stopped = False
+            while not stopped:
+                wait_start = time.monotonic()
+                first = await persist_queue.get()
+                stage.wait_seconds += time.monotonic() - wait_start
+                if first is _STOP:
+                    return
+
+                # Забираем все, что уже накопилось, одной пачкой
+                batch = [first]
+                while len(batch) < persist_batch and not persist_queue.empty():
+                    item = persist_queue.get_nowait()
+                    if item is _STOP:
+                        stopped = True
+                        break
+                    batch.append(item)
+
+                busy_start = time.monotonic()
+                unsaved: Dict[int, List[ListingRecord]] = {}
+                # Лоты окна уже проверены парсером, сохраняются одной вставкой на задачу
+                found: Dict[int, FoundItemBatch] = {}
+                pages: Dict[int, int] = {}
+                for page_num, item_task, record, values in batch:
+                    if item_task.id not in found:
+                        found[item_task.id] = FoundItemBatch(item_task)
+                    try:
+                        await asyncio.wait_for(
+                            store_item_result(
+                                task=item_task,
+                                parsed_data=record,
+                                values=values,
+                                db_session=session,
+                                redis_service=redis_service,
+                                task_logger=task_logger if item_task.id == task_id else None,
+                                notifier=notifier,
+                                batch=found[item_task.id]
+                            ),
+                            timeout=30.0
+                        )
+                        pages[id(record)] = page_num
+                        stage.processed += 1
+                    except Exception as e:
+                        stage.errors += 1
+                        log_func("error", f"    ⚠️ Сохранитель: Ошибка при обработке лота {record.listing_id} (задача {item_task.id}): {type(e).__name__}: {str(e)[:200]}")
+                        # Необработанные лоты задачи уходят в Redis для ResultsProcessorService,
+                        # лоты других задач найдет их собственная проверка
+                        if item_task.id == task_id:
+                            unsaved.setdefault(page_num, []).append(record)
+                for item_task_id, item_batch in found.items():
+                    if not item_batch:
+                        continue
+                    try:
+                        await asyncio.wait_for(
+                            item_batch.flush(
+                                session, redis_service=redis_service, notifier=notifier,
+                                task_logger=task_logger if item_task_id == task_id else None
+                            ),
+                            timeout=30.0
+                        )
+                    except Exception as e:
+                        stage.errors += 1
+                        log_func("error", f"    ⚠️ Сохранитель: Ошибка сохранения пачки из {len(item_batch)} лотов задачи {item_task_id}: {type(e).__name__}: {str(e)[:200]}")
+                        if item_task_id == task_id:
+                            for record in item_batch.records:
+                                unsaved.setdefault(pages[id(record)], []).append(record)
+                for page_num, records in unsaved.items():
+                    await save_page_results_to_redis(redis_service, task_id, page_num, records, log_func)
+                for page_num, count in Counter(page_num for page_num, _, _, _ in batch).items():
+                    await records_persisted(page_num, count)
+                stage.busy_seconds += time.monotonic() - busy_start
+        finally:
+            try:
+                await asyncio.wait_for(session.close(), timeout=5.0)
+            except (asyncio.TimeoutError, Exception):
+                pass
+
+    async def notification_sender() -> None:
+        stage = metrics["notify"]
+        while True:
+            wait_start = time.monotonic()
+            item = await notify_queue.get()
+            stage.wait_seconds += time.monotonic() - wait_start
+            if item is _STOP:
+                return
+
+            # Все накопившиеся уведомления публикуются одним пайплайном Redis
+            items = [item]
+            stopped = False
+            while not notify_queue.empty():
+                item = notify_queue.get_nowait()
+                if item is _STOP:
+                    stopped = True
+                    break
+                items.append(item)
+            busy_start = time.monotonic()
+            by_channel: Dict[str, List[Dict]] = {}
+            for channel, message in items:
+                by_channel.setdefault(channel, []).append(message)
+            for channel, messages in by_channel.items():
+                try:
+                    if len(messages) == 1:
+                        await redis_service.publish(channel, messages[0])
+                    else:
+                        await redis_service.publish_many(channel, messages)
+                    stage.processed += len(messages)
+                except Exception as e:
+                    stage.errors += len(messages)
+                    log_func("error", f"    ❌ Уведомления: Не удалось опубликовать в '{channel}': {e}")
+            stage.busy_seconds += time.monotonic() - busy_start
+            if stopped:
+                return
+
+    log_func("info", f"🚀 Пайплайн: загрузчиков={fetchers}, парсеров={parsers}, очередь={queue_size}, пачка сохранения={persist_batch}")
+
+    persist_session = None
+    if can_persist:
+        try:
+            persist_session = await asyncio.wait_for(db_manager.get_session(), timeout=10.0)
+        except Exception as e:
+            # Без сессии БД результаты уходят в Redis для ResultsProcessorService
+            log_func("error", f"❌ Пайплайн: Не удалось создать сессию БД для сохранения: {type(e).__name__}: {e}")
+            can_persist = False
+
+    parser_tasks = [asyncio.create_task(page_parser(i)) for i in range(1, parsers + 1)]
+    persister_task = asyncio.create_task(persister(persist_session)) if can_persist else None
+    notifier_task = asyncio.create_task(notification_sender()) if can_persist else None
+
+    try:
+        fetch_results = await asyncio.gather(*(fetcher(i) for i in range(1, fetchers + 1)), return_exceptions=True)
+        for result in fetch_results:
+            if isinstance(result, Exception):
+                log_func("error", f"❌ Пайплайн: Загрузчик завершился с ошибкой: {result}")
+    finally:
+        # Останавливаем этапы по порядку, чтобы каждый дообработал свою очередь
+        for _ in parser_tasks:
+            await parse_queue.put(_STOP)
+        await asyncio.gather(*parser_tasks, return_exceptions=True)
+        if persister_task:
+            await persist_queue.put(_STOP)
+            await asyncio.gather(persister_task, return_exceptions=True)
+        if notifier_task:
+            await notify_queue.put(_STOP)
+            await asyncio.gather(notifier_task, return_exceptions=True)
+        if control_session is not None:
+            try:
+                await asyncio.wait_for(control_session.close(), timeout=5.0)
+            except (asyncio.TimeoutError, Exception):
+                pass
+
+    log_func("info", "📊 Пайплайн: метрики этапов:")
+    for stage in metrics.values():
+        log_func("info", f"   {stage}")
+    log_func("info", f"   {prune_counters}")
+    log_func("info", f"   {memory_budget}")
+
+    metrics["prune"] = prune_counters
+    return metrics
@@ -0,0 +1,211 @@
+"""
+Ранний отсев лотов по asset_properties из ответа /render/ API.
+
+Паттерн и float лежат в render_data['assets'] как int_value/float_value,
+поэтому неподходящие assets (и их лоты в listinginfo) отбрасываются до
+разбора HTML, наклеек и создания объектов. Отсев консервативный: отбрасываются
+только лоты, которые FilterService гарантированно отклонил бы позже.
+"""
+from typing import Dict, Optional, Set, Tuple
+
+from ..models import SearchFilters
+from services.filter_plan import get_filter_plan
+
+
+# Причины отсева (ключи счетчиков)
+PRUNED_PATTERN = "pattern"
+PRUNED_FLOAT = "float"
+
+
+def read_asset_properties(item: dict) -> Tuple[Optional[int], Optional[float]]:
+    """
+    Читает паттерн и float из asset_properties одного asset.
+
+    Args:
+        item: Asset из render_data['assets']['730'][contextid]
+
+    Returns:
+        (pattern, float_value), None если значение отсутствует или некорректно
+    """
+    pattern = None
+    float_value = None
+    for prop in item.get('asset_properties') or ():
+        prop_id = prop.get('propertyid')
+        # propertyid=1 для скинов, propertyid=3 для брелков; первый найденный паттерн не перезаписываем
+        if (prop_id == 1 or prop_id == 3) and pattern is None:
+            try:
+                pattern = int(prop['int_value']) if prop.get('int_value') is not None else None
+            except (ValueError, TypeError):
+                pattern = None
+        elif prop_id == 2:
+            try:
+                float_value = float(prop['float_value']) if prop.get('float_value') is not None else None
+            except (ValueError, TypeError):
+                float_value = None
+    return pattern, float_value
+
+
+class AssetPrefilter:
+    """Скомпилированные из SearchFilters условия для раннего отсева assets."""
+
+    __slots__ = ("patterns", "pattern_min", "pattern_max", "float_min", "float_max")
+
+    def __init__(
+        self,
+        patterns: Optional[frozenset] = None,
+        pattern_min: Optional[int] = None,
+        pattern_max: Optional[int] = None,
+        float_min: Optional[float] = None,
+        float_max: Optional[float] = None
+    ):
+        self.patterns = patterns
+        self.pattern_min = pattern_min
+        self.pattern_max = pattern_max
+        self.float_min = float_min
+        self.float_max = float_max
+
+    @classmethod
+    def from_filters(cls, filters: Optional[SearchFilters]) -> Optional["AssetPrefilter"]:
+        """
+        Строит условия раннего отсева из скомпилированного плана фильтров задачи.
+
+        Args:
+            filters: Фильтры поиска
+
+        Returns:
+            AssetPrefilter или None, если по asset_properties отсеивать нечего
+        """
+        if filters is None:
+            return None
+
+        plan = get_filter_plan(filters)
+        patterns = plan.pattern_set if plan.pattern_mode == "list" else None
+        # pattern_range учитывается FilterService, только если нет pattern_list
+        pattern_min = plan.pattern_min if plan.pattern_mode == "range" else None
+        pattern_max = plan.pattern_max if plan.pattern_mode == "range" else None
+
+        if patterns is None and pattern_min is None and plan.float_min is None:
+            return None
+        return cls(patterns, pattern_min, pattern_max, plan.float_min, plan.float_max)
+
+    def reject_reason(self, pattern: Optional[int], float_value: Optional[float]) -> Optional[str]:
+        """
+        Проверяет значения asset.
+
+        Неизвестные значения (None) не отсеиваются - решение остается за FilterService.
+
+        Args:
+            pattern: Паттерн asset
+            float_value: Float asset
+
+        Returns:
+            PRUNED_PATTERN / PRUNED_FLOAT, если asset точно не подходит, иначе None
+        """
+        if pattern is not None:
+            if self.patterns is not None:
+                # Нормализуем паттерн так же, как is_pattern_excluded (брелки: остаток от деления на 1000)
+                normalized = pattern % 1000 if pattern > 999 else pattern
+                if normalized not in self.patterns:
+                    return PRUNED_PATTERN
+            elif self.pattern_min is not None and not (self.pattern_min <= pattern <= self.pattern_max):
+                return PRUNED_PATTERN
+        if float_value is not None and self.float_min is not None:
+            if not (self.float_min <= float_value <= self.float_max):
+                return PRUNED_FLOAT
+        return None
+
+
+class PruneCounters:
+    """Счетчики отсева лотов по этапам обработки страниц."""
+
+    __slots__ = ("listings", "pruned_pattern", "pruned_float", "pruned_seen", "pruned_filters", "matched", "pages_without_html")
+
+    def __init__(self):
+        self.listings = 0  # Лотов в listinginfo до отсева
+        self.pruned_pattern = 0  # Отсеяно по паттерну до разбора HTML
+        self.pruned_float = 0  # Отсеяно по float до разбора HTML
+        self.pruned_seen = 0  # Пропущено как уже сохраненные для задачи
+        self.pruned_filters = 0  # Отклонено полными фильтрами (цена, наклейки и т.д.)
+        self.matched = 0  # Прошло все фильтры
+        self.pages_without_html = 0  # Страниц, где HTML не разбирался (все лоты отсеяны)
+
+    def add(self, other: "PruneCounters") -> None:
+        """Прибавляет счетчики другой страницы."""
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def to_dict(self) -> Dict[str, int]:
+        """Возвращает счетчики в виде словаря."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __str__(self) -> str:
+        return (
+            f"отсев: лотов={self.listings}, по паттерну={self.pruned_pattern}, по float={self.pruned_float}, "
+            f"уже сохраненных={self.pruned_seen}, фильтрами={self.pruned_filters}, подходящих={self.matched}, страниц без разбора HTML={self.pages_without_html}"
+        )
+
+
+def prefilter_render_data(
+    render_data: dict,
+    prefilter: AssetPrefilter,
+    counters: Optional[PruneCounters] = None
+) -> Tuple[dict, Set[str]]:
+    """
+    Отбрасывает неподходящие assets и их лоты из render_data.
+
+    Args:
+        render_data: Данные /render/ API (не изменяются)
+        prefilter: Скомпилированные условия отсева
+        counters: Счетчики отсева страницы (опционально)
+
+    Returns:
+        (render_data без отсеянных assets/listinginfo, множество отсеянных listing_id)
+    """
+    assets = render_data.get('assets') or {}
+    app_assets = assets.get('730')
+    listinginfo = render_data.get('listinginfo') or {}
+    if not app_assets:
+        if counters is not None:
+            counters.listings += len(listinginfo)
+        return render_data, set()
+
+    rejected_assets: Dict[str, str] = {}
+    kept_app_assets = {}
+    for contextid, items in app_assets.items():
+        kept_items = {}
+        for itemid, item in items.items():
+            pattern, float_value = read_asset_properties(item)
+            reason = prefilter.reject_reason(pattern, float_value)
+            if reason is None:
+                kept_items[itemid] = item
+            else:
+                rejected_assets[str(itemid)] = reason
+        kept_app_assets[contextid] = kept_items
+
+    pruned_listing_ids: Set[str] = set()
+    kept_listinginfo = {}
+    for listing_id, listing_data in listinginfo.items():
+        asset_id = str(((listing_data or {}).get('asset') or {}).get('id', ''))
+        reason = rejected_assets.get(asset_id)
+        if reason is None:
+            kept_listinginfo[listing_id] = listing_data
+            continue
+        pruned_listing_ids.add(str(listing_id))
+        if counters is not None:
+            if reason == PRUNED_PATTERN:
+                counters.pruned_pattern += 1
+            else:
+                counters.pruned_float += 1
+
+    if counters is not None:
+        counters.listings += len(listinginfo)
+
+    if not rejected_assets:
+        return render_data, pruned_listing_ids
+
+    pruned_data = dict(render_data)
+    pruned_data['assets'] = dict(assets)
+    pruned_data['assets']['730'] = kept_app_assets
+    if 'listinginfo' in render_data:
+        pruned_data['listinginfo'] = kept_listinginfo
+    return pruned_data, pruned_listing_ids
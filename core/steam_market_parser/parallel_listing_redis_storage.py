@@ -3,17 +3,18 @@
 Вместо блокировки на общий список, каждый воркер сохраняет результаты в Redis.
 В конце все результаты собираются и обрабатываются batch'ом.
 """
-import json
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 from loguru import logger
 
 from ..models import ParsedItemData
+from .listing_record import ListingRecord
 from services.redis_service import RedisService
+from core.utils import payload_codec
 
 
-def serialize_parsed_item(parsed_data: ParsedItemData) -> Dict[str, Any]:
+def serialize_parsed_item(parsed_data: Union[ParsedItemData, ListingRecord]) -> Dict[str, Any]:
     """
-    Сериализует ParsedItemData в словарь для хранения в Redis.
+    Сериализует ParsedItemData или ListingRecord в словарь для хранения в Redis.
     
     Args:
         parsed_data: Данные парсинга
@@ -21,58 +22,43 @@ def serialize_parsed_item(parsed_data: ParsedItemData) -> Dict[str, Any]:
     Returns:
         Словарь с сериализованными данными
     """
-    return {
-        'float_value': parsed_data.float_value,
-        'pattern': parsed_data.pattern,
-        'stickers': [s.model_dump() if hasattr(s, 'model_dump') else s.__dict__ for s in parsed_data.stickers],
-        'total_stickers_price': parsed_data.total_stickers_price,
-        'item_name': parsed_data.item_name,
-        'item_price': parsed_data.item_price,
-        'inspect_links': parsed_data.inspect_links,
-        'item_type': parsed_data.item_type,
-        'is_stattrak': parsed_data.is_stattrak,
-        'listing_id': parsed_data.listing_id
-    }
+    return ListingRecord.from_parsed_item(parsed_data).to_dict()
+
+
+def deserialize_listing_record(data: Dict[str, Any]) -> ListingRecord:
+    """
+    Десериализует словарь в компактную запись лота (без валидации).
+    
+    Args:
+        data: Словарь с данными
+        
+    Returns:
+        ListingRecord объект
+    """
+    return ListingRecord.from_dict(data)
 
 
 def deserialize_parsed_item(data: Dict[str, Any]) -> ParsedItemData:
     """
     Десериализует словарь обратно в ParsedItemData.
     
+    Используется на границе с ResultsProcessorService/API, внутри пайплайна
+    достаточно deserialize_listing_record.
+    
     Args:
         data: Словарь с данными
         
     Returns:
         ParsedItemData объект
     """
-    from ..models import StickerInfo
-    
-    stickers = []
-    for s_data in data.get('stickers', []):
-        if isinstance(s_data, dict):
-            stickers.append(StickerInfo(**s_data))
-        else:
-            stickers.append(s_data)
-    
-    return ParsedItemData(
-        float_value=data.get('float_value'),
-        pattern=data.get('pattern'),
-        stickers=stickers,
-        total_stickers_price=data.get('total_stickers_price', 0.0),
-        item_name=data.get('item_name'),
-        item_price=data.get('item_price'),
-        inspect_links=data.get('inspect_links', []),
-        item_type=data.get('item_type'),
-        is_stattrak=data.get('is_stattrak', False),
-        listing_id=data.get('listing_id')
-    )
+    return deserialize_listing_record(data).to_parsed_item()
 
 
 async def save_page_results_to_redis(
     redis_service: RedisService,
     task_id: int,
     page_num: int,
-    page_results: List[ParsedItemData],
+    page_results: List[Union[ParsedItemData, ListingRecord]],
     log_func
 ) -> bool:
     """
@@ -98,11 +84,11 @@ async def save_page_results_to_redis(
         
         # Сохраняем в Redis List
         redis_key = f"parsing:results:task_{task_id}:page_{page_num}"
-        # Используем JSON для каждого элемента (более надежно)
+        # Каждый элемент кодируется отдельно через payload_codec (байт версии + тело)
         # Сохраняем все элементы одним вызовом для эффективности
         if serialized_results:
-            items_json = [json.dumps(item_data, ensure_ascii=False) for item_data in serialized_results]
-            await redis_service.lpush(redis_key, *items_json)
+            items_payload = [payload_codec.encode_str(item_data) for item_data in serialized_results]
+            await redis_service.lpush(redis_key, *items_payload)
         
         # Устанавливаем TTL (1 час на случай, если что-то пойдет не так)
         await redis_service.expire(redis_key, 3600)
@@ -149,7 +135,7 @@ async def get_all_results_from_redis(
                 page_results = []
                 for item_json in items_json:
                     try:
-                        item_data = json.loads(item_json)
+                        item_data = payload_codec.decode(item_json)
                         parsed_item = deserialize_parsed_item(item_data)
                         page_results.append(parsed_item)
                     except Exception as e:
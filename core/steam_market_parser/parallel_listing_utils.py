@@ -1,13 +1,13 @@
 """
 Утилиты для параллельного парсинга лотов.
 """
-import json
 import random
 from typing import Optional, List
 from datetime import datetime as dt
 from loguru import logger
 
 from core import Proxy
+from core.utils import payload_codec
 from sqlalchemy.orm import make_transient
 
 
@@ -34,7 +34,7 @@ async def get_available_proxies(parser, log_func) -> List[Proxy]:
             log_func("debug", "🔍 Получаем прокси из Redis кэша...")
             cached_proxies_data = await parser.proxy_manager.redis_service.get(parser.proxy_manager.REDIS_CACHE_KEY)
             if cached_proxies_data:
-                cached_proxies = json.loads(cached_proxies_data)
+                cached_proxies = payload_codec.decode(cached_proxies_data)
                 
                 for p_data in cached_proxies:
                     # Проверяем блокировку через Redis
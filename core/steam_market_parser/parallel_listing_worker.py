@@ -10,7 +10,9 @@ from typing import Optional, List, Dict, Callable
 from ..models import SearchFilters, ParsedItemData
 from .parallel_listing_utils import get_random_proxy
 from .parallel_listing_page_parser import extract_assets_data, parse_page_listings, link_listings_with_assets
+from .parallel_listing_prefilter import AssetPrefilter, PruneCounters, prefilter_render_data
 from .parallel_listing_listings_processor import process_page_listings
+from services.task_cancellation import task_cancellation
 
 
 async def process_page_from_queue(
@@ -60,6 +62,8 @@ async def process_page_from_queue(
     """
     log_func("info", f"    👷 Воркер {worker_id}: Запущен, ожидает страницы из очереди...")
     pages_processed = 0
+    # Условия раннего отсева по asset_properties (компилируются один раз на воркер)
+    prefilter = AssetPrefilter.from_filters(filters)
     
     # ВАЖНО: Создаем одну сессию БД для всего воркера (для всех страниц, которые он обработает)
     # Это безопасно, потому что воркер обрабатывает страницы последовательно (не параллельно)
@@ -114,16 +118,10 @@ async def process_page_from_queue(
                     log_func("error", f"       Данные: {page_data_str[:100]}")
                     continue
                 
-                # Проверяем, активна ли задача (для немедленной остановки)
+                # Проверяем, активна ли задача (для немедленной остановки; флаг в памяти, БД - только без канала отмены)
                 if task and worker_db_session:
                     try:
-                        from sqlalchemy import select
-                        from core import MonitoringTask
-                        result = await worker_db_session.execute(
-                            select(MonitoringTask).where(MonitoringTask.id == task.id)
-                        )
-                        db_task = result.scalar_one_or_none()
-                        if db_task and not db_task.is_active:
+                        if await task_cancellation.is_cancelled(task.id, worker_db_session):
                             log_func("info", f"🛑 Воркер {worker_id}: Задача {task.id} деактивирована, останавливаем обработку страницы {page_num}")
                             continue
                     except Exception as e:
@@ -240,6 +238,14 @@ async def process_page_from_queue(
                         task_stages[page_num] = f"парсинг_данных (прокси {page_proxy.id}, попытка {attempt + 1})"
                         log_func("info", f"    🔍 Воркер {worker_id}, страница {page_num}: Начинаем парсинг данных...")
                         
+                        # Ранний отсев по asset_properties до разбора HTML и наклеек
+                        pruned_listing_ids = set()
+                        if prefilter is not None:
+                            page_counters = PruneCounters()
+                            render_data, pruned_listing_ids = prefilter_render_data(render_data, prefilter, page_counters)
+                            if pruned_listing_ids:
+                                log_func("debug", f"    ✂️ Воркер {worker_id}, страница {page_num}: {page_counters}")
+                        
                         # Извлекаем данные из assets
                         assets_data_map = extract_assets_data(render_data, worker_id, page_num, log_func)
                         
@@ -254,7 +260,16 @@ async def process_page_from_queue(
                                 log_func("error", f"    ❌ Воркер {worker_id}, страница {page_num}: results_html пуст после {max_retries} попыток")
                                 break
                         
-                        page_listings = parse_page_listings(render_data, worker_id, page_num, log_func)
+                        if pruned_listing_ids and not render_data.get('listinginfo'):
+                            # Все лоты страницы отсеяны - HTML не разбираем
+                            page_listings = []
+                        else:
+                            page_listings = parse_page_listings(render_data, worker_id, page_num, log_func)
+                            if pruned_listing_ids:
+                                page_listings = [
+                                    listing for listing in page_listings
+                                    if str(listing.get('listing_id')) not in pruned_listing_ids
+                                ]
                         
                         # Связываем listing_id с данными из assets через listinginfo
                         link_listings_with_assets(page_listings, render_data, assets_data_map, worker_id, page_num, log_func)
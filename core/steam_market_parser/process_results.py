@@ -4,32 +4,196 @@
 Обрабатывает результаты сразу после парсинга страницы, не накапливая их.
 """
 import asyncio
-import json
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Union
 from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
 
 from core import FoundItem, MonitoringTask
+from core.config import Config
+from core.database import insert_found_item, insert_found_items, item_data_to_text
 from ..models import ParsedItemData, SearchFilters
+from .listing_record import ListingRecord
 from services.redis_service import RedisService
 from services.filter_service import FilterService
+from services.filter_plan import get_filter_plan, FAIL_PRICE, FAIL_PATTERN, FAIL_FLOAT, FAIL_NAME
+from services.sticker_precheck import sticker_precheck
+from services.seen_listings import seen_listings
 from ..logger import get_task_logger
 from core import MonitoringTask
 
 
+# Названия фильтров для логов отказов
+_FAIL_LABELS = {
+    FAIL_PRICE: "ЦЕНЫ",
+    FAIL_PATTERN: "ПАТТЕРНА",
+    FAIL_FLOAT: "FLOAT",
+    FAIL_NAME: "НАЗВАНИЯ",
+}
+
+
+async def _mark_seen(redis_service: Optional[RedisService], task_id: int, listing_id: Optional[str]) -> None:
+    """Отмечает лот как сохраненный, чтобы следующие проверки пропускали его до фильтров."""
+    if listing_id and redis_service is not None and Config.SEEN_FILTER_ENABLED:
+        await seen_listings.add_many(redis_service, task_id, [listing_id])
+
+
+class FoundItemBatch:
+    """
+    Найденные предметы страницы (или окна сохранения пайплайна), сохраняемые за один проход:
+    одна многострочная вставка в found_items, одно обновление счетчиков задачи, один коммит
+    и публикация уведомлений одним пайплайном Redis.
+    """
+
+    __slots__ = ("task", "rows", "records", "_listing_ids")
+
+    def __init__(self, task: MonitoringTask):
+        """
+        Args:
+            task: Задача мониторинга (используются id и name, сессия задачи не нужна)
+        """
+        self.task = task
+        self.rows: List[Dict[str, Any]] = []
+        self.records: List[Union[ParsedItemData, ListingRecord]] = []
+        self._listing_ids = set()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def add(self, values: Dict[str, Any], record: Union[ParsedItemData, ListingRecord]) -> bool:
+        """
+        Добавляет предмет в пачку.
+
+        Args:
+            values: Значения колонок FoundItem
+            record: Исходный лот (для возврата в очередь при ошибке сохранения)
+
+        Returns:
+            False, если лот с таким listing_id уже есть в пачке
+        """
+        listing_id = values.get("listing_id")
+        if listing_id is not None:
+            if str(listing_id) in self._listing_ids:
+                return False
+            self._listing_ids.add(str(listing_id))
+        self.rows.append(values)
+        self.records.append(record)
+        return True
+
+    def _clear(self) -> None:
+        self.rows = []
+        self.records = []
+        self._listing_ids = set()
+
+    async def flush(
+        self,
+        db_session: AsyncSession,
+        redis_service: Optional[RedisService] = None,
+        notifier=None,
+        task_logger=None
+    ) -> int:
+        """
+        Сохраняет накопленные предметы и отправляет уведомления о новых.
+
+        При ошибке БД транзакция откатывается, пачка не очищается (records можно вернуть
+        в очередь результатов), исключение пробрасывается вызывающему.
+
+        Args:
+            db_session: Сессия БД
+            redis_service: Сервис Redis (уведомления и фильтр сохраненных лотов)
+            notifier: Объект с async publish(channel, data); если не задан - публикация
+                      одним пайплайном через redis_service.publish_many
+            task_logger: Логгер задачи (опционально)
+
+        Returns:
+            Количество новых сохраненных предметов
+        """
+        if not self.rows:
+            return 0
+        task_id = self.task.id
+        # Лоты с listing_id - одной вставкой, сопоставляются с ответом по listing_id.
+        # Строки без listing_id в ответе многострочной вставки не различимы (порядок RETURNING
+        # не гарантирован), поэтому они вставляются по одной
+        by_listing = {str(values["listing_id"]): values for values in self.rows if values.get("listing_id") is not None}
+        without_listing = [values for values in self.rows if values.get("listing_id") is None]
+        inserted = []  # (id, значения колонок)
+        try:
+            if by_listing:
+                for found_item_id, listing_id in await insert_found_items(db_session, list(by_listing.values())):
+                    values = by_listing.get(listing_id)
+                    if values is not None:
+                        inserted.append((found_item_id, values))
+            for values in without_listing:
+                found_item_id = await insert_found_item(db_session, values)
+                if found_item_id is not None:
+                    inserted.append((found_item_id, values))
+            if inserted:
+                await db_session.execute(
+                    update(MonitoringTask).where(MonitoringTask.id == task_id).values(
+                        items_found=MonitoringTask.items_found + len(inserted),
+                        total_checks=MonitoringTask.total_checks + len(inserted)
+                    )
+                )
+            await db_session.commit()
+        except Exception:
+            try:
+                await asyncio.wait_for(db_session.rollback(), timeout=5.0)
+            except (asyncio.TimeoutError, Exception):
+                pass
+            raise
+
+        rows = self.rows
+        self._clear()
+        duplicates = len(rows) - len(inserted)
+        logger.info(f"💾 Сохранено предметов одной вставкой: {len(inserted)} (задача {task_id}, уже были в БД: {duplicates})")
+        if task_logger and inserted:
+            task_logger.success(f"💾 Сохранено предметов: {len(inserted)}")
+
+        if redis_service is not None and Config.SEEN_FILTER_ENABLED:
+            await seen_listings.add_many(redis_service, task_id, (values.get("listing_id") for values in rows))
+
+        messages = []
+        for found_item_id, values in inserted:
+            messages.append({
+                "type": "found_item",
+                "item_id": found_item_id,
+                "task_id": task_id,
+                "item_name": values["item_name"],
+                "price": values["price"],
+                "market_url": values["market_url"],
+                "item_data_json": item_data_to_text(values["item_data_json"]),
+                "task_name": self.task.name
+            })
+        if not messages:
+            return len(inserted)
+
+        try:
+            if notifier is not None:
+                for message in messages:
+                    await notifier.publish("found_items", message)
+            elif redis_service and redis_service.is_connected():
+                await redis_service.publish_many("found_items", messages)
+            logger.info(f"📤 Опубликовано уведомлений о найденных предметах: {len(messages)}")
+        except Exception as notify_error:
+            logger.warning(f"⚠️ Не удалось отправить уведомления: {notify_error}")
+        return len(inserted)
+
+
 async def process_item_result(
     parser,
     task: MonitoringTask,
-    parsed_data: ParsedItemData,
+    parsed_data: Union[ParsedItemData, ListingRecord],
     filters: SearchFilters,
     db_session: AsyncSession,
     redis_service: Optional[RedisService] = None,
-    task_logger=None
+    task_logger=None,
+    notifier=None,
+    batch: Optional[FoundItemBatch] = None
 ) -> bool:
     # ВАЖНО: Если task был загружен в другой сессии, загружаем его заново в текущей сессии
-    # Это предотвращает ошибку "Instance is not persistent within this Session"
-    if task and hasattr(task, 'id'):
+    # Это предотвращает ошибку "Instance is not persistent within this Session".
+    # В пакетном режиме задача в сессии не нужна: счетчики обновляет FoundItemBatch.flush
+    if task and hasattr(task, 'id') and batch is None:
         try:
             # Пытаемся загрузить task в текущей сессии с таймаутом
             task = await asyncio.wait_for(
@@ -53,14 +217,57 @@ async def process_item_result(
     Args:
         parser: Экземпляр SteamMarketParser для использования его методов
         task: Задача мониторинга
-        parsed_data: Данные распарсенного предмета
+        parsed_data: Данные распарсенного предмета (ParsedItemData или ListingRecord)
         filters: Фильтры для проверки
         db_session: Сессия БД для сохранения результатов
         redis_service: Сервис Redis для публикации уведомлений
         task_logger: Логгер для задачи (опционально)
+        notifier: Объект с async publish(channel, data) для уведомлений (например, этап
+                  уведомлений пайплайна). По умолчанию публикация идет напрямую в redis_service
+        batch: Пачка сохранения (FoundItemBatch). Если задана, предмет, прошедший фильтры,
+               только добавляется в пачку; сохранение и уведомления - в batch.flush()
+        
+    Returns:
+        True если предмет прошел фильтры и был сохранен (или добавлен в пачку), False иначе
+    """
+    if not task_logger:
+        task_logger = get_task_logger()
+    
+    values = await evaluate_item_result(
+        parser, task, parsed_data, filters, redis_service=redis_service, task_logger=task_logger
+    )
+    if values is None:
+        return False
+    return await store_item_result(
+        task, parsed_data, values, db_session,
+        redis_service=redis_service, task_logger=task_logger, notifier=notifier, batch=batch
+    )
+
+
+async def evaluate_item_result(
+    parser,
+    task: MonitoringTask,
+    parsed_data: Union[ParsedItemData, ListingRecord],
+    filters: SearchFilters,
+    redis_service: Optional[RedisService] = None,
+    task_logger=None
+) -> Optional[Dict[str, Any]]:
+    """
+    Проверяет фильтры предмета и при необходимости запрашивает цены наклеек (без БД).
+    
+    Пайплайн вызывает эту часть на этапе парсинга, чтобы сетевые запросы цен наклеек
+    не задерживали сохранение в БД.
+    
+    Args:
+        parser: Экземпляр SteamMarketParser
+        task: Задача мониторинга (сессия задачи не нужна)
+        parsed_data: Данные распарсенного предмета (ParsedItemData или ListingRecord)
+        filters: Фильтры для проверки
+        redis_service: Сервис Redis (кэш цен наклеек)
+        task_logger: Логгер для задачи (опционально)
         
     Returns:
-        True если предмет прошел фильтры и был сохранен, False иначе
+        Значения колонок FoundItem, если предмет прошел фильтры, иначе None
     """
     if not task_logger:
         task_logger = get_task_logger()
@@ -84,59 +291,27 @@ async def process_item_result(
         task_logger.info(f"🔍 Проверяем базовые фильтры для: {item_name} (${item_price:.2f})")
     
     try:
-        filter_service = parser.filter_service
-        
-        # Проверяем базовые фильтры без наклеек (временно убираем фильтр наклеек)
-        # Создаем копию фильтров без проверки наклеек для быстрой проверки
-        from copy import deepcopy
-        filters_without_stickers = deepcopy(filters)
-        filters_without_stickers.stickers_filter = None
-        
-        # Временно убираем наклейки из parsed_data для быстрой проверки
-        original_stickers = parsed_data.stickers
-        parsed_data.stickers = []
-        parsed_data.total_stickers_price = 0.0
-        
-        # Проверяем каждый фильтр отдельно для детального логирования
-        # 1. Проверка цены
-        if not filter_service.check_price(item_dict, filters):
-            logger.info(f"❌ Предмет не прошел фильтр ЦЕНЫ: {item_name} (${item_price:.2f}, max_price: {filters.max_price})")
-            if task_logger:
-                task_logger.info(f"❌ Предмет не прошел фильтр ЦЕНЫ: ${item_price:.2f} > ${filters.max_price:.2f}")
-            parsed_data.stickers = original_stickers
-            return False
-        
-        # 2. Проверка названия
-        if not filter_service.check_item_name(item_dict, filters, parsed_data):
-            logger.info(f"❌ Предмет не прошел фильтр НАЗВАНИЯ: {item_name}")
-            if task_logger:
-                task_logger.info(f"❌ Предмет не прошел фильтр НАЗВАНИЯ")
-            parsed_data.stickers = original_stickers
-            return False
-        
-        # 3. Проверка паттерна
-        pattern = parsed_data.pattern if parsed_data else None
-        item_type = parsed_data.item_type if parsed_data else None
-        if not filter_service.check_pattern(pattern, filters, item_type):
-            expected_patterns = filters.pattern_list.patterns if filters.pattern_list else (f"{filters.pattern_range.min}-{filters.pattern_range.max}" if filters.pattern_range else "нет")
-            logger.info(f"❌ Предмет не прошел фильтр ПАТТЕРНА: {item_name} (паттерн: {pattern}, ожидаемые: {expected_patterns})")
-            if task_logger:
-                task_logger.info(f"❌ Предмет не прошел фильтр ПАТТЕРНА: {pattern}")
-            parsed_data.stickers = original_stickers
-            return False
-        
-        # 4. Проверка float
-        float_value = parsed_data.float_value if parsed_data else None
-        if not filter_service.check_float(float_value, filters):
-            float_range = f"{filters.float_range.min}-{filters.float_range.max}" if filters.float_range else "нет"
-            logger.info(f"❌ Предмет не прошел фильтр FLOAT: {item_name} (float: {float_value}, ожидаемый диапазон: {float_range})")
+        # Фильтры задачи скомпилированы в план один раз (кэш по задаче, пересборка при изменении filters_json).
+        # Цепочка: цена -> паттерн -> float -> название; наклейки проверяются позже
+        plan = get_filter_plan(filters, task.id if task else None)
+        failed = plan.first_failure(
+            item_price,
+            parsed_data.pattern,
+            parsed_data.float_value,
+            parsed_data.item_type,
+            item_name
+        )
+        if failed is not None:
+            value = {
+                FAIL_PRICE: f"${item_price:.2f}",
+                FAIL_PATTERN: parsed_data.pattern,
+                FAIL_FLOAT: parsed_data.float_value,
+                FAIL_NAME: item_name
+            }[failed]
+            logger.info(f"❌ Предмет не прошел фильтр {_FAIL_LABELS[failed]}: {item_name} ({value}, {plan.describe(failed)})")
             if task_logger:
-                task_logger.info(f"❌ Предмет не прошел фильтр FLOAT: {float_value} (диапазон: {float_range})")
-            parsed_data.stickers = original_stickers
-            return False
-        
-        # Восстанавливаем наклейки
-        parsed_data.stickers = original_stickers
+                task_logger.info(f"❌ Предмет не прошел фильтр {_FAIL_LABELS[failed]}: {value}")
+            return None
         
         logger.info(f"✅ Предмет прошел базовые фильтры: {item_name}")
         if task_logger:
@@ -148,17 +323,13 @@ async def process_item_result(
             task_logger.error(f"❌ Ошибка при проверке базовых фильтров: {e}")
         import traceback
         logger.debug(f"Traceback: {traceback.format_exc()}")
-        return False
+        return None
     
     # ШАГ 2: Если базовые фильтры пройдены, проверяем, нужны ли цены наклеек
     # Цены наклеек нужны в двух случаях:
     # 1. Есть фильтр по наклейкам (min_stickers_price, max_overpay_coefficient)
     # 2. Предмет прошел все фильтры и нужно опубликовать результат (для отображения в уведомлении)
-    needs_sticker_prices_for_filter = (
-        filters.stickers_filter is not None and
-        (filters.stickers_filter.min_stickers_price is not None or 
-         filters.stickers_filter.max_overpay_coefficient is not None)
-    )
+    needs_sticker_prices_for_filter = plan.needs_sticker_prices
     
     # Запрашиваем цены наклеек только если:
     # 1. Есть фильтр по наклейкам ИЛИ
@@ -175,6 +346,17 @@ async def process_item_result(
             task_logger.info(f"📋 Запрашиваем цены для {stickers_count} наклеек: {stickers_names}{'...' if stickers_count > 3 else ''}")
         
         if not has_prices:
+            # Лот не пройдет фильтр наклеек даже при максимальных ценах - цены не запрашиваем
+            reject_reason = sticker_precheck.check_listing(
+                parsed_data, item_dict, filters, getattr(parser, "base_price_manager", None)
+            )
+            if reject_reason is not None:
+                logger.info(f"❌ Предмет не прошел фильтр НАКЛЕЕК без запроса цен: {item_name} - {reject_reason}")
+                logger.debug(f"📊 Ранний отсев по наклейкам: {sticker_precheck.stats()}")
+                if task_logger:
+                    task_logger.info(f"❌ Предмет не прошел фильтр НАКЛЕЕК без запроса цен: {reject_reason}")
+                return None
+            
             logger.info(f"💰 Запрашиваем цены наклеек для {item_name}...")
             if task_logger:
                 task_logger.info(f"💰 Запрашиваем цены наклеек...")
@@ -350,7 +532,7 @@ async def process_item_result(
                     logger.info(f"❌ Предмет не прошел фильтр НАКЛЕЕК: {item_name} - {reason}")
                     if task_logger:
                         task_logger.info(f"❌ Предмет не прошел фильтр НАКЛЕЕК: {reason}")
-                return False
+                return None
             else:
                 logger.info(f"✅ Предмет прошел фильтр наклеек: {item_name} (цена наклеек: ${total_stickers_price:.2f})")
                 if task_logger:
@@ -363,7 +545,7 @@ async def process_item_result(
             logger.info(f"❌ Предмет не прошел фильтры: {item_name}")
             if task_logger:
                 task_logger.info(f"❌ Предмет не прошел фильтры")
-            return False
+            return None
         
         logger.info(f"✅ Предмет прошел все фильтры (включая наклейки): {item_name}")
         if task_logger:
@@ -404,79 +586,75 @@ async def process_item_result(
                         if task_logger:
                             task_logger.info(f"✅ Получены цены наклеек для публикации: ${total_stickers_price:.2f}")
         
-        # Проверяем дубликаты по listing_id (приоритетная проверка) с таймаутом
-        if listing_id:
-            try:
-                all_task_items = await asyncio.wait_for(
-                    db_session.execute(
-                        select(FoundItem).where(FoundItem.task_id == task.id)
-                    ),
-                    timeout=30.0  # Увеличено: Таймаут 30 секунд для запроса к БД (было 10)
-                )
-                for existing_item in all_task_items.scalars().all():
-                    try:
-                        existing_data = json.loads(existing_item.item_data_json)
-                        existing_listing_id = existing_data.get('listing_id')
-                        if existing_listing_id and str(existing_listing_id) == str(listing_id):
-                            logger.info(f"⏭️ Предмет с listing_id={listing_id} уже существует в БД (ID={existing_item.id}), пропускаем")
-                            if task_logger:
-                                task_logger.info(f"⏭️ Предмет уже существует в БД, пропускаем")
-                            return False
-                    except (json.JSONDecodeError, AttributeError):
-                        pass
-            except asyncio.TimeoutError:
-                logger.error(f"⏱️ Таймаут при проверке дубликатов по listing_id (10с), БД может быть недоступна")
-                if task_logger:
-                    task_logger.error(f"⏱️ Таймаут при проверке дубликатов")
-                return False
-            except Exception as db_error:
-                logger.error(f"❌ Ошибка при проверке дубликатов по listing_id: {type(db_error).__name__}: {db_error}")
-                if task_logger:
-                    task_logger.error(f"❌ Ошибка при проверке дубликатов: {db_error}")
-                return False
+        # Преобразуем parsed_data в JSON-сериализуемый формат
+        serialized_data = _serialize_for_json(parsed_data)
         
-        # Дополнительная проверка по комбинации task_id + item_name + price + listing_id
-        # Для брелков и других предметов с listing_id это более точная проверка
-        if listing_id:
-            # Если есть listing_id, проверяем по нему (уже проверили выше, но на всякий случай)
-            try:
-                existing_query = select(FoundItem).where(
-                    FoundItem.task_id == task.id,
-                    FoundItem.item_name == item_name,
-                    FoundItem.price == item_price
-                )
-                existing_items = await asyncio.wait_for(
-                    db_session.execute(existing_query),
-                    timeout=30.0  # Увеличено: Таймаут 30 секунд для запроса к БД (было 10)
-                )
-                for existing_item in existing_items.scalars().all():
-                    try:
-                        existing_data = json.loads(existing_item.item_data_json)
-                        existing_listing_id = existing_data.get('listing_id')
-                        # ВАЖНО: Приводим к строке для корректного сравнения (защита от дублей)
-                        listing_id_str = str(listing_id) if listing_id else None
-                        # Если у существующего предмета нет listing_id или он отличается - это разные лоты
-                        if existing_listing_id and listing_id_str and str(existing_listing_id) == listing_id_str:
-                            logger.info(f"⏭️ Предмет с listing_id={listing_id} уже существует в БД (ID={existing_item.id}), пропускаем")
-                            if task_logger:
-                                task_logger.info(f"⏭️ Предмет уже существует в БД, пропускаем")
-                            return False
-                    except (json.JSONDecodeError, AttributeError):
-                        pass
-            except asyncio.TimeoutError:
-                logger.error(f"⏱️ Таймаут при проверке дубликатов (10с), БД может быть недоступна")
-                if task_logger:
-                    task_logger.error(f"⏱️ Таймаут при проверке дубликатов")
-                return False
-            except Exception as db_error:
-                logger.error(f"❌ Ошибка при проверке дубликатов: {type(db_error).__name__}: {db_error}")
-                if task_logger:
-                    task_logger.error(f"❌ Ошибка при проверке дубликатов: {db_error}")
-                return False
-        else:
-            # Если нет listing_id, проверяем только по task_id + item_name + price
+        # Убеждаемся, что listing_id сохранен
+        if listing_id and isinstance(serialized_data, dict):
+            serialized_data['listing_id'] = listing_id
+        values = {
+            "task_id": task.id,
+            "listing_id": listing_id,
+            "item_name": item_name,
+            "price": item_price,
+            "item_data_json": serialized_data,
+            "market_url": item_name,
+            "notification_sent": False
+        }
+        
+        return values
+            
+    except Exception as e:
+        logger.error(f"❌ Ошибка при проверке фильтров для {item_name}: {e}")
+        if task_logger:
+            task_logger.error(f"❌ Ошибка при проверке фильтров: {e}")
+        import traceback
+        logger.debug(f"Traceback: {traceback.format_exc()}")
+        return None
+
+
+async def store_item_result(
+    task: MonitoringTask,
+    parsed_data: Union[ParsedItemData, ListingRecord],
+    values: Dict[str, Any],
+    db_session: AsyncSession,
+    redis_service: Optional[RedisService] = None,
+    task_logger=None,
+    notifier=None,
+    batch: Optional[FoundItemBatch] = None
+) -> bool:
+    """
+    Сохраняет предмет, прошедший фильтры (evaluate_item_result), и отправляет уведомление.
+    
+    Args:
+        task: Задача мониторинга
+        parsed_data: Данные предмета (для возврата в очередь при ошибке сохранения пачки)
+        values: Значения колонок FoundItem
+        db_session: Сессия БД
+        redis_service: Сервис Redis для публикации уведомлений
+        task_logger: Логгер для задачи (опционально)
+        notifier: Объект с async publish(channel, data) для уведомлений
+        batch: Пачка сохранения (FoundItemBatch); если задана, предмет только добавляется в пачку
+        
+    Returns:
+        True если предмет сохранен (или добавлен в пачку), False если это дубликат или ошибка
+    """
+    if not task_logger:
+        task_logger = get_task_logger()
+    
+    if notifier is None and redis_service and redis_service.is_connected():
+        notifier = redis_service
+    
+    item_name = values["item_name"]
+    item_price = values["price"]
+    listing_id = values["listing_id"]
+    serialized_data = values["item_data_json"]
+    
+    try:
+        # Если нет listing_id, дубликат ищем по task_id + item_name + price
+        if not listing_id:
             try:
-                existing_query = select(FoundItem).where(
+                existing_query = select(FoundItem.id).where(
                     FoundItem.task_id == task.id,
                     FoundItem.item_name == item_name,
                     FoundItem.price == item_price
@@ -491,7 +669,7 @@ async def process_item_result(
                         task_logger.info(f"⏭️ Предмет уже существует в БД, пропускаем")
                     return False
             except asyncio.TimeoutError:
-                logger.error(f"⏱️ Таймаут при проверке дубликатов (10с), БД может быть недоступна")
+                logger.error(f"⏱️ Таймаут при проверке дубликатов (30с), БД может быть недоступна")
                 if task_logger:
                     task_logger.error(f"⏱️ Таймаут при проверке дубликатов")
                 return False
@@ -501,56 +679,30 @@ async def process_item_result(
                     task_logger.error(f"❌ Ошибка при проверке дубликатов: {db_error}")
                 return False
         
-        # Преобразуем parsed_data в JSON-сериализуемый формат
-        serialized_data = _serialize_for_json(parsed_data)
-        
-        # Убеждаемся, что listing_id сохранен
-        if listing_id and isinstance(serialized_data, dict):
-            serialized_data['listing_id'] = listing_id
-        
-        # Создаем FoundItem
-        found_item = FoundItem(
-            task_id=task.id,
-            item_name=item_name,
-            price=item_price,
-            item_data_json=json.dumps(serialized_data, ensure_ascii=False),
-            market_url=item_name,
-            notification_sent=False
-        )
-        
-        # ВАЖНО: Отправляем уведомление ДО сохранения в БД, чтобы оно ушло даже при таймауте
-        notification_sent = False
-        if redis_service and redis_service.is_connected():
-            try:
-                # Подготавливаем данные для уведомления (без ID предмета, т.к. он еще не сохранен)
-                notification_data = {
-                    "type": "found_item",
-                    "item_id": None,  # Будет установлен после сохранения
-                    "task_id": task.id,
-                    "item_name": item_name,
-                    "price": item_price,
-                    "market_url": item_name,
-                    "item_data_json": json.dumps(serialized_data, ensure_ascii=False),
-                    "task_name": task.name
-                }
-                logger.info(f"📤 Публикуем уведомление в Redis канал 'found_items' для предмета {item_name} (ДО сохранения в БД)")
-                if task_logger:
-                    task_logger.info(f"📤 Публикуем уведомление в Telegram")
-                
-                await redis_service.publish("found_items", notification_data)
-                notification_sent = True
-                logger.info(f"✅ Уведомление опубликовано для предмета {item_name} (ДО сохранения)")
-                if task_logger:
-                    task_logger.success(f"✅ Уведомление отправлено в Telegram")
-            except Exception as notify_error:
-                logger.warning(f"⚠️ Не удалось отправить уведомление ДО сохранения: {notify_error}, попробуем после")
+        if batch is not None:
+            if not batch.add(values, parsed_data):
+                logger.info(f"⏭️ Лот listing_id={listing_id} уже есть в пачке сохранения, пропускаем")
+                return False
+            logger.info(f"📥 Предмет добавлен в пачку сохранения: {item_name} (${item_price:.2f}), в пачке {len(batch)}")
+            return True
         
         try:
-            db_session.add(found_item)
-            await asyncio.wait_for(
-                db_session.flush(),  # Получаем ID предмета
-                timeout=30.0  # Увеличено: Таймаут 30 секунд для flush (было 10)
+            # Дубликат по listing_id отсекает уникальный индекс (task_id, listing_id):
+            # одна вставка вместо чтения всей истории задачи, без гонок между воркерами
+            found_item_id = await asyncio.wait_for(
+                insert_found_item(db_session, values),
+                timeout=30.0
             )
+            if found_item_id is None:
+                logger.info(f"⏭️ Предмет с listing_id={listing_id} уже существует в БД, пропускаем")
+                if task_logger:
+                    task_logger.info(f"⏭️ Предмет уже существует в БД, пропускаем")
+                try:
+                    await asyncio.wait_for(db_session.rollback(), timeout=5.0)
+                except (asyncio.TimeoutError, Exception):
+                    pass
+                await _mark_seen(redis_service, task.id, listing_id)
+                return False
             
             # ВАЖНО: Используем атомарный UPDATE вместо refresh + изменение + commit
             # Это предотвращает блокировки и race conditions
@@ -573,46 +725,14 @@ async def process_item_result(
                 timeout=3.0  # Уменьшен таймаут до 3 секунд для commit
             )
             
-            logger.info(f"💾 Предмет сохранен в БД: {item_name} (${item_price:.2f}), ID={found_item.id}")
+            logger.info(f"💾 Предмет сохранен в БД: {item_name} (${item_price:.2f}), ID={found_item_id}")
             if task_logger:
                 task_logger.success(f"💾 Предмет сохранен в БД: {item_name} (${item_price:.2f})")
-            
-            # Если уведомление не было отправлено ДО сохранения, отправляем после
-            if not notification_sent and redis_service and redis_service.is_connected():
-                try:
-                    notification_data = {
-                        "type": "found_item",
-                        "item_id": found_item.id,
-                        "task_id": task.id,
-                        "item_name": found_item.item_name,
-                        "price": found_item.price,
-                        "market_url": found_item.market_url,
-                        "item_data_json": found_item.item_data_json,
-                        "task_name": task.name
-                    }
-                    await redis_service.publish("found_items", notification_data)
-                    logger.info(f"✅ Уведомление опубликовано для предмета {found_item.id} (после сохранения)")
-                    if task_logger:
-                        task_logger.success(f"✅ Уведомление отправлено в Telegram")
-                except Exception as notify_error:
-                    logger.warning(f"⚠️ Не удалось отправить уведомление после сохранения: {notify_error}")
-            
-            return True
-            
+            await _mark_seen(redis_service, task.id, listing_id)
         except asyncio.TimeoutError:
-            logger.error(f"⏱️ Таймаут при сохранении предмета {item_name} в БД (30с), БД может быть недоступна или перегружена")
+            logger.error(f"⏱️ Таймаут при сохранении предмета {item_name} в БД, БД может быть недоступна или перегружена")
             if task_logger:
                 task_logger.error(f"⏱️ Таймаут при сохранении")
-            # ВАЖНО: Уведомление уже отправлено, поэтому возвращаем True
-            if notification_sent:
-                logger.warning(f"⚠️ Предмет не сохранен в БД из-за таймаута, но уведомление уже отправлено")
-                if task_logger:
-                    task_logger.warning(f"⚠️ Предмет не сохранен, но уведомление отправлено")
-                try:
-                    await asyncio.wait_for(db_session.rollback(), timeout=5.0)
-                except (asyncio.TimeoutError, Exception):
-                    pass
-                return True  # Возвращаем True, т.к. уведомление отправлено
             try:
                 await asyncio.wait_for(db_session.rollback(), timeout=5.0)
             except (asyncio.TimeoutError, Exception):
@@ -627,11 +747,34 @@ async def process_item_result(
             except (asyncio.TimeoutError, Exception):
                 pass
             return False
+        
+        # Уведомление - только после вставки: дубликат определяется самой вставкой
+        if notifier is not None:
+            try:
+                notification_data = {
+                    "type": "found_item",
+                    "item_id": found_item_id,
+                    "task_id": task.id,
+                    "item_name": item_name,
+                    "price": item_price,
+                    "market_url": item_name,
+                    "item_data_json": item_data_to_text(serialized_data),
+                    "task_name": task.name
+                }
+                logger.info(f"📤 Публикуем уведомление в Redis канал 'found_items' для предмета {item_name}")
+                await notifier.publish("found_items", notification_data)
+                logger.info(f"✅ Уведомление опубликовано для предмета {found_item_id}")
+                if task_logger:
+                    task_logger.success(f"✅ Уведомление отправлено в Telegram")
+            except Exception as notify_error:
+                logger.warning(f"⚠️ Не удалось отправить уведомление: {notify_error}")
+        
+        return True
             
     except Exception as e:
-        logger.error(f"❌ Ошибка при проверке фильтров для {item_name}: {e}")
+        logger.error(f"❌ Ошибка при сохранении предмета {item_name}: {e}")
         if task_logger:
-            task_logger.error(f"❌ Ошибка при проверке фильтров: {e}")
+            task_logger.error(f"❌ Ошибка при сохранении: {e}")
         import traceback
         logger.debug(f"Traceback: {traceback.format_exc()}")
         return False
@@ -647,7 +790,10 @@ def _serialize_for_json(obj: Any) -> Any:
     Returns:
         Сериализуемый объект
     """
-    if hasattr(obj, 'model_dump'):
+    if isinstance(obj, ListingRecord):
+        # Компактная запись лота: валидируем через ParsedItemData на границе БД
+        return obj.to_parsed_item().model_dump()
+    elif hasattr(obj, 'model_dump'):
         # Pydantic v2
         return obj.model_dump()
     elif hasattr(obj, 'dict'):
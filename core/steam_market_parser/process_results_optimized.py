@@ -9,7 +9,8 @@ from sqlalchemy import select, update, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
 
-from core import FoundItem, MonitoringTask
+from core import MonitoringTask
+from core.database import insert_found_item
 from ..models import ParsedItemData, SearchFilters
 from services.redis_service import RedisService
 from services.filter_service import FilterService
@@ -76,42 +77,24 @@ async def process_item_result_optimized(
     # ВАЖНО: Используем UPSERT для атомарной вставки/обновления
     # Это предотвращает race condition при параллельной вставке
     try:
-        # Проверяем, существует ли уже предмет с таким listing_id
-        if listing_id:
-            existing_query = select(FoundItem).where(
-                FoundItem.task_id == task.id,
-                FoundItem.item_name == item_name,
-                FoundItem.price == item_price
-            )
-            existing_items = await asyncio.wait_for(
-                db_session.execute(existing_query),
-                timeout=10.0
-            )
-            for existing_item in existing_items.scalars().all():
-                try:
-                    existing_data = json.loads(existing_item.item_data_json)
-                    existing_listing_id = existing_data.get('listing_id')
-                    if existing_listing_id and str(existing_listing_id) == str(listing_id):
-                        logger.info(f"⏭️ Предмет с listing_id={listing_id} уже существует в БД")
-                        return False
-                except (json.JSONDecodeError, AttributeError):
-                    pass
-        
-        # Создаем FoundItem
-        found_item = FoundItem(
-            task_id=task.id,
-            item_name=item_name,
-            price=item_price,
-            item_data_json=json.dumps(serialized_data, ensure_ascii=False),
-            market_url=item_name,
-            notification_sent=False
-        )
-        
-        db_session.add(found_item)
-        await asyncio.wait_for(
-            db_session.flush(),
+        item_data_json = json.dumps(serialized_data, ensure_ascii=False)
+        # INSERT ... ON CONFLICT (task_id, listing_id) DO NOTHING RETURNING id
+        found_item_id = await asyncio.wait_for(
+            insert_found_item(db_session, {
+                "task_id": task.id,
+                "listing_id": listing_id,
+                "item_name": item_name,
+                "price": item_price,
+                "item_data_json": serialized_data,
+                "market_url": item_name,
+                "notification_sent": False
+            }),
             timeout=10.0
         )
+        if found_item_id is None:
+            logger.info(f"⏭️ Предмет с listing_id={listing_id} уже существует в БД")
+            await db_session.rollback()
+            return False
         
         # ВАЖНО: Атомарное обновление счетчика через SQL UPDATE
         # Это предотвращает lost update при параллельных обновлениях
@@ -133,18 +116,18 @@ async def process_item_result_optimized(
             timeout=10.0
         )
         
-        logger.info(f"💾 Предмет сохранен в БД: {item_name} (${item_price:.2f}), ID={found_item.id}")
+        logger.info(f"💾 Предмет сохранен в БД: {item_name} (${item_price:.2f}), ID={found_item_id}")
         
         # Публикуем уведомление в Redis
         if redis_service and redis_service.is_connected():
             notification_data = {
                 "type": "found_item",
-                "item_id": found_item.id,
+                "item_id": found_item_id,
                 "task_id": task.id,
-                "item_name": found_item.item_name,
-                "price": found_item.price,
-                "market_url": found_item.market_url,
-                "item_data_json": found_item.item_data_json,
+                "item_name": item_name,
+                "price": item_price,
+                "market_url": item_name,
+                "item_data_json": item_data_json,
                 "task_name": task.name
             }
             await redis_service.publish("found_items", notification_data)
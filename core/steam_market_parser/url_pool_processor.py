@@ -9,6 +9,7 @@ from loguru import logger
 
 from ..models import SearchFilters
 from ..logger import get_task_logger
+from services.filter_plan import get_filter_plan
 
 
 async def process_url_pool(
@@ -196,7 +197,7 @@ async def process_url_pool(
                         target_patterns = set(filters.pattern_list.patterns)
                         logger.info(f"    🎯 Фильтр по паттерну (direct): ищем паттерны {target_patterns}")
                     elif filters.pattern_range:
-                        target_patterns = set(range(filters.pattern_range.min, filters.pattern_range.max + 1))
+                        target_patterns = get_filter_plan(filters).target_patterns
                         logger.info(f"    🎯 Фильтр по паттерну (direct): ищем паттерны в диапазоне {filters.pattern_range.min}-{filters.pattern_range.max}")
                     
                     # Используем listing_parser если доступен
@@ -18,6 +18,8 @@ from .steam_api_methods import SteamAPIMethods
 from .steam_helper_methods import SteamHelperMethods
 from .logger import get_task_logger
 from services.filter_service import FilterService
+from services.filter_plan import get_filter_plan
+from services.task_cancellation import task_cancellation
 from parsers import ItemPageParser
 from parsers.inspect_parser import InspectLinkParser
 from parsers.item_prices import ItemPricesAPI
@@ -65,7 +67,7 @@ class SteamMarketParser(SteamAPIMethods, SteamHelperMethods):
         """Ленивая инициализация BasePriceManager."""
         if self._base_price_manager is None:
             BasePriceManager = _get_base_price_manager()
-            self._base_price_manager = BasePriceManager()
+            self._base_price_manager = BasePriceManager(redis_service=self.redis_service)
         return self._base_price_manager
     
     @property
@@ -893,16 +895,9 @@ class SteamMarketParser(SteamAPIMethods, SteamHelperMethods):
                         # ВАЖНО: Проверяем статус задачи перед началом обработки предмета
                         if self._current_task:
                             try:
-                                from sqlalchemy import select
-                                from core import MonitoringTask
-                                if self._current_db_session:
-                                    result = await self._current_db_session.execute(
-                                        select(MonitoringTask).where(MonitoringTask.id == self._current_task.id)
-                                    )
-                                    db_task = result.scalar_one_or_none()
-                                    if db_task and not db_task.is_active:
-                                        logger.info(f"🛑 Задача {self._current_task.id} деактивирована, пропускаем предмет {idx + 1}")
-                                        return None
+                                if await task_cancellation.is_cancelled(self._current_task.id, self._current_db_session):
+                                    logger.info(f"🛑 Задача {self._current_task.id} деактивирована, пропускаем предмет {idx + 1}")
+                                    return None
                             except Exception as e:
                                 logger.warning(f"⚠️ Ошибка при проверке статуса задачи: {e}")
                         
@@ -969,8 +964,8 @@ class SteamMarketParser(SteamAPIMethods, SteamHelperMethods):
                             logger.info(f"    🔍 DEBUG (parallel): pattern_list.patterns = {filters.pattern_list.patterns}")
                             logger.info(f"    🔍 DEBUG (parallel): pattern_list.item_type = {filters.pattern_list.item_type}")
                         elif filters.pattern_range:
-                            # Для pattern_range создаем set всех паттернов в диапазоне
-                            target_patterns = set(range(filters.pattern_range.min, filters.pattern_range.max + 1))
+                            # Для pattern_range множество паттернов берется из скомпилированного плана фильтров
+                            target_patterns = get_filter_plan(filters).target_patterns
                             logger.info(f"    🎯 Фильтр по паттерну (parallel): ищем паттерны в диапазоне {filters.pattern_range.min}-{filters.pattern_range.max}")
                             logger.info(f"    🔍 DEBUG (parallel): pattern_range.min = {filters.pattern_range.min}, max = {filters.pattern_range.max}")
                         else:
@@ -1021,16 +1016,9 @@ class SteamMarketParser(SteamAPIMethods, SteamHelperMethods):
                             # ВАЖНО: Проверяем статус задачи перед парсингом страницы предмета
                             if self._current_task:
                                 try:
-                                    from sqlalchemy import select
-                                    from core import MonitoringTask
-                                    if self._current_db_session:
-                                        result = await self._current_db_session.execute(
-                                            select(MonitoringTask).where(MonitoringTask.id == self._current_task.id)
-                                        )
-                                        db_task = result.scalar_one_or_none()
-                                        if db_task and not db_task.is_active:
-                                            logger.info(f"🛑 Задача {self._current_task.id} деактивирована, пропускаем парсинг предмета {hash_name}")
-                                            return None
+                                    if await task_cancellation.is_cancelled(self._current_task.id, self._current_db_session):
+                                        logger.info(f"🛑 Задача {self._current_task.id} деактивирована, пропускаем парсинг предмета {hash_name}")
+                                        return None
                                 except Exception as e:
                                     logger.warning(f"⚠️ Ошибка при проверке статуса задачи перед парсингом: {e}")
                             
@@ -1267,8 +1255,8 @@ class SteamMarketParser(SteamAPIMethods, SteamHelperMethods):
                         logger.info(f"    🔍 DEBUG: pattern_list.patterns = {filters.pattern_list.patterns}")
                         logger.info(f"    🔍 DEBUG: pattern_list.item_type = {filters.pattern_list.item_type}")
                     elif filters.pattern_range:
-                        # Для pattern_range создаем set всех паттернов в диапазоне
-                        target_patterns = set(range(filters.pattern_range.min, filters.pattern_range.max + 1))
+                        # Для pattern_range множество паттернов берется из скомпилированного плана фильтров
+                        target_patterns = get_filter_plan(filters).target_patterns
                         logger.info(f"    🎯 Фильтр по паттерну: ищем паттерны в диапазоне {filters.pattern_range.min}-{filters.pattern_range.max}")
                         logger.info(f"    🔍 DEBUG: pattern_range.min = {filters.pattern_range.min}, max = {filters.pattern_range.max}")
                     else:
@@ -1578,18 +1566,11 @@ class SteamMarketParser(SteamAPIMethods, SteamHelperMethods):
         while page_num <= MAX_PAGES_TO_PARSE:
             # Проверяем, активна ли задача (для немедленной остановки)
             if self._current_task:
-                # Обновляем задачу из БД для проверки актуального статуса
+                # Токен отмены обновляется подписчиком канала; без него статус читается из БД
                 try:
-                    from sqlalchemy import select
-                    from core import MonitoringTask
-                    if self._current_db_session:
-                        result = await self._current_db_session.execute(
-                            select(MonitoringTask).where(MonitoringTask.id == self._current_task.id)
-                        )
-                        db_task = result.scalar_one_or_none()
-                        if db_task and not db_task.is_active:
-                            log_both("info", f"🛑 Задача {self._current_task.id} деактивирована, останавливаем парсинг")
-                            break
+                    if await task_cancellation.is_cancelled(self._current_task.id, self._current_db_session):
+                        log_both("info", f"🛑 Задача {self._current_task.id} деактивирована, останавливаем парсинг")
+                        break
                 except Exception as e:
                     log_both("warning", f"⚠️ Ошибка при проверке статуса задачи: {e}")
             
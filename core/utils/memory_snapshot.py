@@ -0,0 +1,101 @@
+"""
+Диагностика памяти процесса через tracemalloc.
+
+Используется endpoint'ом /debug/memory (parser_api) и периодическими
+снимками parsing worker'а (сохраняются в Redis), чтобы проверить, что
+память на страницу освобождается и не растет с числом обработанных задач.
+"""
+import os
+import time
+import tracemalloc
+from typing import Any, Dict, Optional
+
+from core.config import Config
+
+
+# Ключ Redis для последнего снимка процесса (дополняется именем сервиса)
+REDIS_SNAPSHOT_KEY_PREFIX = "debug:memory:"
+
+# Снимок предыдущего вызова для сравнения (compare=True)
+_previous_snapshot: Optional[tracemalloc.Snapshot] = None
+
+
+def start_tracing(frames: Optional[int] = None) -> bool:
+    """
+    Включает tracemalloc, если он еще не включен.
+
+    Args:
+        frames: Глубина стека для каждой аллокации (по умолчанию Config.TRACEMALLOC_FRAMES)
+
+    Returns:
+        True, если трассировка была включена этим вызовом
+    """
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(max(1, frames or Config.TRACEMALLOC_FRAMES))
+    return True
+
+
+def get_rss_bytes() -> Optional[int]:
+    """Возвращает текущий RSS процесса (Linux) или None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def take_snapshot(limit: int = 20, key_type: str = "lineno", compare: bool = False) -> Dict[str, Any]:
+    """
+    Делает снимок tracemalloc и возвращает крупнейшие места аллокаций.
+
+    Args:
+        limit: Количество строк в топе
+        key_type: Группировка: lineno, filename или traceback
+        compare: Показать разницу с предыдущим снимком вместо абсолютных значений
+
+    Returns:
+        Словарь с текущей/пиковой памятью, RSS и топом аллокаций
+    """
+    global _previous_snapshot
+
+    result: Dict[str, Any] = {
+        "tracing": tracemalloc.is_tracing(),
+        "rss_bytes": get_rss_bytes(),
+        "timestamp": time.time(),
+    }
+    if not tracemalloc.is_tracing():
+        result["top"] = []
+        return result
+
+    current, peak = tracemalloc.get_traced_memory()
+    result["traced_current_bytes"] = current
+    result["traced_peak_bytes"] = peak
+
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+
+    top = []
+    if compare and _previous_snapshot is not None:
+        for stat in snapshot.compare_to(_previous_snapshot, key_type)[:limit]:
+            top.append({
+                "location": str(stat.traceback),
+                "size_bytes": stat.size,
+                "size_diff_bytes": stat.size_diff,
+                "count": stat.count,
+                "count_diff": stat.count_diff,
+            })
+    else:
+        for stat in snapshot.statistics(key_type)[:limit]:
+            top.append({
+                "location": str(stat.traceback),
+                "size_bytes": stat.size,
+                "count": stat.count,
+            })
+    result["compared"] = bool(compare and _previous_snapshot is not None)
+    result["top"] = top
+    _previous_snapshot = snapshot
+    return result
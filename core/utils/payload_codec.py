@@ -0,0 +1,153 @@
+"""
+Кодек для сообщений между сервисами (Redis, RabbitMQ).
+
+Формат сообщения: первый байт - версия кодека, далее тело.
+    (нет префикса) - legacy JSON (старые продюсеры, начинается с '{' или '[')
+    0x01           - JSON (orjson, если установлен, иначе стандартный json)
+    0x02           - msgpack
+
+Потребители умеют декодировать все версии, поэтому при раскатке сначала
+обновляются потребители, затем продюсеры переключаются через PAYLOAD_CODEC
+(json -> orjson -> msgpack).
+
+Redis-клиент работает с decode_responses=True, поэтому бинарные значения
+приходят строкой с surrogateescape (см. RedisService.connect); decode()
+принимает и str, и bytes.
+"""
+import json
+from functools import lru_cache
+from typing import Any, Union
+
+from loguru import logger
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from core.config import Config
+
+
+VERSION_JSON = 0x01
+VERSION_MSGPACK = 0x02
+
+# Поддерживаемые значения PAYLOAD_CODEC
+CODEC_LEGACY_JSON = "json"
+CODEC_ORJSON = "orjson"
+CODEC_MSGPACK = "msgpack"
+
+_CONTENT_TYPES = {
+    CODEC_LEGACY_JSON: "application/json",
+    CODEC_ORJSON: "application/json",
+    CODEC_MSGPACK: "application/x-msgpack",
+}
+
+
+def _dumps_json(obj: Any) -> bytes:
+    if orjson is not None:
+        # OPT_NON_STR_KEYS: числовые ключи словарей принимаются, как в json.dumps
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, default=str).encode("utf-8")
+
+
+def _loads_json(body: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def resolve_codec(name: str = None) -> str:
+    """
+    Возвращает имя кодека для записи с учетом установленных библиотек.
+
+    Args:
+        name: Имя кодека (по умолчанию Config.PAYLOAD_CODEC)
+
+    Returns:
+        Одно из: json, orjson, msgpack
+    """
+    return _resolve_codec((name or Config.PAYLOAD_CODEC or CODEC_LEGACY_JSON).lower())
+
+
+@lru_cache(maxsize=None)
+def _resolve_codec(name: str) -> str:
+    # Вызывается на каждом encode: результат (и предупреждение) - один раз на имя кодека
+    if name == CODEC_MSGPACK and msgpack is None:
+        logger.warning("⚠️ PAYLOAD_CODEC=msgpack, но msgpack не установлен, используем JSON")
+        return CODEC_ORJSON
+    if name not in _CONTENT_TYPES:
+        logger.warning(f"⚠️ Неизвестный PAYLOAD_CODEC='{name}', используем legacy JSON")
+        return CODEC_LEGACY_JSON
+    return name
+
+
+def content_type(name: str = None) -> str:
+    """Возвращает MIME-тип для выбранного кодека (для RabbitMQ)."""
+    return _CONTENT_TYPES[resolve_codec(name)]
+
+
+def encode(obj: Any, codec: str = None) -> bytes:
+    """
+    Кодирует объект в сообщение с байтом версии.
+
+    Args:
+        obj: Сериализуемый объект (dict, list, ...)
+        codec: Имя кодека (по умолчанию Config.PAYLOAD_CODEC)
+
+    Returns:
+        Закодированное сообщение
+    """
+    codec = resolve_codec(codec)
+    if codec == CODEC_MSGPACK:
+        return bytes((VERSION_MSGPACK,)) + msgpack.packb(obj, use_bin_type=True, default=str)
+    if codec == CODEC_ORJSON:
+        return bytes((VERSION_JSON,)) + _dumps_json(obj)
+    return json.dumps(obj, ensure_ascii=False, default=str).encode("utf-8")
+
+
+def encode_str(obj: Any, codec: str = None) -> str:
+    """
+    Кодирует объект в строку для Redis-клиента с decode_responses=True.
+
+    Бинарные байты сохраняются через surrogateescape и восстанавливаются
+    при записи клиентом с encoding_errors="surrogateescape".
+    """
+    return encode(obj, codec).decode("utf-8", "surrogateescape")
+
+
+def decode(data: Union[bytes, bytearray, str]) -> Any:
+    """
+    Декодирует сообщение любой поддерживаемой версии.
+
+    Args:
+        data: Сообщение (bytes или str из Redis)
+
+    Returns:
+        Декодированный объект
+
+    Raises:
+        ValueError: Если сообщение не удалось декодировать
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8", "surrogateescape")
+    if not data:
+        raise ValueError("Пустое сообщение")
+
+    version = data[0]
+    try:
+        if version == VERSION_MSGPACK:
+            if msgpack is None:
+                raise ValueError("Получено msgpack сообщение, но msgpack не установлен")
+            return msgpack.unpackb(data[1:], raw=False, strict_map_key=False)
+        if version == VERSION_JSON:
+            return _loads_json(data[1:])
+        return _loads_json(data)
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Не удалось декодировать сообщение (версия 0x{version:02x}): {e}") from e
@@ -1,9 +1,17 @@
 """
 Утилита для гибкого сопоставления названий наклеек.
 Помогает находить совпадения даже при небольших различиях в названиях.
+
+Для поиска по большому набору названий (каталог цен) используется
+StickerNameIndex: хэш нормализованных названий для точных совпадений,
+обратный индекс слово -> названия и триграммы для проверки вхождения.
+Оцениваются только кандидаты, у которых есть общие слова или вхождение,
+результат совпадает с полным перебором.
 """
 import re
-from typing import Optional, Dict, List, Tuple
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Dict, FrozenSet, Iterable, List, Set, Tuple
 
 
 def normalize_sticker_name(name: str) -> str:
@@ -80,6 +88,143 @@ def calculate_similarity(name1: str, name2: str) -> float:
     return jaccard
 
 
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class StickerNameIndex:
+    """
+    Индекс названий наклеек для find_best_match.
+
+    Строится один раз для набора названий; порядок названий сохраняется,
+    поэтому при равной схожести выбирается то же название, что и при переборе.
+    """
+
+    __slots__ = ("_names", "_normalized", "_tokens", "_exact", "_token_index", "_trigram_index")
+
+    def __init__(self, names: Iterable[str]):
+        self._names: List[str] = []
+        self._normalized: List[str] = []
+        self._tokens: List[FrozenSet[str]] = []
+        self._exact: Dict[str, int] = {}
+        self._token_index: Dict[str, List[int]] = {}
+        self._trigram_index: Dict[str, List[int]] = {}
+        for position, name in enumerate(names):
+            normalized = normalize_sticker_name(name)
+            tokens = frozenset(normalized.split())
+            self._names.append(name)
+            self._normalized.append(normalized)
+            self._tokens.append(tokens)
+            self._exact.setdefault(normalized, position)
+            for token in tokens:
+                self._token_index.setdefault(token, []).append(position)
+            for trigram in _trigrams(normalized):
+                self._trigram_index.setdefault(trigram, []).append(position)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _candidates(self, normalized: str, tokens: FrozenSet[str]) -> Set[int]:
+        """Позиции названий с общими словами или вхождением одной строки в другую."""
+        candidates: Set[int] = set()
+        for token in tokens:
+            candidates.update(self._token_index.get(token, ()))
+
+        # Доступное название целиком входит в запрошенное: перебираем подстроки запрошенного
+        length = len(normalized)
+        for start in range(length):
+            for end in range(start + 1, length + 1):
+                position = self._exact.get(normalized[start:end])
+                if position is not None:
+                    candidates.add(position)
+
+        # Запрошенное название входит в доступное: пересечение списков триграмм
+        if length >= 3:
+            postings = sorted(
+                (self._trigram_index.get(trigram, ()) for trigram in _trigrams(normalized)),
+                key=len
+            )
+            if postings and postings[0]:
+                common = set(postings[0])
+                for posting in postings[1:]:
+                    common.intersection_update(posting)
+                    if not common:
+                        break
+                candidates.update(position for position in common if normalized in self._normalized[position])
+        elif normalized:
+            candidates.update(
+                position for position, available in enumerate(self._normalized) if normalized in available
+            )
+        return candidates
+
+    def best_match(self, requested_name: str, min_similarity: float = 0.7) -> Optional[Tuple[str, float]]:
+        """
+        Находит лучшее совпадение (как find_best_match).
+
+        Args:
+            requested_name: Запрошенное название наклейки
+            min_similarity: Минимальный коэффициент схожести
+
+        Returns:
+            Кортеж (найденное_название, коэффициент_схожести) или None
+        """
+        if not requested_name or not self._names:
+            return None
+        normalized = normalize_sticker_name(requested_name)
+        position = self._exact.get(normalized)
+        if position is not None:
+            return (self._names[position], 1.0)
+        if not normalized:
+            return None
+
+        tokens = frozenset(normalized.split())
+        best_position = None
+        best_similarity = 0.0
+        for position in sorted(self._candidates(normalized, tokens)):
+            available = self._normalized[position]
+            available_tokens = self._tokens[position]
+            union = len(tokens | available_tokens)
+            similarity = len(tokens & available_tokens) / union if union else 0.0
+            if normalized in available or available in normalized:
+                similarity = max(similarity, 0.8)
+            if similarity > best_similarity and similarity >= min_similarity:
+                best_similarity = similarity
+                best_position = position
+        if best_position is None:
+            return None
+        return (self._names[best_position], best_similarity)
+
+
+# Индексы для последних наборов названий (один набор - одна версия каталога)
+_INDEX_CACHE_SIZE = 8
+_index_cache: "OrderedDict[Tuple[str, ...], StickerNameIndex]" = OrderedDict()
+_index_cache_lock = Lock()
+
+
+def get_name_index(names: Iterable[str]) -> StickerNameIndex:
+    """
+    Возвращает общий индекс для набора названий (строится один раз на набор).
+
+    Args:
+        names: Названия (порядок важен для выбора при равной схожести)
+
+    Returns:
+        StickerNameIndex
+    """
+    key = tuple(names)
+    with _index_cache_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+    index = StickerNameIndex(key)
+    with _index_cache_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > _INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+
 def find_best_match(
     requested_name: str,
     available_names: Dict[str, any],
@@ -108,26 +253,8 @@ def find_best_match(
     if not requested_name or not available_names:
         return None
     
-    # Сначала проверяем точное совпадение (регистронезависимо)
-    requested_normalized = normalize_sticker_name(requested_name)
-    for available_name, value in available_names.items():
-        if normalize_sticker_name(available_name) == requested_normalized:
-            return (available_name, 1.0)
-    
-    # Если точного совпадения нет, ищем наиболее похожее
-    best_match = None
-    best_similarity = 0.0
-    
-    for available_name, value in available_names.items():
-        similarity = calculate_similarity(requested_name, available_name)
-        if similarity > best_similarity and similarity >= min_similarity:
-            best_similarity = similarity
-            best_match = available_name
-    
-    if best_match:
-        return (best_match, best_similarity)
-    
-    return None
+    # Индекс строится один раз для набора названий и переиспользуется между вызовами
+    return get_name_index(available_names).best_match(requested_name, min_similarity)
 
 
 # Примеры использования для тестирования
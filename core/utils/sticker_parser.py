@@ -180,9 +180,9 @@ class StickerPriceResolver:
                             final_prices[sticker_name] = valid_prices[matched_name]
                             logger.debug(f"⚠️ Слабое совпадение ({int(similarity*100)}%): '{sticker_name}' -> '{matched_name}'")
                         else:
-                            final_prices[sticker_name] = None
+                            final_prices[sticker_name] = self._match_in_catalog(sticker_name, appid, currency)
                 else:
-                    final_prices[sticker_name] = None
+                    final_prices[sticker_name] = self._match_in_catalog(sticker_name, appid, currency)
             
             return final_prices
         
@@ -196,6 +196,28 @@ class StickerPriceResolver:
         
         return final_prices
     
+    def _match_in_catalog(self, sticker_name: str, appid: int, currency: int) -> Optional[float]:
+        """
+        Ищет цену наклейки в локальном каталоге по гибкому совпадению названия.
+        
+        Args:
+            sticker_name: Название наклейки
+            appid: ID приложения
+            currency: Валюта
+            
+        Returns:
+            Цена или None
+        """
+        catalog = getattr(self.sticker_prices_api, 'catalog', None)
+        if catalog is None:
+            return None
+        match_result = catalog.match(sticker_name, appid, currency, min_similarity=0.7)
+        if match_result is None:
+            return None
+        matched_name, price = match_result
+        logger.debug(f"📚 Найдено совпадение в каталоге: '{sticker_name}' -> '{matched_name}'")
+        return price
+    
     async def calculate_total_stickers_price(
         self,
         stickers: List[StickerInfo],
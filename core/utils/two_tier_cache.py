@@ -0,0 +1,435 @@
+"""
+Двухуровневый кэш справочных данных: LRU в памяти процесса + Redis.
+
+Используется для редко меняющихся данных, которые часто запрашиваются
+(цены наклеек, базовые цены, варианты предметов, проверка hash_name, курсы
+валют):
+- первый уровень - ограниченный по размеру LRU в памяти процесса;
+- второй уровень - Redis (общий для всех процессов), передается в вызов;
+- stale-while-revalidate: после истечения ttl значение еще stale_ttl секунд
+  отдается из кэша, а обновление запускается в фоне;
+- отрицательный кэш: "не найдено" (например, несуществующее название)
+  запоминается на negative_ttl секунд;
+- одновременные промахи по одному ключу объединяются в одну загрузку;
+- счетчики попаданий/промахов для диагностики (stats()).
+
+В Redis значение хранится в обертке {"v": значение, "exp": свежо до (unix),
+"neg": отрицательное}, записи в старом формате считаются промахом.
+"""
+import asyncio
+import math
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+
+Loader = Callable[[], Awaitable[Any]]
+
+# Все созданные кэши процесса (для cache_stats())
+_registry: "weakref.WeakSet[TwoTierCache]" = weakref.WeakSet()
+
+
+class _Entry:
+    """Запись кэша в памяти процесса."""
+
+    __slots__ = ("value", "negative", "stored_at", "fresh_until", "stale_until")
+
+    def __init__(self, value: Any, negative: bool, stored_at: float, fresh_until: float, stale_until: float):
+        self.value = value
+        self.negative = negative
+        self.stored_at = stored_at
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class TwoTierCache:
+    """Кэш с уровнями "память процесса" и "Redis"."""
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: float,
+        max_items: int = 10000,
+        stale_ttl: float = 0,
+        negative_ttl: float = 0,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Args:
+            namespace: Префикс ключей в Redis и имя кэша в статистике
+            ttl: Время свежести значения в секундах
+            max_items: Максимум записей в памяти процесса (LRU)
+            stale_ttl: Сколько секунд после ttl отдавать устаревшее значение, обновляя его в фоне
+            negative_ttl: Время жизни отрицательного результата (0 - не кэшировать)
+            clock: Источник времени (unix-время, общее для процессов через Redis)
+        """
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_items = max(1, max_items)
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.negative_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.loads = 0
+        self.load_errors = 0
+        self.evictions = 0
+        _registry.add(self)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    # --- Память процесса -------------------------------------------------
+
+    def _get_local(self, key: str, now: float) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now >= entry.stale_until:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _put_local(self, key: str, entry: _Entry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_items:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _make_entry(self, value: Any, negative: bool, ttl: Optional[float], now: float) -> _Entry:
+        if negative:
+            fresh_until = now + self.negative_ttl
+            return _Entry(value, True, now, fresh_until, fresh_until)
+        fresh_until = now + (self.ttl if ttl is None else ttl)
+        return _Entry(value, False, now, fresh_until, fresh_until + self.stale_ttl)
+
+    def _count_hit(self, entry: _Entry, now: float) -> bool:
+        """Учитывает попадание, возвращает True, если значение устарело."""
+        if entry.negative:
+            self.negative_hits += 1
+        if now < entry.fresh_until:
+            self.hits += 1
+            return False
+        self.stale_hits += 1
+        return True
+
+    def peek(self, key: str, default: Any = None) -> Any:
+        """
+        Возвращает значение из памяти процесса без обращения к Redis и загрузки.
+
+        Args:
+            key: Ключ
+            default: Значение, если записи нет
+
+        Returns:
+            Свежее или устаревшее (в пределах stale_ttl) значение или default
+        """
+        entry = self._get_local(key, self._clock())
+        return entry.value if entry is not None else default
+
+    def items(self) -> Iterator[Tuple[str, Any, float]]:
+        """Перебирает записи памяти процесса: (ключ, значение, возраст в секундах)."""
+        now = self._clock()
+        for key, entry in list(self._entries.items()):
+            if now < entry.stale_until and not entry.negative:
+                yield key, entry.value, now - entry.stored_at
+
+    # --- Redis -----------------------------------------------------------
+
+    @staticmethod
+    def _redis_ready(redis_service) -> bool:
+        return redis_service is not None and redis_service.is_connected()
+
+    def _decode(self, data: Any, now: float) -> Optional[_Entry]:
+        if not isinstance(data, dict) or "v" not in data or "exp" not in data:
+            return None
+        try:
+            fresh_until = float(data["exp"])
+        except (TypeError, ValueError):
+            return None
+        negative = bool(data.get("neg"))
+        stale_until = fresh_until if negative else fresh_until + self.stale_ttl
+        if now >= stale_until:
+            return None
+        # Время записи неизвестно - считаем от начала окна свежести
+        stored_at = fresh_until - (self.negative_ttl if negative else self.ttl)
+        return _Entry(data["v"], negative, stored_at, fresh_until, stale_until)
+
+    def _encode(self, entry: _Entry) -> Tuple[Dict[str, Any], int]:
+        expire = max(1, math.ceil(entry.stale_until - entry.stored_at))
+        return {"v": entry.value, "exp": entry.fresh_until, "neg": entry.negative}, expire
+
+    async def _redis_get(self, key: str, redis_service) -> Optional[_Entry]:
+        if not self._redis_ready(redis_service):
+            return None
+        try:
+            data = await redis_service.get_json(self._redis_key(key))
+        except Exception as e:
+            logger.debug(f"⚠️ TwoTierCache[{self.namespace}]: Ошибка чтения из Redis: {e}")
+            return None
+        return self._decode(data, self._clock())
+
+    async def _redis_set(self, key: str, entry: _Entry, redis_service) -> None:
+        if not self._redis_ready(redis_service):
+            return
+        data, expire = self._encode(entry)
+        try:
+            await redis_service.set_json(self._redis_key(key), data, ex=expire)
+        except Exception as e:
+            logger.debug(f"⚠️ TwoTierCache[{self.namespace}]: Ошибка записи в Redis: {e}")
+
+    # --- Загрузка --------------------------------------------------------
+
+    def _start(self, key: str, coro: Awaitable[Any], background: bool) -> asyncio.Task:
+        task = asyncio.ensure_future(coro)
+        self._inflight[key] = task
+
+        def _done(finished: asyncio.Task) -> None:
+            if self._inflight.get(key) is finished:
+                del self._inflight[key]
+            if finished.cancelled():
+                return
+            error = finished.exception()
+            if error is not None and background:
+                logger.warning(
+                    f"⚠️ TwoTierCache[{self.namespace}]: Фоновое обновление '{key}' не удалось: "
+                    f"{type(error).__name__}: {error}"
+                )
+
+        task.add_done_callback(_done)
+        return task
+
+    def _revalidate(self, key: str, loader: Loader, redis_service, ttl, cacheable, negative) -> None:
+        """Запускает фоновое обновление устаревшего значения (не больше одного на ключ)."""
+        task = self._inflight.get(key)
+        if task is not None and not task.done():
+            return
+        self._start(key, self._load(key, loader, redis_service, ttl, cacheable, negative, check_redis=False), True)
+
+    async def _load(
+        self,
+        key: str,
+        loader: Loader,
+        redis_service,
+        ttl: Optional[float],
+        cacheable: Optional[Callable[[Any], bool]],
+        negative: Optional[Callable[[Any], bool]],
+        check_redis: bool
+    ) -> Any:
+        if check_redis:
+            entry = await self._redis_get(key, redis_service)
+            if entry is not None:
+                self.redis_hits += 1
+                self._put_local(key, entry)
+                if self._clock() >= entry.fresh_until:
+                    # Отдаем устаревшее значение из Redis, обновление - в фоне после завершения этой задачи
+                    asyncio.get_running_loop().call_soon(
+                        self._revalidate, key, loader, redis_service, ttl, cacheable, negative
+                    )
+                return entry.value
+
+        self.loads += 1
+        try:
+            value = await loader()
+        except Exception:
+            self.load_errors += 1
+            raise
+
+        if cacheable is not None and not cacheable(value):
+            return value
+        is_negative = negative(value) if negative is not None else value is None
+        if is_negative and self.negative_ttl <= 0:
+            return value
+        entry = self._make_entry(value, is_negative, ttl, self._clock())
+        self._put_local(key, entry)
+        await self._redis_set(key, entry, redis_service)
+        return value
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Loader,
+        redis_service=None,
+        ttl: Optional[float] = None,
+        force: bool = False,
+        cacheable: Optional[Callable[[Any], bool]] = None,
+        negative: Optional[Callable[[Any], bool]] = None
+    ) -> Any:
+        """
+        Возвращает значение из кэша или загружает его.
+
+        Args:
+            key: Ключ (без namespace)
+            loader: Корутина без аргументов, загружающая значение
+            redis_service: Сервис Redis для второго уровня (опционально)
+            ttl: Время свежести для этого значения (по умолчанию ttl кэша)
+            force: Загрузить заново, не глядя в кэш
+            cacheable: Предикат "значение можно кэшировать" (например, не ошибка сети)
+            negative: Предикат "значение - отрицательный результат" (по умолчанию value is None)
+
+        Returns:
+            Значение (загрузки одного ключа из разных корутин объединяются)
+        """
+        if not force:
+            now = self._clock()
+            entry = self._get_local(key, now)
+            if entry is not None:
+                if self._count_hit(entry, now):
+                    self._revalidate(key, loader, redis_service, ttl, cacheable, negative)
+                return entry.value
+
+        task = self._inflight.get(key)
+        if task is not None and not force:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = self._start(
+                key,
+                self._load(key, loader, redis_service, ttl, cacheable, negative, check_redis=not force),
+                False
+            )
+        # shield: отмена одного ожидающего не отменяет общую загрузку
+        return await asyncio.shield(task)
+
+    async def get_many(
+        self,
+        keys: Iterable[str],
+        redis_service=None,
+        loader_for: Optional[Callable[[str], Loader]] = None
+    ) -> Dict[str, Any]:
+        """
+        Возвращает найденные в кэше значения для нескольких ключей.
+
+        Память процесса проверяется для всех ключей, остальные ключи читаются
+        из Redis одним MGET. Устаревшие значения отдаются и обновляются в фоне,
+        если передан loader_for.
+
+        Args:
+            keys: Ключи (без namespace)
+            redis_service: Сервис Redis (опционально)
+            loader_for: Функция ключ -> loader для фонового обновления (опционально)
+
+        Returns:
+            Словарь {ключ: значение} только для найденных ключей
+        """
+        found: Dict[str, Any] = {}
+        stale: List[str] = []
+        remote: List[str] = []
+        now = self._clock()
+        for key in dict.fromkeys(keys):
+            entry = self._get_local(key, now)
+            if entry is None:
+                remote.append(key)
+                continue
+            if self._count_hit(entry, now):
+                stale.append(key)
+            found[key] = entry.value
+
+        if remote and self._redis_ready(redis_service):
+            try:
+                cached = await redis_service.get_json_many([self._redis_key(key) for key in remote])
+            except Exception as e:
+                logger.debug(f"⚠️ TwoTierCache[{self.namespace}]: Ошибка чтения из Redis: {e}")
+                cached = [None] * len(remote)
+            now = self._clock()
+            for key, data in zip(remote, cached):
+                entry = self._decode(data, now)
+                if entry is None:
+                    continue
+                self.redis_hits += 1
+                self._put_local(key, entry)
+                if now >= entry.fresh_until:
+                    stale.append(key)
+                found[key] = entry.value
+        self.misses += sum(1 for key in remote if key not in found)
+
+        if loader_for is not None:
+            for key in stale:
+                self._revalidate(key, loader_for(key), redis_service, None, None, None)
+        return found
+
+    async def set(self, key: str, value: Any, redis_service=None, ttl: Optional[float] = None) -> None:
+        """Сохраняет значение в оба уровня."""
+        entry = self._make_entry(value, False, ttl, self._clock())
+        self._put_local(key, entry)
+        await self._redis_set(key, entry, redis_service)
+
+    async def set_many(self, items: Dict[str, Any], redis_service=None, ttl: Optional[float] = None) -> None:
+        """
+        Сохраняет несколько значений: в память процесса и в Redis одним пайплайном.
+
+        Args:
+            items: Словарь {ключ: значение}
+            redis_service: Сервис Redis (опционально)
+            ttl: Время свежести (по умолчанию ttl кэша)
+        """
+        if not items:
+            return
+        now = self._clock()
+        to_redis = {}
+        expire = 1
+        for key, value in items.items():
+            entry = self._make_entry(value, False, ttl, now)
+            self._put_local(key, entry)
+            data, expire = self._encode(entry)
+            to_redis[self._redis_key(key)] = data
+        if self._redis_ready(redis_service):
+            try:
+                await redis_service.set_json_many(to_redis, ex=expire)
+            except Exception as e:
+                logger.debug(f"⚠️ TwoTierCache[{self.namespace}]: Ошибка записи в Redis: {e}")
+
+    async def invalidate(self, key: str, redis_service=None) -> None:
+        """Удаляет значение из обоих уровней."""
+        self.discard(key)
+        if self._redis_ready(redis_service):
+            try:
+                await redis_service.delete_key(self._redis_key(key))
+            except Exception as e:
+                logger.debug(f"⚠️ TwoTierCache[{self.namespace}]: Ошибка удаления из Redis: {e}")
+
+    def discard(self, key: str) -> None:
+        """Удаляет значение из памяти процесса."""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Очищает память процесса (Redis не затрагивается)."""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Возвращает размер и счетчики кэша."""
+        lookups = self.hits + self.stale_hits + self.redis_hits + self.misses + self.coalesced
+        served = self.hits + self.stale_hits + self.redis_hits
+        return {
+            "size": len(self._entries),
+            "max_items": self.max_items,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "negative_hits": self.negative_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "loads": self.loads,
+            "load_errors": self.load_errors,
+            "evictions": self.evictions,
+            "hit_ratio": round(served / lookups, 4) if lookups else None
+        }
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Возвращает статистику всех кэшей процесса {namespace: stats}."""
+    return {cache.namespace: cache.stats() for cache in list(_registry)}
@@ -0,0 +1,33 @@
+-- Миграция: Таблица локального каталога цен наклеек
+-- Дата: 2026-10-18
+-- Описание: Цены наклеек обновляются фоновым обходом поиска Steam Market,
+-- фильтры читают их локально, живые запросы - только для отсутствующих в каталоге
+-- ВАЖНО: Таблица также создается автоматически при init_db (create_all), миграция нужна для существующих БД
+
+DO \$\$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'sticker_catalog') THEN
+    CREATE TABLE sticker_catalog (
+      id SERIAL PRIMARY KEY,
+      name VARCHAR(255) NOT NULL UNIQUE,
+      normalized_name VARCHAR(255) NOT NULL,
+      price DOUBLE PRECISION NULL,
+      volume INTEGER NOT NULL DEFAULT 0,
+      appid INTEGER NOT NULL DEFAULT 730,
+      currency INTEGER NOT NULL DEFAULT 1,
+      updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+    );
+  END IF;
+END \$\$;
+
+COMMENT ON TABLE sticker_catalog IS 'Локальный каталог цен наклеек';
+COMMENT ON COLUMN sticker_catalog.normalized_name IS 'Название без префикса Sticker | в нижнем регистре';
+COMMENT ON COLUMN sticker_catalog.volume IS 'Количество лотов на продаже';
+
+-- Поиск по нормализованному названию (названия наклеек в лотах приходят без префикса)
+CREATE INDEX IF NOT EXISTS ix_sticker_catalog_normalized_name
+ON sticker_catalog(normalized_name);
+
+-- Поиск устаревших записей
+CREATE INDEX IF NOT EXISTS idx_sticker_catalog_updated_at
+ON sticker_catalog(updated_at);
@@ -0,0 +1,29 @@
+-- Миграция: Таблица свойств ассетов (float, паттерн)
+-- Дата: 2026-10-18
+-- Описание: Результаты inspect API сохраняются по ID ассета (параметр A inspect ссылки),
+-- повторно выставленные лоты и лоты из нескольких задач не запрашивают float/паттерн второй раз
+-- ВАЖНО: Таблица также создается автоматически при init_db (create_all), миграция нужна для существующих БД
+
+DO \$\$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'asset_properties') THEN
+    CREATE TABLE asset_properties (
+      asset_id VARCHAR(32) PRIMARY KEY,
+      d_param VARCHAR(32) NULL,
+      appid INTEGER NOT NULL DEFAULT 730,
+      float_value DOUBLE PRECISION NULL,
+      pattern INTEGER NULL,
+      data JSONB NOT NULL,
+      created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+      updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+    );
+  END IF;
+END \$\$;
+
+COMMENT ON TABLE asset_properties IS 'Неизменяемые свойства ассетов, полученные через inspect API';
+COMMENT ON COLUMN asset_properties.d_param IS 'Параметр D inspect ссылки (поиск, если ID ассета неизвестен)';
+COMMENT ON COLUMN asset_properties.data IS 'Полный ответ inspect API';
+
+-- Поиск по параметру D inspect ссылки
+CREATE INDEX IF NOT EXISTS ix_asset_properties_d_param
+ON asset_properties(d_param);
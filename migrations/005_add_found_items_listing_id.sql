@@ -0,0 +1,53 @@
+-- Миграция: Колонка listing_id в found_items и уникальный индекс (task_id, listing_id)
+-- Дата: 2026-10-18
+-- Описание: Проверка дубликатов найденных предметов по индексу вместо чтения всей истории задачи.
+-- Сохранение - одна вставка INSERT ... ON CONFLICT (task_id, listing_id) DO NOTHING RETURNING id
+-- ВАЖНО: Эта миграция применяется только если таблица found_items уже существует
+
+DO \$\$
+BEGIN
+  IF EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'found_items') THEN
+    -- Добавляем колонку (если ее еще нет)
+    IF NOT EXISTS (
+      SELECT 1 FROM information_schema.columns
+      WHERE table_name = 'found_items'
+      AND column_name = 'listing_id'
+    ) THEN
+      ALTER TABLE found_items ADD COLUMN listing_id VARCHAR(32) NULL;
+    END IF;
+
+    -- Заполняем listing_id из item_data_json
+    IF EXISTS (
+      SELECT 1 FROM information_schema.columns
+      WHERE table_name = 'found_items'
+      AND column_name = 'item_data_json'
+      AND data_type = 'jsonb'
+    ) THEN
+      -- JSONB (таблица создана моделью или уже прошла миграцию 006)
+      UPDATE found_items
+      SET listing_id = item_data_json->>'listing_id'
+      WHERE listing_id IS NULL
+        AND item_data_json ? 'listing_id';
+    ELSE
+      -- Текст: регулярным выражением, старые записи могут быть невалидным JSON
+      UPDATE found_items
+      SET listing_id = substring(item_data_json::text from '"listing_id":\s*"?(\d+)"?')
+      WHERE listing_id IS NULL
+        AND item_data_json::text LIKE '%"listing_id"%';
+    END IF;
+
+    -- Удаляем накопившиеся дубликаты, оставляя самую раннюю запись лота
+    -- (иначе уникальный индекс не построится на живых данных)
+    DELETE FROM found_items a
+    USING found_items b
+    WHERE a.task_id = b.task_id
+      AND a.listing_id = b.listing_id
+      AND a.id > b.id;
+
+    EXECUTE 'COMMENT ON COLUMN found_items.listing_id IS ''ID лота на Steam Market''';
+
+    -- Уникальность лота в рамках задачи (NULL - предметы без listing_id - не конфликтуют)
+    CREATE UNIQUE INDEX IF NOT EXISTS uq_found_items_task_listing
+    ON found_items(task_id, listing_id);
+  END IF;
+END \$\$;
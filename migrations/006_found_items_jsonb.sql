@@ -0,0 +1,111 @@
+-- Миграция: item_data_json и inspect_links в found_items из TEXT в JSONB,
+-- генерируемые колонки float_value, pattern, total_stickers_price и индексы
+-- Дата: 2026-10-18
+-- Описание: Данные найденных предметов больше не разбираются в Python при выборках:
+-- "лучшие float задачи за неделю" и списки бота выполняются индексированным SQL.
+-- Подход тот же, что в 001_change_filters_to_jsonb.sql (новое поле -> копирование -> замена)
+-- ВАЖНО: Эта миграция применяется только если таблица found_items уже существует
+
+DO \$\$
+DECLARE
+  rec RECORD;
+BEGIN
+  IF EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'found_items') THEN
+    -- item_data_json: TEXT -> JSONB (если поле уже JSONB, пропускаем)
+    IF EXISTS (
+      SELECT 1 FROM information_schema.columns
+      WHERE table_name = 'found_items'
+      AND column_name = 'item_data_json'
+      AND data_type != 'jsonb'
+    ) THEN
+      ALTER TABLE found_items ADD COLUMN item_data_jsonb JSONB;
+
+      -- Копируем данные одним запросом; если среди старых записей есть невалидный JSON -
+      -- построчно, невалидные записи сохраняются как {"raw": "<исходный текст>"}
+      BEGIN
+        UPDATE found_items SET item_data_jsonb = item_data_json::JSONB;
+      EXCEPTION WHEN others THEN
+        FOR rec IN SELECT id, item_data_json FROM found_items LOOP
+          BEGIN
+            UPDATE found_items SET item_data_jsonb = rec.item_data_json::JSONB WHERE id = rec.id;
+          EXCEPTION WHEN others THEN
+            UPDATE found_items SET item_data_jsonb = jsonb_build_object('raw', rec.item_data_json) WHERE id = rec.id;
+          END;
+        END LOOP;
+      END;
+
+      ALTER TABLE found_items DROP COLUMN item_data_json;
+      ALTER TABLE found_items RENAME COLUMN item_data_jsonb TO item_data_json;
+      UPDATE found_items SET item_data_json = '{}'::JSONB WHERE item_data_json IS NULL;
+      ALTER TABLE found_items ALTER COLUMN item_data_json SET NOT NULL;
+      COMMENT ON COLUMN found_items.item_data_json IS 'JSONB с данными предмета (float, pattern, stickers и т.д.)';
+    END IF;
+
+    -- inspect_links: TEXT -> JSONB (пустые и невалидные значения -> NULL)
+    IF EXISTS (
+      SELECT 1 FROM information_schema.columns
+      WHERE table_name = 'found_items'
+      AND column_name = 'inspect_links'
+      AND data_type != 'jsonb'
+    ) THEN
+      ALTER TABLE found_items ADD COLUMN inspect_links_jsonb JSONB;
+      FOR rec IN SELECT id, inspect_links FROM found_items WHERE inspect_links IS NOT NULL AND inspect_links != '' LOOP
+        BEGIN
+          UPDATE found_items SET inspect_links_jsonb = rec.inspect_links::JSONB WHERE id = rec.id;
+        EXCEPTION WHEN others THEN
+          NULL;
+        END;
+      END LOOP;
+      ALTER TABLE found_items DROP COLUMN inspect_links;
+      ALTER TABLE found_items RENAME COLUMN inspect_links_jsonb TO inspect_links;
+      COMMENT ON COLUMN found_items.inspect_links IS 'Inspect ссылки (JSONB массив)';
+    END IF;
+
+    -- Генерируемые колонки: значение из item_data_json, если это число, иначе NULL
+    -- (ошибка приведения в выражении генерируемой колонки сломала бы вставку)
+    IF NOT EXISTS (
+      SELECT 1 FROM information_schema.columns
+      WHERE table_name = 'found_items'
+      AND column_name = 'float_value'
+    ) THEN
+      ALTER TABLE found_items ADD COLUMN float_value DOUBLE PRECISION GENERATED ALWAYS AS (
+        CASE WHEN jsonb_typeof(item_data_json->'float_value') = 'number'
+        THEN (item_data_json->>'float_value')::double precision END
+      ) STORED;
+      COMMENT ON COLUMN found_items.float_value IS 'Float из item_data_json';
+    END IF;
+
+    IF NOT EXISTS (
+      SELECT 1 FROM information_schema.columns
+      WHERE table_name = 'found_items'
+      AND column_name = 'pattern'
+    ) THEN
+      ALTER TABLE found_items ADD COLUMN pattern INTEGER GENERATED ALWAYS AS (
+        CASE WHEN jsonb_typeof(item_data_json->'pattern') = 'number'
+        THEN (item_data_json->>'pattern')::numeric::integer END
+      ) STORED;
+      COMMENT ON COLUMN found_items.pattern IS 'Паттерн из item_data_json';
+    END IF;
+
+    IF NOT EXISTS (
+      SELECT 1 FROM information_schema.columns
+      WHERE table_name = 'found_items'
+      AND column_name = 'total_stickers_price'
+    ) THEN
+      ALTER TABLE found_items ADD COLUMN total_stickers_price DOUBLE PRECISION GENERATED ALWAYS AS (
+        CASE WHEN jsonb_typeof(item_data_json->'total_stickers_price') = 'number'
+        THEN (item_data_json->>'total_stickers_price')::double precision END
+      ) STORED;
+      COMMENT ON COLUMN found_items.total_stickers_price IS 'Цена наклеек из item_data_json';
+    END IF;
+
+    -- Индексы для выборок по задаче (listing_id уже проиндексирован uq_found_items_task_listing)
+    CREATE INDEX IF NOT EXISTS ix_found_items_task_found_at ON found_items (task_id, found_at);
+    CREATE INDEX IF NOT EXISTS ix_found_items_task_float ON found_items (task_id, float_value);
+    CREATE INDEX IF NOT EXISTS ix_found_items_task_pattern ON found_items (task_id, pattern);
+    CREATE INDEX IF NOT EXISTS ix_found_items_task_stickers_price ON found_items (task_id, total_stickers_price);
+
+    -- Индекс для запросов вида item_data_json @> '{"item_type": "keychain"}'
+    CREATE INDEX IF NOT EXISTS ix_found_items_item_data_gin ON found_items USING GIN (item_data_json jsonb_path_ops);
+  END IF;
+END \$\$;
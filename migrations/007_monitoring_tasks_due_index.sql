@@ -0,0 +1,15 @@
+-- Миграция: Частичный индекс по next_check активных задач для планировщика проверок
+-- Дата: 2026-10-18
+-- Описание: TaskScheduler забирает наступившие задачи одним запросом
+-- UPDATE ... WHERE id IN (SELECT ... WHERE is_active AND next_check <= now FOR UPDATE SKIP LOCKED) RETURNING.
+-- Индекс позволяет находить наступившие задачи без полного просмотра таблицы при тысячах задач
+-- ВАЖНО: Эта миграция применяется только если таблица monitoring_tasks уже существует
+
+DO \$\$
+BEGIN
+  IF EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'monitoring_tasks') THEN
+    CREATE INDEX IF NOT EXISTS ix_monitoring_tasks_due
+    ON monitoring_tasks (next_check NULLS FIRST)
+    WHERE is_active;
+  END IF;
+END \$\$;
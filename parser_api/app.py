@@ -19,6 +19,7 @@ from services.redis_service import RedisService
 from services.proxy_manager import ProxyManager
 from core import DatabaseManager
 from core.config import Config
+from core.utils import memory_snapshot, two_tier_cache
 
 # Импорт версии
 try:
@@ -50,6 +51,9 @@ async def startup():
     logger.info(f"📅 Обновлено: {VERSION_INFO.get('last_updated', 'unknown')}")
     logger.info("=" * 80)
     
+    if Config.TRACEMALLOC_ENABLED and memory_snapshot.start_tracing():
+        logger.info(f"🧠 Parser API: tracemalloc включен (глубина стека {Config.TRACEMALLOC_FRAMES})")
+    
     # Инициализация БД (для ProxyManager)
     try:
         db_manager = DatabaseManager(Config.DATABASE_URL)
@@ -109,6 +113,21 @@ async def startup():
         logger.warning(f"⚠️ Parser API: Не удалось инициализировать CurrencyService: {e}")
         currency_service = None
     
+    # Базовые цены читаются из общего хранилища (обновляет воркер), без БД - только синхронизация с Redis
+    if Config.BASE_PRICE_SERVICE_ENABLED:
+        from services.base_price_manager import BasePriceManager
+        from services.base_price_service import BasePriceService
+        BasePriceManager.store = BasePriceService(proxy_manager=proxy_manager, redis_service=redis_service)
+        asyncio.create_task(BasePriceManager.store.run())
+    
+    if Config.ASSET_PROPERTY_STORE_ENABLED:
+        from parsers.inspect_parser import InspectLinkParser
+        from services.asset_property_store import AssetPropertyStore
+        InspectLinkParser.property_store = AssetPropertyStore(
+            db_manager if db_session else None,
+            redis_service=redis_service
+        )
+    
     # Запускаем несколько воркеров для параллельной обработки запросов
     num_workers = 10  # Количество параллельных воркеров
     for i in range(num_workers):
@@ -303,6 +322,58 @@ async def get_currency_rates():
         )
 
 
+@app.get("/debug/memory")
+async def debug_memory(
+    limit: int = 20,
+    key_type: str = "lineno",
+    compare: bool = False,
+    start: bool = False,
+    source: Optional[str] = None
+):
+    """
+    Снимок памяти через tracemalloc.
+    
+    Args:
+        limit: Количество строк в топе аллокаций
+        key_type: Группировка: lineno, filename или traceback
+        compare: Разница с предыдущим снимком (для поиска роста памяти)
+        start: Включить tracemalloc, если он выключен
+        source: Имя другого сервиса (например, parsing-worker) - вернуть его последний снимок из Redis
+        
+    Returns:
+        Текущая/пиковая память, RSS и топ мест аллокаций
+    """
+    if key_type not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="key_type должен быть lineno, filename или traceback")
+    
+    if source:
+        if not redis_service or not redis_service.is_connected():
+            raise HTTPException(status_code=503, detail="Redis не подключен")
+        data = await redis_service.get_json(f"{memory_snapshot.REDIS_SNAPSHOT_KEY_PREFIX}{source}")
+        if data is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Нет снимка памяти для '{source}' (включите TRACEMALLOC_ENABLED в этом сервисе)"
+            )
+        return data
+    
+    if start:
+        memory_snapshot.start_tracing()
+    # Снимок tracemalloc блокирует процесс, поэтому делаем его в потоке
+    return await asyncio.to_thread(memory_snapshot.take_snapshot, max(1, limit), key_type, compare)
+
+
+@app.get("/debug/cache")
+async def debug_cache():
+    """
+    Статистика кэшей справочных данных процесса (память процесса + Redis).
+    
+    Returns:
+        {namespace: размер и счетчики попаданий/промахов}
+    """
+    return two_tier_cache.cache_stats()
+
+
 @app.get("/")
 async def root():
     """Корневой endpoint."""
@@ -313,6 +384,8 @@ async def root():
             "health": "/health",
             "version": "/version",
             "currency_rates": "/currency-rates",
+            "debug_memory": "/debug/memory",
+            "debug_cache": "/debug/cache",
             "api": "Используйте Redis очереди для запросов",
             "methods": [
                 "validate_hash_name",
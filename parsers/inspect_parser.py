@@ -11,6 +11,9 @@ from loguru import logger
 class InspectLinkParser:
     """Парсер inspect ссылок для получения float и паттерна."""
 
+    # Хранилище свойств ассетов (AssetPropertyStore), задается воркером и parser-api
+    property_store = None
+
     @staticmethod
     def parse_inspect_link(inspect_link: str) -> Optional[Dict[str, str]]:
         """
@@ -272,6 +275,10 @@ class InspectLinkParser:
         """
         Пытается получить float и паттерн из нескольких источников.
 
+        Сначала проверяется хранилище свойств ассетов (float и паттерн ассета
+        не меняются при повторном выставлении), внешние API запрашиваются
+        только при промахе, и их результат сохраняется в хранилище.
+
         Args:
             inspect_link: Inspect in Game ссылка
             assetid: Опциональный asset ID
@@ -280,6 +287,28 @@ class InspectLinkParser:
         Returns:
             Словарь с данными или None
         """
+        store = InspectLinkParser.property_store
+        if store is not None:
+            stored = await store.get(inspect_link, assetid)
+            if stored:
+                logger.info(
+                    f"    💾 InspectLinkParser: Свойства ассета из хранилища: "
+                    f"float={stored.get('float_value')}, pattern={stored.get('pattern')}"
+                )
+                return stored
+
+        result = await InspectLinkParser._fetch_from_sources(inspect_link, proxy=proxy, proxy_manager=proxy_manager)
+        if result and store is not None:
+            await store.put(inspect_link, result, assetid)
+        return result
+
+    @staticmethod
+    async def _fetch_from_sources(
+        inspect_link: str,
+        proxy: Optional[str] = None,
+        proxy_manager=None
+    ) -> Optional[Dict[str, Any]]:
+        """Запрашивает float и паттерн у внешних inspect API по очереди."""
         logger.info(f"    🔍 InspectLinkParser: Пытаемся получить float/pattern из inspect ссылки")
         logger.debug(f"    📎 Inspect ссылка: {inspect_link[:100]}...")
         
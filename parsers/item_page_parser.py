@@ -30,6 +30,20 @@ class ItemPageParser:
         self.soup = BeautifulSoup(html, 'lxml')
         self._cached_data: Optional[Dict[str, Any]] = None
 
+    def release(self) -> None:
+        """
+        Освобождает DOM-дерево и исходный HTML страницы.
+
+        После вызова парсер использовать нельзя. Нужен при потоковой обработке
+        страниц, чтобы дерево не жило до сборки мусора вместе с циклическими
+        ссылками BeautifulSoup.
+        """
+        if self.soup is not None:
+            self.soup.decompose()
+            self.soup = None
+        self.html = None
+        self._cached_data = None
+
     async def parse_all(
         self,
         fetch_sticker_prices: bool = False,
@@ -292,7 +306,9 @@ class ItemPageParser:
             - price: float - цена лота
             - inspect_link: str - inspect ссылка лота
             - listing_id: Optional[str] - ID лота (если удалось извлечь)
-            - row_element: BeautifulSoup - элемент строки лота (для дополнительного парсинга)
+
+            Словари не содержат ссылок на элементы BeautifulSoup, поэтому после
+            вызова release() дерево страницы может быть освобождено.
         """
         import re
         from loguru import logger
@@ -318,8 +334,7 @@ class ItemPageParser:
                 listings.append({
                     'price': price,
                     'inspect_link': inspect_links[0],
-                    'listing_id': listing_id,
-                    'row_element': None
+                    'listing_id': listing_id
                 })
                 logger.info(f"    📋 ItemPageParser: Найден 1 лот на странице предмета (цена: ${price:.2f})")
             return listings
@@ -403,8 +418,7 @@ class ItemPageParser:
                 listings.append({
                     'price': price,
                     'inspect_link': inspect_link,  # Может быть None
-                    'listing_id': listing_id,
-                    'row_element': row
+                    'listing_id': listing_id
                 })
                 logger.debug(f"    📋 Лот [{idx + 1}]: цена ${price:.2f}, listing_id={listing_id}, inspect={bool(inspect_link)}")
             else:
@@ -6,10 +6,37 @@ from typing import Optional, Dict, List
 import asyncio
 import json
 import re
+import time
 from urllib.parse import quote
 from loguru import logger
 from bs4 import BeautifulSoup
 
+from core.config import Config
+from core.utils.two_tier_cache import TwoTierCache
+
+
+class _RateLimiter:
+    """Общий для процесса лимит запросов в секунду (равномерные интервалы между стартами запросов)."""
+
+    __slots__ = ("rate", "_next_at")
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._next_at = 0.0
+
+    async def acquire(self) -> None:
+        """Ждет своей очереди на запрос."""
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        start_at = max(now, self._next_at)
+        self._next_at = start_at + 1.0 / self.rate
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+
+
+_rate_limiter = _RateLimiter(Config.STICKER_PRICE_RATE_LIMIT)
+
 
 class StickerPricesAPI:
     """API для получения цен наклеек."""
@@ -18,6 +45,16 @@ class StickerPricesAPI:
     STEAM_MARKET_LISTING_URL = "https://steamcommunity.com/market/listings/{appid}/{hash_name}"
     STEAM_MARKET_PRICE_OVERVIEW_URL = "https://steamcommunity.com/market/priceoverview/"
     CACHE_TTL = 3600  # 1 час
+    # Кэш цен: память процесса + Redis (ключи sticker_price:<название>:<appid>:<валюта>),
+    # еще час после CACHE_TTL отдается прошлая цена, обновляемая в фоне
+    price_cache = TwoTierCache(
+        "sticker_price",
+        ttl=CACHE_TTL,
+        max_items=Config.REFERENCE_CACHE_MAX_ITEMS,
+        stale_ttl=CACHE_TTL
+    )
+    # Локальный каталог цен (StickerCatalogService), подключается воркером при запуске
+    catalog = None
 
     @staticmethod
     async def get_sticker_price(
@@ -43,34 +80,47 @@ class StickerPricesAPI:
         Returns:
             Цена наклейки в USD или None
         """
-        # Проверяем кэш Redis
-        if redis_service and redis_service.is_connected():
-            try:
-                cache_key = f"sticker_price:{sticker_name}:{appid}:{currency}"
-                cached_price = await redis_service.get_json(cache_key)
-                if cached_price is not None and 'price' in cached_price:
-                    logger.info(f"📦 StickerPricesAPI: Использован кэш для наклейки '{sticker_name}': ${cached_price['price']:.2f} (TTL: {StickerPricesAPI.CACHE_TTL}с)")
-                    return cached_price['price']
-            except Exception as e:
-                logger.debug(f"⚠️ StickerPricesAPI: Ошибка при чтении кэша: {e}")
+        # Сначала локальный каталог цен
+        if StickerPricesAPI.catalog is not None:
+            catalog_price = StickerPricesAPI.catalog.lookup([sticker_name], appid, currency).get(sticker_name)
+            if catalog_price is not None:
+                return catalog_price
         
+        # Память процесса, затем Redis; одновременные запросы одной наклейки объединяются
+        return await StickerPricesAPI.price_cache.get_or_load(
+            StickerPricesAPI._cache_key(sticker_name, appid, currency),
+            lambda: StickerPricesAPI._fetch_sticker_price(sticker_name, appid, currency, proxy, timeout, proxy_manager),
+            redis_service=redis_service,
+            cacheable=lambda price: price is not None
+        )
+    
+    @staticmethod
+    async def _fetch_sticker_price(
+        sticker_name: str,
+        appid: int,
+        currency: int,
+        proxy: Optional[str],
+        timeout: int,
+        proxy_manager=None
+    ) -> Optional[float]:
+        """Запрашивает цену наклейки у Steam (без кэша)."""
         # Сначала пробуем получить цену через priceoverview API (самый точный метод для lowest_price)
         price = await StickerPricesAPI._get_price_from_priceoverview(
-            sticker_name, appid, currency, proxy, timeout, redis_service, proxy_manager
+            sticker_name, appid, currency, proxy, timeout, None, proxy_manager
         )
         if price is not None:
             return price
         
         # Затем пробуем получить цену напрямую со страницы товара
         price = await StickerPricesAPI._get_price_from_item_page(
-            sticker_name, appid, currency, proxy, timeout, redis_service, proxy_manager
+            sticker_name, appid, currency, proxy, timeout, None, proxy_manager
         )
         if price is not None:
             return price
         
         # Затем пробуем searchsuggestionsresults API (более точный)
         price = await StickerPricesAPI._get_price_from_suggestions(
-            sticker_name, appid, currency, proxy, timeout, redis_service, proxy_manager
+            sticker_name, appid, currency, proxy, timeout, None, proxy_manager
         )
         if price is not None:
             return price
@@ -168,19 +218,6 @@ class StickerPricesAPI:
                                 if current_proxy_obj and proxy_manager:
                                     await proxy_manager.mark_proxy_used(current_proxy_obj, success=True)
                                 
-                                # Сохраняем в кэш
-                                if redis_service and redis_service.is_connected():
-                                    try:
-                                        cache_key = f"sticker_price:{sticker_name}:{appid}:{currency}"
-                                        await redis_service.set_json(
-                                            cache_key,
-                                            {'price': price, 'sticker_name': sticker_name},
-                                            ex=StickerPricesAPI.CACHE_TTL
-                                        )
-                                        logger.info(f"💾 StickerPricesAPI: Сохранена цена в кэш (priceoverview) для '{sticker_name}': ${price:.2f}")
-                                    except Exception as e:
-                                        logger.debug(f"⚠️ StickerPricesAPI: Ошибка при сохранении в кэш: {e}")
-                                
                                 logger.info(f"✅ StickerPricesAPI: Найдена цена через priceoverview API для '{sticker_name}': ${price:.2f}")
                                 return price
                     except (json.JSONDecodeError, KeyError, ValueError) as e:
@@ -224,7 +261,7 @@ class StickerPricesAPI:
             currency: Валюта (1 = USD)
             proxy: Опциональный прокси
             timeout: Таймаут запроса
-            redis_service: Сервис Redis для кэширования (опционально)
+            redis_service: Не используется (кэширует get_sticker_price)
             proxy_manager: Менеджер прокси (опционально)
         
         Returns:
@@ -397,19 +434,6 @@ class StickerPricesAPI:
                             if current_proxy_obj and proxy_manager:
                                 await proxy_manager.mark_proxy_used(current_proxy_obj, success=True)
                             
-                            # Сохраняем в кэш
-                            if redis_service and redis_service.is_connected():
-                                try:
-                                    cache_key = f"sticker_price:{sticker_name}:{appid}:{currency}"
-                                    await redis_service.set_json(
-                                        cache_key,
-                                        {'price': price, 'sticker_name': sticker_name},
-                                        ex=StickerPricesAPI.CACHE_TTL
-                                    )
-                                    logger.info(f"💾 StickerPricesAPI: Сохранена цена в кэш (item_page HTML) для '{sticker_name}': ${price:.2f}")
-                                except Exception as e:
-                                    logger.debug(f"⚠️ StickerPricesAPI: Ошибка при сохранении в кэш: {e}")
-                            
                             logger.info(f"✅ StickerPricesAPI: Найдена цена через HTML страницы товара для '{sticker_name}': ${price:.2f}")
                             return price
                         except ValueError as e:
@@ -508,19 +532,6 @@ class StickerPricesAPI:
                                 if current_proxy_obj and proxy_manager:
                                     await proxy_manager.mark_proxy_used(current_proxy_obj, success=True)
                                 
-                                # Сохраняем в кэш
-                                if redis_service and redis_service.is_connected():
-                                    try:
-                                        cache_key = f"sticker_price:{sticker_name}:{appid}:{currency}"
-                                        await redis_service.set_json(
-                                            cache_key,
-                                            {'price': price, 'sticker_name': sticker_name},
-                                            ex=StickerPricesAPI.CACHE_TTL
-                                        )
-                                        logger.info(f"💾 StickerPricesAPI: Сохранена цена в кэш (item_page) для '{sticker_name}': ${price:.2f}")
-                                    except Exception as e:
-                                        logger.debug(f"⚠️ StickerPricesAPI: Ошибка при сохранении в кэш: {e}")
-                                
                                 logger.info(f"✅ StickerPricesAPI: Найдена цена через страницу товара для '{sticker_name}': ${price:.2f}")
                                 return price
                             except ValueError as e:
@@ -616,19 +627,6 @@ class StickerPricesAPI:
                                 if current_proxy_obj and proxy_manager:
                                     await proxy_manager.mark_proxy_used(current_proxy_obj, success=True)
                                 
-                                # Сохраняем в кэш
-                                if redis_service and redis_service.is_connected():
-                                    try:
-                                        cache_key = f"sticker_price:{sticker_name}:{appid}:{currency}"
-                                        await redis_service.set_json(
-                                            cache_key,
-                                            {'price': price, 'sticker_name': sticker_name},
-                                            ex=StickerPricesAPI.CACHE_TTL
-                                        )
-                                        logger.info(f"💾 StickerPricesAPI: Сохранена цена в кэш (searchsuggestionsresults) для '{sticker_name}': ${price:.2f}")
-                                    except Exception as e:
-                                        logger.debug(f"⚠️ StickerPricesAPI: Ошибка при сохранении в кэш: {e}")
-                                
                                 logger.info(f"✅ StickerPricesAPI: Найдена цена через searchsuggestionsresults для '{sticker_name}': ${price:.2f}")
                                 return price
                     
@@ -644,6 +642,10 @@ class StickerPricesAPI:
         
         return None
 
+    @staticmethod
+    def _cache_key(sticker_name: str, appid: int, currency: int) -> str:
+        return f"{sticker_name}:{appid}:{currency}"
+
     @staticmethod
     async def get_stickers_prices_batch(
         sticker_names: List[str],
@@ -655,15 +657,20 @@ class StickerPricesAPI:
         proxy_manager=None
     ) -> Dict[str, Optional[float]]:
         """
-        Получает цены для нескольких наклеек с задержкой между запросами.
-        Использует кэширование для одинаковых наклеек.
+        Получает цены для нескольких наклеек.
+        
+        Кэш проверяется в памяти процесса и одним MGET в Redis, промахи запрашиваются параллельно
+        (не больше Config.STICKER_PRICE_CONCURRENCY одновременно, каждый запрос
+        берет свой прокси из proxy_manager) с общим для процесса лимитом
+        Config.STICKER_PRICE_RATE_LIMIT запросов в секунду. Найденные цены
+        записываются в кэш одним пайплайном.
 
         Args:
             sticker_names: Список названий наклеек
             appid: ID приложения
             currency: Валюта
             proxy: Опциональный прокси
-            delay: Задержка между запросами в секундах
+            delay: Устарел: интервал между запросами задается общим лимитом STICKER_PRICE_RATE_LIMIT
             redis_service: Сервис Redis для кэширования (опционально)
 
         Returns:
@@ -675,42 +682,62 @@ class StickerPricesAPI:
         
         logger.info(f"📋 StickerPricesAPI: Запрос цен для {len(unique_stickers)} уникальных наклеек (из {len(sticker_names)} всего, дубликаты исключены)")
         
-        # Сначала проверяем кэш для всех наклеек
-        cached_prices = {}
-        if redis_service and redis_service.is_connected():
-            for sticker_name in unique_stickers:
-                try:
-                    cache_key = f"sticker_price:{sticker_name}:{appid}:{currency}"
-                    cached_data = await redis_service.get_json(cache_key)
-                    if cached_data is not None and 'price' in cached_data:
-                        cached_prices[sticker_name] = cached_data['price']
-                except Exception:
-                    pass
+        # Сначала локальный каталог цен
+        if StickerPricesAPI.catalog is not None:
+            results.update(StickerPricesAPI.catalog.lookup(unique_stickers, appid, currency))
+            if results:
+                logger.info(f"📚 StickerPricesAPI: Найдено {len(results)} цен в каталоге из {len(unique_stickers)} наклеек")
         
-        if cached_prices:
-            logger.info(f"📦 StickerPricesAPI: Найдено {len(cached_prices)} цен в кэше из {len(unique_stickers)} наклеек")
+        # Затем кэш для остальных наклеек: память процесса, остальное из Redis одним MGET
+        not_in_catalog = [name for name in unique_stickers if name not in results]
+        if not_in_catalog:
+            keys = {StickerPricesAPI._cache_key(name, appid, currency): name for name in not_in_catalog}
+            
+            def refresher(key: str):
+                async def refresh_price() -> Optional[float]:
+                    await _rate_limiter.acquire()
+                    return await StickerPricesAPI._fetch_sticker_price(keys[key], appid, currency, proxy, 10, proxy_manager)
+                return refresh_price
+            
+            # Устаревшие цены отдаются сразу и обновляются в фоне
+            cached = await StickerPricesAPI.price_cache.get_many(keys, redis_service=redis_service, loader_for=refresher)
+            for key, price in cached.items():
+                results[keys[key]] = price
+            if cached:
+                logger.info(f"📦 StickerPricesAPI: Найдено {len(cached)} цен в кэше из {len(not_in_catalog)} наклеек")
         
-        # Запрашиваем цены для наклеек, которых нет в кэше
+        # Запрашиваем цены для наклеек, которых нет в кэше, параллельно
+        missing_stickers = [name for name in unique_stickers if name not in results]
         failed_stickers = []
-        for sticker_name in unique_stickers:
-            # Если цена уже в кэше, используем её
-            if sticker_name in cached_prices:
-                results[sticker_name] = cached_prices[sticker_name]
-                logger.debug(f"📦 StickerPricesAPI: Использована цена из кэша для '{sticker_name}': ${cached_prices[sticker_name]:.2f}")
-                continue
+        if missing_stickers:
+            semaphore = asyncio.Semaphore(max(1, Config.STICKER_PRICE_CONCURRENCY))
+            
+            async def fetch_price(sticker_name: str) -> Optional[float]:
+                async with semaphore:
+                    await _rate_limiter.acquire()
+                    # Кэш уже проверен, запись в Redis - одним пайплайном ниже
+                    return await StickerPricesAPI.get_sticker_price(
+                        sticker_name, appid, currency, proxy, timeout=10, redis_service=None, proxy_manager=proxy_manager
+                    )
             
-            # Запрашиваем цену через API
-            price = await StickerPricesAPI.get_sticker_price(
-                sticker_name, appid, currency, proxy, timeout=10, redis_service=redis_service, proxy_manager=proxy_manager
-            )
-            results[sticker_name] = price
+            started = time.monotonic()
+            prices = await asyncio.gather(*(fetch_price(name) for name in missing_stickers), return_exceptions=True)
+            logger.info(f"🌐 StickerPricesAPI: Запрошено {len(missing_stickers)} цен за {time.monotonic() - started:.2f}с")
             
-            if price is None:
-                failed_stickers.append(sticker_name)
+            to_cache = {}
+            for sticker_name, price in zip(missing_stickers, prices):
+                if isinstance(price, Exception):
+                    logger.debug(f"⚠️ StickerPricesAPI: Ошибка при запросе цены '{sticker_name}': {type(price).__name__}: {price}")
+                    price = None
+                results[sticker_name] = price
+                if price is None:
+                    failed_stickers.append(sticker_name)
+                else:
+                    to_cache[StickerPricesAPI._cache_key(sticker_name, appid, currency)] = price
             
-            # Задержка между запросами, чтобы не получить бан
-            if delay > 0:
-                await asyncio.sleep(delay)
+            if to_cache:
+                await StickerPricesAPI.price_cache.set_many(to_cache, redis_service=redis_service)
+                logger.info(f"💾 StickerPricesAPI: Сохранено {len(to_cache)} цен в кэш")
         
         # Если есть неудачные запросы, выводим информацию
         if failed_stickers:
@@ -4,7 +4,6 @@
 Поддерживает параллельную обработку нескольких задач одновременно.
 """
 import asyncio
-import os
 import signal
 import sys
 from datetime import datetime
@@ -17,6 +16,10 @@ from core.logger import setup_logging, get_task_logger, set_task_id
 from services import MonitoringService, ProxyManager, ParsingService, ResultsProcessorService
 from services.redis_service import RedisService
 from services.rabbitmq_service import RabbitMQService
+from services.task_cancellation import task_cancellation
+from services.task_match_index import task_match_index
+from services.concurrency_controller import concurrency_controller
+from core.utils import memory_snapshot
 
 # Импорт версии
 try:
@@ -47,13 +50,19 @@ class ParsingWorker:
         self._shutdown_event = asyncio.Event()
         
         # Параллельная обработка задач
-        # Максимальное количество одновременных задач (можно настроить через переменную окружения)
-        # По умолчанию 10 для эффективной параллельной обработки I/O операций
-        max_concurrent = int(os.getenv("MAX_CONCURRENT_TASKS", "10"))
-        self._task_semaphore = asyncio.Semaphore(max_concurrent)
-        logger.info(f"🔧 ParsingWorker: Инициализирован с MAX_CONCURRENT_TASKS={max_concurrent}")
+        # Лимит одновременных задач начинается с MAX_CONCURRENT_TASKS; при AUTOSCALE_ENABLED
+        # его (и prefetch канала) меняет ConcurrencyController по загрузке прокси, loop и БД
+        self._task_limit = concurrency_controller.tasks
+        logger.info(f"🔧 ParsingWorker: Инициализирован с MAX_CONCURRENT_TASKS={self._task_limit.limit}")
         self._active_tasks: set[asyncio.Task] = set()  # Отслеживание активных задач
         self._tasks_lock = asyncio.Lock()  # Блокировка для безопасного доступа к _active_tasks
+        self._memory_snapshot_task: Optional[asyncio.Task] = None
+        self._sticker_catalog_task: Optional[asyncio.Task] = None
+        self._base_price_task: Optional[asyncio.Task] = None
+        self._cancellation_task: Optional[asyncio.Task] = None
+        self._match_index_task: Optional[asyncio.Task] = None
+        self._autoscale_task: Optional[asyncio.Task] = None
+        self._page_jobs_task: Optional[asyncio.Task] = None
         
         # Обработка сигналов
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -153,6 +162,64 @@ class ParsingWorker:
         # Инициализируем сервис парсинга с Redis для кэширования
         self.parsing_service = ParsingService(proxy_manager=self.proxy_manager, redis_service=self.redis_service)
         
+        # Локальный каталог цен наклеек: фильтры читают цены из памяти, Steam - только для промахов
+        if Config.STICKER_CATALOG_ENABLED:
+            from parsers.sticker_prices import StickerPricesAPI
+            from services.sticker_catalog_service import StickerCatalogService
+            sticker_catalog = StickerCatalogService(
+                self.db_manager,
+                proxy_manager=self.proxy_manager,
+                redis_service=self.redis_service
+            )
+            try:
+                await sticker_catalog.load()
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось загрузить каталог цен наклеек: {e}")
+            StickerPricesAPI.catalog = sticker_catalog
+            self._sticker_catalog_task = asyncio.create_task(sticker_catalog.run())
+        
+        # Общее хранилище базовых цен: воркер обновляет D по задачам, фильтры читают из памяти
+        if Config.BASE_PRICE_SERVICE_ENABLED:
+            from services.base_price_manager import BasePriceManager
+            from services.base_price_service import BasePriceService
+            base_price_service = BasePriceService(
+                self.db_manager,
+                proxy_manager=self.proxy_manager,
+                redis_service=self.redis_service
+            )
+            BasePriceManager.store = base_price_service
+            self._base_price_task = asyncio.create_task(base_price_service.run())
+        
+        # Подписчик канала отмены: выключение/удаление задачи останавливает парсинг без опроса БД
+        if Config.TASK_CANCELLATION_ENABLED and self.redis_service:
+            self._cancellation_task = task_cancellation.start_listener(self.redis_service)
+        
+        # Индекс задач по предметам: лоты одной задачи проверяются для всех задач того же предмета
+        if Config.TASK_MATCH_INDEX_ENABLED:
+            self._match_index_task = task_match_index.start_listener(self.redis_service, self.db_manager)
+        
+        # Автомасштабирование: лимит задач, prefetch и воркеры страниц по свободным прокси и нагрузке
+        if Config.AUTOSCALE_ENABLED:
+            concurrency_controller.attach(
+                proxy_manager=self.proxy_manager,
+                redis_service=self.redis_service,
+                db_manager=self.db_manager,
+                rabbitmq_service=self.rabbitmq_service
+            )
+            self._autoscale_task = asyncio.create_task(concurrency_controller.run())
+        
+        # Страницы больших задач других реплик: свободные слоты забирают их из Redis Stream
+        if Config.PAGE_JOBS_ENABLED and Config.LISTING_PIPELINE_ENABLED and self.redis_service:
+            from services.page_jobs import PageJobHelper
+            page_job_helper = PageJobHelper(self.db_manager, self.redis_service, self.proxy_manager, limit=self._task_limit)
+            self._page_jobs_task = asyncio.create_task(page_job_helper.run())
+        
+        # Float/паттерн по ID ассета: повторно выставленные лоты не запрашивают inspect API
+        if Config.ASSET_PROPERTY_STORE_ENABLED:
+            from parsers.inspect_parser import InspectLinkParser
+            from services.asset_property_store import AssetPropertyStore
+            InspectLinkParser.property_store = AssetPropertyStore(self.db_manager, redis_service=self.redis_service)
+        
         # Инициализируем сервис мониторинга (для получения задач из БД)
         self.monitoring_service = MonitoringService(
             self.db_session,
@@ -160,7 +227,8 @@ class ParsingWorker:
             notification_callback=None,  # Уведомления отправляет Telegram бот
             parsing_service=self.parsing_service,
             redis_service=self.redis_service,
-            rabbitmq_service=self.rabbitmq_service
+            rabbitmq_service=self.rabbitmq_service,
+            db_manager=self.db_manager  # Планировщик проверок держит свою сессию
         )
         
         logger.info("✅ Parsing Worker инициализирован")
@@ -171,6 +239,34 @@ class ParsingWorker:
         
         self._running = False
         
+        if self._memory_snapshot_task:
+            self._memory_snapshot_task.cancel()
+            self._memory_snapshot_task = None
+        
+        if self._sticker_catalog_task:
+            self._sticker_catalog_task.cancel()
+            self._sticker_catalog_task = None
+        
+        if self._base_price_task:
+            self._base_price_task.cancel()
+            self._base_price_task = None
+        
+        if self._cancellation_task:
+            self._cancellation_task.cancel()
+            self._cancellation_task = None
+        
+        if self._match_index_task:
+            self._match_index_task.cancel()
+            self._match_index_task = None
+        
+        if self._autoscale_task:
+            self._autoscale_task.cancel()
+            self._autoscale_task = None
+        
+        if self._page_jobs_task:
+            self._page_jobs_task.cancel()
+            self._page_jobs_task = None
+        
         if self.monitoring_service:
             await self.monitoring_service.stop()
         
@@ -210,6 +306,7 @@ class ParsingWorker:
         task_id = None
         task_logger = None
         task_db_session = None  # Инициализируем заранее для finally блока
+        cancel_token = None  # Токен отмены запуска (убирается из реестра в finally)
         
         try:
             # Проверяем, что message является словарем
@@ -419,6 +516,9 @@ class ParsingWorker:
                         pass
                     return
                 
+                # Статус только что прочитан из БД: дальше парсинг проверяет токен отмены в памяти
+                cancel_token = task_cancellation.start(task_id)
+                
                 # Загружаем фильтры
                 logger.info(f"🔍 DEBUG: Загружаем фильтры из задачи {task_id}")
                 task_logger.debug(f"Загружаем фильтры из задачи")
@@ -772,21 +872,25 @@ class ParsingWorker:
                     except Exception as retry_error:
                         logger.error(f"❌ ParsingWorker: Не удалось удалить флаг для задачи {task_id} даже после повторной попытки: {retry_error}")
             
+            if cancel_token is not None:
+                task_cancellation.finish(task_id, cancel_token)
+            
             # Очищаем task_id из контекста
             set_task_id(None)
     
-    async def _process_task_with_semaphore_rabbitmq(self, task_data: dict, message: Any):
+    async def _process_task_rabbitmq(self, task_data: dict, message: Any):
         """
-        Обрабатывает задачу из RabbitMQ с использованием семафора.
+        Обрабатывает задачу из RabbitMQ.
+        
+        Количество одновременных задач ограничивает потребитель (слот лимита
+        занимается до получения сообщения).
         
         Args:
             task_data: Данные задачи
             message: Сообщение RabbitMQ (для подтверждения - не используется здесь, подтверждается в task_handler)
         """
-        async with self._task_semaphore:
-            # Обрабатываем задачу
-            # Сообщение будет подтверждено в task_handler после успешной обработки
-            await self._process_parsing_task(task_data)
+        # Сообщение будет подтверждено в task_handler после успешной обработки
+        await self._process_parsing_task(task_data)
     
     async def _remove_task(self, task: asyncio.Task):
         """
@@ -799,11 +903,32 @@ class ParsingWorker:
             self._active_tasks.discard(task)
             logger.debug(f"📊 ParsingWorker: Активных задач: {len(self._active_tasks)}")
     
+    async def _memory_snapshot_loop(self, interval: float = 60.0):
+        """
+        Периодически сохраняет снимок tracemalloc в Redis.
+        
+        У воркера нет HTTP сервера, поэтому снимок читается через
+        parser_api: GET /debug/memory?source=parsing-worker
+        """
+        key = f"{memory_snapshot.REDIS_SNAPSHOT_KEY_PREFIX}parsing-worker"
+        while self._running:
+            try:
+                snapshot = await asyncio.to_thread(memory_snapshot.take_snapshot, 30, "lineno", True)
+                snapshot["active_tasks"] = len(self._active_tasks)
+                await self.redis_service.set_json(key, snapshot, ex=int(interval * 5))
+            except Exception as e:
+                logger.warning(f"⚠️ ParsingWorker: Не удалось сохранить снимок памяти: {e}")
+            await asyncio.sleep(interval)
+    
     async def run(self):
         """Запускает воркер."""
         try:
             await self.initialize()
             
+            if Config.TRACEMALLOC_ENABLED and self.redis_service:
+                memory_snapshot.start_tracing()
+                logger.info(f"🧠 ParsingWorker: tracemalloc включен, снимки памяти сохраняются в Redis")
+            
             # Запускаем сервис мониторинга только если включен (по умолчанию включен)
             # Это позволяет иметь несколько воркеров, но только один запускает мониторинг
             if Config.ENABLE_MONITORING_SERVICE:
@@ -814,11 +939,16 @@ class ParsingWorker:
                 logger.info("⏭️ ParsingWorker: Мониторинг отключен (ENABLE_MONITORING_SERVICE=false), только обработка задач из очереди")
             
             self._running = True
+            if Config.TRACEMALLOC_ENABLED and self.redis_service:
+                self._memory_snapshot_task = asyncio.create_task(self._memory_snapshot_loop())
             logger.info("🚀 ParsingWorker: Запущен и готов к работе")
             logger.info("   📡 Ожидаем задачи из RabbitMQ очереди 'parsing_tasks'...")
             
             # Параллельная обработка: несколько задач могут выполняться одновременно
-            logger.info(f"🚀 ParsingWorker: Параллельная обработка включена (макс. {self._task_semaphore._value} одновременных задач)")
+            logger.info(
+                f"🚀 ParsingWorker: Параллельная обработка включена (макс. {self._task_limit.limit} одновременных задач"
+                f"{', автомасштабирование' if Config.AUTOSCALE_ENABLED else ''})"
+            )
             
             # Запускаем потребителя RabbitMQ
             import socket
@@ -843,9 +973,9 @@ class ParsingWorker:
                     logger.debug(f"📥 ParsingWorker: Получена задача из RabbitMQ: {task_data.get('type')}, task_id={task_id}")
                     
                     # Запускаем обработку задачи в фоне (параллельно)
-                    # Используем семафор для ограничения количества одновременных задач
+                    # Количество одновременных задач ограничивает потребитель (self._task_limit)
                     task = asyncio.create_task(
-                        self._process_task_with_semaphore_rabbitmq(task_data, message)
+                        self._process_task_rabbitmq(task_data, message)
                     )
                     
                     # Добавляем задачу в отслеживание
@@ -873,7 +1003,8 @@ class ParsingWorker:
             # Запускаем потребителя RabbitMQ
             await self.rabbitmq_service.consume_tasks(
                 callback=task_handler,
-                consumer_name=consumer_name
+                consumer_name=consumer_name,
+                limit=self._task_limit
             )
             
             # Ждем сигнала завершения
@@ -0,0 +1,113 @@
+"""
+Бенчмарк проверки фильтров для лотов страницы:
+построчная проверка (is_pattern_excluded + FilterService.matches_filters)
+против пакетной (batch_filter.select_candidates) с последующей полной проверкой
+только прошедших лотов, а также построчный и векторный (NumPy) отбор кандидатов.
+
+Запуск:
+    python scripts/benchmark_batch_filter.py [количество_лотов]
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from loguru import logger
+
+from core.models import SearchFilters, FloatRange, PatternList
+from core.steam_market_parser.batch_filter import select_candidates
+from core.steam_market_parser.listing_record import ListingRecord
+from services.filter_plan import get_filter_plan
+from services.filter_service import FilterService
+
+HASH_NAME = "AK-47 | Case Hardened (Field-Tested)"
+
+
+def _make_records(count: int) -> list:
+    """Генерирует лоты страницы с равномерными паттернами, float и ценами."""
+    return [
+        ListingRecord(
+            float_value=0.15 + (i % 997) / 4000.0,
+            pattern=i % 1000,
+            item_name=HASH_NAME,
+            item_price=20.0 + i % 100,
+            item_type="skin",
+            listing_id=str(5000000000000000000 + i)
+        )
+        for i in range(count)
+    ]
+
+
+async def _per_listing(records: list, filters: SearchFilters, filter_service: FilterService) -> int:
+    plan = get_filter_plan(filters)
+    matched = 0
+    for record in records:
+        if plan.is_pattern_excluded(record.pattern):
+            continue
+        item_dict = {
+            "sell_price_text": f"${record.item_price:.2f}",
+            "asset_description": {"market_hash_name": HASH_NAME},
+            "name": HASH_NAME
+        }
+        if await filter_service.matches_filters(item_dict, filters, record):
+            matched += 1
+    return matched
+
+
+async def _batch(records: list, filters: SearchFilters, filter_service: FilterService) -> int:
+    matched = 0
+    for index in select_candidates(records, get_filter_plan(filters)):
+        record = records[index]
+        item_dict = {
+            "sell_price_text": f"${record.item_price:.2f}",
+            "asset_description": {"market_hash_name": HASH_NAME},
+            "name": HASH_NAME
+        }
+        if await filter_service.matches_filters(item_dict, filters, record):
+            matched += 1
+    return matched
+
+
+def _measure(label: str, coro_func, records: list) -> float:
+    start = time.perf_counter()
+    matched = asyncio.run(coro_func())
+    elapsed = time.perf_counter() - start
+    per_listing_us = elapsed / len(records) * 1_000_000
+    print(f"  {label:<45} {elapsed * 1000:9.1f} мс   {per_listing_us:7.2f} мкс/лот   подходящих: {matched}")
+    return per_listing_us
+
+
+def main(count: int = 100_000) -> None:
+    # Логи фильтров в горячем цикле искажают замер
+    logger.remove()
+    records = _make_records(count)
+    filters = SearchFilters(
+        item_name=HASH_NAME,
+        max_price=60.0,
+        float_range=FloatRange(min=0.15, max=0.25),
+        pattern_list=PatternList(patterns=[151, 321, 387, 555, 661, 670, 955], item_type="skin")
+    )
+    filter_service = FilterService()
+    print(f"📊 Лотов: {count}")
+
+    print("🔍 Проверка фильтров страницы:")
+    scalar = _measure("Построчно (matches_filters)", lambda: _per_listing(records, filters, filter_service), records)
+    batch = _measure("Пакетно (select_candidates + matches_filters)", lambda: _batch(records, filters, filter_service), records)
+    print(f"  ⚡ Ускорение: x{scalar / batch:.1f}")
+
+    print("🧮 Только отбор кандидатов:")
+    plan = get_filter_plan(filters)
+    start = time.perf_counter()
+    select_candidates(records, plan)
+    scalar = time.perf_counter() - start
+    start = time.perf_counter()
+    select_candidates(records, plan, vectorized=True)
+    vector = time.perf_counter() - start
+    print(f"  {'Построчно (FilterPlan)':<45} {scalar * 1000:9.1f} мс")
+    print(f"  {'NumPy (маски)':<45} {vector * 1000:9.1f} мс")
+    print(f"  ⚡ Ускорение: x{scalar / vector:.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
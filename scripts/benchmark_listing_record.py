@@ -0,0 +1,112 @@
+"""
+Бенчмарк стоимости одного лота в горячем цикле парсинга:
+ParsedItemData/StickerInfo (Pydantic) против ListingRecord/StickerRecord (__slots__).
+
+Измеряется построение записи из лота страницы и цикл сериализации/десериализации
+через Redis-формат (serialize_parsed_item -> json -> deserialize).
+
+Запуск:
+    python scripts/benchmark_listing_record.py [количество_лотов]
+"""
+import json
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.models import ParsedItemData, StickerInfo
+from core.steam_market_parser.listing_record import ListingRecord, StickerRecord
+from core.steam_market_parser.parallel_listing_redis_storage import (
+    serialize_parsed_item,
+    deserialize_parsed_item,
+    deserialize_listing_record
+)
+
+
+def _make_listings(count: int) -> list:
+    """Генерирует лоты в формате link_listings_with_assets."""
+    return [
+        {
+            "listing_id": str(5000000000000000000 + i),
+            "price": 12.5 + i % 100,
+            "pattern": i % 1000,
+            "float_value": (i % 997) / 1000.0,
+            "stickers": [
+                StickerInfo(position=p, wear=None, price=None, name=f"Sticker | Team {p} | Katowice 2014")
+                for p in range(i % 5)
+            ],
+            "inspect_link": f"steam://rungame/730/76561202255233023/+csgo_econ_action_preview%20M{i}A{i}D123"
+        }
+        for i in range(count)
+    ]
+
+
+def _build_pydantic(listing: dict, hash_name: str) -> ParsedItemData:
+    inspect_link = listing.get("inspect_link")
+    return ParsedItemData(
+        float_value=listing.get("float_value"),
+        pattern=listing.get("pattern"),
+        stickers=listing.get("stickers", []),
+        total_stickers_price=0.0,
+        item_name=hash_name,
+        item_price=listing.get("price", 0.0),
+        inspect_links=[inspect_link] if inspect_link else [],
+        item_type="skin",
+        is_stattrak=False,
+        listing_id=listing.get("listing_id")
+    )
+
+
+def _build_record(listing: dict, hash_name: str) -> ListingRecord:
+    inspect_link = listing.get("inspect_link")
+    return ListingRecord(
+        float_value=listing.get("float_value"),
+        pattern=listing.get("pattern"),
+        stickers=[StickerRecord.from_any(s) for s in listing.get("stickers", [])],
+        total_stickers_price=0.0,
+        item_name=hash_name,
+        item_price=listing.get("price", 0.0),
+        inspect_links=[inspect_link] if inspect_link else [],
+        item_type="skin",
+        is_stattrak=False,
+        listing_id=listing.get("listing_id")
+    )
+
+
+def _measure(label: str, func, listings: list) -> float:
+    start = time.perf_counter()
+    func(listings)
+    elapsed = time.perf_counter() - start
+    per_listing_us = elapsed / len(listings) * 1_000_000
+    print(f"  {label:<45} {elapsed * 1000:9.1f} мс   {per_listing_us:7.2f} мкс/лот")
+    return per_listing_us
+
+
+def main(count: int = 100_000) -> None:
+    hash_name = "AK-47 | Redline (Field-Tested)"
+    listings = _make_listings(count)
+    print(f"📊 Лотов: {count}")
+
+    print("🏗️ Построение записи лота:")
+    pyd = _measure("ParsedItemData (Pydantic)", lambda ls: [_build_pydantic(l, hash_name) for l in ls], listings)
+    rec = _measure("ListingRecord (__slots__)", lambda ls: [_build_record(l, hash_name) for l in ls], listings)
+    print(f"  ⚡ Ускорение: x{pyd / rec:.1f}")
+
+    print("🔁 Сериализация в Redis-формат и обратно:")
+    pyd_items = [_build_pydantic(l, hash_name) for l in listings]
+    rec_items = [_build_record(l, hash_name) for l in listings]
+    pyd = _measure(
+        "ParsedItemData -> json -> ParsedItemData",
+        lambda items: [deserialize_parsed_item(json.loads(json.dumps(serialize_parsed_item(i)))) for i in items],
+        pyd_items
+    )
+    rec = _measure(
+        "ListingRecord -> json -> ListingRecord",
+        lambda items: [deserialize_listing_record(json.loads(json.dumps(serialize_parsed_item(i)))) for i in items],
+        rec_items
+    )
+    print(f"  ⚡ Ускорение: x{pyd / rec:.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -4,7 +4,6 @@
 """
 import asyncio
 import sys
-import json
 from pathlib import Path
 from datetime import datetime
 import urllib.parse
@@ -28,7 +27,7 @@ async def generate_verification_report(item_id: int):
             print(f"❌ Предмет с ID {item_id} не найден")
             return
         
-        item_data = json.loads(item.item_data_json)
+        item_data = item.get_item_data()
         
         # Генерируем HTML
         html_content = f"""
@@ -136,8 +136,7 @@ async def test_sticker_prices():
             
             if found_items:
                 found_item = found_items[0]
-                import json
-                data = json.loads(found_item.item_data_json)
+                data = found_item.get_item_data()
                 total_price = data.get('total_stickers_price', 0)
                 stickers_data = data.get('stickers', [])
                 logger.info(f"📊 В БД сохранено:")
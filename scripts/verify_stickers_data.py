@@ -5,7 +5,6 @@
 """
 import asyncio
 import sys
-import json
 from pathlib import Path
 
 # Добавляем корневую директорию в путь
@@ -36,7 +35,7 @@ async def verify_stickers_for_item(item_id: int):
             return
         
         # Парсим данные предмета
-        item_data = json.loads(item.item_data_json)
+        item_data = item.get_item_data()
         
         print(f"📦 Предмет: {item.item_name}")
         print(f"💰 Цена: ${item.price:.2f}")
@@ -143,12 +142,12 @@ async def find_recent_items_with_stickers():
     session = await db_manager.get_session()
     
     try:
-        from sqlalchemy import select, desc, text
+        from sqlalchemy import select, desc
         
         # Ищем предметы с наклейками (где total_stickers_price > 0)
         result = await session.execute(
             select(FoundItem)
-            .where(text("item_data_json::jsonb->>'total_stickers_price' != '0'"))
+            .where(FoundItem.total_stickers_price > 0)
             .order_by(desc(FoundItem.found_at))
             .limit(10)
         )
@@ -163,7 +162,7 @@ async def find_recent_items_with_stickers():
         
         for item in items:
             try:
-                item_data = json.loads(item.item_data_json)
+                item_data = item.get_item_data()
                 stickers_count = len(item_data.get('stickers', []))
                 stickers_price = item_data.get('total_stickers_price', 0.0)
                 
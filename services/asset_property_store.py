@@ -0,0 +1,159 @@
+"""
+Долговременное хранилище неизменяемых свойств предметов (float, паттерн).
+
+Float и паттерн (paint seed) не меняются у ассета, поэтому результат inspect
+API сохраняется по идентичности ассета, а не по listing_id: повторно
+выставленный лот или лот, попавший в несколько задач, не запрашивает
+внешние inspect API второй раз.
+
+Уровни: LRU в памяти процесса -> Redis (TwoTierCache) -> Postgres
+(таблица asset_properties). Поиск в БД - по ID ассета (параметр A inspect
+ссылки), а если его нет - по параметру D.
+"""
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import or_, select
+from sqlalchemy.dialects.postgresql import insert
+
+from core.config import Config
+from core.database import AssetProperties, DatabaseManager
+from core.utils.two_tier_cache import TwoTierCache
+from parsers.inspect_parser import InspectLinkParser
+
+
+class AssetPropertyStore:
+    """Свойства ассетов: память процесса + Redis + Postgres."""
+
+    def __init__(self, db_manager: Optional[DatabaseManager] = None, redis_service=None):
+        """
+        Args:
+            db_manager: Менеджер БД для долговременного хранения (опционально)
+            redis_service: Сервис Redis для общего кэша между процессами (опционально)
+        """
+        self.db_manager = db_manager
+        self.redis_service = redis_service
+        self._cache = TwoTierCache(
+            "asset_props",
+            ttl=Config.ASSET_PROPERTY_CACHE_TTL,
+            max_items=Config.REFERENCE_CACHE_MAX_ITEMS
+        )
+        self.db_hits = 0
+        self.saved = 0
+
+    @staticmethod
+    def identity(inspect_link: str, assetid: Optional[str] = None) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Идентичность ассета из inspect ссылки.
+
+        Args:
+            inspect_link: Inspect in Game ссылка
+            assetid: ID ассета, если известен (приоритетнее ссылки)
+
+        Returns:
+            (asset_id, d_param) или None, если ассет не определить
+        """
+        params = InspectLinkParser.parse_inspect_link(inspect_link) if inspect_link else None
+        asset_id = assetid or (params or {}).get('assetid')
+        if not asset_id:
+            return None
+        return str(asset_id), (params or {}).get('d_param')
+
+    async def _load_from_db(self, asset_id: str, d_param: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Свойства ассета из БД (совпадение по asset_id приоритетнее совпадения по D)."""
+        if self.db_manager is None:
+            return None
+        condition = AssetProperties.asset_id == asset_id
+        if d_param:
+            condition = or_(condition, AssetProperties.d_param == d_param)
+        session = await self.db_manager.get_session()
+        try:
+            result = await session.execute(
+                select(AssetProperties.asset_id, AssetProperties.data).where(condition).limit(2)
+            )
+            rows = result.all()
+        finally:
+            await session.close()
+        if not rows:
+            return None
+        self.db_hits += 1
+        rows.sort(key=lambda row: row[0] != asset_id)
+        return rows[0][1]
+
+    async def get(self, inspect_link: str, assetid: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает сохраненные свойства ассета.
+
+        Args:
+            inspect_link: Inspect in Game ссылка
+            assetid: ID ассета (опционально)
+
+        Returns:
+            Словарь как у InspectLinkParser (float_value, pattern, ...) или None
+        """
+        identity = self.identity(inspect_link, assetid)
+        if identity is None:
+            return None
+        asset_id, d_param = identity
+        try:
+            return await self._cache.get_or_load(
+                asset_id,
+                lambda: self._load_from_db(asset_id, d_param),
+                redis_service=self.redis_service,
+                cacheable=lambda data: data is not None
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ AssetPropertyStore: Ошибка чтения свойств ассета {asset_id}: {e}")
+            return None
+
+    async def put(
+        self,
+        inspect_link: str,
+        data: Dict[str, Any],
+        assetid: Optional[str] = None,
+        appid: int = 730
+    ) -> None:
+        """
+        Сохраняет свойства ассета во все уровни.
+
+        Args:
+            inspect_link: Inspect in Game ссылка
+            data: Результат inspect API (float_value, pattern, ...)
+            assetid: ID ассета (опционально)
+            appid: ID приложения
+        """
+        identity = self.identity(inspect_link, assetid)
+        if identity is None or (data.get('float_value') is None and data.get('pattern') is None):
+            return
+        asset_id, d_param = identity
+        await self._cache.set(asset_id, data, redis_service=self.redis_service)
+        if self.db_manager is None:
+            return
+
+        values = {
+            "asset_id": asset_id,
+            "d_param": d_param,
+            "appid": appid,
+            "float_value": data.get('float_value'),
+            "pattern": data.get('pattern'),
+            "data": data
+        }
+        session = await self.db_manager.get_session()
+        try:
+            stmt = insert(AssetProperties).values(**values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[AssetProperties.asset_id],
+                set_={key: stmt.excluded[key] for key in ("d_param", "float_value", "pattern", "data")}
+            )
+            await session.execute(stmt)
+            await session.commit()
+            self.saved += 1
+        except Exception as e:
+            await session.rollback()
+            logger.warning(f"⚠️ AssetPropertyStore: Не удалось сохранить свойства ассета {asset_id}: {e}")
+        finally:
+            await session.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики хранилища и его кэша."""
+        return {"db_hits": self.db_hits, "saved": self.saved, "cache": self._cache.stats()}
@@ -8,24 +8,39 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from core import ItemBasePrice
+from core.config import Config
+from core.utils.two_tier_cache import TwoTierCache
 from parsers.base_price import BasePriceAPI
 
 
+# Общий для всех менеджеров процесса кэш (ограничен по размеру, второй уровень - Redis)
+_base_price_cache = TwoTierCache(
+    "base_price",
+    ttl=300,
+    max_items=Config.REFERENCE_CACHE_MAX_ITEMS,
+    stale_ttl=300
+)
+
+
 class BasePriceManager:
     """Управляет кэшированием и обновлением базовых цен."""
     
     DEFAULT_CACHE_TTL = 300  # 5 минут по умолчанию
     
-    def __init__(self, cache_ttl: int = DEFAULT_CACHE_TTL):
+    # Общее для процессов хранилище базовых цен (BasePriceService), задается воркером и parser-api
+    store = None
+    
+    def __init__(self, cache_ttl: int = DEFAULT_CACHE_TTL, redis_service=None):
         """
         Инициализация менеджера.
         
         Args:
             cache_ttl: Время жизни кэша в секундах (по умолчанию 5 минут)
+            redis_service: Сервис Redis для общего кэша между процессами (опционально)
         """
-        self._cache: Dict[str, ItemBasePrice] = {}
+        self._cache = _base_price_cache
         self._cache_ttl = cache_ttl
+        self.redis_service = redis_service
     
     def _get_cache_key(self, item_name: str, appid: int) -> str:
         """Генерирует ключ кэша."""
@@ -54,34 +69,50 @@ class BasePriceManager:
         Returns:
             Базовая цена в USD или None
         """
-        cache_key = self._get_cache_key(item_name, appid)
-        ttl = cache_ttl or self._cache_ttl
+        if not force_update:
+            # Цена из общего хранилища (обновляется в фоне) - без запроса к Steam
+            price = self.get_stored_price(item_name, appid)
+            if price is not None:
+                return price
         
-        # Проверяем кэш
-        if not force_update and cache_key in self._cache:
-            cached = self._cache[cache_key]
-            # Проверяем, не устарела ли цена
-            age = (datetime.now() - cached.last_updated).total_seconds()
-            if age < ttl:
-                return cached.base_price
+        store = BasePriceManager.store
+        async def load_price() -> Optional[float]:
+            # Обновляем цену с поддержкой ротации прокси
+            price = await BasePriceAPI.get_base_price(
+                item_name,
+                appid=appid,
+                proxy=proxy,
+                proxy_manager=proxy_manager  # Передаем proxy_manager для ротации при 429
+            )
+            if price is not None and store is not None:
+                # Делимся ценой с остальными процессами
+                await store.store(item_name, appid, price, ttl=cache_ttl or self._cache_ttl)
+            return price
         
-        # Обновляем цену с поддержкой ротации прокси
-        new_price = await BasePriceAPI.get_base_price(
-            item_name,
-            appid=appid,
-            proxy=proxy,
-            proxy_manager=proxy_manager  # Передаем proxy_manager для ротации при 429
+        # Одновременные запросы одной цены объединяются, None не кэшируется
+        return await self._cache.get_or_load(
+            self._get_cache_key(item_name, appid),
+            load_price,
+            redis_service=self.redis_service,
+            ttl=cache_ttl or self._cache_ttl,
+            force=force_update,
+            cacheable=lambda price: price is not None
         )
+    
+    def get_stored_price(self, item_name: str, appid: int = 730) -> Optional[float]:
+        """
+        Получает актуальную базовую цену из общего хранилища (без сетевых запросов).
         
-        if new_price is not None:
-            self._cache[cache_key] = ItemBasePrice(
-                item_name=item_name,
-                base_price=new_price,
-                last_updated=datetime.now(),
-                appid=appid
-            )
-        
-        return new_price
+        Args:
+            item_name: Название предмета
+            appid: ID приложения
+            
+        Returns:
+            Базовая цена или None, если хранилище не задано или цены в нем нет
+        """
+        if BasePriceManager.store is None:
+            return None
+        return BasePriceManager.store.get(item_name, appid)
     
     def get_cached_price(
         self,
@@ -98,10 +129,10 @@ class BasePriceManager:
         Returns:
             Базовая цена из кэша или None
         """
-        cache_key = self._get_cache_key(item_name, appid)
-        if cache_key in self._cache:
-            return self._cache[cache_key].base_price
-        return None
+        price = self.get_stored_price(item_name, appid)
+        if price is not None:
+            return price
+        return self._cache.peek(self._get_cache_key(item_name, appid))
     
     def clear_cache(self, item_name: Optional[str] = None, appid: Optional[int] = None):
         """
@@ -112,25 +143,26 @@ class BasePriceManager:
             appid: Если указано, очищает только для этого appid
         """
         if item_name and appid:
-            cache_key = self._get_cache_key(item_name, appid)
-            self._cache.pop(cache_key, None)
+            self._cache.discard(self._get_cache_key(item_name, appid))
         else:
             self._cache.clear()
     
     def get_cache_info(self) -> Dict[str, any]:
         """Возвращает информацию о кэше."""
+        now = datetime.now()
+        items = []
+        for cache_key, base_price, age in self._cache.items():
+            appid, item_name = cache_key.split(":", 1)
+            items.append({
+                "item_name": item_name,
+                "appid": int(appid),
+                "base_price": base_price,
+                "last_updated": (now - timedelta(seconds=age)).isoformat(),
+                "age_seconds": age
+            })
         return {
-            "cached_items": len(self._cache),
+            "cached_items": len(items),
             "cache_ttl": self._cache_ttl,
-            "items": [
-                {
-                    "item_name": item.item_name,
-                    "appid": item.appid,
-                    "base_price": item.base_price,
-                    "last_updated": item.last_updated.isoformat(),
-                    "age_seconds": (datetime.now() - item.last_updated).total_seconds()
-                }
-                for item in self._cache.values()
-            ]
+            "stats": self._cache.stats(),
+            "items": items
         }
-
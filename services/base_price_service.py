@@ -0,0 +1,306 @@
+"""
+Общее для процессов хранилище базовых цен (D) с фоновым обновлением.
+
+Базовая цена каждого предмета хранится в Redis-хэше base_prices
+(поле "{appid}:{item_name}" -> {"price", "updated_at", "ttl"}), процессы держат
+копию в памяти и периодически перечитывают хэш. Фильтры (формула
+S = D + P * x) читают D из памяти без сетевых запросов; Steam запрашивается
+только для предметов, которых нет в хранилище или чья запись устарела.
+
+Фоновый цикл воркера обходит активные задачи с auto_update_base_price и
+обновляет D не чаще base_price_update_interval задачи (для предмета из
+нескольких задач - по минимальному интервалу). Одновременное обновление
+одного предмета разными процессами исключает блокировка в Redis.
+"""
+import asyncio
+import json
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import select
+
+from core.config import Config
+from core.database import DatabaseManager, MonitoringTask
+from core.models import SearchFilters
+from core.utils import payload_codec
+from parsers.base_price import BasePriceAPI
+
+
+PRICES_KEY = "base_prices"
+REFRESH_LOCK_PREFIX = "base_prices:lock:"
+
+
+class BasePriceService:
+    """Базовые цены предметов: память процесса + Redis, фоновое обновление по задачам."""
+
+    def __init__(
+        self,
+        db_manager: Optional[DatabaseManager] = None,
+        proxy_manager=None,
+        redis_service=None,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Args:
+            db_manager: Менеджер БД для чтения активных задач (без него сервис только читает Redis)
+            proxy_manager: ProxyManager для запросов к Steam (опционально)
+            redis_service: Сервис Redis для обмена ценами между процессами (опционально)
+            clock: Источник времени (unix-время, общее для процессов через Redis)
+        """
+        self.db_manager = db_manager
+        self.proxy_manager = proxy_manager
+        self.redis_service = redis_service
+        self._clock = clock
+        # "{appid}:{item_name}" -> (цена, время обновления, сколько секунд цена актуальна)
+        self._prices: Dict[str, Tuple[float, float, float]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.refreshed = 0
+        self.refresh_errors = 0
+
+    def __len__(self) -> int:
+        return len(self._prices)
+
+    @staticmethod
+    def _key(item_name: str, appid: int) -> str:
+        return f"{appid}:{item_name}"
+
+    def _redis_ready(self) -> bool:
+        return self.redis_service is not None and self.redis_service.is_connected()
+
+    # --- Чтение (без сетевых запросов) -----------------------------------
+
+    def age(self, item_name: str, appid: int = 730) -> Optional[float]:
+        """Возраст записи в секундах или None, если предмета нет в хранилище."""
+        entry = self._prices.get(self._key(item_name, appid))
+        if entry is None:
+            return None
+        return self._clock() - entry[1]
+
+    def get(self, item_name: str, appid: int = 730) -> Optional[float]:
+        """
+        Возвращает актуальную базовую цену из памяти процесса.
+
+        Args:
+            item_name: Название предмета
+            appid: ID приложения
+
+        Returns:
+            Базовая цена или None, если ее нет или она устарела
+        """
+        entry = self._prices.get(self._key(item_name, appid))
+        if entry is None or self._clock() - entry[1] >= entry[2]:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    # --- Запись и синхронизация ------------------------------------------
+
+    async def store(self, item_name: str, appid: int, price: float, ttl: float) -> None:
+        """
+        Сохраняет базовую цену в память процесса и в Redis.
+
+        Args:
+            item_name: Название предмета
+            appid: ID приложения
+            price: Базовая цена
+            ttl: Сколько секунд цена считается актуальной
+        """
+        key = self._key(item_name, appid)
+        updated_at = self._clock()
+        self._prices[key] = (price, updated_at, ttl)
+        if not self._redis_ready():
+            return
+        try:
+            await self.redis_service._client.hset(
+                PRICES_KEY, key, payload_codec.encode_str({"price": price, "updated_at": updated_at, "ttl": ttl})
+            )
+        except Exception as e:
+            logger.debug(f"⚠️ BasePriceService: Ошибка записи цены {key} в Redis: {e}")
+
+    async def sync(self) -> int:
+        """
+        Перечитывает цены из Redis (обновленные другими процессами) и удаляет устаревшие поля.
+
+        Returns:
+            Количество цен в памяти после синхронизации
+        """
+        if not self._redis_ready():
+            return len(self._prices)
+        try:
+            fields = await self.redis_service._client.hgetall(PRICES_KEY)
+        except Exception as e:
+            logger.warning(f"⚠️ BasePriceService: Не удалось прочитать цены из Redis: {e}")
+            return len(self._prices)
+
+        now = self._clock()
+        expired: List[str] = []
+        for key, raw in fields.items():
+            try:
+                data = payload_codec.decode(raw)
+                entry = (float(data["price"]), float(data["updated_at"]), float(data["ttl"]))
+            except Exception:
+                expired.append(key)
+                continue
+            if now - entry[1] >= entry[2]:
+                expired.append(key)
+                continue
+            current = self._prices.get(key)
+            if current is None or current[1] < entry[1]:
+                self._prices[key] = entry
+        for key in [key for key, entry in self._prices.items() if now - entry[1] >= entry[2]]:
+            del self._prices[key]
+
+        if expired:
+            try:
+                await self.redis_service._client.hdel(PRICES_KEY, *expired)
+            except Exception as e:
+                logger.debug(f"⚠️ BasePriceService: Не удалось удалить устаревшие цены из Redis: {e}")
+        return len(self._prices)
+
+    # --- Фоновое обновление ----------------------------------------------
+
+    @staticmethod
+    def refresh_intervals(filters_list: Iterable[SearchFilters]) -> Dict[Tuple[str, int], int]:
+        """
+        Предметы с автообновлением базовой цены и их интервалы обновления.
+
+        Args:
+            filters_list: Фильтры активных задач
+
+        Returns:
+            Словарь {(item_name, appid): интервал в секундах} (минимальный по задачам предмета)
+        """
+        intervals: Dict[Tuple[str, int], int] = {}
+        for filters in filters_list:
+            if not filters.auto_update_base_price:
+                continue
+            interval = filters.base_price_update_interval or Config.BASE_PRICE_DEFAULT_INTERVAL
+            item = (filters.item_name, filters.appid)
+            intervals[item] = min(interval, intervals.get(item, interval))
+        return intervals
+
+    async def _load_active_filters(self) -> List[SearchFilters]:
+        """Фильтры активных задач из БД."""
+        session = await self.db_manager.get_session()
+        try:
+            result = await session.execute(
+                select(MonitoringTask.id, MonitoringTask.item_name, MonitoringTask.filters_json).where(
+                    MonitoringTask.is_active == True
+                )
+            )
+            rows = result.all()
+        finally:
+            await session.close()
+
+        filters_list = []
+        for task_id, item_name, filters_json in rows:
+            try:
+                if isinstance(filters_json, str):
+                    filters_json = json.loads(filters_json)
+                filters = SearchFilters.model_validate(filters_json)
+            except Exception as e:
+                logger.debug(f"⚠️ BasePriceService: Пропускаем задачу {task_id} с некорректными фильтрами: {e}")
+                continue
+            filters.item_name = item_name
+            filters_list.append(filters)
+        return filters_list
+
+    async def _try_acquire_item_lock(self, key: str) -> bool:
+        """Блокировка обновления предмета между процессами (без Redis обновляет каждый процесс)."""
+        if not self._redis_ready():
+            return True
+        try:
+            return bool(await self.redis_service._client.set(
+                f"{REFRESH_LOCK_PREFIX}{key}", "1", nx=True, ex=Config.BASE_PRICE_REFRESH_CHECK_INTERVAL * 2
+            ))
+        except Exception as e:
+            logger.warning(f"⚠️ BasePriceService: Не удалось получить блокировку обновления {key}: {e}")
+            return False
+
+    async def fetch(self, item_name: str, appid: int, ttl: float, proxy: Optional[str] = None) -> Optional[float]:
+        """
+        Запрашивает базовую цену у Steam и сохраняет ее в хранилище.
+
+        Args:
+            item_name: Название предмета
+            appid: ID приложения
+            ttl: Сколько секунд цена считается актуальной
+            proxy: Прокси-сервер (по умолчанию - из proxy_manager)
+
+        Returns:
+            Базовая цена или None при ошибке
+        """
+        price = await BasePriceAPI.get_base_price(
+            item_name,
+            appid=appid,
+            proxy=proxy,
+            proxy_manager=self.proxy_manager
+        )
+        if price is not None:
+            await self.store(item_name, appid, price, ttl)
+        return price
+
+    async def refresh_due(self, filters_list: Iterable[SearchFilters]) -> int:
+        """
+        Обновляет базовые цены предметов, у которых истек интервал обновления задачи.
+
+        Args:
+            filters_list: Фильтры активных задач
+
+        Returns:
+            Количество обновленных цен
+        """
+        updated = 0
+        for (item_name, appid), interval in self.refresh_intervals(filters_list).items():
+            age = self.age(item_name, appid)
+            if age is not None and age < interval:
+                continue
+            if not await self._try_acquire_item_lock(self._key(item_name, appid)):
+                continue
+            try:
+                # Запас в один интервал: пропущенное обновление не заставляет фильтры идти в Steam
+                price = await self.fetch(item_name, appid, ttl=interval * 2)
+            except Exception as e:
+                price = None
+                logger.warning(f"⚠️ BasePriceService: Ошибка обновления '{item_name}': {type(e).__name__}: {e}")
+            if price is None:
+                self.refresh_errors += 1
+                continue
+            self.refreshed += 1
+            updated += 1
+            logger.debug(f"💰 BasePriceService: '{item_name}' D=${price:.2f} (интервал {interval}с)")
+        return updated
+
+    async def run(self, check_interval: Optional[float] = None) -> None:
+        """
+        Фоновый цикл: синхронизирует цены с Redis и обновляет цены предметов активных задач.
+
+        Args:
+            check_interval: Интервал проверки в секундах (по умолчанию BASE_PRICE_REFRESH_CHECK_INTERVAL)
+        """
+        check_interval = check_interval or Config.BASE_PRICE_REFRESH_CHECK_INTERVAL
+        while True:
+            try:
+                await self.sync()
+                if self.db_manager is not None:
+                    updated = await self.refresh_due(await self._load_active_filters())
+                    if updated:
+                        logger.info(f"💰 BasePriceService: Обновлено базовых цен: {updated}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ BasePriceService: Ошибка фонового обновления: {type(e).__name__}: {e}")
+            await asyncio.sleep(check_interval)
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики хранилища."""
+        return {
+            "size": len(self._prices),
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshed": self.refreshed,
+            "refresh_errors": self.refresh_errors
+        }
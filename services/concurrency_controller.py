@@ -0,0 +1,289 @@
+"""
+Автомасштабирование параллелизма Parsing Worker.
+
+Раньше число одновременных задач (MAX_CONCURRENT_TASKS), prefetch канала
+RabbitMQ и число воркеров страниц одной задачи (прокси // 3) задавались
+независимо, и их приходилось согласовывать вручную. Контроллер раз в
+AUTOSCALE_INTERVAL секунд снимает сигналы:
+- свободные аренды прокси (активные, не заблокированные и не занятые);
+- задержку event loop;
+- заполненность пула соединений БД;
+- долю ответов 429 с прошлого замера,
+и меняет лимит задач (AIMD): при перегрузке (задержка loop, пул БД, 429)
+лимит умножается на AUTOSCALE_DECREASE_FACTOR, без свободных прокси -
+уменьшается на 1, при спросе и свободных прокси - растет на 1. Лимит не
+больше числа доступных прокси. Prefetch канала следует за лимитом, а воркеры
+страниц делят доступные прокси между выполняющимися задачами.
+"""
+import asyncio
+import math
+from typing import Dict, Optional
+
+from loguru import logger
+
+from core.config import Config
+from core.utils import payload_codec
+
+
+class RequestOutcomes:
+    """Счетчики запросов через прокси (для доли ответов 429)."""
+
+    __slots__ = ("total", "rate_limited")
+
+    def __init__(self):
+        self.total = 0
+        self.rate_limited = 0
+
+    def record(self, rate_limited: bool = False) -> None:
+        self.total += 1
+        if rate_limited:
+            self.rate_limited += 1
+
+
+class AdaptiveLimit:
+    """Семафор, лимит которого можно менять во время работы."""
+
+    __slots__ = ("limit", "active", "_waiters")
+
+    def __init__(self, limit: int):
+        self.limit = max(1, int(limit))
+        self.active = 0
+        self._waiters = []
+
+    @property
+    def saturated(self) -> bool:
+        """Все слоты заняты."""
+        return self.active >= self.limit
+
+    async def acquire(self) -> None:
+        while self.active >= self.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.active += 1
+
+    def release(self) -> None:
+        self.active = max(0, self.active - 1)
+        self._wake()
+
+    def resize(self, limit: int) -> None:
+        """Меняет лимит (выполняющиеся задачи не прерываются)."""
+        self.limit = max(1, int(limit))
+        self._wake()
+
+    def _wake(self) -> None:
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class ConcurrencyController:
+    """Контроллер лимита задач, prefetch и воркеров страниц."""
+
+    def __init__(
+        self,
+        tasks: Optional[AdaptiveLimit] = None,
+        min_tasks: Optional[int] = None,
+        max_tasks: Optional[int] = None,
+        interval: Optional[float] = None
+    ):
+        """
+        Args:
+            tasks: Лимит одновременных задач (по умолчанию MAX_CONCURRENT_TASKS)
+            min_tasks: Нижняя граница лимита (по умолчанию AUTOSCALE_MIN_TASKS)
+            max_tasks: Верхняя граница лимита (по умолчанию AUTOSCALE_MAX_TASKS)
+            interval: Период замеров (по умолчанию AUTOSCALE_INTERVAL)
+        """
+        self.tasks = tasks or AdaptiveLimit(Config.MAX_CONCURRENT_TASKS)
+        self.min_tasks = max(1, min_tasks or Config.AUTOSCALE_MIN_TASKS)
+        self.max_tasks = max(self.min_tasks, max_tasks or Config.AUTOSCALE_MAX_TASKS)
+        self.interval = interval or Config.AUTOSCALE_INTERVAL
+        self.proxy_manager = None
+        self.redis_service = None
+        self.db_manager = None
+        self.rabbitmq_service = None
+        self.signals: Dict = {}
+        self._usable_proxies: Optional[int] = None
+        self._overloaded = False
+        self._outcomes_seen = (0, 0)
+
+    def attach(self, proxy_manager=None, redis_service=None, db_manager=None, rabbitmq_service=None) -> None:
+        """Подключает источники сигналов и RabbitMQ (для prefetch)."""
+        self.proxy_manager = proxy_manager
+        self.redis_service = redis_service
+        self.db_manager = db_manager
+        self.rabbitmq_service = rabbitmq_service
+
+    def page_workers(self, available_proxies: int) -> int:
+        """
+        Сколько страниц одной задачи парсить параллельно.
+
+        Без замеров контроллера - прежнее правило (прокси // 3).
+
+        Args:
+            available_proxies: Доступные прокси, которые видит задача
+        """
+        if self._usable_proxies is None:
+            return max(1, available_proxies // 3)
+        share = min(available_proxies, self._usable_proxies) // max(self.tasks.active, 1)
+        if self._overloaded:
+            share //= 2
+        return max(1, share)
+
+    async def proxy_leases(self):
+        """
+        Доступные (активные и не заблокированные) и свободные прокси по данным Redis.
+
+        Returns:
+            (доступные, свободные) или (None, None), если Redis недоступен
+        """
+        proxy_manager, redis_service = self.proxy_manager, self.redis_service
+        if proxy_manager is None or redis_service is None or not redis_service.is_connected():
+            return None, None
+        client = getattr(redis_service, "_client", None)
+        if client is None:
+            return None, None
+        cached = await client.get(proxy_manager.REDIS_CACHE_KEY)
+        if not cached:
+            return None, None
+        proxy_ids = [proxy["id"] for proxy in payload_codec.decode(cached)]
+        pipe = client.pipeline(transaction=False)
+        for proxy_id in proxy_ids:
+            pipe.exists(f"{proxy_manager.REDIS_BLOCKED_PREFIX}{proxy_id}")
+            pipe.exists(f"{proxy_manager.REDIS_IN_USE_PREFIX}{proxy_id}")
+        flags = await pipe.execute()
+        usable = free = 0
+        for index in range(len(proxy_ids)):
+            if flags[2 * index]:
+                continue
+            usable += 1
+            if not flags[2 * index + 1]:
+                free += 1
+        return usable, free
+
+    def db_saturation(self) -> Optional[float]:
+        """Доля занятых соединений пула БД (с учетом max_overflow)."""
+        engine = getattr(self.db_manager, "engine", None)
+        if engine is None:
+            return None
+        pool = engine.pool
+        try:
+            capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+            return pool.checkedout() / capacity if capacity > 0 else None
+        except Exception:
+            return None
+
+    def rate_limited_share(self) -> float:
+        """Доля ответов 429 с прошлого замера (меньше 10 запросов - 0)."""
+        total, rate_limited = request_outcomes.total, request_outcomes.rate_limited
+        seen_total, seen_limited = self._outcomes_seen
+        requests = total - seen_total
+        if requests < 10:
+            # Мало запросов - копим до следующего замера
+            return 0.0
+        self._outcomes_seen = (total, rate_limited)
+        return (rate_limited - seen_limited) / requests
+
+    def decide(self, signals: Dict) -> int:
+        """
+        Новый лимит задач по сигналам.
+
+        Args:
+            signals: loop_lag, db_saturation, rate_429, usable_proxies, free_proxies
+        """
+        current = self.tasks.limit
+        overload = []
+        if signals.get("loop_lag", 0.0) > Config.AUTOSCALE_MAX_LOOP_LAG:
+            overload.append("loop")
+        if (signals.get("db_saturation") or 0.0) >= Config.AUTOSCALE_MAX_DB_SATURATION:
+            overload.append("db")
+        if signals.get("rate_429", 0.0) > Config.AUTOSCALE_MAX_429_RATE:
+            overload.append("429")
+        self._overloaded = bool(overload)
+        signals["overload"] = overload
+
+        free = signals.get("free_proxies")
+        if overload:
+            target = math.floor(current * Config.AUTOSCALE_DECREASE_FACTOR)
+        elif free == 0:
+            target = current - 1
+        elif self.tasks.saturated:
+            target = current + 1
+        else:
+            target = current
+
+        ceiling = self.max_tasks
+        usable = signals.get("usable_proxies")
+        if usable is not None:
+            ceiling = min(ceiling, max(usable, self.min_tasks))
+        return max(self.min_tasks, min(target, ceiling))
+
+    async def tick(self, loop_lag: float = 0.0) -> int:
+        """
+        Один замер: сигналы, решение и применение лимита.
+
+        Args:
+            loop_lag: Задержка event loop на последнем интервале (сек)
+
+        Returns:
+            Лимит задач
+        """
+        signals = {
+            "loop_lag": loop_lag,
+            "db_saturation": self.db_saturation(),
+            "rate_429": self.rate_limited_share(),
+        }
+        try:
+            signals["usable_proxies"], signals["free_proxies"] = await self.proxy_leases()
+        except Exception as e:
+            logger.debug(f"⚠️ ConcurrencyController: Не удалось получить аренды прокси: {e}")
+            signals["usable_proxies"] = signals["free_proxies"] = None
+        self._usable_proxies = signals["usable_proxies"]
+
+        previous = self.tasks.limit
+        limit = self.decide(signals)
+        signals["tasks_limit"] = limit
+        signals["tasks_active"] = self.tasks.active
+        self.signals = signals
+        if limit != previous:
+            self.tasks.resize(limit)
+            logger.info(
+                f"{'📈' if limit > previous else '📉'} ConcurrencyController: Лимит задач {previous} → {limit} "
+                f"(прокси: свободно {signals['free_proxies']}/{signals['usable_proxies']}, "
+                f"loop: {loop_lag:.2f}с, пул БД: {signals['db_saturation'] or 0:.0%}, 429: {signals['rate_429']:.0%})"
+            )
+        if self.rabbitmq_service is not None:
+            await self.rabbitmq_service.set_prefetch(limit)
+        return limit
+
+    async def run(self) -> None:
+        """Цикл контроллера (одна фоновая задача на воркер)."""
+        loop = asyncio.get_running_loop()
+        logger.info(f"🎛️ ConcurrencyController: Запущен (лимит задач {self.tasks.limit}, {self.min_tasks}..{self.max_tasks})")
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            # Сон дольше интервала - loop был занят синхронной работой
+            loop_lag = max(0.0, loop.time() - started - self.interval)
+            try:
+                await self.tick(loop_lag)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ ConcurrencyController: Ошибка при пересчете лимитов: {e}")
+
+
+# Общие счетчики и контроллер процесса
+request_outcomes = RequestOutcomes()
+concurrency_controller = ConcurrencyController()
@@ -1,6 +1,6 @@
 """
 Сервис для получения курсов валют с trueskins.org/currencies.
-Кэширует результаты в Redis на 1 час.
+Кэширует результаты в памяти процесса и в Redis на 1 час.
 """
 import json
 import asyncio
@@ -10,6 +10,7 @@ from loguru import logger
 import httpx
 from bs4 import BeautifulSoup
 
+from core.utils.two_tier_cache import TwoTierCache
 from services.redis_service import RedisService
 from services.proxy_manager import ProxyManager
 from services.proxy_429_handler import Proxy429Handler
@@ -18,8 +19,10 @@ from services.proxy_429_handler import Proxy429Handler
 class CurrencyService:
     """Сервис для получения и кэширования курсов валют."""
     
-    CACHE_KEY = "currency_rates:trueskins"
+    CACHE_NAMESPACE = "currency_rates"
+    CACHE_SOURCE = "trueskins"
     CACHE_TTL = 3600  # 1 час в секундах
+    CACHE_STALE_TTL = 3600  # Еще час отдаем прошлые курсы, обновляя их в фоне
     CURRENCIES_URL = "https://trueskins.org/currencies"
     FALLBACK_API_URL = "https://api.exchangerate-api.com/v4/latest/USD"  # Fallback API
     
@@ -40,7 +43,6 @@ class CurrencyService:
         """
         self.redis_service = redis_service
         self.proxy_manager = proxy_manager
-        self._rates_cache: Optional[Dict[str, float]] = None
     
     async def get_currency_rates(self) -> Dict[str, float]:
         """
@@ -49,17 +51,23 @@ class CurrencyService:
         Returns:
             Словарь с курсами валют: {"THB": 35.5, "CNY": 7.2, "RUB": 90.0}
         """
-        # Проверяем кэш в Redis
-        if self.redis_service and self.redis_service.is_connected():
-            try:
-                cached_rates = await self.redis_service.get_json(self.CACHE_KEY)
-                if cached_rates:
-                    logger.debug(f"✅ CurrencyService: Использован кэш из Redis (THB={cached_rates.get('THB')}, CNY={cached_rates.get('CNY')}, RUB={cached_rates.get('RUB')})")
-                    return cached_rates
-            except Exception as e:
-                logger.warning(f"⚠️ CurrencyService: Ошибка при чтении кэша из Redis: {e}")
+        # Память процесса, затем Redis; одновременные промахи объединяются в один запрос
+        rates = await _currency_rates_cache.get_or_load(
+            self.CACHE_SOURCE,
+            self._load_currency_rates,
+            redis_service=self.redis_service,
+            # Сохраняем в кэш только если получили все курсы
+            cacheable=lambda loaded: bool(loaded) and len(loaded) >= len(self.TARGET_CURRENCIES)
+        )
+        return rates or {}
+    
+    async def _load_currency_rates(self) -> Optional[Dict[str, float]]:
+        """
+        Запрашивает курсы с trueskins.org, при неудаче - через fallback API.
         
-        # Если кэша нет или Redis недоступен, запрашиваем через прокси
+        Returns:
+            Словарь с курсами валют или None
+        """
         logger.info("🔄 CurrencyService: Запрашиваем курсы валют с trueskins.org через прокси...")
         
         rates = await self._fetch_currency_rates()
@@ -69,19 +77,9 @@ class CurrencyService:
             logger.warning("⚠️ CurrencyService: Не удалось получить все курсы с trueskins.org, используем fallback API...")
             rates = await self._fetch_currency_rates_fallback()
         
-        # Сохраняем в кэш Redis только если получили все курсы
-        if rates and len(rates) >= len(self.TARGET_CURRENCIES) and self.redis_service and self.redis_service.is_connected():
-            try:
-                await self.redis_service.set_json(
-                    self.CACHE_KEY,
-                    rates,
-                    ex=self.CACHE_TTL
-                )
-                logger.info(f"✅ CurrencyService: Курсы валют сохранены в Redis кэш на {self.CACHE_TTL} секунд")
-            except Exception as e:
-                logger.warning(f"⚠️ CurrencyService: Ошибка при сохранении в Redis кэш: {e}")
-        
-        return rates or {}
+        if rates and len(rates) >= len(self.TARGET_CURRENCIES):
+            logger.info(f"✅ CurrencyService: Курсы валют сохранены в кэш на {self.CACHE_TTL} секунд")
+        return rates
     
     async def _fetch_currency_rates(self) -> Optional[Dict[str, float]]:
         """
@@ -386,3 +384,11 @@ class CurrencyService:
         
         return converted
 
+
+# Общий кэш курсов процесса (ключ в Redis - currency_rates:trueskins)
+_currency_rates_cache = TwoTierCache(
+    CurrencyService.CACHE_NAMESPACE,
+    ttl=CurrencyService.CACHE_TTL,
+    max_items=16,
+    stale_ttl=CurrencyService.CACHE_STALE_TTL
+)
@@ -0,0 +1,346 @@
+"""
+Компиляция фильтров задачи (SearchFilters) в неизменяемый план проверки.
+
+SearchFilters разбирается один раз: паттерны превращаются в битовую маску,
+диапазоны - в числа, название задачи нормализуется заранее, пороги наклеек
+выносятся в поля. Проверка лота - цепочка предикатов от дешевых к дорогим
+(цена -> паттерн -> float -> название), без повторного чтения Pydantic-модели
+и форматирования отладочных строк.
+
+План кэшируется по задаче и пересобирается, когда меняются фильтры
+(filters_json задачи).
+"""
+import json
+import re
+import weakref
+from functools import lru_cache
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from core.models import SearchFilters
+
+
+# Причины отказа (первый не пройденный предикат)
+FAIL_PRICE = "price"
+FAIL_PATTERN = "pattern"
+FAIL_FLOAT = "float"
+FAIL_NAME = "name"
+
+_CONDITION_RE = re.compile(r'\s*\([^)]+\)\s*$')
+
+
+@lru_cache(maxsize=4096)
+def normalize_item_name(name: str) -> str:
+    """
+    Нормализует название предмета без состояния (как FilterService._normalize_item_name).
+
+    Args:
+        name: Название предмета
+
+    Returns:
+        Нормализованное название в нижнем регистре
+    """
+    if not name:
+        return ""
+    name = name.replace("StatTrak™", "").replace("Souvenir", "").strip()
+    name = _CONDITION_RE.sub('', name)
+    return " ".join(name.split()).lower()
+
+
+def _to_int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+class FilterPlan:
+    """Неизменяемый скомпилированный план проверки фильтров задачи."""
+
+    __slots__ = (
+        "item_name", "normalized_name", "max_price",
+        "pattern_mode", "pattern_item_type", "pattern_bits", "pattern_set", "pattern_min", "pattern_max",
+        "target_patterns",
+        "float_min", "float_max",
+        "has_stickers_filter", "min_stickers_price", "total_stickers_price_min", "total_stickers_price_max",
+        "max_overpay_coefficient", "needs_sticker_prices", "required_stickers_count",
+        "predicates", "fingerprint"
+    )
+
+    def __init__(self, filters: SearchFilters, fingerprint: str):
+        setattr_ = object.__setattr__
+        setattr_(self, "item_name", filters.item_name)
+        setattr_(self, "normalized_name", normalize_item_name(filters.item_name))
+        setattr_(self, "max_price", filters.max_price)
+
+        # Паттерн: pattern_list имеет приоритет над устаревшим pattern_range (как в FilterService)
+        pattern_mode = None
+        pattern_item_type = None
+        pattern_bits = 0
+        pattern_set = frozenset()
+        pattern_min = pattern_max = None
+        if filters.pattern_list:
+            pattern_mode = "list"
+            pattern_item_type = filters.pattern_list.item_type
+            pattern_set = frozenset(int(p) for p in filters.pattern_list.patterns)
+            for p in pattern_set:
+                pattern_bits |= 1 << p
+        elif filters.pattern_range:
+            pattern_mode = "range"
+            pattern_min = filters.pattern_range.min
+            pattern_max = filters.pattern_range.max
+        setattr_(self, "pattern_mode", pattern_mode)
+        setattr_(self, "pattern_item_type", pattern_item_type)
+        setattr_(self, "pattern_bits", pattern_bits)
+        setattr_(self, "pattern_set", pattern_set)
+        setattr_(self, "pattern_min", pattern_min)
+        setattr_(self, "pattern_max", pattern_max)
+        # Множество паттернов для ранней проверки в парсерах лотов (для диапазона строится один раз)
+        if pattern_mode == "list":
+            target_patterns = pattern_set
+        elif pattern_mode == "range":
+            target_patterns = frozenset(range(pattern_min, pattern_max + 1))
+        else:
+            target_patterns = None
+        setattr_(self, "target_patterns", target_patterns)
+
+        setattr_(self, "float_min", filters.float_range.min if filters.float_range else None)
+        setattr_(self, "float_max", filters.float_range.max if filters.float_range else None)
+
+        stickers = filters.stickers_filter
+        setattr_(self, "has_stickers_filter", stickers is not None)
+        setattr_(self, "min_stickers_price", stickers.min_stickers_price if stickers else None)
+        setattr_(self, "total_stickers_price_min", stickers.total_stickers_price_min if stickers else None)
+        setattr_(self, "total_stickers_price_max", stickers.total_stickers_price_max if stickers else None)
+        setattr_(self, "max_overpay_coefficient", stickers.max_overpay_coefficient if stickers else None)
+        setattr_(self, "needs_sticker_prices", stickers is not None and (
+            stickers.min_stickers_price is not None or stickers.max_overpay_coefficient is not None
+        ))
+        setattr_(self, "required_stickers_count", len(stickers.stickers) if stickers and stickers.stickers else 0)
+
+        # Цепочка только из реально заданных фильтров, от дешевых к дорогим
+        predicates = []
+        if self.max_price is not None:
+            predicates.append((FAIL_PRICE, lambda price, pattern, float_value, item_type, name: self.check_price(price)))
+        if pattern_mode is not None:
+            predicates.append((FAIL_PATTERN, lambda price, pattern, float_value, item_type, name: self.check_pattern(pattern, item_type)))
+        if self.float_min is not None:
+            predicates.append((FAIL_FLOAT, lambda price, pattern, float_value, item_type, name: self.check_float(float_value)))
+        predicates.append((FAIL_NAME, lambda price, pattern, float_value, item_type, name: self.check_item_name(name)))
+        setattr_(self, "predicates", tuple(predicates))
+        setattr_(self, "fingerprint", fingerprint)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("FilterPlan неизменяем, скомпилируйте новый план")
+
+    def __delattr__(self, name):
+        raise AttributeError("FilterPlan неизменяем, скомпилируйте новый план")
+
+    def check_price(self, price: Optional[float]) -> bool:
+        """Цена не превышает max_price (неизвестная цена не отсеивается, как в FilterService)."""
+        if self.max_price is None or price is None:
+            return True
+        return price <= self.max_price
+
+    def check_pattern(self, pattern: Any, item_type: Optional[str] = None) -> bool:
+        """Проверка паттерна по битовой маске (pattern_list) или диапазону (pattern_range)."""
+        if self.pattern_mode is None:
+            return True
+        if self.pattern_mode == "list":
+            # Фильтр для другого типа предмета не применяется
+            if self.pattern_item_type == "keychain" and item_type != "keychain":
+                return True
+            if self.pattern_item_type == "skin" and item_type == "keychain":
+                return True
+            pattern_int = _to_int(pattern)
+            if pattern_int is None or pattern_int < 0:
+                return False
+            return (self.pattern_bits >> pattern_int) & 1 == 1
+        pattern_int = _to_int(pattern)
+        if pattern_int is None:
+            return False
+        return self.pattern_min <= pattern_int <= self.pattern_max
+
+    def is_pattern_excluded(self, pattern: Optional[int]) -> bool:
+        """
+        Ранняя проверка по списку паттернов (брелки нормализуются по модулю 1000).
+
+        Returns:
+            True если паттерн известен и точно не входит в список
+        """
+        if pattern is None or self.pattern_mode != "list":
+            return False
+        normalized = pattern % 1000 if pattern > 999 else pattern
+        return normalized < 0 or not (self.pattern_bits >> normalized) & 1
+
+    def check_float(self, float_value: Any) -> bool:
+        """Float в диапазоне float_range (неизвестный float не проходит, если фильтр задан)."""
+        if self.float_min is None:
+            return True
+        value = _to_float(float_value)
+        if value is None:
+            return False
+        return self.float_min <= value <= self.float_max
+
+    def check_item_name(self, name: Optional[str]) -> bool:
+        """Название (без состояния, StatTrak и Souvenir) совпадает с названием задачи."""
+        return normalize_item_name(name or "") == self.normalized_name
+
+    def check_type_constraints(self, item_type: Optional[str], sticker_count: int) -> bool:
+        """
+        Проверки, зависящие только от типа предмета и числа наклеек (без цен наклеек).
+
+        Повторяют гарантированные отказы FilterService.matches_filters/check_stickers:
+        брелок не проходит фильтры float и наклеек, скин без наклеек не проходит
+        формулу наклеек, наклеек меньше, чем требует фильтр.
+        """
+        if item_type == "keychain":
+            return self.float_min is None and not self.has_stickers_filter
+        if self.needs_sticker_prices and sticker_count == 0:
+            return False
+        if self.required_stickers_count and sticker_count < self.required_stickers_count:
+            return False
+        return True
+
+    def first_failure(
+        self,
+        price: Optional[float],
+        pattern: Any,
+        float_value: Any,
+        item_type: Optional[str],
+        name: Optional[str]
+    ) -> Optional[str]:
+        """
+        Прогоняет цепочку предикатов до первого отказа.
+
+        Args:
+            price: Цена лота
+            pattern: Паттерн лота
+            float_value: Float лота
+            item_type: Тип предмета ('skin' или 'keychain')
+            name: Название предмета
+
+        Returns:
+            Имя не пройденного фильтра (FAIL_*) или None, если все пройдены
+        """
+        for fail_name, predicate in self.predicates:
+            if not predicate(price, pattern, float_value, item_type, name):
+                return fail_name
+        return None
+
+    def describe(self, fail_name: str) -> str:
+        """Описание ожидаемого значения фильтра (для логов отказов)."""
+        if fail_name == FAIL_PRICE:
+            return f"max_price: {self.max_price}"
+        if fail_name == FAIL_PATTERN:
+            if self.pattern_mode == "list":
+                return f"ожидаемые: {sorted(self.pattern_set)}"
+            return f"ожидаемые: {self.pattern_min}-{self.pattern_max}"
+        if fail_name == FAIL_FLOAT:
+            return f"ожидаемый диапазон: {self.float_min}-{self.float_max}"
+        return f"задача: '{self.item_name}'"
+
+
+def filters_fingerprint(filters: SearchFilters) -> str:
+    """Канонический отпечаток фильтров (меняется при изменении filters_json)."""
+    return json.dumps(filters.model_dump(mode="json"), sort_keys=True, ensure_ascii=False)
+
+
+def compile_filter_plan(filters: SearchFilters) -> FilterPlan:
+    """
+    Компилирует фильтры в план без кэширования.
+
+    Args:
+        filters: Фильтры задачи
+
+    Returns:
+        Новый FilterPlan
+    """
+    return FilterPlan(filters, filters_fingerprint(filters))
+
+
+class FilterPlanCache:
+    """
+    Кэш планов по задаче.
+
+    Для одного и того же объекта SearchFilters план возвращается без пересчета
+    отпечатка; новый объект (фильтры перечитаны из filters_json) сравнивается по
+    отпечатку, и план пересобирается только если фильтры действительно изменились.
+    """
+
+    def __init__(self):
+        self._plans: Dict[Any, Tuple[FilterPlan, Callable]] = {}
+        self._lock = Lock()
+
+    def get(self, filters: SearchFilters, task_id: Optional[int] = None) -> FilterPlan:
+        """
+        Возвращает план для фильтров задачи.
+
+        Args:
+            filters: Фильтры задачи
+            task_id: ID задачи (без него ключом служит сам объект фильтров)
+
+        Returns:
+            FilterPlan
+        """
+        key = task_id if task_id is not None else id(filters)
+        cached = self._plans.get(key)
+        if cached is not None:
+            plan, filters_ref = cached
+            if filters_ref() is filters:
+                return plan
+            fingerprint = filters_fingerprint(filters)
+            if fingerprint == plan.fingerprint:
+                with self._lock:
+                    self._plans[key] = (plan, self._ref(key, filters))
+                return plan
+            plan = FilterPlan(filters, fingerprint)
+        else:
+            plan = compile_filter_plan(filters)
+        with self._lock:
+            self._plans[key] = (plan, self._ref(key, filters))
+        return plan
+
+    def _ref(self, key, filters: SearchFilters) -> Callable:
+        if isinstance(key, int) and key == id(filters):
+            # Без task_id запись живет, пока жив объект фильтров
+            return weakref.ref(filters, lambda _ref, key=key: self._plans.pop(key, None))
+        return weakref.ref(filters)
+
+    def invalidate(self, task_id: int) -> None:
+        """Удаляет план задачи (например, после изменения или удаления задачи)."""
+        with self._lock:
+            self._plans.pop(task_id, None)
+
+    def clear(self) -> None:
+        """Очищает кэш."""
+        with self._lock:
+            self._plans.clear()
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+
+# Общий кэш процесса
+filter_plan_cache = FilterPlanCache()
+
+
+def get_filter_plan(filters: SearchFilters, task_id: Optional[int] = None) -> FilterPlan:
+    """
+    Возвращает скомпилированный план из общего кэша.
+
+    Args:
+        filters: Фильтры задачи
+        task_id: ID задачи
+
+    Returns:
+        FilterPlan
+    """
+    return filter_plan_cache.get(filters, task_id)
@@ -7,6 +7,8 @@ from loguru import logger
 
 from core.models import SearchFilters, ParsedItemData
 from parsers.item_type_detector import detect_item_type
+from services.filter_plan import get_filter_plan, FAIL_PATTERN
+from services.sticker_precheck import sticker_precheck
 
 
 class FilterService:
@@ -72,28 +74,15 @@ class FilterService:
         Returns:
             True, если float проходит проверку
         """
-        if not filters.float_range:
+        plan = get_filter_plan(filters)
+        if plan.check_float(float_value):
             return True
         
         if float_value is None:
-            logger.info(f"    ❌ Float не определен, но требуется фильтр float_range ({filters.float_range.min:.6f}-{filters.float_range.max:.6f})")
-            return False
-        
-        # Нормализуем float_value к float для корректного сравнения
-        try:
-            float_value_normalized = float(float_value)
-        except (ValueError, TypeError):
-            logger.warning(f"    ⚠️ Не удалось нормализовать float_value {float_value} к float")
-            float_value_normalized = float_value
-        
-        logger.info(f"    🔍 ПРОВЕРКА FLOAT: float_value={float_value} (нормализован: {float_value_normalized:.6f}), диапазон: {filters.float_range.min:.6f}-{filters.float_range.max:.6f}")
-        
-        if not (filters.float_range.min <= float_value_normalized <= filters.float_range.max):
-            logger.info(f"    ❌ Float {float_value} (нормализован: {float_value_normalized:.6f}) не в диапазоне {filters.float_range.min:.6f}-{filters.float_range.max:.6f}")
-            return False
-        
-        logger.info(f"    ✅ Float {float_value} (нормализован: {float_value_normalized:.6f}) в диапазоне {filters.float_range.min:.6f}-{filters.float_range.max:.6f}")
-        return True
+            logger.info(f"    ❌ Float не определен, но требуется фильтр float_range ({plan.float_min:.6f}-{plan.float_max:.6f})")
+        else:
+            logger.info(f"    ❌ Float {float_value} не в диапазоне {plan.float_min:.6f}-{plan.float_max:.6f}")
+        return False
     
     def check_pattern(
         self,
@@ -112,56 +101,15 @@ class FilterService:
         Returns:
             True, если паттерн проходит проверку
         """
-        # Проверка паттерна (новый формат - список)
-        if filters.pattern_list:
-            if filters.pattern_list.item_type == "keychain" and item_type != "keychain":
-                logger.debug(f"    ⚠️ Фильтр pattern_list для брелков, но предмет - скин, пропускаем фильтр по паттерну")
-                return True
-            elif filters.pattern_list.item_type == "skin" and item_type == "keychain":
-                logger.debug(f"    ⚠️ Фильтр pattern_list для скинов, но предмет - брелок, пропускаем фильтр по паттерну")
-                return True
-            
-            if pattern is None:
-                logger.info(f"    ❌ Паттерн не определен")
-                return False
-            
-            # Нормализуем паттерн к int для корректного сравнения
-            try:
-                pattern_int = int(pattern)
-            except (ValueError, TypeError):
-                pattern_int = pattern
-            
-            # Нормализуем список паттернов к int
-            patterns_normalized = []
-            for p in filters.pattern_list.patterns:
-                try:
-                    patterns_normalized.append(int(p))
-                except (ValueError, TypeError):
-                    patterns_normalized.append(p)
-            
-            logger.info(f"    🔍 ПРОВЕРКА ПАТТЕРНА: pattern={pattern} (нормализован: {pattern_int}), patterns={patterns_normalized}")
-            
-            if pattern_int not in patterns_normalized:
-                logger.info(f"    ❌ Паттерн {pattern} (нормализован: {pattern_int}) не в списке {patterns_normalized}")
-                return False
-            
-            logger.info(f"    ✅ Паттерн {pattern} (нормализован: {pattern_int}) найден в списке")
-            return True
-        
-        # Проверка паттерна (старый формат - диапазон)
-        if filters.pattern_range:
-            if pattern is None:
-                logger.debug(f"    ❌ Паттерн не определен, но требуется фильтр pattern_range")
-                return False
-            
-            if not (filters.pattern_range.min <= pattern <= filters.pattern_range.max):
-                logger.debug(f"    ❌ Паттерн {pattern} не в диапазоне")
-                return False
-            
-            logger.debug(f"    ✅ Паттерн {pattern} в диапазоне")
+        plan = get_filter_plan(filters)
+        if plan.check_pattern(pattern, item_type):
             return True
         
-        return True
+        if pattern is None:
+            logger.info(f"    ❌ Паттерн не определен")
+        else:
+            logger.info(f"    ❌ Паттерн {pattern} не подходит ({plan.describe(FAIL_PATTERN)})")
+        return False
     
     async def check_stickers(
         self,
@@ -196,6 +144,11 @@ class FilterService:
         
         # Если цены неизвестны и есть фильтр по наклейкам - запрашиваем цены
         if not has_prices and stickers:
+            # Лоты, которые не пройдут фильтр даже при максимальных ценах наклеек, отсеиваем без запроса
+            reject_reason = sticker_precheck.check_listing(parsed_data, item, filters, self.base_price_manager)
+            if reject_reason is not None:
+                logger.info(f"    ❌ Фильтр наклеек не пройдет без запроса цен: {reject_reason}")
+                return False
             if not self.parser:
                 logger.warning(f"    ⚠️ Парсер не установлен, невозможно запросить цены наклеек")
                 total_price = 0.0
@@ -352,20 +305,23 @@ class FilterService:
                 
                 logger.info(f"    🔍 Получаем базовую цену (D) для предмета: {filters.item_name}")
                 
-                # Получаем прокси для запроса базовой цены
-                proxy_for_request = None
-                if self.proxy_manager:
-                    proxy_obj = await self.proxy_manager.get_next_proxy(force_refresh=False)
-                    if proxy_obj:
-                        proxy_for_request = proxy_obj.url
-                
-                base_price = await self.base_price_manager.get_base_price(
-                    filters.item_name,
-                    filters.appid,
-                    force_update=False,
-                    proxy=proxy_for_request,
-                    proxy_manager=self.proxy_manager
-                )
+                # D из общего хранилища, запрос к Steam - только если цены там нет
+                base_price = self.base_price_manager.get_stored_price(filters.item_name, filters.appid)
+                if base_price is None:
+                    # Получаем прокси для запроса базовой цены
+                    proxy_for_request = None
+                    if self.proxy_manager:
+                        proxy_obj = await self.proxy_manager.get_next_proxy(force_refresh=False)
+                        if proxy_obj:
+                            proxy_for_request = proxy_obj.url
+                    
+                    base_price = await self.base_price_manager.get_base_price(
+                        filters.item_name,
+                        filters.appid,
+                        force_update=False,
+                        proxy=proxy_for_request,
+                        proxy_manager=self.proxy_manager
+                    )
                 
                 if base_price is None:
                     logger.warning(f"    ⚠️ Не удалось получить базовую цену (D), пропускаем проверку коэффициента")
@@ -562,55 +518,18 @@ class FilterService:
         if parsed_data and not item_name_from_parsed:
             item_name_from_parsed = item_name_from_api
         
-        # Определяем наличие состояния в названиях
-        task_has_condition = '(' in filters.item_name and ')' in filters.item_name
-        api_has_condition = '(' in item_name_from_api and ')' in item_name_from_api
-        parsed_has_condition = item_name_from_parsed and '(' in item_name_from_parsed and ')' in item_name_from_parsed
-        
-        logger.debug(f"    🔍 Проверка названия предмета:")
-        logger.debug(f"       Задача: '{filters.item_name}' (состояние: {task_has_condition})")
-        logger.debug(f"       API: '{item_name_from_api}' (состояние: {api_has_condition})")
-        if item_name_from_parsed:
-            logger.debug(f"       Parsed: '{item_name_from_parsed}' (состояние: {parsed_has_condition})")
-        
-        # Нормализуем названия
-        normalized_task_name = self._normalize_item_name(filters.item_name, remove_condition=True)
-        normalized_api_name = self._normalize_item_name(item_name_from_api, remove_condition=True)
-        normalized_parsed_name = self._normalize_item_name(item_name_from_parsed, remove_condition=True) if item_name_from_parsed else None
-        
-        logger.debug(f"       Нормализованная задача: '{normalized_task_name}'")
-        logger.debug(f"       Нормализованный API: '{normalized_api_name}'")
-        if normalized_parsed_name:
-            logger.debug(f"       Нормализованный Parsed: '{normalized_parsed_name}'")
-        
-        # Проверяем соответствие названия
-        name_matches = False
-        if normalized_parsed_name:
-            name_matches = normalized_parsed_name == normalized_task_name
-            if not name_matches:
-                logger.debug(f"    ❌ Название не совпадает: '{normalized_parsed_name}' != '{normalized_task_name}' (из parsed_data)")
-            else:
-                logger.debug(f"    ✅ Название совпадает: '{normalized_parsed_name}' == '{normalized_task_name}' (из parsed_data)")
-        else:
-            name_matches = normalized_api_name == normalized_task_name
-            if not name_matches:
-                logger.debug(f"    ❌ Название не совпадает: '{normalized_api_name}' != '{normalized_task_name}' (из API)")
-            else:
-                logger.debug(f"    ✅ Название совпадает: '{normalized_api_name}' == '{normalized_task_name}' (из API)")
-        
-        if not name_matches:
-            compared_name = normalized_parsed_name if normalized_parsed_name else normalized_api_name
-            compared_source = "parsed_data" if normalized_parsed_name else "API"
+        # Название задачи нормализовано в плане заранее
+        plan = get_filter_plan(filters)
+        compared_name = item_name_from_parsed if item_name_from_parsed else item_name_from_api
+        if not plan.check_item_name(compared_name):
+            compared_source = "parsed_data" if item_name_from_parsed else "API"
             logger.warning(
                 f"    ⚠️ Предмет '{item_name_from_api}' не соответствует задаче '{filters.item_name}'\n"
-                f"       Использовано для сравнения ({compared_source}): '{compared_name}'\n"
-                f"       Задача (нормализованная): '{normalized_task_name}'\n"
-                f"       API (нормализованная): '{normalized_api_name}'"
-                + (f"\n       Parsed (нормализованная): '{normalized_parsed_name}'" if normalized_parsed_name else "")
+                f"       Использовано для сравнения ({compared_source}): '{self._normalize_item_name(compared_name, remove_condition=True)}'\n"
+                f"       Задача (нормализованная): '{plan.normalized_name}'"
             )
             return False
         
-        logger.info(f"    ✅ Название предмета совпадает: '{item_name_from_api}' соответствует задаче '{filters.item_name}'")
         return True
     
     async def matches_filters(
@@ -631,16 +550,8 @@ class FilterService:
         Returns:
             True, если предмет соответствует всем фильтрам
         """
-        logger.info(f"    🔍 Начинаем проверку фильтров для предмета:")
-        logger.info(f"       - max_price: {filters.max_price}")
-        logger.info(f"       - float_range: {filters.float_range.min if filters.float_range else None}-{filters.float_range.max if filters.float_range else None}")
-        logger.info(f"       - pattern_list: {filters.pattern_list.patterns if filters.pattern_list else None} ({filters.pattern_list.item_type if filters.pattern_list else None})")
-        logger.info(f"       - pattern_range: {filters.pattern_range.min if filters.pattern_range else None}-{filters.pattern_range.max if filters.pattern_range else None}")
-        logger.info(f"       - stickers_filter: {filters.stickers_filter is not None}")
         if parsed_data:
-            logger.info(f"       - parsed_data: float={parsed_data.float_value}, pattern={parsed_data.pattern}, stickers={len(parsed_data.stickers) if parsed_data.stickers else 0}")
-        else:
-            logger.info(f"       - parsed_data: None")
+            logger.debug(f"    🔍 Проверка фильтров: float={parsed_data.float_value}, pattern={parsed_data.pattern}, stickers={len(parsed_data.stickers) if parsed_data.stickers else 0}")
         
         # 1. Проверка названия предмета
         if not self.check_item_name(item, filters, parsed_data):
@@ -12,12 +12,17 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from core import MonitoringTask, FoundItem, SearchFilters
-from core.database import DatabaseManager
+from core import Config, MonitoringTask, FoundItem, SearchFilters
+from core.database import DatabaseManager, item_data_to_text
 from services.proxy_manager import ProxyManager
 from services.parsing_service import ParsingService
 from services.redis_service import RedisService
+from services.seen_listings import seen_listings
+from services.task_cancellation import task_cancellation, ACTION_ACTIVATED, ACTION_DEACTIVATED, ACTION_DELETED
 from services.rabbitmq_service import RabbitMQService
+from services.filter_plan import filter_plan_cache
+from services.task_match_index import index_filters, task_match_index
+from services.task_scheduler import TaskScheduler
 from typing import Optional, Callable, TYPE_CHECKING
 
 
@@ -56,6 +61,10 @@ class MonitoringService:
         self._task_sessions: Dict[int, AsyncSession] = {}  # Отдельные сессии для каждой задачи
         self._recovery_tasks: Dict[int, asyncio.Task] = {}  # Задачи восстановления
         self._session_lock = asyncio.Lock()  # Блокировка для безопасной работы с основной сессией
+        self._cancellation_task: Optional[asyncio.Task] = None  # Подписчик канала отмены задач
+        self._match_index_task: Optional[asyncio.Task] = None  # Подписчик канала индекса задач
+        self.scheduler: Optional[TaskScheduler] = None  # Единый планировщик проверок (создается в start)
+        self._scheduler_task: Optional[asyncio.Task] = None
         # Используем отдельный сервис парсинга с Redis для кэширования
         self.parsing_service = parsing_service or ParsingService(proxy_manager=proxy_manager, redis_service=redis_service)
     
@@ -97,6 +106,7 @@ class MonitoringService:
         await self.db_session.refresh(task)
         
         logger.info(f"Добавлена задача мониторинга: {name} (ID: {task.id}), интервал: {check_interval} сек")
+        await self._index_task(task)
         
         # ВАЖНО: При создании новой задачи проверяем и очищаем зависшие флаги
         # Это предотвращает ситуацию, когда новая задача не может выполниться из-за старого флага
@@ -181,8 +191,11 @@ class MonitoringService:
             task.name = name
         if filters is not None:
             task.filters_json = filters.model_dump(exclude_none=True)
+            # Скомпилированный план пересоберется при следующей проверке (в других процессах - по отпечатку фильтров)
+            filter_plan_cache.invalidate(task_id)
         if check_interval is not None:
             task.check_interval = check_interval
+        status_changed = is_active is not None and task.is_active != is_active
         if is_active is not None:
             task.is_active = is_active
         
@@ -190,6 +203,12 @@ class MonitoringService:
         await self.db_session.refresh(task)
         
         logger.info(f"Обновлена задача мониторинга: {task_id}")
+        if status_changed:
+            # Идущий парсинг задачи останавливается по сигналу, без опроса БД
+            await task_cancellation.publish(
+                self.redis_service, task_id, ACTION_ACTIVATED if task.is_active else ACTION_DEACTIVATED
+            )
+        await self._index_task(task)
         
         # Перезапускаем мониторинг, если сервис запущен
         if self._running:
@@ -212,6 +231,8 @@ class MonitoringService:
                 return False
             
             await self._stop_task_monitoring(task_id)
+            await task_match_index.publish(self.redis_service, task_id)
+            filter_plan_cache.invalidate(task_id)
             
             # ВАЖНО: Удаляем все связанные FoundItem перед удалением задачи
             # Это предотвращает ошибки при удалении задачи с связанными записями
@@ -235,9 +256,12 @@ class MonitoringService:
                     logger.debug(f"🔓 MonitoringService: Удален флаг выполнения для задачи {task_id} из Redis")
                 except Exception as e:
                     logger.warning(f"⚠️ MonitoringService: Не удалось удалить флаг выполнения для задачи {task_id}: {e}")
+                # Фильтр сохраненных лотов больше не нужен: found_items задачи удалены
+                await seen_listings.reset(self.redis_service, task_id)
             
             await self.db_session.delete(task)
             await self.db_session.commit()
+            await task_cancellation.publish(self.redis_service, task_id, ACTION_DELETED)
             
             logger.info(f"✅ MonitoringService: Удалена задача мониторинга: {task_id}")
             return True
@@ -251,6 +275,16 @@ class MonitoringService:
                 pass
             raise  # Пробрасываем ошибку дальше для обработки в Telegram боте
     
+    async def _index_task(self, task: MonitoringTask) -> None:
+        """
+        Обновляет задачу в индексе задач по предметам и рассылает изменение воркерам (task_match_index).
+        
+        Args:
+            task: Задача мониторинга
+        """
+        filters = index_filters(task) if task.is_active else None
+        await task_match_index.publish(self.redis_service, task.id, filters, task.name)
+    
     async def get_all_tasks(self, active_only: bool = False) -> List[MonitoringTask]:
         """
         Получает все задачи мониторинга.
@@ -310,6 +344,12 @@ class MonitoringService:
     
     async def _start_task_monitoring(self, task: MonitoringTask):
         """Запускает мониторинг для задачи."""
+        if self.scheduler is not None:
+            # Планировщик сам публикует задачу, когда наступит next_check (None - сразу)
+            self.scheduler.schedule(task.id, task.next_check)
+            logger.info(f"🗓️ Задача {task.id}: Добавлена в расписание (next_check: {task.next_check.strftime('%Y-%m-%d %H:%M:%S') if task.next_check else 'сразу'})")
+            return
+        
         if task.id in self._tasks:
             logger.warning(f"Мониторинг для задачи {task.id} уже запущен")
             return
@@ -349,6 +389,7 @@ class MonitoringService:
                 task_session = self.db_session
                 logger.warning(f"⚠️ Задача {task_id}: Используется общая сессия БД (рекомендуется передать db_manager)")
             
+            cancel_token = task_cancellation.start(task_id)
             try:
                 logger.info(f"🚀 Запущен мониторинг для задачи: {task_name} (ID: {task_id})")
                 logger.info(f"   📋 Интервал проверки: {task.check_interval} сек")
@@ -365,8 +406,12 @@ class MonitoringService:
                 
                 while self._running:
                     try:
-                        # Периодически обновляем задачу из БД для проверки актуального статуса
-                        if iteration % 6 == 0:  # Каждые 6 итераций (примерно минута)
+                        if cancel_token.cancelled:
+                            logger.info(f"🛑 Задача {task_id}: Получен сигнал отмены, останавливаем мониторинг")
+                            break
+                        
+                        # Без канала отмены периодически обновляем задачу из БД для проверки актуального статуса
+                        if not task_cancellation.listening and iteration % 6 == 0:  # Каждые 6 итераций (примерно минута)
                             try:
                                 # Проверяем, существует ли задача в БД используя отдельную сессию
                                 from sqlalchemy import select
@@ -423,7 +468,7 @@ class MonitoringService:
                             wait_time = (task.next_check - now).total_seconds()
                             if wait_time > 0:
                                 logger.debug(f"⏳ Задача {task_id}: Ждем до следующей проверки ({wait_time:.1f} сек)")
-                                await asyncio.sleep(min(wait_time, 60))  # Максимум 60 секунд
+                                await cancel_token.wait(min(wait_time, 60))  # Максимум 60 секунд, прерывается отменой
                                 continue
                         
                         # Если next_check в прошлом или не установлен - выполняем проверку сразу
@@ -694,6 +739,7 @@ class MonitoringService:
                             pass
                         await asyncio.sleep(60)  # Ждем перед повтором
             finally:
+                task_cancellation.finish(task_id, cancel_token)
                 # Закрываем сессию задачи при выходе из цикла
                 if task_session and task_session != self.db_session:
                     try:
@@ -860,6 +906,9 @@ class MonitoringService:
     
     async def _stop_task_monitoring(self, task_id: int):
         """Останавливает мониторинг для задачи."""
+        if self.scheduler is not None:
+            self.scheduler.unschedule(task_id)
+        
         if task_id in self._tasks:
             self._tasks[task_id].cancel()
             try:
@@ -973,7 +1022,7 @@ class MonitoringService:
                                     "item_name": found_item.item_name,
                                     "price": found_item.price,
                                     "market_url": found_item.market_url,
-                                    "item_data_json": found_item.item_data_json,
+                                    "item_data_json": item_data_to_text(found_item.item_data_json),
                                     "task_name": task.name
                                 })
                                 logger.debug(f"📤 Опубликовано уведомление в Redis для предмета {found_item.id}")
@@ -1048,13 +1097,12 @@ class MonitoringService:
             return False
         
         # Сохраняем в БД
-        import json
         item_data = parsed_data if parsed_data else {}
         found_item = FoundItem(
             task_id=task.id,
             item_name=item_name,
             price=price,
-            item_data_json=json.dumps(item_data, ensure_ascii=False),
+            item_data_json=item_data,
             market_url=item.get('asset_description', {}).get('market_hash_name'),
             notification_sent=False
         )
@@ -1074,16 +1122,30 @@ class MonitoringService:
         
         self._running = True
         logger.info("🚀 Запуск сервиса мониторинга")
+        if Config.TASK_CANCELLATION_ENABLED and self.redis_service and self._cancellation_task is None:
+            self._cancellation_task = task_cancellation.start_listener(self.redis_service)
+        
+        # Один планировщик на одной сессии вместо корутины и сессии на каждую задачу
+        if Config.TASK_SCHEDULER_ENABLED and self.db_manager and self.rabbitmq_service:
+            self.scheduler = TaskScheduler(self.db_manager, self.rabbitmq_service, redis_service=self.redis_service)
+        
         logger.info(f"   🔌 Redis доступен: {self.redis_service is not None and (self.redis_service.is_connected() if self.redis_service else False)}")
         
         # Загружаем все активные задачи
         tasks = await self.get_all_tasks(active_only=True)
         logger.info(f"   📋 Найдено активных задач: {len(tasks)}")
         
+        # Проверки без RabbitMQ идут в этом процессе: индекс задач загружается из БД и обновляется по каналу
+        if Config.TASK_MATCH_INDEX_ENABLED and self.db_manager and self._match_index_task is None:
+            self._match_index_task = task_match_index.start_listener(self.redis_service, self.db_manager)
+        
         for task in tasks:
             logger.info(f"   ▶️ Запускаем мониторинг задачи #{task.id}: {task.name}")
             await self._start_task_monitoring(task)
         
+        if self.scheduler is not None:
+            self._scheduler_task = asyncio.create_task(self.scheduler.run())
+        
         logger.info(f"✅ Сервис мониторинга запущен, активных задач: {len(tasks)}")
     
     async def stop(self):
@@ -1094,6 +1156,23 @@ class MonitoringService:
         self._running = False
         logger.info("Остановка сервиса мониторинга")
         
+        if self._cancellation_task:
+            self._cancellation_task.cancel()
+            self._cancellation_task = None
+        
+        if self._match_index_task:
+            self._match_index_task.cancel()
+            self._match_index_task = None
+        
+        if self._scheduler_task:
+            self._scheduler_task.cancel()
+            try:
+                await self._scheduler_task
+            except asyncio.CancelledError:
+                pass
+            self._scheduler_task = None
+        self.scheduler = None
+        
         # Останавливаем все задачи
         for task_id in list(self._tasks.keys()):
             await self._stop_task_monitoring(task_id)
@@ -1123,7 +1202,7 @@ class MonitoringService:
         return {
             "total_tasks": len(tasks),
             "active_tasks": len([t for t in tasks if t.is_active]),
-            "running_tasks": len(self._tasks),
+            "running_tasks": len(self.scheduler) if self.scheduler is not None else len(self._tasks),
             "tasks": [
                 {
                     "id": t.id,
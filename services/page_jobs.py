@@ -0,0 +1,185 @@
+"""
+Помощь другим репликам Parsing Worker со страницами больших задач.
+
+Реплика, которая проверяет большую задачу, публикует ее страницы в Redis
+Stream запуска (core.steam_market_parser.parallel_listing_page_jobs). Помощник
+раз в PAGE_JOBS_POLL_INTERVAL секунд просматривает зарегистрированные запуски
+и, если у воркера есть свободный слот задач (ConcurrencyController), забирает
+невыданные страницы тем же пайплайном: загрузка, парсинг, сохранение найденных
+лотов и уведомления. Результаты ключуются по ID задачи, поэтому реплика-
+координатор собирает их так же, как собственные.
+"""
+import asyncio
+from typing import Dict, Optional
+
+from loguru import logger
+
+from core.config import Config
+from core.database import MonitoringTask
+from core.models import SearchFilters
+from core.steam_market_parser.logger_utils import log_both
+from core.steam_market_parser.parallel_listing_page_jobs import (
+    RUNS_KEY, StreamPageSource, consumer_name, has_undelivered, local_runs, run_key
+)
+from core.steam_market_parser.parallel_listing_pipeline import run_listing_pipeline
+from core.steam_market_parser.parallel_listing_utils import get_available_proxies
+from services.concurrency_controller import AdaptiveLimit, concurrency_controller
+from services.task_cancellation import task_cancellation
+
+
+def _get_steam_parser():
+    from core.steam_parser import SteamMarketParser
+    return SteamMarketParser
+
+
+class PageJobHelper:
+    """Забирает страницы чужих запусков, пока у воркера есть свободные слоты."""
+
+    def __init__(self, db_manager, redis_service, proxy_manager, limit: Optional[AdaptiveLimit] = None):
+        """
+        Args:
+            db_manager: Менеджер БД
+            redis_service: Сервис Redis
+            proxy_manager: Менеджер прокси
+            limit: Лимит задач воркера (по умолчанию лимит ConcurrencyController)
+        """
+        self.db_manager = db_manager
+        self.redis_service = redis_service
+        self.proxy_manager = proxy_manager
+        self.limit = limit or concurrency_controller.tasks
+        self.consumer = consumer_name()
+        self._helping: Dict[str, asyncio.Task] = {}
+        self.helped_pages = 0
+
+    async def poll(self) -> int:
+        """
+        Один просмотр запусков: запускает помощь там, где есть невыданные страницы.
+
+        Returns:
+            Количество запусков, к которым подключился помощник
+        """
+        for run_id, helper_task in list(self._helping.items()):
+            if helper_task.done():
+                del self._helping[run_id]
+
+        client = self.redis_service._client
+        run_ids = await client.smembers(RUNS_KEY)
+        started = 0
+        for run_id in sorted(run_ids):
+            if len(self._helping) >= Config.PAGE_JOBS_MAX_HELPED_RUNS or self.limit.saturated:
+                break
+            if run_id in local_runs or run_id in self._helping:
+                continue
+            meta = await client.hgetall(run_key(run_id))
+            if not meta:
+                # Координатор упал, метаданные истекли
+                await client.srem(RUNS_KEY, run_id)
+                continue
+            if not await has_undelivered(self.redis_service, run_id):
+                continue
+            self._helping[run_id] = asyncio.create_task(self.help(run_id, meta))
+            started += 1
+        return started
+
+    async def help(self, run_id: str, meta: Dict[str, str]) -> None:
+        """
+        Обрабатывает страницы запуска, пока есть невыданные.
+
+        Args:
+            run_id: ID запуска
+            meta: Метаданные запуска (task_id, appid, hash_name, filters)
+        """
+        try:
+            await self._help(run_id, meta)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ PageJobHelper: Ошибка при помощи с запуском {run_id}: {type(e).__name__}: {e}")
+
+    async def _help(self, run_id: str, meta: Dict[str, str]) -> None:
+        async with self.limit:
+            task = await self._load_task(int(meta["task_id"]))
+            if task is None:
+                return
+            # Статус только что прочитан из БД: дальше парсинг проверяет токен отмены в памяти
+            cancel_token = task_cancellation.start(task.id)
+            try:
+                await self._help_run(run_id, meta, task)
+            finally:
+                task_cancellation.finish(task.id, cancel_token)
+
+    async def _help_run(self, run_id: str, meta: Dict[str, str], task: MonitoringTask) -> None:
+        filters = SearchFilters.model_validate_json(meta["filters"])
+
+        def log(level: str, message: str):
+            log_both(level, message, None)
+
+        page_source = StreamPageSource(self.redis_service, run_id, consumer=self.consumer, log_func=log)
+        SteamMarketParser = _get_steam_parser()
+        async with SteamMarketParser(proxy=None, timeout=30, redis_service=self.redis_service, proxy_manager=self.proxy_manager) as parser:
+            parser.db_manager = self.db_manager
+            available_proxies = await get_available_proxies(parser, log)
+            if not available_proxies:
+                return
+            logger.info(f"🤝 PageJobHelper: Помогаем с запуском {run_id} (задача {task.id})")
+            await run_listing_pipeline(
+                parser=parser,
+                appid=int(meta["appid"]),
+                hash_name=meta["hash_name"],
+                filters=filters,
+                task=task,
+                db_manager=self.db_manager,
+                task_logger=None,
+                redis_service=self.redis_service,
+                queue_key=run_key(run_id),
+                available_proxies=available_proxies,
+                max_retries=3,
+                total_pages=int(meta.get("total", 0)),
+                fetchers=concurrency_controller.page_workers(len(available_proxies)),
+                task_start_times={},
+                task_stages={},
+                log_func=log,
+                parsers=Config.LISTING_PIPELINE_PARSERS,
+                queue_size=Config.LISTING_PIPELINE_QUEUE_SIZE,
+                persist_batch=Config.LISTING_PIPELINE_PERSIST_BATCH,
+                page_source=page_source
+            )
+        self.helped_pages += page_source.acked
+        logger.info(f"🤝 PageJobHelper: Запуск {run_id}: обработано {page_source.acked} страниц")
+
+    async def _load_task(self, task_id: int) -> Optional[MonitoringTask]:
+        """Активная задача запуска (отсоединенная от сессии) или None."""
+        session = await self.db_manager.get_session()
+        try:
+            task = await session.get(MonitoringTask, task_id)
+            if task is None or not task.is_active:
+                return None
+            session.expunge(task)
+            return task
+        finally:
+            await session.close()
+
+    async def run(self) -> None:
+        """Цикл помощника (одна фоновая задача на воркер)."""
+        logger.info(f"🤝 PageJobHelper: Запущен (потребитель {self.consumer})")
+        try:
+            while True:
+                try:
+                    if self.redis_service is not None and self.redis_service.is_connected():
+                        await self.poll()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"❌ PageJobHelper: Ошибка при поиске запусков: {e}")
+                await asyncio.sleep(Config.PAGE_JOBS_POLL_INTERVAL)
+        finally:
+            await self.stop()
+
+    async def stop(self) -> None:
+        """Останавливает помощь (неподтвержденные страницы заберут через XAUTOCLAIM)."""
+        helping = list(self._helping.values())
+        self._helping.clear()
+        for helper_task in helping:
+            helper_task.cancel()
+        if helping:
+            await asyncio.gather(*helping, return_exceptions=True)
@@ -3,7 +3,6 @@
 """
 import asyncio
 import random
-import json
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -16,6 +15,8 @@ from core import Proxy
 from loguru import logger
 from services.proxy_context import ProxyContext
 from services.telegram_notifier import send_proxy_unavailable_notification
+from core.utils import payload_codec
+from services.concurrency_controller import request_outcomes
 
 
 class ProxyManager:
@@ -199,7 +200,7 @@ class ProxyManager:
             
             cached_data = await self.redis_service._client.get(self.REDIS_CACHE_KEY)
             if cached_data:
-                proxies_data = json.loads(cached_data)
+                proxies_data = payload_codec.decode(cached_data)
                 logger.debug(f"📥 ProxyManager: Получено {len(proxies_data)} прокси из Redis кэша")
                 return proxies_data
         except Exception as e:
@@ -251,7 +252,7 @@ class ProxyManager:
                     await self.redis_service._client.setex(
                         self.REDIS_CACHE_KEY,
                         self.REDIS_CACHE_TTL,
-                        json.dumps(proxies_data, ensure_ascii=False)
+                        payload_codec.encode_str(proxies_data)
                     )
                     logger.debug(f"💾 ProxyManager: Обновлен кэш в Redis ({len(proxies_data)} прокси)")
                 else:
@@ -397,7 +398,6 @@ class ProxyManager:
                 # Это избегает повторного запроса к БД и гарантирует атомарность операции
                 try:
                     # Сериализуем данные прокси
-                    import json
                     proxies_data = [
                         {
                             "id": p.id,
@@ -417,7 +417,7 @@ class ProxyManager:
                         await self.redis_service._client.setex(
                             self.REDIS_CACHE_KEY,
                             self.REDIS_CACHE_TTL,
-                            json.dumps(proxies_data, ensure_ascii=False)
+                            payload_codec.encode_str(proxies_data)
                         )
                         logger.debug(f"💾 ProxyManager: Обновлен кэш в Redis ({len(proxies_data)} прокси) из get_active_proxies")
                 except Exception as cache_error:
@@ -1090,6 +1090,7 @@ class ProxyManager:
                 
                 # Обновляем статистику в объекте
                 if success:
+                    request_outcomes.record()
                     proxy.success_count += 1
                     logger.debug(f"📈 ProxyManager: Прокси ID={proxy.id} - успешный запрос (было: успешно={old_success}, ошибок={old_fail} → стало: успешно={proxy.success_count}, ошибок={proxy.fail_count})")
                     # При успешном запросе разблокируем прокси (если был заблокирован)
@@ -1106,6 +1107,7 @@ class ProxyManager:
                     if not is_429_error and error:
                         error_str = str(error)
                         is_429_error = '429' in error_str or 'Too Many Requests' in error_str
+                    request_outcomes.record(rate_limited=is_429_error)
                     
                     if is_429_error:
                         # Для 429 ошибок: блокируем прокси сразу при первой ошибке на короткое время
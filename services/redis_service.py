@@ -1,11 +1,12 @@
 """
 Сервис для работы с Redis (коммуникация между сервисами).
 """
-import json
 import asyncio
-from typing import Optional, Dict, Any, Callable
+from typing import Optional, Dict, Any, Callable, List
 from loguru import logger
 
+from core.utils import payload_codec
+
 try:
     import redis.asyncio as redis
 except ImportError:
@@ -38,7 +39,9 @@ class RedisService:
             self._client = await redis.from_url(
                 self.redis_url,
                 decode_responses=True,
-                encoding="utf-8"
+                encoding="utf-8",
+                # Бинарные сообщения (msgpack) проходят через str без потерь
+                encoding_errors="surrogateescape"
             )
             self._is_connected = True
             logger.info(f"✅ Подключено к Redis: {self.redis_url}")
@@ -72,12 +75,33 @@ class RedisService:
             await self.connect()
         
         try:
-            message_json = json.dumps(message, ensure_ascii=False)
-            await self._client.publish(channel, message_json)
+            await self._client.publish(channel, payload_codec.encode_str(message))
             logger.debug(f"📤 Опубликовано сообщение в канал '{channel}': {message}")
         except Exception as e:
             logger.error(f"Ошибка при публикации в Redis: {e}")
-    
+
+    async def publish_many(self, channel: str, messages: List[Dict[str, Any]]):
+        """
+        Публикует несколько сообщений в канал Redis одним пайплайном.
+
+        Args:
+            channel: Название канала
+            messages: Список словарей с данными сообщений
+        """
+        if not messages:
+            return
+        if self._client is None:
+            await self.connect()
+
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for message in messages:
+                pipe.publish(channel, payload_codec.encode_str(message))
+            await pipe.execute()
+            logger.debug(f"📤 Опубликовано {len(messages)} сообщений в канал '{channel}'")
+        except Exception as e:
+            logger.error(f"Ошибка при публикации в Redis: {e}")
+
     async def subscribe(self, channel: str, callback: Callable[[Dict[str, Any]], None]):
         """
         Подписывается на канал Redis и вызывает callback при получении сообщения.
@@ -104,13 +128,13 @@ class RedisService:
                     message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=0.1)
                     if message and message['type'] == 'message':
                         try:
-                            data = json.loads(message['data'])
+                            data = payload_codec.decode(message['data'])
                             if asyncio.iscoroutinefunction(callback):
                                 await callback(data)
                             else:
                                 callback(data)
-                        except json.JSONDecodeError as e:
-                            logger.error(f"Ошибка декодирования JSON из Redis: {e}")
+                        except ValueError as e:
+                            logger.error(f"Ошибка декодирования сообщения из Redis: {e}")
                         except Exception as e:
                             logger.error(f"Ошибка в callback для Redis сообщения: {e}")
                 except asyncio.TimeoutError:
@@ -279,7 +303,7 @@ class RedisService:
         try:
             # Используем Redis Streams вместо простых списков
             # Это позволяет использовать consumer groups (как в Kafka)
-            message_json = json.dumps(data, ensure_ascii=False)
+            message_json = payload_codec.encode_str(data)
             stream_name = f"stream:{queue_name}"
             
             # Добавляем сообщение в stream
@@ -297,7 +321,7 @@ class RedisService:
             logger.error(f"Ошибка при добавлении в поток Redis: {e}")
             # Fallback на старый метод (список) для обратной совместимости
             try:
-                message_json = json.dumps(data, ensure_ascii=False)
+                message_json = payload_codec.encode_str(data)
                 await self._client.lpush(queue_name, message_json)
                 logger.warning(f"⚠️ Использован fallback (список) для очереди '{queue_name}'")
             except Exception as fallback_error:
@@ -365,7 +389,7 @@ class RedisService:
                     
                     if message_json:
                         try:
-                            parsed_message = json.loads(message_json)
+                            parsed_message = payload_codec.decode(message_json)
                             if isinstance(parsed_message, dict):
                                 task_id = parsed_message.get('task_id')
                                 logger.debug(f"📤 Извлечено из потока '{stream_name}': task_id={task_id}, message_id={message_id}")
@@ -377,8 +401,8 @@ class RedisService:
                             else:
                                 logger.warning(f"⚠️ RedisService: Сообщение из потока не является словарем: {type(parsed_message)}")
                                 return None
-                        except json.JSONDecodeError as e:
-                            logger.error(f"❌ RedisService: Ошибка декодирования JSON из потока '{stream_name}': {e}, данные: {message_json[:100]}")
+                        except ValueError as e:
+                            logger.error(f"❌ RedisService: Ошибка декодирования сообщения из потока '{stream_name}': {e}, данные: {message_json[:100]!r}")
                             return None
             
             # Fallback на старый метод (список) для обратной совместимости
@@ -386,7 +410,7 @@ class RedisService:
                 result = await self._client.brpop(queue_name, timeout=timeout)
                 if result:
                     _, message_json = result
-                    parsed_message = json.loads(message_json)
+                    parsed_message = payload_codec.decode(message_json)
                     if isinstance(parsed_message, dict):
                         logger.debug(f"📤 Извлечено из очереди (fallback) '{queue_name}': task_id={parsed_message.get('task_id')}")
                         return parsed_message
@@ -419,7 +443,7 @@ class RedisService:
             cache_key = f"parsed_item:{listing_id}"
             cached_data = await self._client.get(cache_key)
             if cached_data:
-                data = json.loads(cached_data)
+                data = payload_codec.decode(cached_data)
                 logger.debug(f"💾 Redis: Найдены закэшированные данные для listing_id={listing_id}")
                 return data
         except Exception as e:
@@ -441,8 +465,7 @@ class RedisService:
         
         try:
             cache_key = f"parsed_item:{listing_id}"
-            data_json = json.dumps(parsed_data, ensure_ascii=False)
-            await self._client.setex(cache_key, ttl, data_json)
+            await self._client.setex(cache_key, ttl, payload_codec.encode_str(parsed_data))
             logger.debug(f"💾 Redis: Сохранены данные парсинга для listing_id={listing_id} (TTL={ttl}с)")
         except Exception as e:
             logger.warning(f"⚠️ Redis: Ошибка при сохранении кэша для listing_id={listing_id}: {e}")
@@ -463,7 +486,7 @@ class RedisService:
             json_data = await self._client.get(key)
             if json_data:
                 logger.debug(f"📦 Redis: Получен JSON из кэша по ключу '{key}'")
-                return json.loads(json_data)
+                return payload_codec.decode(json_data)
         except Exception as e:
             logger.error(f"❌ Redis: Ошибка при получении JSON по ключу '{key}': {e}")
         return None
@@ -480,7 +503,7 @@ class RedisService:
         if self._client is None:
             await self.connect()
         try:
-            json_data = json.dumps(data, ensure_ascii=False)
+            json_data = payload_codec.encode_str(data)
             if ex:
                 await self._client.setex(key, ex, json_data)
             else:
@@ -489,6 +512,62 @@ class RedisService:
         except Exception as e:
             logger.error(f"❌ Redis: Ошибка при сохранении JSON по ключу '{key}': {e}")
 
+    async def get_json_many(self, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Получает JSON данные по нескольким ключам одним MGET.
+        
+        Args:
+            keys: Ключи для получения данных
+            
+        Returns:
+            Список словарей (None для отсутствующих ключей) в порядке keys
+        """
+        if not keys:
+            return []
+        if self._client is None:
+            await self.connect()
+        try:
+            values = await self._client.mget(keys)
+        except Exception as e:
+            logger.error(f"❌ Redis: Ошибка при MGET {len(keys)} ключей: {e}")
+            return [None] * len(keys)
+        results = []
+        for key, value in zip(keys, values):
+            if not value:
+                results.append(None)
+                continue
+            try:
+                results.append(payload_codec.decode(value))
+            except Exception as e:
+                logger.warning(f"⚠️ Redis: Не удалось декодировать значение по ключу '{key}': {e}")
+                results.append(None)
+        return results
+
+    async def set_json_many(self, items: Dict[str, Dict[str, Any]], ex: Optional[int] = None):
+        """
+        Сохраняет JSON данные по нескольким ключам одним пайплайном.
+        
+        Args:
+            items: Словарь {ключ: данные}
+            ex: Время жизни в секундах (опционально)
+        """
+        if not items:
+            return
+        if self._client is None:
+            await self.connect()
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for key, data in items.items():
+                json_data = payload_codec.encode_str(data)
+                if ex:
+                    pipe.setex(key, ex, json_data)
+                else:
+                    pipe.set(key, json_data)
+            await pipe.execute()
+            logger.debug(f"💾 Redis: Сохранено {len(items)} JSON значений одним пайплайном")
+        except Exception as e:
+            logger.error(f"❌ Redis: Ошибка при пакетном сохранении {len(items)} JSON значений: {e}")
+
     async def get(self, key: str) -> Optional[str]:
         """
         Получает значение по ключу из Redis.
@@ -3,13 +3,13 @@
 Отвечает за сохранение результатов в БД и публикацию уведомлений.
 Универсальный - работает с любыми фильтрами.
 """
-import json
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core import FoundItem, MonitoringTask
+from core.database import insert_found_item, item_data_to_text
 from services.redis_service import RedisService
 from loguru import logger
 
@@ -90,55 +90,9 @@ class ResultsProcessorService:
             
             logger.info(f"💾 Проверяем сохранение предмета: {item_name} (${price:.2f}), listing_id={listing_id}")
             
-            # Проверяем дубликаты по listing_id
-            # ВАЖНО: Всегда приводим listing_id к строке для корректного сравнения
-            if listing_id:
-                listing_id_str = str(listing_id)
-                all_task_items = await self.db_session.execute(
-                    select(FoundItem).where(FoundItem.task_id == task.id)
-                )
-                found_duplicate = False
-                for existing_item in all_task_items.scalars().all():
-                    try:
-                        existing_data = json.loads(existing_item.item_data_json)
-                        existing_listing_id = existing_data.get('listing_id')
-                        # ВАЖНО: Приводим к строке для корректного сравнения
-                        if existing_listing_id and str(existing_listing_id) == listing_id_str:
-                            logger.info(f"   ⏭️ Предмет с listing_id={listing_id_str} уже существует в БД (ID={existing_item.id}), пропускаем")
-                            found_duplicate = True
-                            break
-                    except (json.JSONDecodeError, AttributeError):
-                        pass
-                
-                if found_duplicate:
-                    continue
-            
-            # Дополнительная проверка по комбинации task_id + item_name + price + listing_id
-            # Для брелков и других предметов с listing_id это более точная проверка
-            if listing_id:
-                existing_query = select(FoundItem).where(
-                    FoundItem.task_id == task.id,
-                    FoundItem.item_name == item_name,
-                    FoundItem.price == price
-                )
-                existing_items = await self.db_session.execute(existing_query)
-                found_duplicate = False
-                for existing_item in existing_items.scalars().all():
-                    try:
-                        existing_data = json.loads(existing_item.item_data_json)
-                        existing_listing_id = existing_data.get('listing_id')
-                        # Если у существующего предмета нет listing_id или он отличается - это разные лоты
-                        if existing_listing_id and str(existing_listing_id) == str(listing_id):
-                            logger.info(f"   ⏭️ Предмет с listing_id={listing_id} уже существует в БД (ID={existing_item.id}), пропускаем")
-                            found_duplicate = True
-                            break
-                    except (json.JSONDecodeError, AttributeError):
-                        pass
-                if found_duplicate:
-                    continue
-            else:
-                # Если нет listing_id, проверяем только по task_id + item_name + price
-                existing_query = select(FoundItem).where(
+            # Если нет listing_id, дубликат ищем по task_id + item_name + price
+            if not listing_id:
+                existing_query = select(FoundItem.id).where(
                     FoundItem.task_id == task.id,
                     FoundItem.item_name == item_name,
                     FoundItem.price == price
@@ -155,26 +109,28 @@ class ResultsProcessorService:
             # Преобразуем parsed_data в JSON-сериализуемый формат
             serialized_data = self._serialize_for_json(parsed_data)
             
-            # Создаем FoundItem
-            found_item = FoundItem(
-                task_id=task.id,
-                item_name=item_name,
-                price=price,
-                item_data_json=json.dumps(serialized_data, ensure_ascii=False),
-                market_url=item.get('asset_description', {}).get('market_hash_name'),
-                notification_sent=False
-            )
-            
             try:
-                self.db_session.add(found_item)
+                # Дубликат по listing_id отсекает уникальный индекс (task_id, listing_id)
+                found_item_id = await insert_found_item(self.db_session, {
+                    "task_id": task.id,
+                    "listing_id": listing_id,
+                    "item_name": item_name,
+                    "price": price,
+                    "item_data_json": serialized_data,
+                    "market_url": item.get('asset_description', {}).get('market_hash_name'),
+                    "notification_sent": False
+                })
+                if found_item_id is None:
+                    logger.info(f"   ⏭️ Предмет с listing_id={listing_id} уже существует в БД, пропускаем")
+                    continue
                 found_count += 1
                 logger.info(f"   ✅ Предмет добавлен для сохранения: {item_name} (${price:.2f})")
                 if task_logger:
                     task_logger.info(f"   ✅ Предмет добавлен для сохранения: {item_name} (${price:.2f})")
             except Exception as add_error:
-                logger.error(f"   ❌ Ошибка при добавлении предмета {item_name} в сессию: {add_error}")
+                logger.error(f"   ❌ Ошибка при добавлении предмета {item_name}: {add_error}")
                 if task_logger:
-                    task_logger.error(f"   ❌ Ошибка при добавлении предмета {item_name} в сессию: {add_error}")
+                    task_logger.error(f"   ❌ Ошибка при добавлении предмета {item_name}: {add_error}")
                 import traceback
                 logger.error(f"   Traceback: {traceback.format_exc()}")
                 if task_logger:
@@ -271,7 +227,7 @@ class ResultsProcessorService:
                 "item_name": found_item.item_name,
                 "price": found_item.price,
                 "market_url": found_item.market_url,
-                "item_data_json": found_item.item_data_json,
+                "item_data_json": item_data_to_text(found_item.item_data_json),
                 "task_name": task.name
             }
             logger.info(f"📤 ResultsProcessor: Публикуем уведомление для предмета {found_item.id} ({found_item.item_name}, ${found_item.price:.2f})")
@@ -0,0 +1,242 @@
+"""
+Вероятностный фильтр уже сохраненных лотов задачи в Redis.
+
+Для каждой задачи хранятся:
+- фильтр Блума - битовая карта Redis (seen:{task_id}:bloom), размер и число
+  хэш-функций рассчитываются по SEEN_FILTER_CAPACITY и допустимой доле ложных
+  срабатываний SEEN_FILTER_FP_RATE;
+- точное множество недавних лотов - sorted set (seen:{task_id}:recent,
+  score - время добавления), хранится SEEN_FILTER_RECENT_WINDOW секунд.
+
+Лот считается сохраненным, если он есть в недавнем множестве или фильтр
+Блума отвечает "возможно" (ложное срабатывание - пропуск нового лота с
+вероятностью SEEN_FILTER_FP_RATE). Проверка всей страницы - один пайплайн
+(ZMSCORE + BITFIELD GET) без обращения к Postgres.
+
+Фильтр Блума не поддерживает удаление, поэтому он пересобирается из
+found_items (rebuild), если ключа нет - например, после истечения TTL или
+удаления задачи.
+"""
+import hashlib
+import math
+import time
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+from loguru import logger
+from sqlalchemy import select
+
+from core.config import Config
+from core.database import FoundItem
+
+
+KEY_PREFIX = "seen"
+
+
+def bloom_parameters(capacity: int, fp_rate: float) -> Tuple[int, int]:
+    """
+    Размер фильтра Блума в битах и число хэш-функций.
+
+    Args:
+        capacity: Ожидаемое количество элементов
+        fp_rate: Допустимая доля ложных срабатываний (0 < fp_rate < 1)
+
+    Returns:
+        (m - бит, k - хэш-функций)
+    """
+    capacity = max(1, capacity)
+    fp_rate = min(max(fp_rate, 1e-9), 0.5)
+    bits = math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2))
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+def bloom_positions(listing_id: str, bits: int, hashes: int) -> List[int]:
+    """Номера бит лота (двойное хэширование от blake2b)."""
+    digest = hashlib.blake2b(str(listing_id).encode(), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    return [(h1 + i * h2) % bits for i in range(hashes)]
+
+
+class SeenListings:
+    """Фильтр сохраненных лотов задач: Блум + точное недавнее множество."""
+
+    def __init__(
+        self,
+        capacity: Optional[int] = None,
+        fp_rate: Optional[float] = None,
+        recent_window: Optional[int] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Args:
+            capacity: Ожидаемое количество сохраненных лотов задачи (по умолчанию SEEN_FILTER_CAPACITY)
+            fp_rate: Доля ложных срабатываний (по умолчанию SEEN_FILTER_FP_RATE)
+            recent_window: Сколько секунд хранить точное множество (по умолчанию SEEN_FILTER_RECENT_WINDOW)
+            clock: Источник времени
+        """
+        self.bits, self.hashes = bloom_parameters(
+            capacity or Config.SEEN_FILTER_CAPACITY,
+            fp_rate or Config.SEEN_FILTER_FP_RATE
+        )
+        self.recent_window = recent_window or Config.SEEN_FILTER_RECENT_WINDOW
+        self._clock = clock
+        self.checked = 0
+        self.skipped = 0
+        self.rebuilds = 0
+
+    @staticmethod
+    def _keys(task_id: int) -> Tuple[str, str]:
+        return f"{KEY_PREFIX}:{task_id}:bloom", f"{KEY_PREFIX}:{task_id}:recent"
+
+    @staticmethod
+    def _ready(redis_service) -> bool:
+        return redis_service is not None and redis_service.is_connected() and getattr(redis_service, "_client", None) is not None
+
+    def _expire(self) -> int:
+        # Ключи задачи живут, пока она проверяется; окно недавнего множества не меньше суток
+        return max(self.recent_window, 86400) * 2
+
+    async def contains_many(self, redis_service, task_id: int, listing_ids: Iterable) -> Set[str]:
+        """
+        Возвращает лоты страницы, которые уже сохранены для задачи (одним пайплайном).
+
+        Args:
+            redis_service: Сервис Redis
+            task_id: ID задачи
+            listing_ids: listing_id лотов страницы
+
+        Returns:
+            Множество listing_id (строки), которые можно пропустить
+        """
+        ids = [str(listing_id) for listing_id in dict.fromkeys(listing_ids) if listing_id]
+        if not ids or not self._ready(redis_service):
+            return set()
+        bloom_key, recent_key = self._keys(task_id)
+        bitfield_args = []
+        for listing_id in ids:
+            for position in bloom_positions(listing_id, self.bits, self.hashes):
+                bitfield_args.extend(("GET", "u1", position))
+        try:
+            pipe = redis_service._client.pipeline(transaction=False)
+            pipe.exists(bloom_key)
+            pipe.execute_command("ZMSCORE", recent_key, *ids)
+            pipe.execute_command("BITFIELD", bloom_key, *bitfield_args)
+            has_bloom, recent_scores, bloom_bits = await pipe.execute()
+        except Exception as e:
+            logger.debug(f"⚠️ SeenListings: Ошибка проверки лотов задачи {task_id}: {e}")
+            return set()
+
+        seen = {listing_id for listing_id, score in zip(ids, recent_scores or ()) if score is not None}
+        if has_bloom:
+            for index, listing_id in enumerate(ids):
+                chunk = bloom_bits[index * self.hashes:(index + 1) * self.hashes]
+                if chunk and all(chunk):
+                    seen.add(listing_id)
+        self.checked += len(ids)
+        self.skipped += len(seen)
+        return seen
+
+    async def add_many(self, redis_service, task_id: int, listing_ids: Iterable) -> None:
+        """
+        Отмечает лоты задачи как сохраненные.
+
+        Args:
+            redis_service: Сервис Redis
+            task_id: ID задачи
+            listing_ids: listing_id сохраненных лотов
+        """
+        ids = [str(listing_id) for listing_id in dict.fromkeys(listing_ids) if listing_id]
+        if not ids or not self._ready(redis_service):
+            return
+        bloom_key, recent_key = self._keys(task_id)
+        now = self._clock()
+        bitfield_args = []
+        for listing_id in ids:
+            for position in bloom_positions(listing_id, self.bits, self.hashes):
+                bitfield_args.extend(("SET", "u1", position, 1))
+        try:
+            pipe = redis_service._client.pipeline(transaction=False)
+            pipe.execute_command("BITFIELD", bloom_key, *bitfield_args)
+            pipe.zadd(recent_key, {listing_id: now for listing_id in ids})
+            pipe.zremrangebyscore(recent_key, "-inf", now - self.recent_window)
+            pipe.expire(bloom_key, self._expire())
+            pipe.expire(recent_key, self._expire())
+            await pipe.execute()
+        except Exception as e:
+            logger.debug(f"⚠️ SeenListings: Ошибка записи лотов задачи {task_id}: {e}")
+
+    def build_bitmap(self, listing_ids: Iterable) -> bytes:
+        """Битовая карта фильтра Блума в формате Redis (бит 0 - старший бит первого байта)."""
+        bitmap = bytearray(math.ceil(self.bits / 8))
+        for listing_id in listing_ids:
+            for position in bloom_positions(str(listing_id), self.bits, self.hashes):
+                bitmap[position >> 3] |= 0x80 >> (position & 7)
+        return bytes(bitmap)
+
+    async def rebuild(self, redis_service, task_id: int, db_session) -> int:
+        """
+        Пересобирает фильтр Блума задачи из found_items.
+
+        Args:
+            redis_service: Сервис Redis
+            task_id: ID задачи
+            db_session: Сессия БД
+
+        Returns:
+            Количество лотов в фильтре
+        """
+        if not self._ready(redis_service):
+            return 0
+        result = await db_session.execute(
+            select(FoundItem.listing_id).where(FoundItem.task_id == task_id, FoundItem.listing_id.is_not(None))
+        )
+        listing_ids = list(result.scalars().all())
+        bloom_key, _ = self._keys(task_id)
+        temp_key = f"{bloom_key}:rebuild"
+        try:
+            pipe = redis_service._client.pipeline(transaction=True)
+            pipe.set(temp_key, self.build_bitmap(listing_ids), ex=self._expire())
+            pipe.rename(temp_key, bloom_key)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"⚠️ SeenListings: Не удалось пересобрать фильтр задачи {task_id}: {e}")
+            return 0
+        self.rebuilds += 1
+        logger.info(f"🧮 SeenListings: Фильтр задачи {task_id} пересобран из БД ({len(listing_ids)} лотов)")
+        return len(listing_ids)
+
+    async def ensure(self, redis_service, task_id: int, db_session) -> None:
+        """Пересобирает фильтр задачи, если его нет в Redis."""
+        if not self._ready(redis_service) or db_session is None:
+            return
+        bloom_key, _ = self._keys(task_id)
+        try:
+            if await redis_service._client.exists(bloom_key):
+                return
+            await self.rebuild(redis_service, task_id, db_session)
+        except Exception as e:
+            logger.warning(f"⚠️ SeenListings: Ошибка проверки фильтра задачи {task_id}: {e}")
+
+    async def reset(self, redis_service, task_id: int) -> None:
+        """Удаляет фильтр задачи (например, при удалении задачи)."""
+        if not self._ready(redis_service):
+            return
+        try:
+            await redis_service._client.delete(*self._keys(task_id))
+        except Exception as e:
+            logger.debug(f"⚠️ SeenListings: Ошибка удаления фильтра задачи {task_id}: {e}")
+
+    def stats(self) -> dict:
+        """Счетчики фильтра."""
+        return {
+            "bits": self.bits,
+            "hashes": self.hashes,
+            "checked": self.checked,
+            "skipped": self.skipped,
+            "rebuilds": self.rebuilds
+        }
+
+
+# Общий фильтр процесса
+seen_listings = SeenListings()
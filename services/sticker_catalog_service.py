@@ -0,0 +1,376 @@
+"""
+Локальный каталог цен наклеек.
+
+Цены всех наклеек периодически загружаются пачками через поиск Steam Market
+(search/render по категории наклеек, по 100 лотов на страницу) и сохраняются
+в таблицу sticker_catalog. Процессы держат каталог в памяти, поэтому фильтр
+наклеек получает цены без сетевых запросов; живой запрос к Steam
+(priceoverview/страница предмета/подсказки) выполняется только для наклеек,
+которых нет в каталоге или чья запись устарела.
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from core.config import Config
+from core.database import DatabaseManager, StickerCatalogEntry
+from core.utils.sticker_name_matcher import StickerNameIndex
+
+
+STEAM_MARKET_SEARCH_URL = "https://steamcommunity.com/market/search/render/"
+STICKER_CATEGORY_TAG = "tag_CSGO_Tool_Sticker"
+# Только один процесс обходит поиск Steam, остальные перечитывают таблицу
+REFRESH_LOCK_KEY = "sticker_catalog:refresh_lock"
+_STICKER_PREFIX = "sticker |"
+
+
+def normalize_sticker_name(name: str) -> str:
+    """
+    Нормализует название наклейки для поиска в каталоге.
+
+    Args:
+        name: Название наклейки (с префиксом 'Sticker |' или без него)
+
+    Returns:
+        Название без префикса в нижнем регистре
+    """
+    normalized = " ".join((name or "").split()).lower()
+    if normalized.startswith(_STICKER_PREFIX):
+        normalized = normalized[len(_STICKER_PREFIX):].strip()
+    return normalized
+
+
+def parse_search_results(data: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Разбирает ответ search/render (norender=1).
+
+    Args:
+        data: JSON ответа
+
+    Returns:
+        (строки каталога, total_count)
+    """
+    rows = []
+    for result in data.get("results") or ():
+        name = result.get("hash_name") or result.get("name")
+        if not name:
+            continue
+        sell_price = result.get("sell_price")
+        try:
+            price = int(sell_price) / 100.0 if sell_price else None
+        except (ValueError, TypeError):
+            price = None
+        try:
+            volume = int(result.get("sell_listings") or 0)
+        except (ValueError, TypeError):
+            volume = 0
+        rows.append({
+            "name": name,
+            "normalized_name": normalize_sticker_name(name),
+            "price": price,
+            "volume": volume
+        })
+    try:
+        total_count = int(data.get("total_count") or 0)
+    except (ValueError, TypeError):
+        total_count = 0
+    return rows, total_count
+
+
+class StickerCatalogService:
+    """Каталог цен наклеек: таблица sticker_catalog + копия в памяти процесса."""
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        proxy_manager=None,
+        redis_service=None,
+        appid: int = 730,
+        currency: int = 1
+    ):
+        """
+        Args:
+            db_manager: Менеджер БД
+            proxy_manager: Менеджер прокси для запросов к Steam (опционально)
+            redis_service: Сервис Redis для блокировки обновления между процессами (опционально)
+            appid: ID приложения
+            currency: Валюта
+        """
+        self.db_manager = db_manager
+        self.proxy_manager = proxy_manager
+        self.redis_service = redis_service
+        self.appid = appid
+        self.currency = currency
+        # normalized_name -> (цена, время обновления в секундах)
+        self._prices: Dict[str, Tuple[Optional[float], float]] = {}
+        self._loaded_at: Optional[float] = None
+        # Индекс гибкого сопоставления строится заново только при изменении набора названий
+        self._name_index: Optional[StickerNameIndex] = None
+        # Максимальная цена в каталоге (пересчитывается при изменении цен)
+        self._ceiling: Optional[float] = None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._prices)
+
+    async def load(self) -> int:
+        """
+        Загружает каталог из БД в память.
+
+        Returns:
+            Количество загруженных наклеек
+        """
+        session = await self.db_manager.get_session()
+        try:
+            result = await session.execute(
+                select(
+                    StickerCatalogEntry.normalized_name,
+                    StickerCatalogEntry.price,
+                    StickerCatalogEntry.updated_at
+                ).where(
+                    StickerCatalogEntry.appid == self.appid,
+                    StickerCatalogEntry.currency == self.currency
+                )
+            )
+            prices = {
+                normalized_name: (price, updated_at.timestamp() if updated_at else 0.0)
+                for normalized_name, price, updated_at in result.all()
+            }
+        finally:
+            await session.close()
+        if prices.keys() != self._prices.keys():
+            self._name_index = None
+        self._prices = prices
+        self._ceiling = None
+        self._loaded_at = time.time()
+        logger.info(f"📚 StickerCatalog: Загружено {len(self._prices)} наклеек из каталога")
+        return len(self._prices)
+
+    def lookup(self, sticker_names: Iterable[str], appid: int = 730, currency: int = 1) -> Dict[str, float]:
+        """
+        Возвращает цены наклеек, которые есть в каталоге и не устарели.
+
+        Args:
+            sticker_names: Названия наклеек
+            appid: ID приложения
+            currency: Валюта
+
+        Returns:
+            Словарь {название: цена} только для найденных наклеек
+        """
+        if appid != self.appid or currency != self.currency or not self._prices:
+            return {}
+        oldest = time.time() - Config.STICKER_CATALOG_MAX_AGE
+        found = {}
+        for name in sticker_names:
+            entry = self._prices.get(normalize_sticker_name(name))
+            if entry is not None and entry[0] is not None and entry[1] >= oldest:
+                found[name] = entry[0]
+                self.hits += 1
+            else:
+                self.misses += 1
+        return found
+
+    def match(
+        self,
+        sticker_name: str,
+        appid: int = 730,
+        currency: int = 1,
+        min_similarity: float = 0.7
+    ) -> Optional[Tuple[str, float]]:
+        """
+        Гибкое сопоставление названия с каталогом (для наклеек, не найденных точно).
+
+        Args:
+            sticker_name: Название наклейки
+            appid: ID приложения
+            currency: Валюта
+            min_similarity: Минимальный коэффициент схожести
+
+        Returns:
+            (название в каталоге, цена) или None
+        """
+        if appid != self.appid or currency != self.currency or not self._prices:
+            return None
+        if self._name_index is None:
+            self._name_index = StickerNameIndex(self._prices)
+        match = self._name_index.best_match(normalize_sticker_name(sticker_name), min_similarity)
+        if match is None:
+            return None
+        matched_name = match[0]
+        price, updated_at = self._prices[matched_name]
+        if price is None or updated_at < time.time() - Config.STICKER_CATALOG_MAX_AGE:
+            return None
+        return matched_name, price
+
+    def price_ceiling(self, appid: int = 730, currency: int = 1) -> Optional[float]:
+        """
+        Максимальная цена наклейки в каталоге (верхняя граница цены любой наклейки).
+
+        Args:
+            appid: ID приложения
+            currency: Валюта
+
+        Returns:
+            Максимальная цена или None, если каталог пуст или для другой валюты
+        """
+        if appid != self.appid or currency != self.currency or not self._prices:
+            return None
+        if self._ceiling is None:
+            self._ceiling = max((price for price, _ in self._prices.values() if price is not None), default=None)
+        return self._ceiling
+
+    def is_stale(self) -> bool:
+        """Каталог пуст или самая свежая запись старше интервала обновления."""
+        if not self._prices:
+            return True
+        newest = max(updated_at for _, updated_at in self._prices.values())
+        return time.time() - newest > Config.STICKER_CATALOG_REFRESH_INTERVAL
+
+    async def _fetch_page(self, start: int, count: int) -> Optional[Dict[str, Any]]:
+        """Загружает одну страницу поиска наклеек (с переключением прокси при ошибках)."""
+        params = {
+            "query": "",
+            "start": start,
+            "count": count,
+            "search_descriptions": 0,
+            "sort_column": "name",
+            "sort_dir": "asc",
+            "appid": self.appid,
+            "currency": self.currency,
+            "norender": 1,
+            f"category_{self.appid}_Type[]": STICKER_CATEGORY_TAG
+        }
+        headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+            "Accept": "application/json",
+            "Referer": "https://steamcommunity.com/market/",
+        }
+        for attempt in range(3):
+            proxy_obj = None
+            if self.proxy_manager:
+                proxy_obj = await self.proxy_manager.get_next_proxy(force_refresh=(attempt > 0))
+            try:
+                async with httpx.AsyncClient(proxy=proxy_obj.url if proxy_obj else None, timeout=20) as client:
+                    response = await client.get(STEAM_MARKET_SEARCH_URL, params=params, headers=headers)
+                if response.status_code == 200:
+                    data = response.json()
+                    if data and data.get("success"):
+                        if proxy_obj:
+                            await self.proxy_manager.mark_proxy_used(proxy_obj, success=True)
+                        return data
+                is_429 = response.status_code == 429
+                logger.warning(f"⚠️ StickerCatalog: Страница start={start} вернула статус {response.status_code}")
+                if proxy_obj:
+                    await self.proxy_manager.mark_proxy_used(
+                        proxy_obj,
+                        success=False,
+                        error=f"HTTP {response.status_code}",
+                        is_429_error=is_429
+                    )
+            except Exception as e:
+                logger.warning(f"⚠️ StickerCatalog: Ошибка при загрузке страницы start={start}: {type(e).__name__}: {e}")
+                if proxy_obj:
+                    await self.proxy_manager.mark_proxy_used(proxy_obj, success=False, error=str(e)[:200])
+            await asyncio.sleep(Config.STICKER_CATALOG_PAGE_DELAY)
+        return None
+
+    async def _upsert(self, rows: List[Dict[str, Any]]) -> None:
+        """Сохраняет страницу каталога одним INSERT ... ON CONFLICT."""
+        if not rows:
+            return
+        now = datetime.now()
+        values = [dict(row, appid=self.appid, currency=self.currency, updated_at=now) for row in rows]
+        stmt = insert(StickerCatalogEntry).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StickerCatalogEntry.name],
+            set_={
+                "normalized_name": stmt.excluded.normalized_name,
+                "price": stmt.excluded.price,
+                "volume": stmt.excluded.volume,
+                "updated_at": stmt.excluded.updated_at
+            }
+        )
+        session = await self.db_manager.get_session()
+        try:
+            await session.execute(stmt)
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+        for row in rows:
+            if row["normalized_name"] not in self._prices:
+                self._name_index = None
+            self._prices[row["normalized_name"]] = (row["price"], now.timestamp())
+        self._ceiling = None
+
+    async def refresh(self) -> int:
+        """
+        Обходит поиск Steam Market по категории наклеек и обновляет каталог.
+
+        Returns:
+            Количество обновленных наклеек
+        """
+        page_size = Config.STICKER_CATALOG_PAGE_SIZE
+        start = 0
+        total_count = None
+        updated = 0
+        started = time.monotonic()
+        logger.info(f"🔄 StickerCatalog: Начинаем обновление каталога (по {page_size} на страницу)")
+        while total_count is None or start < total_count:
+            data = await self._fetch_page(start, page_size)
+            if data is None:
+                logger.warning(f"⚠️ StickerCatalog: Обновление прервано на start={start}, обновлено {updated} наклеек")
+                break
+            rows, total_count = parse_search_results(data)
+            if not rows:
+                break
+            await self._upsert(rows)
+            updated += len(rows)
+            start += len(rows)
+            await asyncio.sleep(Config.STICKER_CATALOG_PAGE_DELAY)
+        logger.info(
+            f"✅ StickerCatalog: Обновлено {updated}/{total_count or 0} наклеек за {time.monotonic() - started:.0f}с"
+        )
+        return updated
+
+    async def _try_acquire_refresh_lock(self) -> bool:
+        """Блокировка обновления между процессами (без Redis обновляет каждый процесс)."""
+        if not self.redis_service or not self.redis_service.is_connected():
+            return True
+        try:
+            return bool(await self.redis_service._client.set(
+                REFRESH_LOCK_KEY, "1", nx=True, ex=Config.STICKER_CATALOG_REFRESH_INTERVAL
+            ))
+        except Exception as e:
+            logger.warning(f"⚠️ StickerCatalog: Не удалось получить блокировку обновления: {e}")
+            return False
+
+    async def run(self, check_interval: float = 600.0) -> None:
+        """
+        Фоновый цикл: перечитывает каталог из БД и обновляет его, когда он устарел.
+
+        Args:
+            check_interval: Интервал проверки в секундах
+        """
+        while True:
+            try:
+                if self._loaded_at is None or time.time() - self._loaded_at >= check_interval:
+                    await self.load()
+                if self.is_stale() and await self._try_acquire_refresh_lock():
+                    await self.refresh()
+                logger.debug(f"📚 StickerCatalog: Попаданий={self.hits}, промахов={self.misses}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ StickerCatalog: Ошибка фонового обновления: {type(e).__name__}: {e}")
+            await asyncio.sleep(check_interval)
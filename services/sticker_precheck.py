@@ -0,0 +1,181 @@
+"""
+Ранний отсев лотов по фильтру наклеек без запроса цен наклеек.
+
+Фильтр наклеек требует суммарную цену наклеек P не меньше min_stickers_price
+(и total_stickers_price_min), а формула S = D + (P * x) - коэффициент
+переплаты x = (S - D) / P не больше max_overpay_coefficient. Все условия
+монотонны по P, поэтому достаточно верхней границы P:
+- цены наклеек, которые есть в локальном каталоге, известны точно (их же
+  вернет и полный запрос цен);
+- для остальных берется максимальная цена каталога с запасом
+  STICKER_PRECHECK_MARGIN.
+
+Если даже при такой P лот не проходит фильтр, цены наклеек не запрашиваются.
+Без каталога граница неизвестна и лот проверяется как раньше.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.config import Config
+from core.models import SearchFilters, StickersFilter
+from parsers.sticker_prices import StickerPricesAPI
+
+
+def sticker_names_of(stickers) -> List[str]:
+    """Названия наклеек лота (name или wear), как их передают в запрос цен."""
+    names = []
+    for sticker in stickers or ():
+        name = getattr(sticker, "name", None) or getattr(sticker, "wear", None)
+        if name:
+            names.append(name)
+    return names
+
+
+class StickerPrecheck:
+    """Проверка "лот гарантированно не пройдет фильтр наклеек" и ее счетчики."""
+
+    __slots__ = ("checked", "rejected", "saved_lookups")
+
+    def __init__(self):
+        self.checked = 0
+        self.rejected = 0
+        # Наклейки, цены которых не пришлось запрашивать (нет в каталоге)
+        self.saved_lookups = 0
+
+    def stickers_price_ceiling(
+        self,
+        sticker_names: List[str],
+        catalog,
+        appid: int = 730,
+        currency: int = 1
+    ) -> Optional[Tuple[float, int]]:
+        """
+        Верхняя граница суммарной цены наклеек.
+
+        Args:
+            sticker_names: Названия наклеек лота
+            catalog: Каталог цен наклеек (StickerCatalogService) или None
+            appid: ID приложения
+            currency: Валюта
+
+        Returns:
+            (граница P, количество наклеек не из каталога) или None, если границу нельзя оценить без запросов
+        """
+        if catalog is None:
+            return None
+        ceiling = catalog.price_ceiling(appid, currency)
+        if ceiling is None:
+            return None
+        known = catalog.lookup(sticker_names, appid, currency)
+        unknown = sum(1 for name in sticker_names if name not in known)
+        return sum(known.values()) + unknown * ceiling * Config.STICKER_PRECHECK_MARGIN, unknown
+
+    def reject_reason(
+        self,
+        sticker_names: List[str],
+        stickers_filter: StickersFilter,
+        item_price: Optional[float],
+        base_price: Optional[float],
+        catalog,
+        appid: int = 730,
+        currency: int = 1
+    ) -> Optional[str]:
+        """
+        Проверяет, может ли лот пройти фильтр наклеек хотя бы при максимальных ценах.
+
+        Args:
+            sticker_names: Названия наклеек лота
+            stickers_filter: Фильтр наклеек задачи
+            item_price: Цена лота (S)
+            base_price: Базовая цена предмета (D), если уже известна без запроса
+            catalog: Каталог цен наклеек или None
+            appid: ID приложения
+            currency: Валюта
+
+        Returns:
+            Причина отказа или None, если лот нужно проверить с ценами наклеек
+        """
+        if not sticker_names:
+            return None
+        needs_bound = (
+            stickers_filter.min_stickers_price is not None
+            or stickers_filter.total_stickers_price_min is not None
+            or (stickers_filter.max_overpay_coefficient is not None and item_price is not None and base_price is not None)
+        )
+        if not needs_bound:
+            return None
+        self.checked += 1
+        bound = self.stickers_price_ceiling(sticker_names, catalog, appid, currency)
+        if bound is None:
+            return None
+        ceiling, unknown = bound
+
+        reason = None
+        for minimum in (stickers_filter.min_stickers_price, stickers_filter.total_stickers_price_min):
+            if minimum is not None and ceiling < minimum:
+                reason = f"наклейки стоят не больше ${ceiling:.2f}, фильтр ${minimum:.2f}"
+                break
+        coefficient = stickers_filter.max_overpay_coefficient
+        if reason is None and coefficient is not None and item_price is not None and base_price is not None:
+            # x = (S - D) / P > coefficient при любой P <= ceiling
+            if item_price - base_price > coefficient * ceiling:
+                reason = (
+                    f"S=${item_price:.2f} > D + P*x = ${base_price:.2f} + ${ceiling:.2f}*{coefficient:.4f} "
+                    f"при максимальной цене наклеек"
+                )
+        if reason is None:
+            return None
+
+        self.rejected += 1
+        self.saved_lookups += unknown
+        return reason
+
+    def check_listing(self, parsed_data, item: Dict[str, Any], filters: SearchFilters, base_price_manager=None) -> Optional[str]:
+        """
+        Проверяет лот перед запросом цен наклеек.
+
+        Граница цены наклеек берется из каталога StickerPricesAPI.catalog,
+        базовая цена (D) - только из кэша base_price_manager.
+
+        Args:
+            parsed_data: Распарсенные данные лота (ParsedItemData или ListingRecord)
+            item: Данные предмета (sell_price_text, если у лота нет цены)
+            filters: Фильтры задачи
+            base_price_manager: Менеджер базовых цен (опционально)
+
+        Returns:
+            Причина отказа или None, если нужно запросить цены и проверить полностью
+        """
+        if not Config.STICKER_PRECHECK_ENABLED or not filters.stickers_filter or not parsed_data.stickers:
+            return None
+
+        item_price = parsed_data.item_price
+        if item_price is None:
+            price_text = item.get("sell_price_text", "").replace("$", "").replace(",", "").strip()
+            try:
+                item_price = float(price_text)
+            except (ValueError, AttributeError):
+                item_price = None
+
+        catalog = StickerPricesAPI.catalog
+        if catalog is None:
+            return None
+        base_price = None
+        if filters.stickers_filter.max_overpay_coefficient is not None and base_price_manager is not None:
+            base_price = base_price_manager.get_cached_price(filters.item_name, filters.appid)
+
+        return self.reject_reason(
+            sticker_names_of(parsed_data.stickers),
+            filters.stickers_filter,
+            item_price,
+            base_price,
+            catalog,
+            appid=filters.appid
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики раннего отсева."""
+        return {"checked": self.checked, "rejected": self.rejected, "saved_lookups": self.saved_lookups}
+
+
+# Общие счетчики процесса
+sticker_precheck = StickerPrecheck()
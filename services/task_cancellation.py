@@ -0,0 +1,216 @@
+"""
+Канал отмены задач мониторинга через Redis Pub/Sub.
+
+MonitoringService публикует событие в канал task_cancellation, когда задачу
+выключают, включают или удаляют (в том числе из Telegram). В каждом процессе
+один подписчик (TaskCancellation.run) обновляет локальные токены отмены, а
+парсинг перед страницей или предметом проверяет флаг токена в памяти вместо
+запроса MonitoringTask.is_active к БД.
+
+Если Redis недоступен или канал выключен (TASK_CANCELLATION_ENABLED=false),
+подписчик не слушает и is_cancelled читает статус задачи из БД, как раньше.
+"""
+import asyncio
+from typing import Dict, Optional
+
+from loguru import logger
+from sqlalchemy import select
+
+from core.config import Config
+from core.database import MonitoringTask
+from core.utils import payload_codec
+
+
+CANCEL_CHANNEL = "task_cancellation"
+
+ACTION_DEACTIVATED = "deactivated"
+ACTION_ACTIVATED = "activated"
+ACTION_DELETED = "deleted"
+
+
+class CancellationToken:
+    """Флаг отмены одной задачи."""
+
+    __slots__ = ("task_id", "_event")
+
+    def __init__(self, task_id: int):
+        self.task_id = task_id
+        self._event = asyncio.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    async def wait(self, timeout: float) -> bool:
+        """
+        Ждет отмены не дольше timeout секунд (прерываемая пауза).
+
+        Returns:
+            True, если задача отменена
+        """
+        if not self._event.is_set() and timeout > 0:
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._event.is_set()
+
+
+class TaskCancellation:
+    """Токены отмены задач процесса и подписчик канала отмены."""
+
+    def __init__(self):
+        self._tokens: Dict[int, CancellationToken] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self.listening = False
+        self.received = 0
+
+    def token(self, task_id: int) -> CancellationToken:
+        """Токен задачи (создается при первом обращении)."""
+        token = self._tokens.get(task_id)
+        if token is None:
+            token = self._tokens[task_id] = CancellationToken(task_id)
+        return token
+
+    def finish(self, task_id: int, token: Optional[CancellationToken] = None) -> None:
+        """
+        Убирает токен завершенного запуска проверки задачи из реестра.
+
+        Args:
+            task_id: ID задачи
+            token: Токен запуска (если задачу уже перезапустили с новым токеном, он не трогается)
+        """
+        if token is None or self._tokens.get(task_id) is token:
+            self._tokens.pop(task_id, None)
+
+    def start(self, task_id: int) -> CancellationToken:
+        """Новый токен для запуска проверки задачи, статус которой только что прочитан из БД."""
+        token = self._tokens[task_id] = CancellationToken(task_id)
+        return token
+
+    def finish(self, task_id: int, token: Optional[CancellationToken] = None) -> None:
+        """
+        Убирает токен завершенного запуска проверки задачи из реестра.
+
+        Args:
+            task_id: ID задачи
+            token: Токен запуска (если задачу уже перезапустили с новым токеном, он не трогается)
+        """
+        if token is None or self._tokens.get(task_id) is token:
+            self._tokens.pop(task_id, None)
+
+    def apply(self, message: Dict) -> None:
+        """
+        Применяет событие канала отмены.
+
+        Args:
+            message: {"task_id": int, "action": "deactivated" | "activated" | "deleted"}
+        """
+        task_id = message.get("task_id")
+        if task_id is None:
+            return
+        task_id = int(task_id)
+        action = message.get("action")
+        if action == ACTION_DEACTIVATED:
+            self.token(task_id).cancel()
+            logger.info(f"🛑 TaskCancellation: Задача {task_id} отменена ({action})")
+        elif action == ACTION_DELETED:
+            # Текущие проверки держат отмененный токен, задача больше не вернется
+            token = self._tokens.pop(task_id, None)
+            if token is not None:
+                token.cancel()
+            logger.info(f"🛑 TaskCancellation: Задача {task_id} отменена ({action})")
+        elif action == ACTION_ACTIVATED:
+            # Текущие проверки держат старый токен, новые получат неотмененный
+            self._tokens.pop(task_id, None)
+
+    async def publish(self, redis_service, task_id: int, action: str) -> None:
+        """
+        Отменяет задачу в текущем процессе и рассылает событие остальным.
+
+        Args:
+            redis_service: Сервис Redis (может быть None)
+            task_id: ID задачи
+            action: deactivated, activated или deleted
+        """
+        message = {"task_id": task_id, "action": action}
+        self.apply(message)
+        if not Config.TASK_CANCELLATION_ENABLED or redis_service is None or not redis_service.is_connected():
+            return
+        await redis_service.publish(CANCEL_CHANNEL, message)
+
+    async def is_cancelled(self, task_id: int, db_session=None) -> bool:
+        """
+        Отменена ли задача.
+
+        Пока подписчик слушает канал, ответ берется из токена в памяти;
+        иначе статус задачи читается из БД (ошибки запроса пробрасываются).
+
+        Args:
+            task_id: ID задачи
+            db_session: Сессия БД для проверки без канала отмены
+        """
+        token = self.token(task_id)
+        if token.cancelled:
+            return True
+        if self.listening or db_session is None:
+            return False
+        result = await db_session.execute(
+            select(MonitoringTask.is_active).where(MonitoringTask.id == task_id)
+        )
+        if result.scalar_one_or_none() is False:
+            token.cancel()
+            return True
+        return False
+
+    def start_listener(self, redis_service) -> Optional[asyncio.Task]:
+        """
+        Запускает подписчика, если в процессе он еще не запущен.
+
+        Returns:
+            Задача подписчика (ее останавливает тот, кто запустил) или None
+        """
+        if self._listener is not None and not self._listener.done():
+            return None
+        self._listener = asyncio.create_task(self.run(redis_service))
+        return self._listener
+
+    async def run(self, redis_service) -> None:
+        """Подписчик канала отмены (одна фоновая задача на процесс)."""
+        while True:
+            pubsub = None
+            try:
+                if redis_service is None or not redis_service.is_connected() or getattr(redis_service, "_client", None) is None:
+                    await asyncio.sleep(5)
+                    continue
+                pubsub = redis_service._client.pubsub()
+                await pubsub.subscribe(CANCEL_CHANNEL)
+                self.listening = True
+                logger.info(f"📥 TaskCancellation: Подписка на канал '{CANCEL_CHANNEL}'")
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message and message.get("type") == "message":
+                        try:
+                            self.apply(payload_codec.decode(message["data"]))
+                            self.received += 1
+                        except (ValueError, TypeError) as e:
+                            logger.warning(f"⚠️ TaskCancellation: Некорректное сообщение: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ TaskCancellation: Ошибка подписки, проверка статуса через БД: {e}")
+                await asyncio.sleep(5)
+            finally:
+                self.listening = False
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except Exception:
+                        pass
+
+
+# Общие токены процесса
+task_cancellation = TaskCancellation()
@@ -0,0 +1,448 @@
+"""
+Индекс активных задач для проверки одного лота сразу по всем задачам предмета.
+
+Когда один и тот же предмет отслеживают десятки задач с разными окнами float,
+списками паттернов и потолками цены, проверка лота задача за задачей линейна.
+Индекс группирует задачи по нормализованному названию предмета и для каждой
+группы хранит:
+- отсортированные границы диапазонов float и pattern_range (элементарные
+  отрезки с заранее посчитанным набором покрывающих задач);
+- обратный индекс паттерн -> задачи для pattern_list;
+- задачи, упорядоченные по max_price.
+
+По одному лоту возвращается набор задач-кандидатов за O(log n + k). Кандидаты -
+это задачи, у которых пройдены цена, паттерн, float, название и тип предмета;
+наклейки проверяются FilterService для каждой задачи отдельно.
+
+Индекс держит каждый процесс, который проверяет лоты (ParsingWorker и
+MonitoringService для проверок без RabbitMQ). MonitoringService при добавлении,
+изменении и удалении задачи публикует событие в канал task_match_index, и
+подписчик каждого процесса (TaskMatchIndex.run) применяет его инкрементально:
+перестраивается только группа затронутого предмета. Pub/Sub не хранит
+сообщения, поэтому подписчик загружает активные задачи из БД при подключении и
+раз в TASK_MATCH_INDEX_REFRESH секунд.
+
+Пайплайн лотов (parallel_listing_pipeline) по кандидатам индекса проверяет лоты
+страницы одной задачи сразу для всех остальных задач того же предмета.
+"""
+import asyncio
+import json
+from bisect import bisect_left
+from threading import Lock
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from loguru import logger
+from sqlalchemy import select
+
+from core.config import Config
+from core.database import MonitoringTask
+from core.models import SearchFilters
+from core.utils import payload_codec
+from services.filter_plan import FilterPlan, filter_plan_cache, normalize_item_name
+
+
+INDEX_CHANNEL = "task_match_index"
+
+ACTION_UPSERT = "upsert"
+ACTION_REMOVE = "remove"
+
+
+def index_filters(task: MonitoringTask) -> Optional[SearchFilters]:
+    """
+    Фильтры задачи для индекса (как их собирает ParsingWorker) или None, если их не разобрать.
+
+    Args:
+        task: Задача мониторинга
+    """
+    try:
+        filters_json = task.filters_json
+        if isinstance(filters_json, str):
+            filters_json = json.loads(filters_json)
+        filters = SearchFilters.model_validate({**(filters_json or {}), "item_name": task.item_name})
+        filters.appid = task.appid
+        filters.currency = task.currency
+        return filters
+    except Exception as e:
+        logger.warning(f"⚠️ TaskMatchIndex: Не удалось загрузить фильтры задачи {task.id}: {e}")
+        return None
+
+
+class IndexedTask:
+    """Задача в индексе: все, что нужно для проверки и сохранения лота без загрузки задачи из БД."""
+
+    __slots__ = ("id", "name", "item_name", "appid", "filters")
+
+    def __init__(self, task_id: int, filters: SearchFilters, name: Optional[str] = None):
+        self.id = task_id
+        self.name = name or f"#{task_id}"
+        self.item_name = filters.item_name
+        self.appid = filters.appid
+        self.filters = filters
+
+
+class _IntervalIndex:
+    """
+    Поиск закрытых интервалов [min, max], содержащих точку.
+
+    Все границы сортируются; для каждой границы и каждого промежутка между
+    соседними границами заранее сохраняется набор покрывающих интервалов.
+    """
+
+    __slots__ = ("_bounds", "_at_bound", "_between")
+
+    def __init__(self, intervals: Iterable[Tuple[float, float, int]]):
+        intervals = list(intervals)
+        bounds = sorted({value for low, high, _ in intervals for value in (low, high)})
+        at_bound: List[Set[int]] = [set() for _ in bounds]
+        between: List[Set[int]] = [set() for _ in bounds]
+        for low, high, task_id in intervals:
+            start = bisect_left(bounds, low)
+            end = bisect_left(bounds, high)
+            for i in range(start, end + 1):
+                at_bound[i].add(task_id)
+            # Промежуток i лежит между bounds[i] и bounds[i + 1]
+            for i in range(start, end):
+                between[i].add(task_id)
+        self._bounds = bounds
+        self._at_bound = [frozenset(s) for s in at_bound]
+        self._between = [frozenset(s) for s in between]
+
+    def stab(self, value: float) -> FrozenSet[int]:
+        """Возвращает задачи, интервал которых содержит value."""
+        bounds = self._bounds
+        i = bisect_left(bounds, value)
+        if i < len(bounds) and bounds[i] == value:
+            return self._at_bound[i]
+        if i == 0 or i == len(bounds):
+            return frozenset()
+        return self._between[i - 1]
+
+
+class _ItemTaskGroup:
+    """Индекс задач одного предмета."""
+
+    __slots__ = (
+        "plans",
+        "no_float", "float_index",
+        "no_pattern", "pattern_map", "pattern_skip_keychain", "pattern_skip_skin", "pattern_range_index",
+        "price_ceilings", "price_ceiling_tasks", "no_price"
+    )
+
+    def __init__(self, plans: Dict[int, FilterPlan]):
+        self.plans = plans
+
+        # Float
+        self.no_float = frozenset(task_id for task_id, plan in plans.items() if plan.float_min is None)
+        self.float_index = _IntervalIndex(
+            (plan.float_min, plan.float_max, task_id) for task_id, plan in plans.items() if plan.float_min is not None
+        )
+
+        # Паттерн
+        self.no_pattern = frozenset(task_id for task_id, plan in plans.items() if plan.pattern_mode is None)
+        pattern_map: Dict[int, Set[int]] = {}
+        skip_keychain = set()
+        skip_skin = set()
+        for task_id, plan in plans.items():
+            if plan.pattern_mode != "list":
+                continue
+            for pattern in plan.pattern_set:
+                pattern_map.setdefault(pattern, set()).add(task_id)
+            # Фильтр для другого типа предмета не применяется (как в FilterPlan.check_pattern)
+            if plan.pattern_item_type == "skin":
+                skip_keychain.add(task_id)
+            elif plan.pattern_item_type == "keychain":
+                skip_skin.add(task_id)
+        self.pattern_map = {pattern: frozenset(ids) for pattern, ids in pattern_map.items()}
+        self.pattern_skip_keychain = frozenset(skip_keychain)
+        self.pattern_skip_skin = frozenset(skip_skin)
+        self.pattern_range_index = _IntervalIndex(
+            (plan.pattern_min, plan.pattern_max, task_id) for task_id, plan in plans.items() if plan.pattern_mode == "range"
+        )
+
+        # Цена: задачи по возрастанию max_price
+        ceilings = sorted((plan.max_price, task_id) for task_id, plan in plans.items() if plan.max_price is not None)
+        self.price_ceilings = [ceiling for ceiling, _ in ceilings]
+        self.price_ceiling_tasks = [task_id for _, task_id in ceilings]
+        self.no_price = frozenset(task_id for task_id, plan in plans.items() if plan.max_price is None)
+
+    def _by_price(self, price: Optional[float]) -> Set[int]:
+        if price is None:
+            return set(self.plans)
+        # max_price >= price: суффикс отсортированного списка
+        start = bisect_left(self.price_ceilings, price)
+        return set(self.price_ceiling_tasks[start:]) | self.no_price
+
+    def _by_float(self, float_value: Optional[float]) -> FrozenSet[int]:
+        if float_value is None:
+            return self.no_float
+        return self.no_float | self.float_index.stab(float_value)
+
+    def _by_pattern(self, pattern: Optional[int], item_type: Optional[str]) -> FrozenSet[int]:
+        matched = self.no_pattern
+        if item_type == "keychain":
+            matched = matched | self.pattern_skip_keychain
+        else:
+            matched = matched | self.pattern_skip_skin
+        if pattern is not None and pattern >= 0:
+            matched = matched | self.pattern_map.get(pattern, frozenset()) | self.pattern_range_index.stab(pattern)
+        return matched
+
+    def candidates(
+        self,
+        price: Optional[float],
+        float_value: Optional[float],
+        pattern: Optional[int],
+        item_type: Optional[str],
+        sticker_count: int
+    ) -> Set[int]:
+        by_pattern = self._by_pattern(pattern, item_type)
+        by_float = self._by_float(float_value)
+        # Пересекаем, начиная с меньшего набора
+        if len(by_float) < len(by_pattern):
+            result = by_float & by_pattern
+        else:
+            result = by_pattern & by_float
+        if not result:
+            return set()
+        result = result & self._by_price(price)
+        # Тип предмета и количество наклеек проверяются только для k кандидатов
+        return {
+            task_id for task_id in result
+            if self.plans[task_id].check_type_constraints(item_type, sticker_count)
+        }
+
+
+class TaskMatchIndex:
+    """Индекс активных задач, сгруппированных по предмету."""
+
+    def __init__(self):
+        self._plans: Dict[str, Dict[int, FilterPlan]] = {}
+        self._task_items: Dict[int, str] = {}
+        self._tasks: Dict[int, IndexedTask] = {}
+        self._groups: Dict[str, _ItemTaskGroup] = {}
+        self._lock = Lock()
+        self._listener: Optional[asyncio.Task] = None
+
+    def upsert(self, task_id: int, filters: SearchFilters, name: Optional[str] = None) -> None:
+        """
+        Добавляет задачу или обновляет ее фильтры.
+
+        Args:
+            task_id: ID задачи
+            filters: Фильтры задачи
+            name: Название задачи (для уведомлений о лотах, найденных проверкой другой задачи)
+        """
+        plan = filter_plan_cache.get(filters, task_id)
+        item_key = plan.normalized_name
+        with self._lock:
+            previous_key = self._task_items.get(task_id)
+            if previous_key is not None and previous_key != item_key:
+                self._drop(task_id, previous_key)
+            self._plans.setdefault(item_key, {})[task_id] = plan
+            self._task_items[task_id] = item_key
+            self._tasks[task_id] = IndexedTask(task_id, filters, name)
+            self._rebuild(item_key)
+
+    def remove(self, task_id: int) -> None:
+        """Удаляет задачу из индекса (удалена или деактивирована)."""
+        with self._lock:
+            item_key = self._task_items.get(task_id)
+            if item_key is not None:
+                self._drop(task_id, item_key)
+
+    def rebuild(self, tasks: Iterable[Tuple[int, SearchFilters]], names: Optional[Dict[int, str]] = None) -> None:
+        """
+        Полностью перестраивает индекс по списку активных задач.
+
+        Args:
+            tasks: Пары (task_id, filters)
+            names: Названия задач по ID (опционально)
+        """
+        names = names or {}
+        with self._lock:
+            self._plans.clear()
+            self._task_items.clear()
+            self._tasks.clear()
+            self._groups.clear()
+            for task_id, filters in tasks:
+                plan = filter_plan_cache.get(filters, task_id)
+                self._plans.setdefault(plan.normalized_name, {})[task_id] = plan
+                self._task_items[task_id] = plan.normalized_name
+                self._tasks[task_id] = IndexedTask(task_id, filters, names.get(task_id))
+            for item_key in self._plans:
+                self._rebuild(item_key)
+
+    def _drop(self, task_id: int, item_key: str) -> None:
+        self._task_items.pop(task_id, None)
+        self._tasks.pop(task_id, None)
+        plans = self._plans.get(item_key)
+        if plans is None:
+            return
+        plans.pop(task_id, None)
+        if plans:
+            self._rebuild(item_key)
+        else:
+            self._plans.pop(item_key, None)
+            self._groups.pop(item_key, None)
+
+    def _rebuild(self, item_key: str) -> None:
+        # Группа неизменяема: читатели без блокировки видят либо старую, либо новую
+        self._groups[item_key] = _ItemTaskGroup(dict(self._plans[item_key]))
+
+    def candidates(
+        self,
+        item_name: str,
+        price: Optional[float] = None,
+        float_value: Optional[float] = None,
+        pattern: Optional[int] = None,
+        item_type: Optional[str] = None,
+        sticker_count: int = 0
+    ) -> Set[int]:
+        """
+        Возвращает задачи, которым подходит лот (без проверки цен наклеек).
+
+        Args:
+            item_name: Название предмета лота
+            price: Цена лота
+            float_value: Float лота
+            pattern: Паттерн лота
+            item_type: Тип предмета ('skin' или 'keychain')
+            sticker_count: Количество наклеек на лоте
+
+        Returns:
+            Множество ID задач-кандидатов
+        """
+        group = self._groups.get(normalize_item_name(item_name or ""))
+        if group is None:
+            return set()
+        return group.candidates(price, float_value, pattern, item_type, sticker_count)
+
+    def tasks_for_item(self, item_name: str) -> Set[int]:
+        """Возвращает все задачи, отслеживающие предмет."""
+        group = self._groups.get(normalize_item_name(item_name or ""))
+        return set(group.plans) if group is not None else set()
+
+    def task(self, task_id: int) -> Optional[IndexedTask]:
+        """Задача индекса по ID или None."""
+        return self._tasks.get(task_id)
+
+    def __len__(self) -> int:
+        return len(self._task_items)
+
+    def apply(self, message: Dict[str, Any]) -> None:
+        """
+        Применяет событие канала индекса.
+
+        Args:
+            message: {"task_id": int, "action": "upsert", "name": str, "filters": dict}
+                     или {"task_id": int, "action": "remove"}
+        """
+        task_id = message.get("task_id")
+        if task_id is None:
+            return
+        task_id = int(task_id)
+        if message.get("action") == ACTION_UPSERT and message.get("filters") is not None:
+            self.upsert(task_id, SearchFilters.model_validate(message["filters"]), message.get("name"))
+        else:
+            self.remove(task_id)
+
+    async def publish(
+        self,
+        redis_service,
+        task_id: int,
+        filters: Optional[SearchFilters] = None,
+        name: Optional[str] = None
+    ) -> None:
+        """
+        Обновляет задачу в индексе процесса и рассылает событие остальным.
+
+        Args:
+            redis_service: Сервис Redis (может быть None)
+            task_id: ID задачи
+            filters: Фильтры активной задачи; None - задача удалена или выключена
+            name: Название задачи
+        """
+        if filters is None:
+            message = {"task_id": task_id, "action": ACTION_REMOVE}
+        else:
+            message = {"task_id": task_id, "action": ACTION_UPSERT, "name": name, "filters": filters.model_dump(mode="json")}
+        self.apply(message)
+        if not Config.TASK_MATCH_INDEX_ENABLED or redis_service is None or not redis_service.is_connected():
+            return
+        await redis_service.publish(INDEX_CHANNEL, message)
+
+    async def load(self, db_manager) -> int:
+        """
+        Перестраивает индекс по активным задачам из БД.
+
+        Returns:
+            Количество задач в индексе
+        """
+        session = await db_manager.get_session()
+        try:
+            result = await session.execute(select(MonitoringTask).where(MonitoringTask.is_active == True))
+            tasks = list(result.scalars().all())
+        finally:
+            await session.close()
+        indexed = [(task.id, index_filters(task)) for task in tasks]
+        self.rebuild(
+            ((task_id, filters) for task_id, filters in indexed if filters is not None),
+            names={task.id: task.name for task in tasks}
+        )
+        return len(self)
+
+    def start_listener(self, redis_service, db_manager) -> Optional[asyncio.Task]:
+        """
+        Запускает подписчика, если в процессе он еще не запущен.
+
+        Returns:
+            Задача подписчика (ее останавливает тот, кто запустил) или None
+        """
+        if self._listener is not None and not self._listener.done():
+            return None
+        self._listener = asyncio.create_task(self.run(redis_service, db_manager))
+        return self._listener
+
+    async def run(self, redis_service, db_manager) -> None:
+        """Подписчик канала индекса с периодической загрузкой из БД (одна фоновая задача на процесс)."""
+        loop = asyncio.get_running_loop()
+        while True:
+            pubsub = None
+            try:
+                connected = (
+                    redis_service is not None and redis_service.is_connected()
+                    and getattr(redis_service, "_client", None) is not None
+                )
+                if connected:
+                    # Сначала подписка, потом загрузка: события между ними не теряются
+                    pubsub = redis_service._client.pubsub()
+                    await pubsub.subscribe(INDEX_CHANNEL)
+                if db_manager is not None:
+                    count = await self.load(db_manager)
+                    logger.info(f"🗂️ TaskMatchIndex: Загружено задач из БД: {count}")
+                if pubsub is None:
+                    await asyncio.sleep(Config.TASK_MATCH_INDEX_REFRESH)
+                    continue
+                deadline = loop.time() + Config.TASK_MATCH_INDEX_REFRESH
+                while loop.time() < deadline:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message and message.get("type") == "message":
+                        try:
+                            self.apply(payload_codec.decode(message["data"]))
+                        except (ValueError, TypeError) as e:
+                            logger.warning(f"⚠️ TaskMatchIndex: Некорректное сообщение: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ TaskMatchIndex: Ошибка обновления индекса: {e}")
+                await asyncio.sleep(5)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except Exception:
+                        pass
+
+
+# Общий индекс процесса
+task_match_index = TaskMatchIndex()
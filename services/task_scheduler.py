@@ -0,0 +1,445 @@
+"""
+Планировщик проверок задач мониторинга.
+
+Вместо отдельной корутины (со своей сессией БД) на каждую задачу работает
+один цикл на одной сессии:
+- держит min-кучу (next_check, task_id) и спит до ближайшего срока, но не
+  дольше TASK_SCHEDULER_MAX_SLEEP (так замечаются задачи, созданные или
+  перенесенные другими процессами);
+- забирает наступившие задачи одним запросом
+  UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED) RETURNING,
+  сразу сдвигая next_check на check_interval - параллельный планировщик
+  эти задачи не получит, а задача, которую не удалось опубликовать,
+  повторится через интервал, как и раньше;
+- проверяет флаги выполнения parsing_task_running:{id} одним пайплайном Redis;
+- считает приоритет задач (task_priority) и публикует их в RabbitMQ пачкой:
+  срочные задачи попадают в очередь с приоритетами.
+
+next_check после завершения парсинга по-прежнему выставляет Parsing Worker.
+"""
+import asyncio
+import heapq
+import math
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import DateTime, func, literal, or_, select, update
+
+from core.config import Config
+from core.database import FoundItem, MonitoringTask
+
+
+RUNNING_KEY_PREFIX = "parsing_task_running"
+RUNNING_FLAG_TTL = 3600  # Флаг выполнения ставится воркером на 60 минут
+STUCK_TASK_TIMEOUT = 10 * 60  # Максимальное время выполнения задачи, после него флаг считается зависшим
+PUBLISH_RETRY_DELAY = 60  # Через сколько секунд повторить задачу, которую не удалось опубликовать
+LOCKED_RETRY_DELAY = 1  # Задача заблокирована другим планировщиком - проверяем чуть позже
+ERROR_DELAY = 5
+
+# Веса составляющих приоритета задачи (сумма = 1)
+PRIORITY_LATENESS_WEIGHT = 0.5
+PRIORITY_VALUE_WEIGHT = 0.25
+PRIORITY_HIT_RATE_WEIGHT = 0.25
+PRIORITY_MAX_LATENESS = 2.0  # Опоздание на 2 интервала и больше - максимальная срочность
+PRIORITY_VALUE_CAP = 1000.0  # Цена предмета, с которой ценность максимальна
+HIT_RATE_WINDOW = 24 * 3600  # Окно для доли находок (сек)
+
+
+def claim_due_tasks_query(now: datetime, limit: int):
+    """
+    Запрос, забирающий до limit наступивших задач и сдвигающий их next_check на check_interval.
+
+    Заблокированные строки (их забирает другой планировщик) пропускаются.
+    RETURNING отдает и прежний срок задачи (due_at) - по нему считается опоздание.
+    """
+    due = (
+        select(MonitoringTask.id, MonitoringTask.next_check.label("due_at"))
+        .where(
+            MonitoringTask.is_active == True,
+            or_(MonitoringTask.next_check.is_(None), MonitoringTask.next_check <= now)
+        )
+        .order_by(MonitoringTask.next_check.asc().nulls_first())
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .cte("due")
+    )
+    return (
+        update(MonitoringTask)
+        .where(MonitoringTask.id == due.c.id)
+        .values(next_check=literal(now, DateTime) + func.make_interval(0, 0, 0, 0, 0, 0, MonitoringTask.check_interval))
+        .returning(
+            MonitoringTask.id,
+            MonitoringTask.item_name,
+            MonitoringTask.appid,
+            MonitoringTask.currency,
+            MonitoringTask.filters_json,
+            MonitoringTask.check_interval,
+            MonitoringTask.next_check,
+            due.c.due_at
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def parsing_task_message(row) -> Dict:
+    """Сообщение задачи парсинга для очереди RabbitMQ."""
+    return {
+        "type": "parsing_task",
+        "task_id": row.id,
+        "filters_json": row.filters_json,  # Уже dict (JSONB)
+        "item_name": row.item_name,
+        "appid": row.appid,
+        "currency": row.currency
+    }
+
+
+def task_priority(
+    lateness: float,
+    interval: float,
+    max_price: Optional[float] = None,
+    hit_rate: float = 0.0,
+    max_priority: Optional[int] = None
+) -> int:
+    """
+    Приоритет задачи для RabbitMQ (0..max_priority).
+
+    Складывается из опоздания относительно интервала проверки (задача с частыми
+    проверками, опоздавшая на интервал, важнее редкой задачи с тем же опозданием),
+    ценности предмета (логарифм максимальной цены фильтра) и доли проверок
+    с находками за последние сутки.
+
+    Args:
+        lateness: На сколько секунд задача опоздала
+        interval: Интервал проверки задачи (сек)
+        max_price: Максимальная цена из фильтров
+        hit_rate: Доля проверок с находками (0..1)
+        max_priority: Верхняя граница (по умолчанию RABBITMQ_MAX_PRIORITY)
+    """
+    if max_priority is None:
+        max_priority = Config.RABBITMQ_MAX_PRIORITY
+    urgency = min(max(lateness, 0.0) / max(interval or 1, 1), PRIORITY_MAX_LATENESS) / PRIORITY_MAX_LATENESS
+    value = 0.0
+    if max_price and max_price > 0:
+        value = min(math.log10(1 + max_price) / math.log10(1 + PRIORITY_VALUE_CAP), 1.0)
+    score = (
+        PRIORITY_LATENESS_WEIGHT * urgency
+        + PRIORITY_VALUE_WEIGHT * value
+        + PRIORITY_HIT_RATE_WEIGHT * min(max(hit_rate, 0.0), 1.0)
+    )
+    return int(round(score * max_priority))
+
+
+def flag_elapsed(flag_value, ttl: int, now: datetime) -> Optional[float]:
+    """
+    Сколько секунд выполняется задача по флагу parsing_task_running.
+
+    Значение флага - ISO время начала; если его не разобрать, время оценивается по TTL.
+
+    Returns:
+        Секунды или None, если оценить нельзя
+    """
+    try:
+        started = datetime.fromisoformat(flag_value.decode("utf-8") if isinstance(flag_value, bytes) else flag_value)
+        return (now - started).total_seconds()
+    except (ValueError, AttributeError, TypeError):
+        if ttl and ttl > 0:
+            return RUNNING_FLAG_TTL - ttl
+    return None
+
+
+class TaskScheduler:
+    """Единый планировщик: куча сроков задач + пакетный захват и публикация."""
+
+    def __init__(
+        self,
+        db_manager,
+        rabbitmq_service,
+        redis_service=None,
+        batch_size: Optional[int] = None,
+        max_sleep: Optional[float] = None,
+        clock: Callable[[], datetime] = datetime.now
+    ):
+        """
+        Args:
+            db_manager: Менеджер БД (планировщик держит одну сессию)
+            rabbitmq_service: Сервис RabbitMQ для публикации задач
+            redis_service: Сервис Redis для флагов выполнения (опционально)
+            batch_size: Сколько задач забирать одним запросом (по умолчанию TASK_SCHEDULER_BATCH_SIZE)
+            max_sleep: Максимальная пауза между проверками (по умолчанию TASK_SCHEDULER_MAX_SLEEP)
+            clock: Источник времени
+        """
+        self.db_manager = db_manager
+        self.rabbitmq_service = rabbitmq_service
+        self.redis_service = redis_service
+        self.batch_size = batch_size or Config.TASK_SCHEDULER_BATCH_SIZE
+        self.max_sleep = max_sleep or Config.TASK_SCHEDULER_MAX_SLEEP
+        self._clock = clock
+        self._heap: List[Tuple[datetime, int]] = []
+        self._deadlines: Dict[int, datetime] = {}  # Актуальный срок задачи; устаревшие записи кучи пропускаются
+        self._wakeup = asyncio.Event()
+        self._session = None
+        self.claimed = 0
+        self.published = 0
+        self.skipped_running = 0
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, task_id: int) -> bool:
+        return task_id in self._deadlines
+
+    def schedule(self, task_id: int, next_check: Optional[datetime] = None) -> None:
+        """
+        Ставит (или переносит) задачу на время next_check; None - проверить сразу.
+
+        Args:
+            task_id: ID задачи
+            next_check: Время следующей проверки
+        """
+        deadline = next_check or self._clock()
+        self._deadlines[task_id] = deadline
+        heapq.heappush(self._heap, (deadline, task_id))
+        if self._heap[0] == (deadline, task_id):
+            # Новый ближайший срок - будим цикл, чтобы он пересчитал паузу
+            self._wakeup.set()
+
+    def unschedule(self, task_id: int) -> None:
+        """Убирает задачу из расписания (запись в куче удалится лениво)."""
+        self._deadlines.pop(task_id, None)
+
+    def next_deadline(self) -> Optional[datetime]:
+        """Ближайший срок среди задач расписания."""
+        while self._heap:
+            deadline, task_id = self._heap[0]
+            if self._deadlines.get(task_id) == deadline:
+                return deadline
+            heapq.heappop(self._heap)
+        return None
+
+    def pop_due(self, now: datetime) -> List[int]:
+        """Снимает с кучи задачи, срок которых наступил."""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, task_id = heapq.heappop(self._heap)
+            if self._deadlines.get(task_id) == deadline:
+                del self._deadlines[task_id]
+                due.append(task_id)
+        return due
+
+    async def _get_session(self):
+        if self._session is None:
+            self._session = await self.db_manager.get_session()
+        return self._session
+
+    async def _reset_session(self) -> None:
+        session, self._session = self._session, None
+        if session is None:
+            return
+        try:
+            await session.rollback()
+        except Exception:
+            pass
+        try:
+            await session.close()
+        except Exception:
+            pass
+
+    async def claim_due(self, session, now: datetime) -> list:
+        """Забирает все наступившие задачи пачками по batch_size."""
+        rows = []
+        while True:
+            result = await session.execute(claim_due_tasks_query(now, self.batch_size))
+            batch = result.all()
+            await session.commit()
+            rows.extend(batch)
+            if len(batch) < self.batch_size:
+                return rows
+
+    async def filter_running(self, rows: list, now: datetime) -> list:
+        """
+        Убирает задачи, парсинг которых еще выполняется (флаги читаются одним пайплайном).
+
+        Зависшие флаги (дольше STUCK_TASK_TIMEOUT) удаляются, такие задачи публикуются заново.
+        """
+        redis_service = self.redis_service
+        if not rows or redis_service is None or not redis_service.is_connected() or getattr(redis_service, "_client", None) is None:
+            return rows
+        keys = [f"{RUNNING_KEY_PREFIX}:{row.id}" for row in rows]
+        try:
+            pipe = redis_service._client.pipeline(transaction=False)
+            for key in keys:
+                pipe.get(key)
+                pipe.ttl(key)
+            values = await pipe.execute()
+        except Exception as e:
+            logger.debug(f"⚠️ TaskScheduler: Ошибка при проверке флагов выполнения: {e}")
+            return rows
+
+        ready, stuck_keys = [], []
+        for index, row in enumerate(rows):
+            flag_value, ttl = values[2 * index], values[2 * index + 1]
+            if not flag_value or ttl == -2:
+                ready.append(row)
+                continue
+            elapsed = flag_elapsed(flag_value, ttl, now)
+            if elapsed is not None and elapsed > STUCK_TASK_TIMEOUT:
+                logger.warning(f"⚠️ Задача {row.id}: Обнаружена ЗАВИСШАЯ задача ({elapsed / 60:.1f} мин), удаляем флаг и перезапускаем")
+                stuck_keys.append(keys[index])
+                ready.append(row)
+            else:
+                self.skipped_running += 1
+                logger.info(f"⏸️ Задача {row.id}: Парсинг уже выполняется, пропускаем эту проверку")
+        if stuck_keys:
+            try:
+                await redis_service._client.delete(*stuck_keys)
+            except Exception as e:
+                logger.error(f"❌ TaskScheduler: Ошибка при удалении зависших флагов: {e}")
+        return ready
+
+    async def hit_rates(self, session, rows: list, now: datetime) -> Dict[int, float]:
+        """
+        Доля проверок с находками за HIT_RATE_WINDOW для захваченных задач (один запрос).
+
+        Число проверок оценивается по интервалу задачи, доля ограничена единицей.
+        """
+        if not rows:
+            return {}
+        result = await session.execute(
+            select(FoundItem.task_id, func.count())
+            .where(
+                FoundItem.task_id.in_([row.id for row in rows]),
+                FoundItem.found_at >= now - timedelta(seconds=HIT_RATE_WINDOW)
+            )
+            .group_by(FoundItem.task_id)
+        )
+        found = dict(result.all())
+        rates = {}
+        for row in rows:
+            checks = HIT_RATE_WINDOW / max(row.check_interval or 1, 1)
+            rates[row.id] = min(found.get(row.id, 0) / checks, 1.0)
+        return rates
+
+    def priorities(self, rows: list, hit_rates: Dict[int, float], now: datetime) -> List[int]:
+        """Приоритеты задач в порядке rows."""
+        result = []
+        for row in rows:
+            lateness = (now - row.due_at).total_seconds() if row.due_at else row.check_interval
+            max_price = (row.filters_json or {}).get("max_price")
+            try:
+                max_price = float(max_price) if max_price is not None else None
+            except (TypeError, ValueError):
+                max_price = None
+            result.append(task_priority(lateness, row.check_interval, max_price, hit_rates.get(row.id, 0.0)))
+        return result
+
+    async def publish(self, session, rows: list, now: datetime) -> List[int]:
+        """
+        Публикует задачи пачкой.
+
+        Returns:
+            ID задач, которые не удалось опубликовать (повторятся через PUBLISH_RETRY_DELAY)
+        """
+        if not rows:
+            return []
+        if self.rabbitmq_service is None or not await self.rabbitmq_service.ensure_connected():
+            # next_check уже сдвинут захватом: повторная попытка при следующей проверке
+            logger.warning(f"⚠️ TaskScheduler: RabbitMQ недоступен, {len(rows)} задач пропущено до следующей проверки")
+            return []
+        try:
+            hit_rates = await self.hit_rates(session, rows, now)
+        except Exception as e:
+            # Без доли находок приоритет считается по опозданию и цене
+            logger.debug(f"⚠️ TaskScheduler: Ошибка при подсчете находок: {e}")
+            await session.rollback()
+            hit_rates = {}
+        priorities = self.priorities(rows, hit_rates, now)
+        failed = await self.rabbitmq_service.publish_tasks(
+            [parsing_task_message(row) for row in rows],
+            priorities
+        )
+        failed_ids = [message["task_id"] for message in failed]
+        self.published += len(rows) - len(failed_ids)
+        if failed_ids:
+            retry_at = now + timedelta(seconds=PUBLISH_RETRY_DELAY)
+            await session.execute(
+                update(MonitoringTask)
+                .where(MonitoringTask.id.in_(failed_ids))
+                .values(next_check=retry_at)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+        return failed_ids
+
+    async def refresh(self, session, task_ids: Iterable[int], now: datetime) -> None:
+        """Перечитывает сроки задач, которые ожидались, но не были захвачены."""
+        task_ids = list(task_ids)
+        if not task_ids:
+            return
+        result = await session.execute(
+            select(MonitoringTask.id, MonitoringTask.next_check)
+            .where(MonitoringTask.id.in_(task_ids), MonitoringTask.is_active == True)
+        )
+        rows = result.all()
+        await session.commit()
+        for task_id, next_check in rows:
+            # Срок в прошлом - строку держит другой планировщик
+            self.schedule(task_id, max(next_check or now, now + timedelta(seconds=LOCKED_RETRY_DELAY)))
+
+    async def tick(self) -> int:
+        """
+        Одна итерация: захват наступивших задач, проверка флагов, публикация.
+
+        Returns:
+            Количество опубликованных задач
+        """
+        session = await self._get_session()
+        now = self._clock()
+        expected = self.pop_due(now)
+        rows = await self.claim_due(session, now)
+        self.claimed += len(rows)
+        ready = await self.filter_running(rows, now)
+        failed_ids = set(await self.publish(session, ready, now))
+        retry_at = now + timedelta(seconds=PUBLISH_RETRY_DELAY)
+        for row in rows:
+            self.schedule(row.id, retry_at if row.id in failed_ids else row.next_check)
+        claimed_ids = {row.id for row in rows}
+        await self.refresh(session, (task_id for task_id in expected if task_id not in claimed_ids), now)
+        if rows:
+            logger.info(f"⏰ TaskScheduler: Захвачено задач: {len(rows)}, опубликовано: {len(ready) - len(failed_ids)}")
+        return len(ready) - len(failed_ids)
+
+    async def run(self) -> None:
+        """Цикл планировщика (одна фоновая задача на процесс)."""
+        logger.info(f"🗓️ TaskScheduler: Запущен, задач в расписании: {len(self)}")
+        try:
+            while True:
+                delay = 0.0
+                try:
+                    await self.tick()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"❌ TaskScheduler: Ошибка при проверке задач: {e}")
+                    await self._reset_session()
+                    delay = ERROR_DELAY
+                deadline = self.next_deadline()
+                timeout = self.max_sleep
+                if deadline is not None:
+                    timeout = min(timeout, (deadline - self._clock()).total_seconds())
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=max(timeout, delay))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self._reset_session()
+
+    def stats(self) -> dict:
+        """Счетчики планировщика."""
+        return {
+            "scheduled": len(self),
+            "claimed": self.claimed,
+            "published": self.published,
+            "skipped_running": self.skipped_running
+        }
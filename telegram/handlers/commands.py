@@ -83,6 +83,7 @@ class CommandHandlers:
 /tasks - Список задач мониторинга
 /proxies - Список прокси
 /found - Последние найденные предметы
+/found [id задачи] - Лучшие float задачи за неделю
 
 <b>Управление прокси:</b>
 /add_proxy - Добавить прокси
@@ -182,25 +183,39 @@ class CommandHandlers:
         await self.bot._send_proxies(message)
     
     async def cmd_found(self, message: Message):
-        """Показывает последние найденные предметы."""
+        """Показывает последние найденные предметы или лучшие float задачи (/found <id задачи>)."""
+        from datetime import datetime, timedelta
+        from core.database import best_floats_query, recent_found_items_query
+        
+        # Список строится по колонкам и индексам found_items, item_data_json не загружается
+        args = (message.text or "").split()
+        task_id = int(args[1]) if len(args) > 1 and args[0].startswith("/found") and args[1].isdigit() else None
         session = await self.bot.db_manager.get_session()
         try:
-            from sqlalchemy import select, desc
-            from core import FoundItem
-            result = await session.execute(
-                select(FoundItem)
-                .order_by(desc(FoundItem.found_at))
-                .limit(10)
-            )
-            items = list(result.scalars().all())
+            if task_id is not None:
+                query = best_floats_query(task_id, since=datetime.now() - timedelta(days=7), limit=10)
+                title = f"🏆 <b>Лучшие float задачи {task_id} за неделю:</b>"
+            else:
+                query = recent_found_items_query(limit=10)
+                title = "🔍 <b>Последние найденные предметы:</b>"
+            items = list((await session.execute(query)).all())
             
             if not items:
                 await message.answer("🔍 Найденных предметов пока нет")
                 return
             
-            text = "🔍 <b>Последние найденные предметы:</b>\n\n"
+            text = f"{title}\n\n"
             for item in items:
                 text += f"💰 <b>{item.item_name}</b> - ${item.price:.2f}\n"
+                details = []
+                if item.float_value is not None:
+                    details.append(f"float {item.float_value:.6f}")
+                if item.pattern is not None:
+                    details.append(f"паттерн {item.pattern}")
+                if item.total_stickers_price:
+                    details.append(f"наклейки ${item.total_stickers_price:.2f}")
+                if details:
+                    text += f"   {', '.join(details)}\n"
                 text += f"   Найдено: {item.found_at.strftime('%Y-%m-%d %H:%M')}\n"
                 if item.market_url:
                     text += f"   [Steam Market](https://steamcommunity.com/market/listings/730/{item.market_url})\n"
@@ -1324,7 +1324,7 @@ class TaskHandlers:
 
             session = await self.bot.db_manager.get_session()
 
-            monitoring_service = MonitoringService(session, self.bot.proxy_manager)
+            monitoring_service = MonitoringService(session, self.bot.proxy_manager, redis_service=self.bot.redis_service)
 
             success = await monitoring_service.delete_monitoring_task(task_id)
 
@@ -1359,7 +1359,7 @@ class TaskHandlers:
 
             session = await self.bot.db_manager.get_session()
 
-            monitoring_service = MonitoringService(session, self.bot.proxy_manager)
+            monitoring_service = MonitoringService(session, self.bot.proxy_manager, redis_service=self.bot.redis_service)
 
 
             tasks = await monitoring_service.get_all_tasks()
@@ -0,0 +1,127 @@
+"""
+Тесты для раннего отсева лотов по asset_properties (parallel_listing_prefilter).
+"""
+from unittest.mock import patch
+
+from core.models import SearchFilters, FloatRange, PatternList, PatternRange
+from core.steam_market_parser import parallel_listing_pipeline
+from core.steam_market_parser.parallel_listing_pipeline import parse_render_data
+from core.steam_market_parser.parallel_listing_prefilter import (
+    AssetPrefilter,
+    PruneCounters,
+    prefilter_render_data,
+    read_asset_properties,
+    PRUNED_PATTERN,
+    PRUNED_FLOAT
+)
+
+
+def _asset(pattern, float_value):
+    return {
+        "asset_properties": [
+            {"propertyid": 1, "int_value": str(pattern)},
+            {"propertyid": 2, "float_value": str(float_value)}
+        ]
+    }
+
+
+def _render_data(assets):
+    """assets: {listing_id: (pattern, float)}, asset id = listing_id + '0'."""
+    return {
+        "results_html": "<div/>",
+        "assets": {"730": {"2": {f"{lid}0": _asset(p, f) for lid, (p, f) in assets.items()}}},
+        "listinginfo": {lid: {"asset": {"id": f"{lid}0", "contextid": "2"}} for lid in assets}
+    }
+
+
+def _filters(**kwargs):
+    return SearchFilters(item_name="AK-47 | Case Hardened (Field-Tested)", **kwargs)
+
+
+class TestAssetPrefilter:
+    """Тесты компиляции и применения раннего отсева."""
+
+    def test_read_asset_properties(self):
+        """Тест: паттерн и float читаются из int_value/float_value, первый паттерн не перезаписывается."""
+        item = {"asset_properties": [
+            {"propertyid": 3, "int_value": "1661"},
+            {"propertyid": 1, "int_value": "5"},
+            {"propertyid": 2, "float_value": "0.25"}
+        ]}
+        assert read_asset_properties(item) == (1661, 0.25)
+        assert read_asset_properties({"asset_properties": [{"propertyid": 1, "int_value": "x"}]}) == (None, None)
+
+    def test_no_prefilter_without_asset_filters(self):
+        """Тест: без фильтров паттерна/float отсеивать нечего."""
+        assert AssetPrefilter.from_filters(_filters()) is None
+
+    def test_reject_reasons(self):
+        """Тест: паттерн (с нормализацией брелков) и float проверяются, неизвестные значения пропускаются."""
+        prefilter = AssetPrefilter.from_filters(_filters(
+            pattern_list=PatternList(patterns=[661], item_type="skin"),
+            float_range=FloatRange(min=0.1, max=0.2)
+        ))
+        assert prefilter.reject_reason(661, 0.15) is None
+        assert prefilter.reject_reason(1661, 0.15) is None, "Паттерн брелка нормализуется по модулю 1000"
+        assert prefilter.reject_reason(662, 0.15) == PRUNED_PATTERN
+        assert prefilter.reject_reason(661, 0.3) == PRUNED_FLOAT
+        assert prefilter.reject_reason(None, None) is None
+
+        range_prefilter = AssetPrefilter.from_filters(_filters(pattern_range=PatternRange(min=10, max=20, item_type="skin")))
+        assert range_prefilter.reject_reason(15, None) is None
+        assert range_prefilter.reject_reason(21, None) == PRUNED_PATTERN
+
+    def test_prefilter_render_data(self):
+        """Тест: неподходящие assets и их лоты удаляются, исходные данные не меняются."""
+        render_data = _render_data({"1": (661, 0.15), "2": (100, 0.15), "3": (661, 0.5)})
+        prefilter = AssetPrefilter.from_filters(_filters(
+            pattern_list=PatternList(patterns=[661], item_type="skin"),
+            float_range=FloatRange(min=0.1, max=0.2)
+        ))
+        counters = PruneCounters()
+
+        pruned_data, pruned_ids = prefilter_render_data(render_data, prefilter, counters)
+
+        assert pruned_ids == {"2", "3"}
+        assert list(pruned_data["listinginfo"]) == ["1"]
+        assert list(pruned_data["assets"]["730"]["2"]) == ["10"]
+        assert len(render_data["listinginfo"]) == 3, "Исходный render_data не должен изменяться"
+        assert (counters.listings, counters.pruned_pattern, counters.pruned_float) == (3, 1, 1)
+
+    def test_parse_render_data_skips_html_when_all_pruned(self):
+        """Тест: если все лоты отсеяны, HTML не разбирается."""
+        render_data = _render_data({"1": (1, 0.15), "2": (2, 0.15)})
+        prefilter = AssetPrefilter.from_filters(_filters(pattern_list=PatternList(patterns=[661], item_type="skin")))
+        counters = PruneCounters()
+
+        with patch.object(parallel_listing_pipeline, "parse_page_listings") as parse_html:
+            listings = parse_render_data(render_data, 1, 1, lambda level, msg: None, prefilter, counters)
+
+        assert listings == []
+        parse_html.assert_not_called()
+        assert counters.pages_without_html == 1
+        assert counters.pruned_pattern == 2
+
+    def test_parse_render_data_links_only_kept_listings(self):
+        """Тест: в результат попадают только лоты, прошедшие отсев, с данными своих assets."""
+        render_data = _render_data({"1": (661, 0.15), "2": (5, 0.15)})
+        prefilter = AssetPrefilter.from_filters(_filters(pattern_list=PatternList(patterns=[661], item_type="skin")))
+        html_listings = [{"listing_id": "1", "price": 10.0}, {"listing_id": "2", "price": 11.0}]
+
+        with patch.object(parallel_listing_pipeline, "parse_page_listings", return_value=html_listings):
+            listings = parse_render_data(render_data, 1, 1, lambda level, msg: None, prefilter, PruneCounters())
+
+        assert [listing["listing_id"] for listing in listings] == ["1"]
+        assert listings[0]["pattern"] == 661
+        assert listings[0]["float_value"] == 0.15
+
+    def test_counters_add(self):
+        """Тест: счетчики страниц суммируются."""
+        total = PruneCounters()
+        page = PruneCounters()
+        page.listings, page.pruned_pattern, page.matched = 10, 8, 1
+        total.add(page)
+        total.add(page)
+        assert total.to_dict()["listings"] == 20
+        assert total.to_dict()["pruned_pattern"] == 16
+        assert total.to_dict()["matched"] == 2
@@ -0,0 +1,96 @@
+"""
+Тесты для хранилища свойств ассетов (AssetPropertyStore).
+"""
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from parsers.inspect_parser import InspectLinkParser
+from services.asset_property_store import AssetPropertyStore
+
+
+LINK = "steam://rungame/730/76561202255233023/+csgo_econ_action_preview%20M720139732925859819A47696126279D16747423212568741781"
+# Тот же ассет, выставленный повторно (новый listing_id)
+RELISTED = "steam://rungame/730/76561202255233023/+csgo_econ_action_preview%20M999999999999999999A47696126279D16747423212568741781"
+INSPECT_RESULT = {"float_value": 0.1234, "pattern": 661, "source": "cs2floatchecker_api"}
+
+
+class _FakeRedis:
+    """Redis в памяти."""
+
+    def __init__(self):
+        self.data = {}
+
+    def is_connected(self):
+        return True
+
+    async def get_json(self, key):
+        return self.data.get(key)
+
+    async def set_json(self, key, data, ex=None):
+        self.data[key] = data
+
+
+class TestAssetPropertyStore:
+    """Тесты хранилища."""
+
+    def test_identity_from_inspect_link(self):
+        """Тест: идентичность ассета - параметры A и D, listing_id не учитывается."""
+        assert AssetPropertyStore.identity(LINK) == ("47696126279", "16747423212568741781")
+        assert AssetPropertyStore.identity(RELISTED) == AssetPropertyStore.identity(LINK)
+        assert AssetPropertyStore.identity("https://example.com") is None
+        assert AssetPropertyStore.identity("", assetid="123") == ("123", None)
+
+    def test_put_and_get_shared_through_redis(self):
+        """Тест: свойства, сохраненные одним процессом, читаются другим из Redis."""
+        redis = _FakeRedis()
+        writer = AssetPropertyStore(redis_service=redis)
+        reader = AssetPropertyStore(redis_service=redis)
+
+        async def _scenario():
+            await writer.put(LINK, INSPECT_RESULT)
+            return await reader.get(RELISTED)
+
+        assert asyncio.run(_scenario()) == INSPECT_RESULT
+        assert "asset_props:47696126279" in redis.data
+
+    def test_empty_result_not_stored(self):
+        """Тест: ответ без float и паттерна не сохраняется."""
+        store = AssetPropertyStore()
+
+        async def _scenario():
+            await store.put(LINK, {"float_value": None, "pattern": None})
+            return await store.get(LINK)
+
+        assert asyncio.run(_scenario()) is None
+
+
+class TestInspectLinkParserStore:
+    """Тесты использования хранилища в InspectLinkParser."""
+
+    def test_relisted_asset_skips_inspect_api(self):
+        """Тест: повторно выставленный ассет не запрашивает inspect API второй раз."""
+        fetch = AsyncMock(return_value=dict(INSPECT_RESULT))
+        with patch.object(InspectLinkParser, "property_store", AssetPropertyStore()), \
+                patch.object(InspectLinkParser, "_fetch_from_sources", fetch):
+
+            async def _scenario():
+                first = await InspectLinkParser.get_float_from_multiple_sources(LINK)
+                second = await InspectLinkParser.get_float_from_multiple_sources(RELISTED)
+                return first, second
+
+            first, second = asyncio.run(_scenario())
+        assert first == second == INSPECT_RESULT
+        assert fetch.await_count == 1
+
+    def test_without_store_fetches_every_time(self):
+        """Тест: без хранилища поведение прежнее."""
+        fetch = AsyncMock(return_value=dict(INSPECT_RESULT))
+        with patch.object(InspectLinkParser, "property_store", None), \
+                patch.object(InspectLinkParser, "_fetch_from_sources", fetch):
+
+            async def _scenario():
+                await InspectLinkParser.get_float_from_multiple_sources(LINK)
+                await InspectLinkParser.get_float_from_multiple_sources(RELISTED)
+
+            asyncio.run(_scenario())
+        assert fetch.await_count == 2
@@ -0,0 +1,159 @@
+"""
+Тесты для общего хранилища базовых цен (BasePriceService).
+"""
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from core.models import SearchFilters
+from services.base_price_manager import BasePriceManager
+from services.base_price_service import PRICES_KEY, BasePriceService
+
+
+class _Clock:
+    """Управляемое время."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _FakeRedisClient:
+    """Хэши и SET NX в памяти."""
+
+    def __init__(self):
+        self.hashes = {}
+        self.keys = {}
+
+    async def hset(self, name, key, value):
+        self.hashes.setdefault(name, {})[key] = value
+
+    async def hgetall(self, name):
+        return dict(self.hashes.get(name, {}))
+
+    async def hdel(self, name, *keys):
+        for key in keys:
+            self.hashes.get(name, {}).pop(key, None)
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.keys:
+            return None
+        self.keys[key] = value
+        return True
+
+
+class _FakeRedisService:
+    def __init__(self, client=None):
+        self._client = client or _FakeRedisClient()
+
+    def is_connected(self):
+        return True
+
+
+def _filters(item_name, auto=True, interval=None):
+    return SearchFilters(item_name=item_name, auto_update_base_price=auto, base_price_update_interval=interval)
+
+
+class TestBasePriceService:
+    """Тесты хранилища и фонового обновления."""
+
+    def test_store_shared_through_redis(self):
+        """Тест: цена, сохраненная одним процессом, читается другим после sync без запроса к Steam."""
+        clock = _Clock()
+        client = _FakeRedisClient()
+        writer = BasePriceService(redis_service=_FakeRedisService(client), clock=clock)
+        reader = BasePriceService(redis_service=_FakeRedisService(client), clock=clock)
+
+        async def _scenario():
+            await writer.store("AK-47 | Redline (Field-Tested)", 730, 12.5, ttl=300)
+            await reader.sync()
+
+        asyncio.run(_scenario())
+        assert reader.get("AK-47 | Redline (Field-Tested)", 730) == 12.5
+        assert "730:AK-47 | Redline (Field-Tested)" in client.hashes[PRICES_KEY]
+
+    def test_expired_price_not_returned_and_pruned(self):
+        """Тест: устаревшая цена не отдается фильтрам и удаляется из Redis при sync."""
+        clock = _Clock()
+        client = _FakeRedisClient()
+        service = BasePriceService(redis_service=_FakeRedisService(client), clock=clock)
+
+        asyncio.run(service.store("A", 730, 5.0, ttl=60))
+        clock.now += 61
+        assert service.get("A", 730) is None
+        asyncio.run(service.sync())
+        assert len(service) == 0
+        assert client.hashes[PRICES_KEY] == {}
+
+    def test_refresh_intervals_honor_task_settings(self):
+        """Тест: обновляются только задачи с auto_update_base_price, интервал - минимальный по задачам."""
+        with patch("services.base_price_service.Config.BASE_PRICE_DEFAULT_INTERVAL", 300):
+            intervals = BasePriceService.refresh_intervals([
+                _filters("A", interval=600),
+                _filters("A", interval=120),
+                _filters("B"),
+                _filters("C", auto=False, interval=60),
+            ])
+        assert intervals == {("A", 730): 120, ("B", 730): 300}
+
+    def test_refresh_due_respects_interval(self):
+        """Тест: цена обновляется только после истечения интервала задачи."""
+        clock = _Clock()
+        service = BasePriceService(clock=clock)
+        fetch = AsyncMock(return_value=10.0)
+
+        async def _scenario():
+            with patch("services.base_price_service.BasePriceAPI.get_base_price", fetch):
+                first = await service.refresh_due([_filters("A", interval=120)])
+                clock.now += 60
+                second = await service.refresh_due([_filters("A", interval=120)])
+                clock.now += 61
+                third = await service.refresh_due([_filters("A", interval=120)])
+            return first, second, third
+
+        assert asyncio.run(_scenario()) == (1, 0, 1)
+        assert fetch.await_count == 2
+        assert service.get("A", 730) == 10.0
+
+    def test_refresh_lock_between_processes(self):
+        """Тест: один предмет одновременно обновляет только один процесс."""
+        client = _FakeRedisClient()
+        first = BasePriceService(redis_service=_FakeRedisService(client))
+        second = BasePriceService(redis_service=_FakeRedisService(client))
+        fetch = AsyncMock(return_value=10.0)
+
+        async def _scenario():
+            with patch("services.base_price_service.BasePriceAPI.get_base_price", fetch):
+                await first.refresh_due([_filters("A")])
+                await second.refresh_due([_filters("A")])
+
+        asyncio.run(_scenario())
+        assert fetch.await_count == 1
+
+
+class TestBasePriceManagerStore:
+    """Тесты чтения D менеджером из общего хранилища."""
+
+    def test_manager_reads_store_without_fetch(self):
+        """Тест: при цене в хранилище запрос к Steam не выполняется."""
+        service = BasePriceService()
+        asyncio.run(service.store("A", 730, 7.0, ttl=300))
+        fetch = AsyncMock(return_value=99.0)
+        with patch.object(BasePriceManager, "store", service), \
+                patch("services.base_price_manager.BasePriceAPI.get_base_price", fetch):
+            manager = BasePriceManager()
+            assert asyncio.run(manager.get_base_price("A", 730)) == 7.0
+            assert manager.get_cached_price("A", 730) == 7.0
+        fetch.assert_not_called()
+
+    def test_manager_shares_fetched_price(self):
+        """Тест: цена, запрошенная при промахе, попадает в общее хранилище."""
+        service = BasePriceService()
+        fetch = AsyncMock(return_value=3.5)
+        with patch.object(BasePriceManager, "store", service), \
+                patch("services.base_price_manager.BasePriceAPI.get_base_price", fetch):
+            manager = BasePriceManager()
+            manager.clear_cache("Fresh item", 730)
+            assert asyncio.run(manager.get_base_price("Fresh item", 730)) == 3.5
+        assert service.get("Fresh item", 730) == 3.5
@@ -0,0 +1,118 @@
+"""
+Тесты для пакетной проверки лотов страницы (batch_filter).
+"""
+import asyncio
+
+import pytest
+
+from core.models import SearchFilters, FloatRange, PatternList, PatternRange, StickersFilter
+from core.steam_market_parser.batch_filter import select_candidates
+from core.steam_market_parser.listing_record import ListingRecord, StickerRecord
+from services.filter_plan import compile_filter_plan
+from services.filter_service import FilterService
+
+HASH_NAME = "AK-47 | Case Hardened (Field-Tested)"
+
+
+def _records():
+    """Лоты с разными ценами, паттернами, float, типами и наклейками."""
+    records = []
+    for i in range(200):
+        stickers = [StickerRecord(position=p, name=f"Sticker {p}") for p in range(i % 4)]
+        records.append(ListingRecord(
+            float_value=None if i % 17 == 0 else (i % 50) / 100.0,
+            pattern=None if i % 23 == 0 else (1000 + i if i % 11 == 0 else i * 7 % 1000),
+            stickers=stickers,
+            item_name=HASH_NAME if i % 13 else "M4A1-S | Hot Rod (Factory New)",
+            item_price=5.0 + i % 40 + (0.004 if i % 9 == 0 else 0.0),
+            item_type="keychain" if i % 11 == 0 else "skin",
+            listing_id=str(i)
+        ))
+    return records
+
+
+FILTERS = [
+    SearchFilters(item_name=HASH_NAME),
+    SearchFilters(item_name=HASH_NAME, max_price=20.0),
+    SearchFilters(item_name=HASH_NAME, float_range=FloatRange(min=0.1, max=0.3)),
+    SearchFilters(item_name=HASH_NAME, pattern_list=PatternList(patterns=[7, 14, 21, 661], item_type="skin")),
+    SearchFilters(item_name=HASH_NAME, pattern_list=PatternList(patterns=[11, 22, 33], item_type="keychain")),
+    SearchFilters(item_name=HASH_NAME, pattern_range=PatternRange(min=100, max=500, item_type="skin")),
+    SearchFilters(item_name=HASH_NAME, stickers_filter=StickersFilter(min_stickers_price=1.0)),
+    SearchFilters(
+        item_name=HASH_NAME,
+        max_price=30.0,
+        float_range=FloatRange(min=0.05, max=0.45),
+        pattern_list=PatternList(patterns=list(range(0, 1000, 3)), item_type="skin")
+    ),
+]
+
+
+def _accepted_by_filter_service(records, filters):
+    """Индексы лотов, которые принимал прежний построчный цикл (ранняя проверка паттерна + FilterService) без цен наклеек."""
+    filter_service = FilterService()
+    plan = compile_filter_plan(filters)
+
+    async def _no_sticker_prices(parsed_data, item, filters):
+        return True
+
+    filter_service.check_stickers = _no_sticker_prices
+
+    async def _run():
+        accepted = []
+        for index, record in enumerate(records):
+            if plan.is_pattern_excluded(record.pattern):
+                continue
+            item_dict = {
+                "sell_price_text": f"${record.item_price:.2f}",
+                "asset_description": {"market_hash_name": record.item_name},
+                "name": record.item_name
+            }
+            if await filter_service.matches_filters(item_dict, filters, record):
+                accepted.append(index)
+        return accepted
+
+    return asyncio.run(_run())
+
+
+class TestSelectCandidates:
+    """Тесты отбора кандидатов страницы."""
+
+    @pytest.mark.parametrize("filters", FILTERS)
+    def test_vectorized_matches_scalar(self, filters):
+        """Тест: маски NumPy и построчная проверка отбирают одни и те же лоты."""
+        pytest.importorskip("numpy")
+        records = _records()
+        plan = compile_filter_plan(filters)
+        assert select_candidates(records, plan, vectorized=True) == select_candidates(records, plan)
+
+    @pytest.mark.parametrize("filters", FILTERS[:6] + FILTERS[7:])
+    def test_candidates_equal_filter_service_without_stickers(self, filters):
+        """Тест: без фильтра наклеек кандидаты совпадают с решением прежнего построчного цикла."""
+        records = _records()
+        assert select_candidates(records, compile_filter_plan(filters)) == _accepted_by_filter_service(records, filters)
+
+    def test_sticker_count_constraints(self):
+        """Тест: при фильтре цены наклеек отсеиваются только брелки и скины без наклеек."""
+        records = _records()
+        filters = FILTERS[6]
+        candidates = select_candidates(records, compile_filter_plan(filters))
+        accepted = _accepted_by_filter_service(records, filters)
+        expected = [index for index in accepted if records[index].item_type == "skin" and records[index].stickers]
+        assert candidates == expected
+        assert candidates, "Скины с наклейками должны остаться"
+
+    def test_required_stickers_count(self):
+        """Тест: лоты с меньшим числом наклеек, чем в фильтре, отсеиваются."""
+        records = _records()
+        filters = SearchFilters(
+            item_name=HASH_NAME,
+            stickers_filter=StickersFilter(stickers=[StickerRecord(name=n).to_model() for n in ("A", "B", "C")])
+        )
+        candidates = select_candidates(records, compile_filter_plan(filters))
+        assert candidates
+        assert all(len(records[index].stickers) >= 3 for index in candidates)
+
+    def test_empty_page(self):
+        """Тест: пустая страница."""
+        assert select_candidates([], compile_filter_plan(FILTERS[1])) == []
@@ -0,0 +1,320 @@
+"""
+Тесты для автомасштабирования параллелизма Parsing Worker (ConcurrencyController).
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from core.utils import payload_codec
+from services import concurrency_controller as controller_module
+from services.concurrency_controller import AdaptiveLimit, ConcurrencyController, RequestOutcomes
+from services.rabbitmq_service import RabbitMQService
+
+
+class _FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def exists(self, key):
+        self.commands.append(int(key in self.client.keys))
+
+    async def execute(self):
+        return self.commands
+
+
+class _FakeRedisClient:
+    """Redis с кэшем прокси и флагами блокировки/резервирования."""
+
+    def __init__(self, proxy_ids, keys=()):
+        self.cache = payload_codec.encode([{"id": proxy_id} for proxy_id in proxy_ids])
+        self.keys = set(keys)
+
+    async def get(self, key):
+        return self.cache
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class _FakeRedisService:
+    def __init__(self, client):
+        self._client = client
+
+    def is_connected(self):
+        return True
+
+
+class _FakeRabbit:
+    def __init__(self):
+        self.prefetch = []
+
+    async def set_prefetch(self, prefetch_count):
+        self.prefetch.append(prefetch_count)
+
+
+_PROXY_MANAGER = SimpleNamespace(
+    REDIS_CACHE_KEY="proxies:active",
+    REDIS_BLOCKED_PREFIX="proxy:blocked:",
+    REDIS_IN_USE_PREFIX="proxy:in_use:"
+)
+
+
+def _controller(limit=4, proxy_ids=range(1, 11), keys=(), rabbit=None):
+    controller = ConcurrencyController(AdaptiveLimit(limit), min_tasks=1, max_tasks=50, interval=1)
+    controller.attach(
+        proxy_manager=_PROXY_MANAGER,
+        redis_service=_FakeRedisService(_FakeRedisClient(list(proxy_ids), keys)),
+        rabbitmq_service=rabbit
+    )
+    return controller
+
+
+class TestAdaptiveLimit:
+    """Тесты семафора с изменяемым лимитом."""
+
+    def test_resize_releases_waiters(self):
+        """Тест: увеличение лимита пропускает ожидающих, уменьшение не прерывает выполняющихся."""
+        async def _scenario():
+            limit = AdaptiveLimit(1)
+            await limit.acquire()
+            waiter = asyncio.create_task(limit.acquire())
+            await asyncio.sleep(0.01)
+            blocked = not waiter.done()
+            limit.resize(2)
+            await asyncio.wait_for(waiter, timeout=1)
+            limit.resize(1)
+            return blocked, limit.active, limit.saturated
+
+        assert asyncio.run(_scenario()) == (True, 2, True)
+
+    def test_release_wakes_next(self):
+        """Тест: освобождение слота пропускает следующего ожидающего."""
+        async def _scenario():
+            limit = AdaptiveLimit(1)
+            async with limit:
+                waiter = asyncio.create_task(limit.acquire())
+                await asyncio.sleep(0.01)
+                assert not waiter.done()
+            await asyncio.wait_for(waiter, timeout=1)
+            return limit.active
+
+        assert asyncio.run(_scenario()) == 1
+
+
+class TestController:
+    """Тесты решений контроллера."""
+
+    def test_proxy_leases_from_redis(self):
+        """Тест: заблокированные прокси не доступны, зарезервированные - не свободны."""
+        controller = _controller(keys={"proxy:blocked:1", "proxy:in_use:2", "proxy:in_use:3"})
+        assert asyncio.run(controller.proxy_leases()) == (9, 7)
+
+    def test_grows_when_saturated_and_proxies_free(self):
+        """Тест: все слоты заняты и есть свободные прокси - лимит растет на 1, prefetch следует."""
+        rabbit = _FakeRabbit()
+        controller = _controller(limit=4, rabbit=rabbit)
+        controller.tasks.active = 4
+        assert asyncio.run(controller.tick()) == 5
+        assert controller.tasks.limit == 5
+        assert rabbit.prefetch == [5]
+
+    def test_idle_worker_keeps_limit(self):
+        """Тест: без спроса лимит не растет."""
+        controller = _controller(limit=4)
+        controller.tasks.active = 1
+        assert asyncio.run(controller.tick()) == 4
+
+    def test_no_free_proxies_shrinks_by_one(self):
+        """Тест: все прокси заняты - лимит уменьшается на 1."""
+        controller = _controller(limit=4, proxy_ids=[1, 2, 3, 4, 5], keys={f"proxy:in_use:{i}" for i in range(1, 6)})
+        controller.tasks.active = 4
+        assert asyncio.run(controller.tick()) == 3
+
+    def test_overload_multiplicative_decrease(self):
+        """Тест: задержка event loop, пул БД или 429 уменьшают лимит мультипликативно."""
+        controller = _controller(limit=10)
+        controller.tasks.active = 10
+        assert controller.decide({"loop_lag": 2.0, "usable_proxies": 10, "free_proxies": 5}) == 7
+        assert controller.decide({"db_saturation": 0.95, "usable_proxies": 10, "free_proxies": 5}) == 7
+        assert controller.decide({"rate_429": 0.5, "usable_proxies": 10, "free_proxies": 5}) == 7
+        assert controller.decide({"rate_429": 0.5, "usable_proxies": None, "free_proxies": None}) == 7
+
+    def test_limit_capped_by_usable_proxies(self):
+        """Тест: лимит не превышает число доступных прокси."""
+        controller = _controller(limit=12, proxy_ids=range(1, 7))
+        assert asyncio.run(controller.tick()) == 6
+
+    def test_rate_limited_share_since_last_sample(self, monkeypatch):
+        """Тест: доля 429 считается с прошлого замера, малые выборки копятся."""
+        outcomes = RequestOutcomes()
+        monkeypatch.setattr(controller_module, "request_outcomes", outcomes)
+        controller = _controller()
+        for index in range(5):
+            outcomes.record(rate_limited=index == 0)
+        assert controller.rate_limited_share() == 0.0
+        for _ in range(5):
+            outcomes.record()
+        assert controller.rate_limited_share() == 0.1
+        for _ in range(10):
+            outcomes.record(rate_limited=True)
+        assert controller.rate_limited_share() == 1.0
+
+    def test_page_workers_share_proxies(self):
+        """Тест: воркеры страниц делят доступные прокси между задачами, без замеров - прокси // 3."""
+        controller = _controller(limit=4)
+        assert controller.page_workers(30) == 10
+
+        asyncio.run(controller.tick())
+        controller.tasks.active = 2
+        assert controller.page_workers(10) == 5
+        controller._overloaded = True
+        assert controller.page_workers(10) == 2
+
+
+class _FakeQueue:
+    """Очередь, доставляющая заранее заданные сообщения потребителю (basic.consume)."""
+
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.cancelled = []
+
+    async def consume(self, callback, no_ack=False):
+        while self.messages:
+            await callback(self.messages.pop(0))
+        return "tag"
+
+    async def cancel(self, consumer_tag):
+        self.cancelled.append(consumer_tag)
+
+
+def _message(task_id):
+    message = SimpleNamespace(
+        body=payload_codec.encode({"task_id": task_id}), headers={}, priority=0,
+        content_type=payload_codec.content_type(), requeued=False
+    )
+
+    async def _nack(requeue=True):
+        message.requeued = requeue
+
+    message.nack = _nack
+    return message
+
+
+class TestLimitedConsumer:
+    """Тесты потребителя RabbitMQ с лимитом задач."""
+
+    def _service(self, normal, urgent=()):
+        service = RabbitMQService()
+        service.is_connected = lambda: True
+        service._parsing_queue = _FakeQueue(normal)
+        service._urgent_queue = _FakeQueue(urgent)
+        return service
+
+    def test_consumer_runs_up_to_limit_in_parallel(self):
+        """Тест: задачи выполняются параллельно, сообщение сверх лимита ждет свободного слота."""
+        async def _scenario():
+            service = self._service([_message(i) for i in range(3)])
+            release = asyncio.Event()
+            started = []
+
+            async def callback(task_data, message):
+                started.append(task_data["task_id"])
+                await release.wait()
+
+            limit = AdaptiveLimit(2)
+            await service.consume_tasks(callback, consumer_name="test", limit=limit)
+            await asyncio.sleep(0.05)
+            running = list(started)
+            release.set()
+            await asyncio.sleep(0.05)
+            await service.stop_consumer("test")
+            return running, started, service._parsing_queue.cancelled
+
+        running, started, cancelled = asyncio.run(_scenario())
+        assert running == [0, 1]
+        assert started == [0, 1, 2]
+        assert cancelled == ["tag"]
+
+    def test_fair_share_between_lanes(self):
+        """Тест: при полных буферах срочные задачи идут чаще, но обычные не голодают."""
+        async def _scenario():
+            service = self._service([_message(f"n{i}") for i in range(4)], [_message(f"u{i}") for i in range(4)])
+            order = []
+
+            async def callback(task_data, message):
+                order.append(task_data["task_id"])
+
+            await service.consume_tasks(callback, consumer_name="test")
+            await asyncio.sleep(0.05)
+            await service.stop_consumer("test")
+            return order
+
+        order = asyncio.run(_scenario())
+        assert sorted(order[:4]) == ["n0", "u0", "u1", "u2"]
+        assert sorted(order) == sorted([f"n{i}" for i in range(4)] + [f"u{i}" for i in range(4)])
+
+    def test_stop_requeues_buffered(self):
+        """Тест: при остановке не начатые задачи возвращаются в очередь."""
+        async def _scenario():
+            messages = [_message(i) for i in range(3)]
+            service = self._service(messages)
+            release = asyncio.Event()
+
+            async def callback(task_data, message):
+                await release.wait()
+
+            await service.consume_tasks(callback, consumer_name="test", limit=AdaptiveLimit(1))
+            await asyncio.sleep(0.05)
+            await service.stop_consumer("test")
+            release.set()
+            return [message.requeued for message in messages]
+
+        assert asyncio.run(_scenario()) == [False, True, True]
+
+    def test_early_message_deferred_without_slot(self):
+        """Тест: сообщение раньше срока досылается при получении и не занимает слот задачи."""
+        async def _scenario():
+            early = _message("early")
+            early.headers = {RabbitMQService.DELAY_HEADER: time.time() + 60}
+            early.ack = AsyncMock()
+            service = self._service([early, _message("due")])
+            service.delay_tiers = (1, 5, 30)
+            service._retry_exchange = SimpleNamespace(publish=AsyncMock())
+            started = []
+            limit = AdaptiveLimit(1)
+
+            async def callback(task_data, message):
+                started.append(task_data["task_id"])
+
+            await service.consume_tasks(callback, consumer_name="test", limit=limit)
+            await asyncio.sleep(0.05)
+            await service.stop_consumer("test")
+            return started, early.ack.await_count, service._retry_exchange.publish.await_args.kwargs["routing_key"]
+
+        assert asyncio.run(_scenario()) == (["due"], 1, "delay_30s")
+
+
+class _FakeChannel:
+    def __init__(self):
+        self.is_closed = False
+        self.qos = []
+
+    async def set_qos(self, prefetch_count, global_=False):
+        self.qos.append((prefetch_count, global_))
+
+
+class TestPrefetch:
+    """Тесты prefetch канала RabbitMQ."""
+
+    def test_prefetch_follows_task_limit(self):
+        """Тест: prefetch канала (общий для очередей) - лимит задач плюс круг FairShare."""
+        service = RabbitMQService()
+        service._channel = _FakeChannel()
+        service._prefetch = 0
+        headroom = RabbitMQService._prefetch_for(0) - 1
+        asyncio.run(service.set_prefetch(5))
+        asyncio.run(service.set_prefetch(5))
+        asyncio.run(service.set_prefetch(3))
+        assert service._channel.qos == [(5 + headroom, True), (3 + headroom, True)]
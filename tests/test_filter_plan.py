@@ -0,0 +1,111 @@
+"""
+Тесты для скомпилированных планов фильтров (filter_plan).
+"""
+import pytest
+
+from core.models import SearchFilters, FloatRange, PatternList, PatternRange, StickersFilter
+from services.filter_plan import (
+    FilterPlanCache,
+    compile_filter_plan,
+    normalize_item_name,
+    FAIL_PRICE,
+    FAIL_PATTERN,
+    FAIL_FLOAT,
+    FAIL_NAME
+)
+from services.filter_service import FilterService
+
+
+def _filters(**kwargs):
+    return SearchFilters(item_name="AK-47 | Case Hardened (Field-Tested)", **kwargs)
+
+
+class TestFilterPlan:
+    """Тесты компиляции и проверки плана."""
+
+    def test_pattern_bitset_matches_filter_service(self):
+        """Тест: битовая маска паттернов дает тот же результат, что и FilterService.check_pattern."""
+        filters = _filters(pattern_list=PatternList(patterns=[0, 151, 661, 999], item_type="skin"))
+        plan = compile_filter_plan(filters)
+        filter_service = FilterService()
+        for pattern in [0, 1, 151, 661, 662, 999, "661", None]:
+            for item_type in ("skin", "keychain", None):
+                assert plan.check_pattern(pattern, item_type) == filter_service.check_pattern(pattern, filters, item_type), \
+                    f"Расхождение для pattern={pattern}, item_type={item_type}"
+
+    def test_pattern_range(self):
+        """Тест: pattern_range проверяется по границам без построения множества."""
+        plan = compile_filter_plan(_filters(pattern_range=PatternRange(min=100, max=200, item_type="skin")))
+        assert plan.check_pattern(100) and plan.check_pattern(200)
+        assert not plan.check_pattern(201)
+        assert not plan.check_pattern(None)
+
+    def test_keychain_early_exclusion(self):
+        """Тест: ранняя проверка нормализует паттерны брелков по модулю 1000."""
+        plan = compile_filter_plan(_filters(pattern_list=PatternList(patterns=[661], item_type="skin")))
+        assert not plan.is_pattern_excluded(1661)
+        assert plan.is_pattern_excluded(662)
+        assert not plan.is_pattern_excluded(None)
+
+    def test_first_failure_order(self):
+        """Тест: цепочка останавливается на первом (самом дешевом) непройденном фильтре."""
+        plan = compile_filter_plan(_filters(
+            max_price=50.0,
+            float_range=FloatRange(min=0.1, max=0.2),
+            pattern_list=PatternList(patterns=[661], item_type="skin")
+        ))
+        name = "StatTrak™ AK-47 | Case Hardened (Minimal Wear)"
+        assert plan.first_failure(40.0, 661, 0.15, "skin", name) is None
+        assert plan.first_failure(60.0, 1, 0.5, "skin", "M4A1-S") == FAIL_PRICE
+        assert plan.first_failure(40.0, 1, 0.5, "skin", "M4A1-S") == FAIL_PATTERN
+        assert plan.first_failure(40.0, 661, 0.5, "skin", "M4A1-S") == FAIL_FLOAT
+        assert plan.first_failure(40.0, 661, 0.15, "skin", "M4A1-S") == FAIL_NAME
+
+    def test_sticker_thresholds(self):
+        """Тест: пороги наклеек вынесены в план."""
+        plan = compile_filter_plan(_filters(stickers_filter=StickersFilter(min_stickers_price=5.0, max_overpay_coefficient=0.1)))
+        assert plan.has_stickers_filter
+        assert plan.needs_sticker_prices
+        assert plan.min_stickers_price == 5.0
+        assert not compile_filter_plan(_filters()).needs_sticker_prices
+
+    def test_plan_is_immutable(self):
+        """Тест: план нельзя изменить после компиляции."""
+        plan = compile_filter_plan(_filters(max_price=10.0))
+        with pytest.raises(AttributeError):
+            plan.max_price = 100.0
+
+    def test_normalize_item_name(self):
+        """Тест: нормализация совпадает с FilterService._normalize_item_name."""
+        name = "StatTrak™  AK-47 | Case Hardened (Field-Tested)"
+        assert normalize_item_name(name) == FilterService()._normalize_item_name(name, remove_condition=True)
+
+
+class TestFilterPlanCache:
+    """Тесты кэша планов по задаче."""
+
+    def test_same_filters_reuse_plan(self):
+        """Тест: для тех же фильтров задачи план не пересобирается."""
+        cache = FilterPlanCache()
+        filters = _filters(max_price=10.0)
+        plan = cache.get(filters, task_id=1)
+        assert cache.get(filters, task_id=1) is plan
+        # Фильтры перечитаны из того же filters_json - новый объект, тот же план
+        assert cache.get(SearchFilters.model_validate(filters.model_dump()), task_id=1) is plan
+
+    def test_changed_filters_rebuild_plan(self):
+        """Тест: изменение filters_json задачи пересобирает план."""
+        cache = FilterPlanCache()
+        plan = cache.get(_filters(max_price=10.0), task_id=1)
+        new_plan = cache.get(_filters(max_price=20.0), task_id=1)
+        assert new_plan is not plan
+        assert new_plan.max_price == 20.0
+
+    def test_invalidate(self):
+        """Тест: invalidate удаляет план задачи."""
+        cache = FilterPlanCache()
+        filters = _filters(max_price=10.0)
+        plan = cache.get(filters, task_id=1)
+        cache.invalidate(1)
+        assert len(cache) == 0
+        assert cache.get(filters, task_id=1) is not plan
@@ -0,0 +1,203 @@
+"""
+Тесты для сохранения найденных предметов через INSERT ... ON CONFLICT (insert_found_item, FoundItemBatch).
+"""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy.dialects import postgresql
+
+from core.database import insert_found_item
+from core.steam_market_parser.process_results import FoundItemBatch
+from services.results_processor_service import ResultsProcessorService
+
+
+def _session(returned_ids):
+    """Сессия, у которой вставки по очереди возвращают переданные id (None - дубликат)."""
+    session = MagicMock()
+    statements = []
+    ids = iter(returned_ids)
+
+    async def _execute(stmt):
+        statements.append(stmt)
+        result = MagicMock()
+        result.scalar_one_or_none.return_value = next(ids)
+        return result
+
+    session.execute = _execute
+    session.statements = statements
+    session.commit = AsyncMock()
+    session.rollback = AsyncMock()
+    session.refresh = AsyncMock()
+    return session
+
+
+class TestInsertFoundItem:
+    """Тесты вставки с проверкой дубликата по уникальному индексу."""
+
+    def test_statement_is_single_upsert(self):
+        """Тест: одна вставка ON CONFLICT (task_id, listing_id) DO NOTHING RETURNING id."""
+        session = _session([42])
+        found_id = asyncio.run(insert_found_item(session, {
+            "task_id": 1,
+            "listing_id": 765177620331184862,
+            "item_name": "AK-47 | Redline (Field-Tested)",
+            "price": 45.73,
+            "item_data_json": "{}",
+        }))
+        assert found_id == 42
+        assert len(session.statements) == 1
+        stmt = session.statements[0]
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (task_id, listing_id) DO NOTHING" in sql
+        assert "RETURNING found_items.id" in sql
+        # listing_id приводится к строке (в JSON он мог быть числом)
+        assert stmt.compile(dialect=postgresql.dialect()).params["listing_id"] == "765177620331184862"
+
+    def test_duplicate_returns_none(self):
+        """Тест: для уже сохраненного лота вставка не возвращает id."""
+        session = _session([None])
+        assert asyncio.run(insert_found_item(session, {"task_id": 1, "listing_id": "1", "item_name": "A",
+                                                       "price": 1.0, "item_data_json": "{}"})) is None
+
+
+class TestResultsProcessorDedup:
+    """Тесты ResultsProcessorService: дубликаты отсекаются вставкой, без чтения истории задачи."""
+
+    def test_duplicates_skipped_without_history_scan(self):
+        """Тест: на каждый лот - одна вставка, дубликат не считается сохраненным."""
+        session = _session([10, None])
+        task = MagicMock()
+        task.id = 1
+        task.item_name = "AK-47 | Redline (Field-Tested)"
+        task.items_found = 0
+        task.next_check = None
+        task.check_interval = 60
+        items = [
+            {"name": task.item_name, "listingid": "111", "parsed_data": {"item_price": 10.0}},
+            {"name": task.item_name, "listingid": "222", "parsed_data": {"item_price": 11.0}},
+        ]
+        processor = ResultsProcessorService(db_session=session, redis_service=None)
+
+        saved = asyncio.run(processor.process_results(task, items))
+        assert saved == 1
+        assert task.items_found == 1
+        assert len(session.statements) == 2
+        assert all("ON CONFLICT" in str(stmt.compile(dialect=postgresql.dialect())) for stmt in session.statements)
+
+
+def _batch_session(inserted):
+    """Сессия, у которой многострочная вставка возвращает строки (id, listing_id)."""
+    session = MagicMock()
+    statements = []
+
+    async def _execute(stmt):
+        statements.append(stmt)
+        result = MagicMock()
+        result.all.return_value = list(inserted)
+        return result
+
+    session.execute = _execute
+    session.statements = statements
+    session.commit = AsyncMock()
+    session.rollback = AsyncMock()
+    return session
+
+
+def _values(listing_id, price=10.0):
+    return {
+        "task_id": 1,
+        "listing_id": listing_id,
+        "item_name": "AK-47 | Redline (Field-Tested)",
+        "price": price,
+        "item_data_json": "{}",
+        "market_url": "AK-47 | Redline (Field-Tested)",
+        "notification_sent": False
+    }
+
+
+class TestFoundItemBatch:
+    """Тесты пакетного сохранения найденных предметов страницы."""
+
+    def _task(self):
+        task = MagicMock()
+        task.id = 1
+        task.name = "Redline"
+        return task
+
+    def test_flush_is_single_roundtrip_per_step(self):
+        """Тест: одна вставка, одно обновление счетчиков, один коммит, уведомления одним пайплайном."""
+        session = _batch_session([(10, "111"), (11, "333")])
+        redis = MagicMock()
+        redis.is_connected.return_value = True
+        redis._client = None
+        redis.publish_many = AsyncMock()
+        redis.publish = AsyncMock()
+        batch = FoundItemBatch(self._task())
+        for listing_id in ("111", "222", "333"):
+            batch.add(_values(listing_id), listing_id)
+
+        saved = asyncio.run(batch.flush(session, redis_service=redis))
+        assert saved == 2
+        assert len(session.statements) == 2
+        insert_sql = str(session.statements[0].compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (task_id, listing_id) DO NOTHING" in insert_sql
+        assert "RETURNING found_items.id, found_items.listing_id" in insert_sql
+        update_sql = str(session.statements[1].compile(dialect=postgresql.dialect()))
+        assert "items_found=(monitoring_tasks.items_found + " in update_sql
+        assert session.statements[1].compile(dialect=postgresql.dialect()).params["items_found_1"] == 2
+        session.commit.assert_awaited_once()
+        redis.publish.assert_not_called()
+        channel, messages = redis.publish_many.await_args.args
+        assert channel == "found_items"
+        assert [m["item_id"] for m in messages] == [10, 11]
+        assert len(batch) == 0
+
+    def test_duplicate_in_batch_rejected(self):
+        """Тест: лот с тем же listing_id не попадает в пачку дважды."""
+        batch = FoundItemBatch(self._task())
+        assert batch.add(_values("111"), "a") is True
+        assert batch.add(_values(111), "b") is False
+        assert len(batch) == 1
+
+    def test_flush_error_keeps_records(self):
+        """Тест: при ошибке БД транзакция откатывается, лоты остаются для повторной обработки."""
+        session = _batch_session([])
+        session.commit = AsyncMock(side_effect=RuntimeError("db down"))
+        batch = FoundItemBatch(self._task())
+        batch.add(_values("111"), "record")
+
+        try:
+            asyncio.run(batch.flush(session))
+            raised = False
+        except RuntimeError:
+            raised = True
+        assert raised
+        session.rollback.assert_awaited_once()
+        assert batch.records == ["record"]
+
+    def test_notifications_match_inserted_rows(self):
+        """Тест: уведомления берут данные своей строки при дубликатах, любом порядке RETURNING и строках без listing_id."""
+        session = MagicMock()
+        statements = []
+        single_ids = iter([20, 21])
+
+        async def _execute(stmt):
+            statements.append(stmt)
+            result = MagicMock()
+            # Лот "222" - дубликат, ответ многострочной вставки в обратном порядке
+            result.all.return_value = [(11, "333"), (10, "111")]
+            result.scalar_one_or_none.side_effect = lambda: next(single_ids, None)
+            return result
+
+        session.execute = _execute
+        session.commit = AsyncMock()
+        session.rollback = AsyncMock()
+        notifier = MagicMock()
+        notifier.publish = AsyncMock()
+        batch = FoundItemBatch(self._task())
+        for listing_id, price in (("111", 1.0), (None, 2.0), ("222", 3.0), ("333", 4.0), (None, 5.0)):
+            batch.add(_values(listing_id, price=price), listing_id)
+
+        assert asyncio.run(batch.flush(session, notifier=notifier)) == 4
+        published = {call.args[1]["item_id"]: call.args[1]["price"] for call in notifier.publish.await_args_list}
+        assert published == {11: 4.0, 10: 1.0, 20: 2.0, 21: 5.0}
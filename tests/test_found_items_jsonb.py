@@ -0,0 +1,68 @@
+"""
+Тесты для JSONB данных найденных предметов и выборок по генерируемым колонкам.
+"""
+import json
+from datetime import datetime
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from core.database import (
+    FoundItem,
+    JSONBData,
+    best_floats_query,
+    item_data_to_text,
+    recent_found_items_query,
+)
+
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+class TestFoundItemJsonb:
+    """Тесты модели FoundItem."""
+
+    def test_bind_accepts_text_and_dict(self):
+        """Тест: в JSONB колонку можно передать и словарь, и JSON-строку прежнего формата."""
+        column_type = JSONBData()
+        assert column_type.process_bind_param('{"pattern": 661}', postgresql.dialect()) == {"pattern": 661}
+        assert column_type.process_bind_param({"pattern": 661}, postgresql.dialect()) == {"pattern": 661}
+        assert column_type.process_bind_param("", postgresql.dialect()) is None
+
+    def test_get_item_data_from_dict_and_text(self):
+        """Тест: get_item_data работает и для JSONB (словарь), и для строки."""
+        assert FoundItem(item_data_json={"float_value": 0.01}).get_item_data() == {"float_value": 0.01}
+        assert FoundItem(item_data_json='{"float_value": 0.01}').get_item_data() == {"float_value": 0.01}
+
+    def test_generated_columns_not_inserted(self):
+        """Тест: генерируемые колонки вычисляет Postgres, во вставку они не попадают."""
+        sql = _sql(pg_insert(FoundItem).values(task_id=1, item_name="A", price=1.0, item_data_json={}))
+        assert "float_value" not in sql
+        assert "total_stickers_price" not in sql
+        assert FoundItem.__table__.c.float_value.computed is not None
+        assert FoundItem.__table__.c.pattern.computed.persisted
+
+    def test_notification_payload_stays_text(self):
+        """Тест: в уведомлениях item_data_json - JSON-строка, как и раньше."""
+        assert json.loads(item_data_to_text({"listing_id": "1"})) == {"listing_id": "1"}
+        assert item_data_to_text('{"listing_id": "1"}') == '{"listing_id": "1"}'
+
+
+class TestFoundItemQueries:
+    """Тесты выборок найденных предметов."""
+
+    def test_best_floats_uses_generated_column(self):
+        """Тест: лучшие float задачи сортируются по колонке float_value, item_data_json не загружается."""
+        sql = _sql(best_floats_query(7, since=datetime(2026, 10, 11), limit=5))
+        assert "ORDER BY found_items.float_value" in sql
+        assert "found_items.float_value IS NOT NULL" in sql
+        assert "found_items.found_at >=" in sql
+        assert "item_data_json" not in sql
+
+    def test_recent_items_without_payload(self):
+        """Тест: список последних предметов не загружает item_data_json."""
+        sql = _sql(recent_found_items_query(task_id=3))
+        assert "ORDER BY found_items.found_at DESC" in sql
+        assert "found_items.task_id = " in sql
+        assert "item_data_json" not in sql
@@ -0,0 +1,331 @@
+"""
+Тесты для потокового пайплайна страниц лотов (parallel_listing_pipeline).
+Сеть, HTML и БД заменены моками, проверяется передача данных между этапами.
+"""
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from core.models import SearchFilters
+from core.steam_market_parser import parallel_listing_listings_processor, parallel_listing_pipeline
+from core.steam_market_parser.parallel_listing_pipeline import run_listing_pipeline
+from services.task_match_index import TaskMatchIndex
+
+
+class FakeRedis:
+    """Минимальный Redis для очереди страниц, результатов и уведомлений."""
+
+    def __init__(self):
+        self.lists = {}
+        self.counters = {}
+        self.published = []
+        self._client = self
+
+    def is_connected(self):
+        return True
+
+    async def rpop(self, key, timeout=0):
+        items = self.lists.get(key, [])
+        return items.pop() if items else None
+
+    async def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    async def lpush(self, key, *values):
+        self.lists.setdefault(key, [])[:0] = list(reversed(values))
+        return len(self.lists[key])
+
+    async def expire(self, key, seconds):
+        return True
+
+    async def incr(self, key):
+        self.counters[key] = self.counters.get(key, 0) + 1
+        return self.counters[key]
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+
+    async def publish_many(self, channel, messages):
+        self.published.extend((channel, message) for message in messages)
+
+
+def _fill_pages(redis, queue_key, pages):
+    redis.lists[queue_key] = [
+        json.dumps({"page_num": n, "page_start": (n - 1) * 20, "page_count": 20}) for n in reversed(pages)
+    ]
+
+
+def _make_parser():
+    parser = MagicMock()
+    parser.proxy_manager = MagicMock()
+    parser.proxy_manager.mark_proxy_used = AsyncMock()
+    parser.filter_service = MagicMock()
+    # Проходят только лоты с четной ценой
+    parser.filter_service.matches_filters = AsyncMock(
+        side_effect=lambda item, filters, record: int(record.item_price) % 2 == 0
+    )
+    return parser
+
+
+def _fake_listings(render_data, worker_id, page_num, log_func, prefilter=None, counters=None):
+    return [
+        {"listing_id": f"{page_num}-{i}", "price": float(i), "pattern": i, "float_value": 0.1, "stickers": []}
+        for i in range(4)
+    ]
+
+
+def _proxy():
+    proxy = MagicMock()
+    proxy.id = 1
+    proxy.url = "http://proxy:8080"
+    return proxy
+
+
+class TestListingPipeline:
+    """Тесты потокового пайплайна."""
+
+    @pytest.mark.asyncio
+    async def test_results_go_to_redis_without_db(self):
+        """Тест: без задачи/БД подходящие лоты сохраняются в Redis по страницам."""
+        redis = FakeRedis()
+        _fill_pages(redis, "q", [1, 2, 3])
+        parser = _make_parser()
+
+        with patch.object(parallel_listing_pipeline, "fetch_page_render_data", AsyncMock(return_value={"results_html": "<div/>"})), \
+             patch.object(parallel_listing_pipeline, "parse_render_data", side_effect=_fake_listings):
+            metrics = await run_listing_pipeline(
+                parser=parser, appid=730, hash_name="AK-47 | Redline (Field-Tested)",
+                filters=SearchFilters(item_name="AK-47 | Redline (Field-Tested)"),
+                task=None, db_manager=None, task_logger=None, redis_service=redis,
+                queue_key="q", available_proxies=[_proxy()], max_retries=2, total_pages=3,
+                fetchers=2, task_start_times={}, task_stages={}, log_func=lambda level, msg: None,
+                parsers=2, queue_size=1
+            )
+
+        assert metrics["fetch"].processed == 3, "Все страницы должны быть загружены"
+        assert metrics["parse"].processed == 3, "Все страницы должны быть разобраны"
+        for page_num in (1, 2, 3):
+            stored = redis.lists.get(f"parsing:results:task_0:page_{page_num}", [])
+            assert len(stored) == 2, f"На странице {page_num} должно быть 2 подходящих лота"
+        assert parser.proxy_manager.mark_proxy_used.await_count == 3
+        assert metrics["prune"].matched == 6
+        assert metrics["prune"].pruned_filters == 6
+
+    @pytest.mark.asyncio
+    async def test_persist_and_notify_stages(self):
+        """Тест: с задачей лоты идут в сохранитель, уведомления - через этап уведомлений."""
+        redis = FakeRedis()
+        _fill_pages(redis, "q", [1, 2])
+        parser = _make_parser()
+
+        session = MagicMock()
+        active_result = MagicMock()
+        active_result.scalar_one_or_none.return_value = True
+        session.execute = AsyncMock(return_value=active_result)
+        session.rollback = AsyncMock()
+        session.close = AsyncMock()
+        db_manager = MagicMock()
+        db_manager.get_session = AsyncMock(return_value=session)
+
+        task = MagicMock()
+        task.id = 7
+        processed = []
+
+        async def fake_evaluate_item_result(parser, task, parsed_data, filters, redis_service=None, task_logger=None):
+            return {"listing_id": parsed_data.listing_id}
+
+        async def fake_store_item_result(task, parsed_data, values, db_session, redis_service=None, task_logger=None, notifier=None, batch=None):
+            processed.append(values["listing_id"])
+            await notifier.publish("found_items", {"listing_id": values["listing_id"]})
+            return True
+
+        with patch.object(parallel_listing_pipeline, "fetch_page_render_data", AsyncMock(return_value={"results_html": "<div/>"})), \
+             patch.object(parallel_listing_pipeline, "parse_render_data", side_effect=_fake_listings), \
+             patch.object(parallel_listing_pipeline, "evaluate_item_result", side_effect=fake_evaluate_item_result), \
+             patch.object(parallel_listing_pipeline, "store_item_result", side_effect=fake_store_item_result):
+            metrics = await run_listing_pipeline(
+                parser=parser, appid=730, hash_name="AK-47 | Redline (Field-Tested)",
+                filters=SearchFilters(item_name="AK-47 | Redline (Field-Tested)"),
+                task=task, db_manager=db_manager, task_logger=None, redis_service=redis,
+                queue_key="q", available_proxies=[_proxy()], max_retries=2, total_pages=2,
+                fetchers=1, task_start_times={}, task_stages={}, log_func=lambda level, msg: None,
+                parsers=1, queue_size=1, persist_batch=3
+            )
+
+        assert sorted(processed) == ["1-0", "1-2", "2-0", "2-2"]
+        assert metrics["persist"].processed == 4
+        assert metrics["notify"].processed == 4
+        assert [m["listing_id"] for _, m in redis.published] == processed, "Уведомления должны уйти в порядке сохранения"
+        assert redis.counters["parsing:completed:task_7"] == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_fetch_counts_error(self):
+        """Тест: страница, которую не удалось загрузить, учитывается как ошибка этапа загрузки."""
+        redis = FakeRedis()
+        _fill_pages(redis, "q", [1])
+        parser = _make_parser()
+
+        with patch.object(parallel_listing_pipeline, "fetch_page_render_data", AsyncMock(side_effect=RuntimeError("429 Too Many Requests"))), \
+             patch.object(parallel_listing_pipeline.asyncio, "sleep", AsyncMock()):
+            metrics = await run_listing_pipeline(
+                parser=parser, appid=730, hash_name="AK-47 | Redline (Field-Tested)",
+                filters=SearchFilters(item_name="AK-47 | Redline (Field-Tested)"),
+                task=None, db_manager=None, task_logger=None, redis_service=redis,
+                queue_key="q", available_proxies=[_proxy()], max_retries=2, total_pages=1,
+                fetchers=1, task_start_times={}, task_stages={}, log_func=lambda level, msg: None
+            )
+
+        assert metrics["fetch"].errors == 1
+        assert metrics["parse"].processed == 0
+        kwargs = parser.proxy_manager.mark_proxy_used.await_args.kwargs
+        assert kwargs["success"] is False and kwargs["is_429_error"] is True
+
+    @pytest.mark.asyncio
+    async def test_page_confirmed_after_persist(self):
+        """Тест: страница с найденными лотами подтверждается в источнике только после их сохранения."""
+        redis = FakeRedis()
+        parser = _make_parser()
+        session = MagicMock()
+        session.close = AsyncMock()
+        db_manager = MagicMock()
+        db_manager.get_session = AsyncMock(return_value=session)
+        task = MagicMock()
+        task.id = 8
+        events = []
+
+        class _Source:
+            def __init__(self, pages):
+                self.pages = [json.dumps({"page_num": n, "page_start": 0, "page_count": 20}) for n in pages]
+
+            async def next(self, timeout=5.0):
+                return self.pages.pop(0) if self.pages else None
+
+            async def exhausted(self):
+                return not self.pages
+
+            async def done(self, page_num, ok=True):
+                events.append(("done", page_num, ok))
+
+        async def fake_evaluate_item_result(parser, task, parsed_data, filters, redis_service=None, task_logger=None):
+            return {"listing_id": parsed_data.listing_id}
+
+        async def fake_store_item_result(task, parsed_data, values, db_session, redis_service=None, task_logger=None, notifier=None, batch=None):
+            events.append(("saved", int(parsed_data.listing_id.split("-")[0])))
+            return True
+
+        with patch.object(parallel_listing_pipeline, "fetch_page_render_data", AsyncMock(return_value={"results_html": "<div/>"})), \
+             patch.object(parallel_listing_pipeline, "parse_render_data", side_effect=_fake_listings), \
+             patch.object(parallel_listing_pipeline, "evaluate_item_result", side_effect=fake_evaluate_item_result), \
+             patch.object(parallel_listing_pipeline, "store_item_result", side_effect=fake_store_item_result), \
+             patch.object(parallel_listing_pipeline.task_cancellation, "listening", True):
+            await run_listing_pipeline(
+                parser=parser, appid=730, hash_name="AK-47 | Redline (Field-Tested)",
+                filters=SearchFilters(item_name="AK-47 | Redline (Field-Tested)"),
+                task=task, db_manager=db_manager, task_logger=None, redis_service=redis,
+                queue_key="q", available_proxies=[_proxy()], max_retries=2, total_pages=2,
+                fetchers=1, task_start_times={}, task_stages={}, log_func=lambda level, msg: None,
+                parsers=1, queue_size=1, persist_batch=1, page_source=_Source([1, 2])
+            )
+
+        for page_num in (1, 2):
+            saved = [index for index, event in enumerate(events) if event == ("saved", page_num)]
+            assert len(saved) == 2
+            assert events.index(("done", page_num, True)) > max(saved)
+        assert sum(1 for event in events if event[0] == "done") == 2
+
+    @pytest.mark.asyncio
+    async def test_sticker_prices_do_not_block_persister(self):
+        """Тест: цены наклеек запрашивает парсер, медленный лот не задерживает сохранение других."""
+        redis = FakeRedis()
+        _fill_pages(redis, "q", [1, 2])
+        parser = _make_parser()
+        session = MagicMock()
+        session.close = AsyncMock()
+        db_manager = MagicMock()
+        db_manager.get_session = AsyncMock(return_value=session)
+        task = MagicMock()
+        task.id = 9
+        first_saved = asyncio.Event()
+        order = []
+
+        async def fake_evaluate_item_result(parser, task, parsed_data, filters, redis_service=None, task_logger=None):
+            if parsed_data.listing_id.startswith("2-"):
+                # Медленный запрос цен наклеек: ждет, пока сохранитель запишет лот другой страницы
+                await asyncio.wait_for(first_saved.wait(), timeout=2.0)
+                order.append("priced")
+            return {"listing_id": parsed_data.listing_id}
+
+        async def fake_store_item_result(task, parsed_data, values, db_session, redis_service=None, task_logger=None, notifier=None, batch=None):
+            order.append(values["listing_id"])
+            first_saved.set()
+            return True
+
+        with patch.object(parallel_listing_pipeline, "fetch_page_render_data", AsyncMock(return_value={"results_html": "<div/>"})), \
+             patch.object(parallel_listing_pipeline, "parse_render_data", side_effect=_fake_listings), \
+             patch.object(parallel_listing_pipeline, "evaluate_item_result", side_effect=fake_evaluate_item_result), \
+             patch.object(parallel_listing_pipeline, "store_item_result", side_effect=fake_store_item_result), \
+             patch.object(parallel_listing_pipeline.task_cancellation, "listening", True):
+            metrics = await run_listing_pipeline(
+                parser=parser, appid=730, hash_name="AK-47 | Redline (Field-Tested)",
+                filters=SearchFilters(item_name="AK-47 | Redline (Field-Tested)"),
+                task=task, db_manager=db_manager, task_logger=None, redis_service=redis,
+                queue_key="q", available_proxies=[_proxy()], max_retries=2, total_pages=2,
+                fetchers=2, task_start_times={}, task_stages={}, log_func=lambda level, msg: None,
+                parsers=2, queue_size=1, persist_batch=1
+            )
+
+        assert metrics["parse"].errors == 0, "Медленный лот не должен упасть по таймауту"
+        assert order.index("1-0") < order.index("priced")
+        assert sorted(item for item in order if item != "priced") == ["1-0", "1-2", "2-0", "2-2"]
+
+    @pytest.mark.asyncio
+    async def test_page_matched_for_other_tasks_of_item(self):
+        """Тест: лоты страницы проверяются и сохраняются для других задач того же предмета."""
+        redis = FakeRedis()
+        _fill_pages(redis, "q", [1])
+        parser = _make_parser()
+        session = MagicMock()
+        session.close = AsyncMock()
+        db_manager = MagicMock()
+        db_manager.get_session = AsyncMock(return_value=session)
+        task = MagicMock()
+        task.id = 10
+        hash_name = "AK-47 | Redline (Field-Tested)"
+
+        index = TaskMatchIndex()
+        index.upsert(10, SearchFilters(item_name=hash_name, appid=730))
+        index.upsert(11, SearchFilters(item_name=hash_name, appid=730, max_price=1.0), name="cheap")
+        # Другое состояние и другая валюта - те же группы индекса, но другие страницы
+        index.upsert(12, SearchFilters(item_name="AK-47 | Redline (Minimal Wear)", appid=730))
+        index.upsert(13, SearchFilters(item_name=hash_name, appid=730, currency=5))
+        stored = []
+
+        async def fake_evaluate_item_result(parser, task, parsed_data, filters, redis_service=None, task_logger=None):
+            return {"listing_id": parsed_data.listing_id, "task_id": task.id}
+
+        async def fake_store_item_result(task, parsed_data, values, db_session, redis_service=None, task_logger=None, notifier=None, batch=None):
+            assert batch.task is task
+            stored.append((task.id, values["listing_id"]))
+            return True
+
+        with patch.object(parallel_listing_pipeline, "fetch_page_render_data", AsyncMock(return_value={"results_html": "<div/>"})), \
+             patch.object(parallel_listing_pipeline, "parse_render_data", side_effect=_fake_listings), \
+             patch.object(parallel_listing_pipeline, "evaluate_item_result", side_effect=fake_evaluate_item_result), \
+             patch.object(parallel_listing_listings_processor, "evaluate_item_result", side_effect=fake_evaluate_item_result), \
+             patch.object(parallel_listing_listings_processor, "task_match_index", index), \
+             patch.object(parallel_listing_pipeline, "store_item_result", side_effect=fake_store_item_result), \
+             patch.object(parallel_listing_pipeline.task_cancellation, "listening", True):
+            metrics = await run_listing_pipeline(
+                parser=parser, appid=730, hash_name=hash_name,
+                filters=SearchFilters(item_name=hash_name, appid=730),
+                task=task, db_manager=db_manager, task_logger=None, redis_service=redis,
+                queue_key="q", available_proxies=[_proxy()], max_retries=2, total_pages=1,
+                fetchers=1, task_start_times={}, task_stages={}, log_func=lambda level, msg: None,
+                parsers=1, queue_size=1, persist_batch=10
+            )
+
+        # Своя задача: четные цены (FilterService); задача 11: цена не выше 1.0 по индексу
+        assert sorted(stored) == [(10, "1-0"), (10, "1-2"), (11, "1-0"), (11, "1-1")]
+        assert metrics["persist"].processed == 4
@@ -0,0 +1,77 @@
+"""
+Тесты для компактных записей лотов (ListingRecord / StickerRecord).
+"""
+import json
+
+from core.models import ParsedItemData, StickerInfo, SearchFilters, FloatRange, PatternList
+from core.steam_market_parser.listing_record import ListingRecord, StickerRecord
+from core.steam_market_parser.parallel_listing_redis_storage import (
+    serialize_parsed_item,
+    deserialize_parsed_item,
+    deserialize_listing_record
+)
+from services.filter_service import FilterService
+
+
+def _make_record() -> ListingRecord:
+    return ListingRecord(
+        float_value=0.350107,
+        pattern=372,
+        stickers=[StickerRecord(position=0, name="Sticker | Crown (Foil)"), StickerRecord(position=1, name="Sticker | Titan | Katowice 2014", price=1.5)],
+        item_name="AK-47 | Redline (Field-Tested)",
+        item_price=12.34,
+        inspect_links=["steam://rungame/730/76561202255233023/+csgo_econ_action_preview%20M1A2D3"],
+        item_type="skin",
+        listing_id="123456789"
+    )
+
+
+class TestListingRecord:
+    """Тесты преобразований ListingRecord."""
+
+    def test_slots_without_dict(self):
+        """Тест: записи не имеют __dict__ (используют __slots__)."""
+        record = _make_record()
+        assert not hasattr(record, "__dict__"), "ListingRecord должен использовать __slots__"
+        assert not hasattr(record.stickers[0], "__dict__"), "StickerRecord должен использовать __slots__"
+
+    def test_to_parsed_item_roundtrip(self):
+        """Тест: преобразование в ParsedItemData и обратно сохраняет все поля."""
+        record = _make_record()
+        parsed = record.to_parsed_item()
+        assert isinstance(parsed, ParsedItemData)
+        assert isinstance(parsed.stickers[0], StickerInfo)
+        assert parsed.model_dump() == record.to_dict(), "Поля ParsedItemData должны совпадать с ListingRecord"
+        assert ListingRecord.from_parsed_item(parsed).to_dict() == record.to_dict()
+
+    def test_redis_format_compatible(self):
+        """Тест: формат Redis одинаков для ParsedItemData и ListingRecord."""
+        record = _make_record()
+        parsed = record.to_parsed_item()
+        assert serialize_parsed_item(record) == serialize_parsed_item(parsed)
+
+        data = json.loads(json.dumps(serialize_parsed_item(record)))
+        assert deserialize_listing_record(data).to_dict() == record.to_dict()
+        assert deserialize_parsed_item(data) == parsed
+
+    def test_sticker_from_any(self):
+        """Тест: StickerRecord создается из StickerInfo и словаря."""
+        info = StickerInfo(position=2, name="Sticker | iBUYPOWER | Katowice 2014", price=100.0)
+        from_model = StickerRecord.from_any(info)
+        from_dict = StickerRecord.from_any(info.model_dump())
+        assert from_model.to_dict() == info.model_dump()
+        assert from_dict.to_dict() == info.model_dump()
+
+    def test_filter_service_accepts_record(self):
+        """Тест: FilterService проверяет ListingRecord так же, как ParsedItemData."""
+        filter_service = FilterService()
+        filters = SearchFilters(
+            item_name="AK-47 | Redline (Field-Tested)",
+            float_range=FloatRange(min=0.35, max=0.36),
+            pattern_list=PatternList(patterns=[372], item_type="skin")
+        )
+        record = _make_record()
+        assert filter_service.check_float(record.float_value, filters) is True
+        assert filter_service.check_pattern(record.pattern, filters, record.item_type) is True
+        item = {"sell_price_text": "$12.34", "asset_description": {"market_hash_name": record.item_name}, "name": record.item_name}
+        assert filter_service.check_item_name(item, filters, record) is True
@@ -0,0 +1,107 @@
+"""
+Тесты для ограничения памяти при обработке страниц лотов.
+"""
+import asyncio
+
+import pytest
+
+from core.steam_market_parser.parallel_listing_page_parser import parse_page_listings
+from core.steam_market_parser.parallel_listing_pipeline import MemoryBudget, estimate_render_data_size
+from core.utils import memory_snapshot
+from parsers.item_page_parser import ItemPageParser
+
+
+LISTINGS_HTML = """
+<div id="listing_111" class="market_listing_row">
+    <span class="market_listing_price_with_fee">$10.50</span>
+    <a href="steam://rungame/730/76561202255233023/+csgo_econ_action_preview%20M111A222D333">Inspect</a>
+</div>
+<div id="listing_222" class="market_listing_row">
+    <span class="market_listing_price_with_fee">$12.00</span>
+</div>
+"""
+
+
+class TestDomRelease:
+    """Тесты освобождения DOM после разбора страницы."""
+
+    def test_listings_hold_no_dom(self):
+        """Тест: лоты не содержат ссылок на элементы BeautifulSoup."""
+        listings = ItemPageParser(LISTINGS_HTML).get_all_listings()
+        assert [listing["listing_id"] for listing in listings] == ["111", "222"]
+        for listing in listings:
+            assert "row_element" not in listing
+            assert all(isinstance(value, (str, float, type(None))) for value in listing.values())
+
+    def test_release_drops_tree(self):
+        """Тест: release() освобождает дерево и HTML."""
+        page_parser = ItemPageParser(LISTINGS_HTML)
+        page_parser.release()
+        assert page_parser.soup is None
+        assert page_parser.html is None
+
+    def test_parse_page_listings(self):
+        """Тест: parse_page_listings возвращает лоты после освобождения дерева."""
+        listings = parse_page_listings({"results_html": LISTINGS_HTML}, 1, 1, lambda level, msg: None)
+        assert [listing["price"] for listing in listings] == [10.5, 12.0]
+
+
+class TestMemoryBudget:
+    """Тесты бюджета памяти страниц."""
+
+    @pytest.mark.asyncio
+    async def test_acquire_waits_for_release(self):
+        """Тест: при исчерпании бюджета загрузчик ждет, пока парсер освободит память."""
+        budget = MemoryBudget(100)
+        await budget.acquire(60)
+
+        waiter = asyncio.create_task(budget.acquire(60))
+        await asyncio.sleep(0.01)
+        assert not waiter.done(), "Вторая страница не должна помещаться в бюджет"
+        assert budget.throttled == 1
+
+        await budget.release(60)
+        await asyncio.wait_for(waiter, timeout=1.0)
+        assert budget.used_bytes == 60
+        assert budget.peak_bytes == 60
+
+    @pytest.mark.asyncio
+    async def test_oversized_page_passes_when_budget_free(self):
+        """Тест: страница больше бюджета проходит, если бюджет свободен."""
+        budget = MemoryBudget(10)
+        await asyncio.wait_for(budget.acquire(1000), timeout=1.0)
+        assert budget.used_bytes == 1000
+        await budget.release(1000)
+        assert budget.used_bytes == 0
+
+    def test_estimate_render_data_size(self):
+        """Тест: оценка размера растет с HTML и числом assets/лотов."""
+        small = estimate_render_data_size({"results_html": "x"})
+        large = estimate_render_data_size({
+            "results_html": "x" * 10000,
+            "assets": {"730": {"2": {"1": {}, "2": {}}}},
+            "listinginfo": {"1": {}, "2": {}}
+        })
+        assert large - small > 9000 + 4 * 2048
+
+
+class TestMemorySnapshot:
+    """Тесты снимков tracemalloc."""
+
+    def test_snapshot_with_tracing(self):
+        """Тест: снимок содержит текущую память и топ аллокаций, повторный - разницу."""
+        started = memory_snapshot.start_tracing(frames=1)
+        try:
+            data = [bytearray(1024) for _ in range(100)]
+            first = memory_snapshot.take_snapshot(limit=5)
+            second = memory_snapshot.take_snapshot(limit=5, compare=True)
+        finally:
+            if started:
+                import tracemalloc
+                tracemalloc.stop()
+        assert first["tracing"] is True
+        assert first["traced_current_bytes"] > 0
+        assert 0 < len(first["top"]) <= 5
+        assert second["compared"] is True
+        assert "size_diff_bytes" in second["top"][0]
+        del data
@@ -0,0 +1,304 @@
+"""
+Тесты для распределения страниц задачи между репликами (Redis Stream).
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+
+from core.models import SearchFilters
+from core.steam_market_parser import parallel_listing_page_jobs as page_jobs
+from core.steam_market_parser.parallel_listing_page_jobs import (
+    ListPageSource, StreamPageSource, barrier_reached, close_page_run, create_page_run, page_run_progress
+)
+from services.concurrency_controller import AdaptiveLimit
+from services.page_jobs import PageJobHelper
+
+
+class _FakeStreamPipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def _call(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+        return _call
+
+    async def execute(self):
+        return [await getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class _FakeStreamRedis:
+    """Redis с потоками, группами потребителей, хэшами и множествами."""
+
+    def __init__(self):
+        self.streams = {}  # key -> {"entries": [(id, fields)], "delivered": int, "pending": {id: [consumer, time]}}
+        self.hashes = {}
+        self.sets = {}
+        self.now = 0.0
+
+    def _stream(self, key):
+        if key not in self.streams:
+            raise Exception("NOGROUP No such key or consumer group")
+        return self.streams[key]
+
+    async def xgroup_create(self, key, group, id="0", mkstream=False):
+        self.streams[key] = {"entries": [], "delivered": 0, "pending": {}}
+
+    async def xadd(self, key, fields):
+        stream = self.streams[key]
+        entry_id = f"{len(stream['entries']) + 1}-0"
+        stream["entries"].append((entry_id, dict(fields)))
+        return entry_id
+
+    async def xreadgroup(self, group, consumer, streams, count=1, block=None):
+        (key, _), = streams.items()
+        stream = self._stream(key)
+        if stream["delivered"] >= len(stream["entries"]):
+            return []
+        entry_id, fields = stream["entries"][stream["delivered"]]
+        stream["delivered"] += 1
+        stream["pending"][entry_id] = [consumer, self.now]
+        return [[key, [(entry_id, fields)]]]
+
+    async def xautoclaim(self, key, group, consumer, min_idle_time, start_id="0-0", count=1):
+        stream = self._stream(key)
+        for entry_id, fields in stream["entries"]:
+            pending = stream["pending"].get(entry_id)
+            if pending and (self.now - pending[1]) * 1000 >= min_idle_time:
+                stream["pending"][entry_id] = [consumer, self.now]
+                return ["0-0", [(entry_id, fields)], []]
+        return ["0-0", [], []]
+
+    async def xack(self, key, group, entry_id):
+        stream = self._stream(key)
+        return 1 if stream["pending"].pop(entry_id, None) else 0
+
+    async def xinfo_stream(self, key):
+        stream = self._stream(key)
+        return {"last-generated-id": stream["entries"][-1][0] if stream["entries"] else "0-0"}
+
+    async def xinfo_groups(self, key):
+        stream = self._stream(key)
+        delivered = stream["entries"][stream["delivered"] - 1][0] if stream["delivered"] else "0-0"
+        return [{"name": "pages", "pending": len(stream["pending"]), "last-delivered-id": delivered}]
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def hincrby(self, key, field, amount):
+        data = self.hashes.setdefault(key, {})
+        data[field] = str(int(data.get(field, 0)) + amount)
+
+    async def expire(self, key, seconds):
+        return True
+
+    async def sadd(self, key, member):
+        self.sets.setdefault(key, set()).add(member)
+
+    async def srem(self, key, member):
+        self.sets.get(key, set()).discard(member)
+
+    async def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.streams.pop(key, None)
+            self.hashes.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return _FakeStreamPipeline(self)
+
+
+class _FakeRedisService:
+    def __init__(self, client=None):
+        self._client = client or _FakeStreamRedis()
+        self.lists = {}
+
+    def is_connected(self):
+        return True
+
+    async def rpop(self, key, timeout=None):
+        items = self.lists.get(key)
+        return items.pop() if items else None
+
+    async def llen(self, key):
+        return len(self.lists.get(key, []))
+
+
+def _pages(count):
+    return [json.dumps({"page_num": num, "page_start": (num - 1) * 20, "page_count": 20}) for num in range(1, count + 1)]
+
+
+def _create_run(redis, pages=3):
+    task = SimpleNamespace(id=42)
+    return asyncio.run(create_page_run(redis, task, 730, "AK-47 | Redline", SearchFilters(item_name="AK-47 | Redline"), _pages(pages)))
+
+
+class TestStreamPageSource:
+    """Тесты источника страниц из потока запуска."""
+
+    def test_create_and_close_run(self):
+        """Тест: запуск регистрируется для реплик и удаляется после завершения."""
+        redis = _FakeRedisService()
+        run_id = _create_run(redis)
+        client = redis._client
+        assert run_id in client.sets[page_jobs.RUNS_KEY]
+        assert run_id in page_jobs.local_runs
+        assert len(client.streams[page_jobs.stream_key(run_id)]["entries"]) == 3
+        meta = client.hashes[page_jobs.run_key(run_id)]
+        assert (meta["task_id"], meta["total"], meta["appid"]) == ("42", "3", "730")
+
+        asyncio.run(close_page_run(redis, run_id))
+        assert run_id not in client.sets[page_jobs.RUNS_KEY]
+        assert run_id not in page_jobs.local_runs
+        assert page_jobs.stream_key(run_id) not in client.streams
+
+    def test_pages_split_between_consumers(self):
+        """Тест: каждая страница выдается одному потребителю, подтверждения считаются в запуске."""
+        redis = _FakeRedisService()
+        run_id = _create_run(redis, pages=4)
+
+        async def _scenario():
+            first = StreamPageSource(redis, run_id, consumer="a")
+            second = StreamPageSource(redis, run_id, consumer="b")
+            taken = []
+            for source in (first, second, first, second):
+                page = json.loads(await source.next(timeout=0.01))
+                taken.append(page["page_num"])
+                await source.done(page["page_num"], ok=page["page_num"] != 4)
+            assert await first.next(timeout=0.01) is None
+            return taken, await page_run_progress(redis, run_id), await barrier_reached(redis, run_id)
+
+        taken, progress, barrier = asyncio.run(_scenario())
+        assert sorted(taken) == [1, 2, 3, 4]
+        assert progress == (3, 1, 4)
+        assert barrier
+        page_jobs.local_runs.discard(run_id)
+
+    def test_reclaims_pages_of_crashed_consumer(self):
+        """Тест: страница упавшего потребителя забирается после простоя и считается один раз."""
+        redis = _FakeRedisService()
+        run_id = _create_run(redis, pages=1)
+
+        async def _scenario():
+            crashed = StreamPageSource(redis, run_id, consumer="crashed", claim_idle=60)
+            coordinator = StreamPageSource(redis, run_id, consumer="coordinator", wait_all=True, claim_idle=60)
+            await crashed.next(timeout=0.01)
+            assert await coordinator.next(timeout=0.01) is None
+            assert not await coordinator.exhausted()
+
+            redis._client.now += 61
+            page = json.loads(await coordinator.next(timeout=0.01))
+            await coordinator.done(page["page_num"])
+            # Упавший потребитель ожил и подтверждает ту же страницу
+            await crashed.done(page["page_num"])
+            return coordinator.reclaimed, await coordinator.exhausted(), await page_run_progress(redis, run_id)
+
+        assert asyncio.run(_scenario()) == (1, True, (1, 0, 1))
+        page_jobs.local_runs.discard(run_id)
+
+    def test_barrier_deadline_and_closed_run(self):
+        """Тест: координатор не ждет барьер дольше таймаута, закрытый запуск исчерпан."""
+        redis = _FakeRedisService()
+        run_id = _create_run(redis, pages=2)
+
+        async def _scenario():
+            waiting = StreamPageSource(redis, run_id, wait_all=True, barrier_timeout=0)
+            helper = StreamPageSource(redis, run_id, consumer="helper")
+            assert await helper.exhausted()
+            expired = await waiting.exhausted()
+            await close_page_run(redis, run_id)
+            return expired, await helper.next(timeout=0.01), await helper.exhausted()
+
+        assert asyncio.run(_scenario()) == (True, None, True)
+
+    def test_list_source_keeps_local_queue(self):
+        """Тест: источник по умолчанию берет страницы из Redis списка задачи."""
+        redis = _FakeRedisService()
+        redis.lists["parsing:pages:task_1"] = ["p2", "p1"]
+        source = ListPageSource(redis, "parsing:pages:task_1")
+
+        async def _scenario():
+            taken = [await source.next(), await source.next()]
+            return taken, await source.exhausted()
+
+        assert asyncio.run(_scenario()) == (["p1", "p2"], True)
+
+
+class TestPageJobHelper:
+    """Тесты подключения реплики к чужим запускам."""
+
+    def _helper(self, redis, limit=None):
+        helper = PageJobHelper(None, redis, None, limit=limit or AdaptiveLimit(4))
+        helper.helped = []
+
+        async def _help(run_id, meta):
+            helper.helped.append((run_id, meta["task_id"]))
+
+        helper.help = _help
+        return helper
+
+    def test_helps_foreign_runs_only(self):
+        """Тест: помощник берет чужой запуск с невыданными страницами и пропускает свой."""
+        redis = _FakeRedisService()
+        own_run = _create_run(redis)
+        foreign_run = _create_run(redis)
+        page_jobs.local_runs.discard(foreign_run)
+        helper = self._helper(redis)
+
+        async def _scenario():
+            started = await helper.poll()
+            await asyncio.sleep(0)
+            return started
+
+        assert asyncio.run(_scenario()) == 1
+        assert helper.helped == [(foreign_run, "42")]
+        page_jobs.local_runs.discard(own_run)
+
+    def test_skips_when_saturated_and_drops_stale_runs(self):
+        """Тест: без свободных слотов запуски не берутся, запуск без метаданных удаляется из реестра."""
+        redis = _FakeRedisService()
+        run_id = _create_run(redis)
+        page_jobs.local_runs.discard(run_id)
+        limit = AdaptiveLimit(1)
+        limit.active = 1
+        helper = self._helper(redis, limit=limit)
+        assert asyncio.run(helper.poll()) == 0
+
+        limit.active = 0
+        redis._client.hashes.clear()
+        assert asyncio.run(helper.poll()) == 0
+        assert run_id not in redis._client.sets[page_jobs.RUNS_KEY]
+
+    def test_help_starts_fresh_cancellation_token(self, monkeypatch):
+        """Тест: помощник берет статус задачи из БД и начинает новый токен отмены."""
+        from services import page_jobs as page_jobs_service
+        from services.task_cancellation import task_cancellation
+
+        class _Parser:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *args):
+                return False
+
+        async def _load_task(task_id):
+            return SimpleNamespace(id=task_id)
+
+        async def _no_proxies(parser, log):
+            return []
+
+        monkeypatch.setattr(page_jobs_service, "_get_steam_parser", lambda: lambda **kwargs: _Parser())
+        monkeypatch.setattr(page_jobs_service, "get_available_proxies", _no_proxies)
+        helper = PageJobHelper(None, _FakeRedisService(), None, limit=AdaptiveLimit(1))
+        helper._load_task = _load_task
+        task_cancellation.token(77).cancel()
+
+        meta = {"task_id": "77", "filters": SearchFilters(item_name="AK-47 | Redline").model_dump_json()}
+        asyncio.run(helper.help("77-run", meta))
+        assert not task_cancellation.token(77).cancelled
@@ -0,0 +1,77 @@
+"""
+Тесты для кодека сообщений Redis/RabbitMQ (payload_codec).
+"""
+import json
+
+import pytest
+
+from core.utils import payload_codec
+
+
+MESSAGE = {
+    "type": "found_item",
+    "task_id": 42,
+    "item_name": "AK-47 | Redline (Field-Tested)",
+    "price": 12.34,
+    "stickers": [{"name": "Sticker | Crown (Foil)", "price": None}],
+    "task_name": "Тестовая задача"
+}
+
+
+class TestPayloadCodec:
+    """Тесты кодирования и декодирования сообщений."""
+
+    @pytest.mark.parametrize("codec", ["json", "orjson", "msgpack"])
+    def test_roundtrip_bytes(self, codec):
+        """Тест: сообщение декодируется после кодирования любым кодеком."""
+        encoded = payload_codec.encode(MESSAGE, codec)
+        assert payload_codec.decode(encoded) == MESSAGE
+
+    @pytest.mark.parametrize("codec", ["json", "orjson", "msgpack"])
+    def test_roundtrip_redis_str(self, codec):
+        """Тест: строка для Redis (decode_responses=True) декодируется без потерь."""
+        encoded = payload_codec.encode_str(MESSAGE, codec)
+        assert isinstance(encoded, str)
+        assert payload_codec.decode(encoded) == MESSAGE
+
+    def test_version_byte(self):
+        """Тест: новые форматы помечаются байтом версии, legacy JSON - нет."""
+        assert payload_codec.encode(MESSAGE, "orjson")[0] == payload_codec.VERSION_JSON
+        assert payload_codec.encode(MESSAGE, "msgpack")[0] == payload_codec.VERSION_MSGPACK
+        assert payload_codec.encode(MESSAGE, "json")[:1] == b"{"
+
+    def test_legacy_json_from_old_producer(self):
+        """Тест: сообщения старых продюсеров (json.dumps) декодируются."""
+        legacy = json.dumps(MESSAGE, ensure_ascii=False)
+        assert payload_codec.decode(legacy) == MESSAGE
+        assert payload_codec.decode(legacy.encode("utf-8")) == MESSAGE
+
+    def test_msgpack_smaller_than_json(self):
+        """Тест: msgpack компактнее legacy JSON."""
+        assert len(payload_codec.encode(MESSAGE, "msgpack")) < len(payload_codec.encode(MESSAGE, "json"))
+
+    def test_invalid_payload_raises_value_error(self):
+        """Тест: некорректное сообщение вызывает ValueError."""
+        with pytest.raises(ValueError):
+            payload_codec.decode(b"")
+        with pytest.raises(ValueError):
+            payload_codec.decode(b"\x01not json")
+
+    def test_unknown_codec_falls_back_to_json(self):
+        """Тест: неизвестное имя кодека приводит к legacy JSON."""
+        assert payload_codec.resolve_codec("protobuf") == payload_codec.CODEC_LEGACY_JSON
+
+    def test_unknown_codec_warns_once(self, monkeypatch):
+        """Тест: предупреждение о неизвестном кодеке пишется один раз, а не на каждый encode."""
+        warnings = []
+        monkeypatch.setattr(payload_codec.logger, "warning", warnings.append)
+        payload_codec._resolve_codec.cache_clear()
+        for _ in range(3):
+            payload_codec.encode(MESSAGE, "avro")
+        assert len(warnings) == 1
+
+    @pytest.mark.parametrize("codec", ["json", "orjson", "msgpack"])
+    def test_non_str_keys_encode(self, codec):
+        """Тест: словари с числовыми ключами кодируются любым кодеком."""
+        decoded = payload_codec.decode(payload_codec.encode({"prices": {1: 2.5}}, codec))
+        assert decoded["prices"] in ({"1": 2.5}, {1: 2.5})
@@ -189,6 +189,8 @@ async def test_process_item_result_duplicate_listing_id(
     
     mock_result_all = MagicMock()
     mock_result_all.scalars.return_value.all.return_value = [existing_item]
+    # INSERT ... ON CONFLICT DO NOTHING RETURNING id не возвращает id для дубликата
+    mock_result_all.scalar_one_or_none.return_value = None
     mock_db_session.execute.return_value = mock_result_all
     
     # Вызываем функцию
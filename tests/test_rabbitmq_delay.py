@@ -0,0 +1,139 @@
+"""
+Тесты для очередей задержки RabbitMQ (уровни TTL и досылка остатка задержки).
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+from core.utils import payload_codec
+from services.rabbitmq_service import RabbitMQService, delay_tier
+
+
+TIERS = (1, 5, 30, 120, 600)
+
+
+class _FakeExchange:
+    """Exchange, запоминающий публикации."""
+
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, message, routing_key):
+        self.published.append((routing_key, message))
+
+
+class _FakeMessage:
+    """Полученное сообщение RabbitMQ."""
+
+    def __init__(self, task_data, headers=None, priority=0):
+        self.body = payload_codec.encode(task_data)
+        self.content_type = payload_codec.content_type()
+        self.headers = headers or {}
+        self.priority = priority
+        self.acked = False
+
+    async def ack(self):
+        self.acked = True
+
+    async def nack(self, requeue=True):
+        pass
+
+
+class _FakeChannel:
+    """Канал, отвечающий на пассивное объявление очереди ее глубиной."""
+
+    def __init__(self, depths):
+        self.depths = depths
+
+    async def declare_queue(self, name, passive=False):
+        return SimpleNamespace(declaration_result=SimpleNamespace(message_count=self.depths.get(name, 0)))
+
+
+def _service():
+    service = RabbitMQService()
+    service.delay_tiers = TIERS
+    service._retry_exchange = _FakeExchange()
+    return service
+
+
+class TestDelayTier:
+    """Тесты выбора уровня задержки."""
+
+    def test_largest_tier_not_exceeding_delay(self):
+        """Тест: выбирается наибольший уровень не больше задержки, малая задержка округляется вверх."""
+        assert delay_tier(5, TIERS) == 5
+        assert delay_tier(7, TIERS) == 5
+        assert delay_tier(240, TIERS) == 120
+        assert delay_tier(3600, TIERS) == 600
+        assert delay_tier(0.2, TIERS) == 1
+
+
+class TestDelayedPublish:
+    """Тесты публикации и досылки отложенных задач."""
+
+    def test_publish_routes_to_tier_with_deadline(self):
+        """Тест: отложенная задача уходит в очередь уровня со сроком доставки в заголовке."""
+        service = _service()
+        service.is_connected = lambda: True
+        before = time.time()
+        asyncio.run(service.publish_task({"task_id": 1}, delay_seconds=45))
+
+        routing_key, message = service._retry_exchange.published[0]
+        assert routing_key == "delay_30s"
+        assert message.expiration is None
+        assert before + 45 <= message.headers[RabbitMQService.DELAY_HEADER] <= time.time() + 45
+
+    def test_early_message_deferred_for_remainder(self):
+        """Тест: сообщение, пришедшее раньше срока, досылается на остаток и не обрабатывается."""
+        service = _service()
+        deliver_at = time.time() + 15
+        message = _FakeMessage({"task_id": 2}, {service.DELAY_HEADER: deliver_at, "x-retry-count": 1, "x-death": [{}]})
+
+        assert asyncio.run(service._defer_if_early(message)) is True
+        routing_key, deferred = service._retry_exchange.published[0]
+        assert message.acked
+        assert routing_key == "delay_5s"
+        assert deferred.headers == {service.DELAY_HEADER: deliver_at, "x-retry-count": 1}
+
+    def test_due_message_processed(self):
+        """Тест: сообщение с наступившим сроком передается в callback."""
+        service = _service()
+        message = _FakeMessage({"task_id": 3}, {service.DELAY_HEADER: time.time() - 1})
+        calls = []
+
+        assert asyncio.run(service._defer_if_early(message)) is False
+        asyncio.run(service._handle_message(message, lambda task_data, msg: calls.append(task_data["task_id"])))
+        assert calls == [3]
+        assert service._retry_exchange.published == []
+
+    def test_retry_goes_to_tier_and_keeps_priority(self):
+        """Тест: повтор срочной задачи идет в уровень срочной очереди и сохраняет приоритет."""
+        service = _service()
+        message = _FakeMessage({"task_id": 4}, {"x-retry-count": 0}, priority=7)
+
+        asyncio.run(service._handle_task_error(message, {"task_id": 4}, RuntimeError("boom")))
+        routing_key, retry = service._retry_exchange.published[0]
+        assert routing_key == "urgent_delay_120s"
+        assert retry.priority == 7
+        assert retry.headers["x-retry-count"] == 1
+        assert message.acked
+
+    def test_normal_retry_stays_in_normal_lane(self):
+        """Тест: повтор обычной задачи идет в уровень основной очереди."""
+        service = _service()
+        message = _FakeMessage({"task_id": 5}, {"x-retry-count": 0})
+
+        asyncio.run(service._handle_task_error(message, {"task_id": 5}, RuntimeError("boom")))
+        assert service._retry_exchange.published[0][0] == "delay_120s"
+
+    def test_delay_depths_per_tier(self):
+        """Тест: глубина очередей задержки отдается по очередям задач и уровням."""
+        service = _service()
+        service._channel = _FakeChannel({
+            "parsing_tasks_delay_5s": 3, "parsing_tasks_delay_600s": 12, "parsing_tasks_urgent_delay_1s": 2
+        })
+        depths = asyncio.run(service.get_delay_depths())
+        assert depths == {
+            "parsing": {1: 0, 5: 3, 30: 0, 120: 0, 600: 12},
+            "parsing_urgent": {1: 2, 5: 0, 30: 0, 120: 0, 600: 0},
+        }
@@ -0,0 +1,252 @@
+"""
+Тесты для фильтра уже сохраненных лотов задачи (SeenListings).
+"""
+import asyncio
+from unittest.mock import MagicMock
+
+from core.steam_market_parser.parallel_listing_listings_processor import drop_seen_listings
+from services.seen_listings import SeenListings, bloom_parameters
+
+
+class _Clock:
+    """Управляемое время."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _FakeRedisClient:
+    """Битовые карты, sorted set и пайплайн в памяти (биты - как в Redis, от старшего бита байта)."""
+
+    def __init__(self):
+        self.data = {}
+        self.pipelines = 0
+
+    def pipeline(self, transaction=True):
+        self.pipelines += 1
+        return _FakePipeline(self)
+
+    def _bit(self, key, position):
+        bitmap = self.data.get(key, b"")
+        if position >> 3 >= len(bitmap):
+            return 0
+        return 1 if bitmap[position >> 3] & (0x80 >> (position & 7)) else 0
+
+    def _set_bit(self, key, position):
+        bitmap = bytearray(self.data.get(key, b""))
+        if position >> 3 >= len(bitmap):
+            bitmap.extend(b"\0" * ((position >> 3) + 1 - len(bitmap)))
+        bitmap[position >> 3] |= 0x80 >> (position & 7)
+        self.data[key] = bytes(bitmap)
+
+    def run(self, name, *args):
+        if name == "BITFIELD":
+            key, ops, result = args[0], list(args[1:]), []
+            while ops:
+                if ops[0] == "GET":
+                    result.append(self._bit(key, ops[2]))
+                    ops = ops[3:]
+                else:
+                    result.append(self._bit(key, ops[2]))
+                    self._set_bit(key, ops[2])
+                    ops = ops[4:]
+            return result
+        if name == "ZMSCORE":
+            zset = self.data.get(args[0], {})
+            return [zset.get(member) for member in args[1:]]
+        if name == "EXISTS":
+            return int(args[0] in self.data)
+        if name == "ZADD":
+            self.data.setdefault(args[0], {}).update(args[1])
+            return len(args[1])
+        if name == "ZREMRANGEBYSCORE":
+            zset = self.data.get(args[0], {})
+            for member in [m for m, score in zset.items() if score <= args[2]]:
+                del zset[member]
+            return 0
+        if name == "SET":
+            self.data[args[0]] = args[1]
+            return True
+        if name == "RENAME":
+            self.data[args[1]] = self.data.pop(args[0])
+            return True
+        if name == "EXPIRE":
+            return 1
+        raise AssertionError(name)
+
+    async def exists(self, key):
+        return self.run("EXISTS", key)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+class _FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def execute_command(self, *args):
+        self.commands.append(args)
+
+    def exists(self, key):
+        self.commands.append(("EXISTS", key))
+
+    def zadd(self, key, mapping):
+        self.commands.append(("ZADD", key, mapping))
+
+    def zremrangebyscore(self, key, low, high):
+        self.commands.append(("ZREMRANGEBYSCORE", key, low, high))
+
+    def expire(self, key, seconds):
+        self.commands.append(("EXPIRE", key, seconds))
+
+    def set(self, key, value, ex=None):
+        self.commands.append(("SET", key, value))
+
+    def rename(self, src, dst):
+        self.commands.append(("RENAME", src, dst))
+
+    async def execute(self):
+        return [self.client.run(*command) for command in self.commands]
+
+
+class _FakeRedisService:
+    def __init__(self, client=None):
+        self._client = client or _FakeRedisClient()
+
+    def is_connected(self):
+        return True
+
+
+def _session(listing_ids):
+    """Сессия БД, возвращающая listing_id сохраненных лотов задачи."""
+    session = MagicMock()
+
+    async def _execute(stmt):
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = list(listing_ids)
+        return result
+
+    session.execute = _execute
+    return session
+
+
+class TestSeenListings:
+    """Тесты фильтра."""
+
+    def test_bloom_parameters_follow_fp_rate(self):
+        """Тест: размер фильтра растет при уменьшении доли ложных срабатываний."""
+        bits, hashes = bloom_parameters(100000, 0.001)
+        assert 1400000 < bits < 1450000
+        assert hashes == 10
+        assert bloom_parameters(100000, 0.01)[0] < bits
+
+    def test_added_listings_are_seen_in_one_roundtrip(self):
+        """Тест: сохраненные лоты находятся, проверка страницы - один пайплайн."""
+        redis = _FakeRedisService()
+        seen = SeenListings(capacity=1000, fp_rate=0.001, recent_window=60)
+
+        async def _scenario():
+            await seen.add_many(redis, 1, ["111", "222"])
+            redis._client.pipelines = 0
+            found = await seen.contains_many(redis, 1, ["111", "222", "333"])
+            return found, redis._client.pipelines
+
+        found, pipelines = asyncio.run(_scenario())
+        assert found == {"111", "222"}
+        assert pipelines == 1
+
+    def test_bloom_answers_after_recent_window(self):
+        """Тест: после выхода из окна недавних лот по-прежнему находится фильтром Блума."""
+        clock = _Clock()
+        redis = _FakeRedisService()
+        seen = SeenListings(capacity=1000, fp_rate=0.001, recent_window=60, clock=clock)
+
+        async def _scenario():
+            await seen.add_many(redis, 1, ["111"])
+            clock.now += 120
+            await seen.add_many(redis, 1, ["222"])
+            return await seen.contains_many(redis, 1, ["111", "333"])
+
+        assert asyncio.run(_scenario()) == {"111"}
+        assert "111" not in redis._client.data["seen:1:recent"]
+
+    def test_tasks_are_isolated(self):
+        """Тест: лот, сохраненный одной задачей, не пропускается в другой."""
+        redis = _FakeRedisService()
+        seen = SeenListings(capacity=1000, fp_rate=0.001)
+
+        async def _scenario():
+            await seen.add_many(redis, 1, ["111"])
+            return await seen.contains_many(redis, 2, ["111"])
+
+        assert asyncio.run(_scenario()) == set()
+
+    def test_rebuild_from_db_matches_bitfield_layout(self):
+        """Тест: фильтр, собранный из found_items, читается через BITFIELD."""
+        redis = _FakeRedisService()
+        seen = SeenListings(capacity=1000, fp_rate=0.001)
+
+        async def _scenario():
+            await seen.ensure(redis, 1, _session(["111", "222"]))
+            return await seen.contains_many(redis, 1, ["111", "222", "333"])
+
+        assert asyncio.run(_scenario()) == {"111", "222"}
+        assert seen.rebuilds == 1
+        assert "seen:1:bloom:rebuild" not in redis._client.data
+
+    def test_ensure_keeps_existing_filter(self):
+        """Тест: существующий фильтр не пересобирается."""
+        redis = _FakeRedisService()
+        seen = SeenListings(capacity=1000, fp_rate=0.001)
+
+        async def _scenario():
+            await seen.add_many(redis, 1, ["111"])
+            await seen.ensure(redis, 1, _session([]))
+            return await seen.contains_many(redis, 1, ["111"])
+
+        assert asyncio.run(_scenario()) == {"111"}
+        assert seen.rebuilds == 0
+
+    def test_reset_forgets_task(self):
+        """Тест: после удаления задачи ее лоты не считаются сохраненными."""
+        redis = _FakeRedisService()
+        seen = SeenListings(capacity=1000, fp_rate=0.001)
+
+        async def _scenario():
+            await seen.add_many(redis, 1, ["111"])
+            await seen.reset(redis, 1)
+            return await seen.contains_many(redis, 1, ["111"])
+
+        assert asyncio.run(_scenario()) == set()
+
+    def test_without_redis_nothing_is_skipped(self):
+        """Тест: без Redis лоты не отсеиваются."""
+        seen = SeenListings(capacity=1000, fp_rate=0.001)
+        assert asyncio.run(seen.contains_many(None, 1, ["111"])) == set()
+
+
+class TestDropSeenListings:
+    """Тесты отсева страницы перед фильтрами."""
+
+    def test_page_drops_saved_listings(self):
+        """Тест: со страницы убираются только уже сохраненные лоты."""
+        redis = _FakeRedisService()
+        page = [{"listing_id": "111"}, {"listing_id": "222"}, {"listing_id": None}]
+
+        async def _scenario():
+            from services.seen_listings import seen_listings
+            await seen_listings.add_many(redis, 99, ["111"])
+            return await drop_seen_listings(page, 99, redis)
+
+        assert asyncio.run(_scenario()) == [{"listing_id": "222"}, {"listing_id": None}]
+
+    def test_without_task_page_unchanged(self):
+        """Тест: без задачи страница не меняется."""
+        page = [{"listing_id": "111"}]
+        assert asyncio.run(drop_seen_listings(page, None, _FakeRedisService())) is page
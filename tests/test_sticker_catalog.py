@@ -0,0 +1,79 @@
+"""
+Тесты для локального каталога цен наклеек (StickerCatalogService).
+"""
+import asyncio
+import time
+from unittest.mock import patch
+
+from core.utils.two_tier_cache import TwoTierCache
+from parsers.sticker_prices import StickerPricesAPI
+from services.sticker_catalog_service import (
+    StickerCatalogService,
+    normalize_sticker_name,
+    parse_search_results
+)
+
+
+def _catalog(prices):
+    """Каталог с ценами в памяти (без БД)."""
+    catalog = StickerCatalogService(db_manager=None)
+    now = time.time()
+    catalog._prices = {normalize_sticker_name(name): (price, now) for name, price in prices.items()}
+    return catalog
+
+
+class TestStickerCatalog:
+    """Тесты разбора поиска и чтения каталога."""
+
+    def test_normalize_sticker_name(self):
+        """Тест: префикс 'Sticker |', регистр и пробелы не влияют на поиск."""
+        assert normalize_sticker_name("Sticker | MOUZ | Stockholm 2021") == "mouz | stockholm 2021"
+        assert normalize_sticker_name("MOUZ  |  Stockholm 2021") == normalize_sticker_name("mouz | stockholm 2021")
+
+    def test_parse_search_results(self):
+        """Тест: цена переводится из центов, лоты без цены сохраняются с price=None."""
+        rows, total = parse_search_results({
+            "success": True,
+            "total_count": 2,
+            "results": [
+                {"hash_name": "Sticker | Crown (Foil)", "sell_price": 54050, "sell_listings": 12},
+                {"hash_name": "Sticker | Rare", "sell_price": 0, "sell_listings": 0},
+                {"sell_price": 10}
+            ]
+        })
+        assert total == 2
+        assert rows[0] == {"name": "Sticker | Crown (Foil)", "normalized_name": "crown (foil)", "price": 540.5, "volume": 12}
+        assert rows[1]["price"] is None
+        assert len(rows) == 2
+
+    def test_lookup_skips_missing_stale_and_other_currency(self):
+        """Тест: возвращаются только свежие цены для той же валюты."""
+        catalog = _catalog({"Crown (Foil)": 540.5, "Old": 1.0, "No Price": None})
+        catalog._prices["old"] = (1.0, 0.0)
+        found = catalog.lookup(["Sticker | Crown (Foil)", "Old", "No Price", "Unknown"])
+        assert found == {"Sticker | Crown (Foil)": 540.5}
+        assert catalog.lookup(["Crown (Foil)"], currency=5) == {}
+        assert catalog.hits == 1 and catalog.misses == 3
+
+    def test_batch_reads_catalog_before_live_lookup(self):
+        """Тест: в Steam запрашиваются только наклейки, которых нет в каталоге."""
+        fetched = []
+
+        async def fake_price(name, *args, **kwargs):
+            fetched.append(name)
+            return 2.0
+
+        with patch.object(StickerPricesAPI, "catalog", _catalog({"Crown (Foil)": 540.5})), \
+                patch.object(StickerPricesAPI, "price_cache", TwoTierCache("sticker_price", ttl=3600)), \
+                patch.object(StickerPricesAPI, "get_sticker_price", side_effect=fake_price):
+            prices = asyncio.run(StickerPricesAPI.get_stickers_prices_batch(["Crown (Foil)", "Bosh (Holo)"]))
+
+        assert prices == {"Crown (Foil)": 540.5, "Bosh (Holo)": 2.0}
+        assert fetched == ["Bosh (Holo)"]
+
+    def test_fuzzy_match_uses_catalog_index(self):
+        """Тест: гибкое сопоставление находит наклейку каталога по похожему названию."""
+        catalog = _catalog({"Sticker | Team EnVyUs | Cluj-Napoca 2015": 2.5, "Sticker | Crown (Foil)": 540.5})
+        assert catalog.match("Team EnVyUs Cluj-Napoca 2015") == ("team envyus | cluj-napoca 2015", 2.5)
+        assert catalog.match("Completely Different") is None
+        assert catalog.match("Crown (Foil)", currency=5) is None
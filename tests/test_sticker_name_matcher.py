@@ -0,0 +1,70 @@
+"""
+Тесты для индекса гибкого сопоставления названий наклеек (sticker_name_matcher).
+"""
+import random
+
+from core.utils.sticker_name_matcher import (
+    StickerNameIndex,
+    calculate_similarity,
+    find_best_match,
+    get_name_index,
+    normalize_sticker_name
+)
+
+
+def _linear_best_match(requested_name, available_names, min_similarity):
+    """Полный перебор (прежняя реализация find_best_match)."""
+    requested_normalized = normalize_sticker_name(requested_name)
+    for available_name in available_names:
+        if normalize_sticker_name(available_name) == requested_normalized:
+            return (available_name, 1.0)
+    best_match = None
+    best_similarity = 0.0
+    for available_name in available_names:
+        similarity = calculate_similarity(requested_name, available_name)
+        if similarity > best_similarity and similarity >= min_similarity:
+            best_similarity = similarity
+            best_match = available_name
+    return (best_match, best_similarity) if best_match else None
+
+
+WORDS = ["Crown", "Foil", "Holo", "MOUZ", "Austin", "2025", "Katowice", "2014", "Team", "EnVyUs", "G2", "Cluj-Napoca",
+         "2015", "Gold", "Bosh", "iBUYPOWER", "Titan", "Glitter", "s1mple", "ZywOo", "|", "(", ")"]
+
+
+class TestStickerNameIndex:
+    """Тесты индекса названий."""
+
+    def test_examples(self):
+        """Тест: примеры из модуля."""
+        assert find_best_match("Crown (Foil)", {"Crown (Foil)": 540.5, "Crown Foil": 540.5}) == ("Crown (Foil)", 1.0)
+        assert find_best_match("MOUZ | Austin 2025", {"mouz austin 2025": 0.03}) == ("mouz austin 2025", 1.0)
+        assert find_best_match("Some Unknown Sticker", {"Crown (Foil)": 540.5, "Bosh (Holo)": 3.94}) is None
+
+    def test_containment_without_common_tokens(self):
+        """Тест: вхождение строки находится и без общих слов."""
+        index = StickerNameIndex(["mouzsports austin", "crown"])
+        assert index.best_match("mouz", min_similarity=0.7) == ("mouzsports austin", 0.8)
+        assert index.best_match("crownfoil", min_similarity=0.7) == ("crown", 0.8)
+
+    def test_matches_linear_scan(self):
+        """Тест: результат индекса совпадает с полным перебором."""
+        rng = random.Random(7)
+        for _ in range(30):
+            names = list(dict.fromkeys(
+                " ".join(rng.sample(WORDS, rng.randint(1, 4))) for _ in range(rng.randint(1, 60))
+            ))
+            index = StickerNameIndex(names)
+            for _ in range(30):
+                requested = " ".join(rng.sample(WORDS, rng.randint(1, 4)))
+                if rng.random() < 0.2:
+                    requested = requested.replace(" ", "")
+                for min_similarity in (0.5, 0.7):
+                    assert index.best_match(requested, min_similarity) == \
+                        _linear_best_match(requested, names, min_similarity), f"{requested!r} в {names}"
+
+    def test_index_shared_per_name_set(self):
+        """Тест: для одного набора названий индекс строится один раз."""
+        names = {"Crown (Foil)": 1.0, "Bosh (Holo)": 2.0}
+        assert get_name_index(names) is get_name_index(dict(names))
+        assert get_name_index(names) is not get_name_index({"Crown (Foil)": 1.0})
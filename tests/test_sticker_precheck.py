@@ -0,0 +1,120 @@
+"""
+Тесты для раннего отсева лотов по фильтру наклеек (StickerPrecheck).
+"""
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from core.models import ParsedItemData, SearchFilters, StickerInfo, StickersFilter
+from parsers.sticker_prices import StickerPricesAPI
+from services.filter_service import FilterService
+from services.sticker_catalog_service import StickerCatalogService, normalize_sticker_name
+from services.sticker_precheck import StickerPrecheck
+
+
+def _catalog(prices):
+    """Каталог с ценами в памяти (без БД)."""
+    catalog = StickerCatalogService(db_manager=None)
+    now = time.time()
+    catalog._prices = {normalize_sticker_name(name): (price, now) for name, price in prices.items()}
+    return catalog
+
+
+def _listing(price, *names):
+    return ParsedItemData(
+        item_name="AK-47 | Redline (Field-Tested)",
+        item_price=price,
+        stickers=[StickerInfo(name=name, position=i) for i, name in enumerate(names)]
+    )
+
+
+def _filters(**stickers_filter):
+    return SearchFilters(item_name="AK-47 | Redline (Field-Tested)", stickers_filter=StickersFilter(**stickers_filter))
+
+
+class _BasePrices:
+    """BasePriceManager с ценами только в кэше."""
+
+    def __init__(self, price):
+        self.price = price
+
+    def get_cached_price(self, item_name, appid=730):
+        return self.price
+
+
+class TestStickerPrecheck:
+    """Тесты границы цены наклеек."""
+
+    def test_min_price_unreachable_with_known_prices(self):
+        """Тест: наклейки из каталога стоят меньше min_stickers_price - отказ без запросов."""
+        precheck = StickerPrecheck()
+        catalog = _catalog({"A": 1.0, "B": 2.0, "Expensive": 100.0})
+        reason = precheck.reject_reason(["A", "B"], StickersFilter(min_stickers_price=5.0), 30.0, None, catalog)
+        assert reason is not None
+        assert precheck.rejected == 1
+        # Обе наклейки есть в каталоге - запросов и так не было бы
+        assert precheck.saved_lookups == 0
+
+    def test_unknown_sticker_uses_catalog_ceiling(self):
+        """Тест: для наклейки не из каталога граница - максимальная цена каталога с запасом."""
+        precheck = StickerPrecheck()
+        catalog = _catalog({"A": 1.0, "Top": 3.0})
+        with patch("services.sticker_precheck.Config.STICKER_PRECHECK_MARGIN", 2.0):
+            # A (1.0) + неизвестная (3.0 * 2) = 7.0
+            assert precheck.reject_reason(["A", "New"], StickersFilter(min_stickers_price=7.0), 30.0, None, catalog) is None
+            assert precheck.reject_reason(["A", "New"], StickersFilter(min_stickers_price=7.5), 30.0, None, catalog) is not None
+        assert precheck.saved_lookups == 1
+
+    def test_overpay_bound(self):
+        """Тест: S > D + x * max(P) - формула не выполнится ни при какой цене наклеек."""
+        precheck = StickerPrecheck()
+        catalog = _catalog({"A": 2.0, "B": 3.0})
+        stickers_filter = StickersFilter(max_overpay_coefficient=0.5)
+        # D + x * P = 10 + 0.5 * 5 = 12.5
+        assert precheck.reject_reason(["A", "B"], stickers_filter, 12.6, 10.0, catalog) is not None
+        assert precheck.reject_reason(["A", "B"], stickers_filter, 12.5, 10.0, catalog) is None
+        # Цена ниже базовой: x = 0, фильтр проходит
+        assert precheck.reject_reason(["A", "B"], stickers_filter, 9.0, 10.0, catalog) is None
+
+    def test_no_bound_without_catalog_or_base_price(self):
+        """Тест: без каталога или базовой цены лот проверяется как раньше."""
+        precheck = StickerPrecheck()
+        assert precheck.reject_reason(["A"], StickersFilter(min_stickers_price=100.0), 30.0, None, None) is None
+        catalog = _catalog({"A": 1.0})
+        # Только коэффициент, базовая цена не в кэше - граница не нужна
+        assert precheck.reject_reason(["A"], StickersFilter(max_overpay_coefficient=0.1), 30.0, None, catalog) is None
+        assert precheck.rejected == 0
+
+    def test_check_listing_reads_cached_base_price(self):
+        """Тест: базовая цена берется только из кэша менеджера."""
+        precheck = StickerPrecheck()
+        listing = _listing(50.0, "A")
+        filters = _filters(max_overpay_coefficient=0.5)
+        with patch.object(StickerPricesAPI, "catalog", _catalog({"A": 4.0})):
+            assert precheck.check_listing(listing, {}, filters, _BasePrices(10.0)) is not None
+            assert precheck.check_listing(listing, {}, filters, _BasePrices(None)) is None
+            assert precheck.check_listing(listing, {}, filters, _BasePrices(49.0)) is None
+
+
+class TestFilterServicePrecheck:
+    """Тесты отсева в FilterService.check_stickers."""
+
+    def test_rejected_listing_does_not_fetch_sticker_prices(self):
+        """Тест: цены наклеек не запрашиваются, если лот заведомо не пройдет фильтр."""
+        parser = MagicMock()
+        parser.get_stickers_prices = AsyncMock(return_value={"A": 1.0})
+        service = FilterService(parser=parser)
+        with patch.object(StickerPricesAPI, "catalog", _catalog({"A": 1.0, "B": 1.0})):
+            passed = asyncio.run(service.check_stickers(_listing(30.0, "A", "B"), {}, _filters(min_stickers_price=10.0)))
+        assert passed is False
+        parser.get_stickers_prices.assert_not_called()
+
+    def test_possible_listing_fetches_prices(self):
+        """Тест: если граница допускает прохождение, цены запрашиваются как раньше."""
+        parser = MagicMock()
+        parser.get_stickers_prices = AsyncMock(return_value={"A": 6.0, "New": 6.0})
+        service = FilterService(parser=parser)
+        with patch.object(StickerPricesAPI, "catalog", _catalog({"A": 6.0, "Top": 50.0})):
+            passed = asyncio.run(service.check_stickers(_listing(30.0, "A", "New"), {}, _filters(min_stickers_price=10.0)))
+        assert passed is True
+        parser.get_stickers_prices.assert_called_once()
@@ -0,0 +1,135 @@
+"""
+Тесты для пакетного получения цен наклеек (StickerPricesAPI.get_stickers_prices_batch).
+"""
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from core.utils.two_tier_cache import TwoTierCache
+from parsers import sticker_prices
+from parsers.sticker_prices import StickerPricesAPI, _RateLimiter
+
+
+@pytest.fixture(autouse=True)
+def _fresh_price_cache():
+    """Пустой кэш цен в памяти процесса для каждого теста."""
+    with patch.object(StickerPricesAPI, "price_cache", TwoTierCache("sticker_price", ttl=StickerPricesAPI.CACHE_TTL)):
+        yield
+
+
+class _FakeRedis:
+    """Redis с подсчетом запросов."""
+
+    def __init__(self, data=None):
+        self.data = dict(data or {})
+        self.mget_calls = 0
+        self.set_many_calls = 0
+
+    def is_connected(self):
+        return True
+
+    async def get_json_many(self, keys):
+        self.mget_calls += 1
+        return [self.data.get(key) for key in keys]
+
+    async def set_json_many(self, items, ex=None):
+        self.set_many_calls += 1
+        self.data.update(items)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+class TestStickerPricesBatch:
+    """Тесты пакетного запроса цен."""
+
+    def test_cache_probe_and_write_back_are_batched(self):
+        """Тест: кэш проверяется одним MGET, найденные цены записываются одним пайплайном."""
+        redis = _FakeRedis({"sticker_price:A:730:1": {"v": 1.5, "exp": time.time() + 60, "neg": False}})
+        fetched = []
+
+        async def fake_price(name, *args, **kwargs):
+            fetched.append(name)
+            assert kwargs.get("redis_service") is None, "Запись в кэш должна идти одним пайплайном"
+            return {"B": 2.0, "C": None}[name]
+
+        with patch.object(StickerPricesAPI, "get_sticker_price", side_effect=fake_price), \
+                patch.object(sticker_prices, "_rate_limiter", _RateLimiter(0)):
+            prices = _run(StickerPricesAPI.get_stickers_prices_batch(["A", "B", "C", "B"], redis_service=redis))
+
+        assert prices == {"A": 1.5, "B": 2.0, "C": None}
+        assert sorted(fetched) == ["B", "C"]
+        assert redis.mget_calls == 1
+        assert redis.set_many_calls == 1
+        assert redis.data["sticker_price:B:730:1"]["v"] == 2.0
+        assert "sticker_price:C:730:1" not in redis.data
+
+    def test_memory_tier_skips_redis(self):
+        """Тест: цены из памяти процесса не запрашиваются ни в Redis, ни в Steam."""
+        redis = _FakeRedis()
+
+        async def fake_price(name, *args, **kwargs):
+            return 4.0
+
+        async def _twice():
+            first = await StickerPricesAPI.get_stickers_prices_batch(["A"], redis_service=redis)
+            second = await StickerPricesAPI.get_stickers_prices_batch(["A"], redis_service=redis)
+            return first, second
+
+        with patch.object(StickerPricesAPI, "get_sticker_price", side_effect=fake_price) as fetch, \
+                patch.object(sticker_prices, "_rate_limiter", _RateLimiter(0)):
+            first, second = _run(_twice())
+
+        assert first == second == {"A": 4.0}
+        assert fetch.call_count == 1
+        assert redis.mget_calls == 1
+
+    def test_misses_fetched_concurrently(self):
+        """Тест: промахи запрашиваются параллельно - время близко к max(fetch), а не к сумме."""
+        async def slow_price(name, *args, **kwargs):
+            await asyncio.sleep(0.2)
+            return 1.0
+
+        with patch.object(StickerPricesAPI, "get_sticker_price", side_effect=slow_price), \
+                patch.object(sticker_prices, "_rate_limiter", _RateLimiter(0)), \
+                patch.object(sticker_prices.Config, "STICKER_PRICE_CONCURRENCY", 4):
+            started = time.monotonic()
+            prices = _run(StickerPricesAPI.get_stickers_prices_batch(["A", "B", "C", "D"]))
+            elapsed = time.monotonic() - started
+
+        assert set(prices.values()) == {1.0}
+        assert elapsed < 0.6
+
+    def test_fetch_errors_do_not_fail_batch(self):
+        """Тест: ошибка запроса одной наклейки не ломает весь пакет."""
+        async def flaky_price(name, *args, **kwargs):
+            if name == "B":
+                raise RuntimeError("boom")
+            return 3.0
+
+        with patch.object(StickerPricesAPI, "get_sticker_price", side_effect=flaky_price), \
+                patch.object(sticker_prices, "_rate_limiter", _RateLimiter(0)):
+            prices = _run(StickerPricesAPI.get_stickers_prices_batch(["A", "B"]))
+
+        assert prices == {"A": 3.0, "B": None}
+
+
+class TestRateLimiter:
+    """Тесты общего лимита запросов."""
+
+    def test_spacing(self):
+        """Тест: старты запросов разнесены на 1/rate секунд."""
+        limiter = _RateLimiter(20)
+
+        async def _acquire_all():
+            starts = []
+            for _ in range(4):
+                await limiter.acquire()
+                starts.append(time.monotonic())
+            return starts
+
+        starts = _run(_acquire_all())
+        assert starts[-1] - starts[0] >= 3 / 20 - 0.01
@@ -0,0 +1,196 @@
+"""
+Тесты для канала отмены задач (TaskCancellation).
+"""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from core.utils import payload_codec
+from services.monitoring_service import MonitoringService
+from services.task_cancellation import CANCEL_CHANNEL, TaskCancellation, task_cancellation
+
+
+class _FakeRedisService:
+    """Сервис Redis, запоминающий публикации."""
+
+    def __init__(self, client=None):
+        self._client = client
+        self.published = []
+
+    def is_connected(self):
+        return True
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+class _FakePubSub:
+    """Pub/Sub с заранее заданными сообщениями."""
+
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.channels = []
+        self.closed = False
+
+    async def subscribe(self, channel):
+        self.channels.append(channel)
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=1.0):
+        if self.messages:
+            return {"type": "message", "data": self.messages.pop(0)}
+        await asyncio.sleep(0.01)
+        return None
+
+    async def close(self):
+        self.closed = True
+
+
+def _session(is_active):
+    """Сессия БД, возвращающая статус задачи."""
+    session = MagicMock()
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = is_active
+    session.execute = AsyncMock(return_value=result)
+    return session
+
+
+class TestTaskCancellation:
+    """Тесты токенов отмены."""
+
+    def test_deactivation_cancels_and_activation_resets(self):
+        """Тест: выключение отменяет токен, включение дает новый неотмененный токен."""
+        cancellation = TaskCancellation()
+        token = cancellation.token(5)
+        cancellation.apply({"task_id": 5, "action": "deactivated"})
+        assert token.cancelled
+        cancellation.apply({"task_id": 5, "action": "activated"})
+        assert not cancellation.token(5).cancelled
+        assert token.cancelled
+
+    def test_start_replaces_cancelled_token(self):
+        """Тест: новый запуск проверки задачи не наследует старую отмену."""
+        cancellation = TaskCancellation()
+        cancellation.apply({"task_id": 5, "action": "deleted"})
+        assert not cancellation.start(5).cancelled
+
+    def test_finished_and_deleted_tokens_are_released(self):
+        """Тест: токен убирается после запуска и удаления задачи, но не у нового запуска."""
+        cancellation = TaskCancellation()
+        first = cancellation.start(5)
+        second = cancellation.start(5)
+        cancellation.finish(5, first)
+        assert cancellation._tokens == {5: second}
+        cancellation.finish(5, second)
+        assert cancellation._tokens == {}
+
+        running = cancellation.start(6)
+        cancellation.apply({"task_id": 6, "action": "deleted"})
+        assert running.cancelled
+        assert cancellation._tokens == {}
+
+    def test_publish_applies_locally(self):
+        """Тест: публикация отменяет задачу в своем процессе и уходит в канал."""
+        cancellation = TaskCancellation()
+        redis = _FakeRedisService()
+        asyncio.run(cancellation.publish(redis, 7, "deactivated"))
+        assert cancellation.token(7).cancelled
+        assert redis.published == [(CANCEL_CHANNEL, {"task_id": 7, "action": "deactivated"})]
+
+    def test_listening_skips_db(self):
+        """Тест: пока канал слушается, статус задачи не читается из БД."""
+        cancellation = TaskCancellation()
+        cancellation.listening = True
+        session = _session(False)
+        assert asyncio.run(cancellation.is_cancelled(3, session)) is False
+        session.execute.assert_not_called()
+
+    def test_db_fallback_without_channel(self):
+        """Тест: без канала статус читается из БД, выключенная задача отменяется."""
+        cancellation = TaskCancellation()
+        session = _session(False)
+        assert asyncio.run(cancellation.is_cancelled(3, session)) is True
+        assert asyncio.run(cancellation.is_cancelled(3, session)) is True
+        assert session.execute.await_count == 1
+        assert asyncio.run(cancellation.is_cancelled(4, _session(True))) is False
+
+    def test_wait_is_interrupted_by_cancel(self):
+        """Тест: пауза прерывается отменой задачи."""
+        cancellation = TaskCancellation()
+
+        async def _scenario():
+            token = cancellation.token(1)
+            asyncio.get_running_loop().call_later(0.05, token.cancel)
+            return await token.wait(10)
+
+        assert asyncio.run(asyncio.wait_for(_scenario(), timeout=2)) is True
+        assert asyncio.run(TaskCancellation().token(1).wait(0.01)) is False
+
+    def test_subscriber_cancels_token(self):
+        """Тест: сообщение из канала отменяет токен задачи в процессе."""
+        cancellation = TaskCancellation()
+        pubsub = _FakePubSub([payload_codec.encode_str({"task_id": 9, "action": "deleted"})])
+        client = MagicMock()
+        client.pubsub.return_value = pubsub
+        redis = _FakeRedisService(client)
+
+        async def _scenario():
+            token = cancellation.token(9)
+            listener = asyncio.create_task(cancellation.run(redis))
+            cancelled = await token.wait(2)
+            listening = cancellation.listening
+            listener.cancel()
+            try:
+                await listener
+            except asyncio.CancelledError:
+                pass
+            return cancelled, listening
+
+        assert asyncio.run(_scenario()) == (True, True)
+        assert pubsub.channels == [CANCEL_CHANNEL]
+        assert pubsub.closed
+        assert not cancellation.listening
+
+    def test_single_listener_per_process(self):
+        """Тест: второй запуск подписчика в процессе не создает новую подписку."""
+        cancellation = TaskCancellation()
+
+        async def _scenario():
+            first = cancellation.start_listener(None)
+            second = cancellation.start_listener(None)
+            first.cancel()
+            try:
+                await first
+            except asyncio.CancelledError:
+                pass
+            return first, second
+
+        first, second = asyncio.run(_scenario())
+        assert first is not None and second is None
+
+
+class TestMonitoringServiceCancellation:
+    """Тесты публикации отмены из MonitoringService."""
+
+    def _service(self, task, redis):
+        session = MagicMock()
+        result = MagicMock()
+        result.scalar_one_or_none.return_value = task
+        session.execute = AsyncMock(return_value=result)
+        session.commit = AsyncMock()
+        session.refresh = AsyncMock()
+        return MonitoringService(session, MagicMock(), parsing_service=MagicMock(), redis_service=redis)
+
+    def test_toggle_publishes_deactivation(self):
+        """Тест: выключение задачи публикует отмену, изменение имени - нет."""
+        task = MagicMock(id=11, is_active=True, filters_json=None)
+        redis = _FakeRedisService()
+        service = self._service(task, redis)
+
+        asyncio.run(service.update_monitoring_task(11, name="renamed"))
+        assert [item for item in redis.published if item[0] == CANCEL_CHANNEL] == []
+
+        asyncio.run(service.update_monitoring_task(11, is_active=False))
+        assert [item for item in redis.published if item[0] == CANCEL_CHANNEL] == [
+            (CANCEL_CHANNEL, {"task_id": 11, "action": "deactivated"})
+        ]
+        assert task_cancellation.token(11).cancelled
+        task_cancellation.start(11)
@@ -0,0 +1,172 @@
+"""
+Тесты для индекса задач по предметам (task_match_index).
+"""
+import asyncio
+import random
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from core.models import SearchFilters, FloatRange, PatternList, PatternRange, StickersFilter
+from services.filter_plan import compile_filter_plan
+from services.task_match_index import INDEX_CHANNEL, TaskMatchIndex, _IntervalIndex
+
+HASH_NAME = "AK-47 | Case Hardened (Field-Tested)"
+
+
+def _random_filters(rng: random.Random) -> SearchFilters:
+    kwargs = {}
+    if rng.random() < 0.7:
+        kwargs["max_price"] = float(rng.randint(5, 100))
+    if rng.random() < 0.6:
+        low = rng.randint(0, 80) / 100.0
+        kwargs["float_range"] = FloatRange(min=low, max=min(1.0, low + rng.randint(1, 30) / 100.0))
+    choice = rng.random()
+    if choice < 0.4:
+        kwargs["pattern_list"] = PatternList(
+            patterns=rng.sample(range(0, 1000), rng.randint(1, 20)),
+            item_type=rng.choice(["skin", "keychain"])
+        )
+    elif choice < 0.6:
+        low = rng.randint(0, 900)
+        kwargs["pattern_range"] = PatternRange(min=low, max=low + rng.randint(0, 99), item_type="skin")
+    if rng.random() < 0.2:
+        kwargs["stickers_filter"] = StickersFilter(min_stickers_price=1.0)
+    return SearchFilters(item_name=HASH_NAME, **kwargs)
+
+
+def _brute_force(tasks, price, float_value, pattern, item_type, sticker_count):
+    """Проверка задача за задачей тем же планом."""
+    result = set()
+    for task_id, filters in tasks.items():
+        plan = compile_filter_plan(filters)
+        if plan.first_failure(price, pattern, float_value, item_type, HASH_NAME):
+            continue
+        if not plan.check_type_constraints(item_type, sticker_count):
+            continue
+        result.add(task_id)
+    return result
+
+
+class TestIntervalIndex:
+    """Тесты поиска интервалов по точке."""
+
+    def test_closed_bounds(self):
+        """Тест: границы интервалов включаются, промежутки между границами учитываются."""
+        index = _IntervalIndex([(0.1, 0.2, 1), (0.15, 0.3, 2), (0.3, 0.3, 3)])
+        assert index.stab(0.1) == {1}
+        assert index.stab(0.15) == {1, 2}
+        assert index.stab(0.17) == {1, 2}
+        assert index.stab(0.25) == {2}
+        assert index.stab(0.3) == {2, 3}
+        assert index.stab(0.05) == set()
+        assert index.stab(0.5) == set()
+
+    def test_empty(self):
+        """Тест: пустой индекс."""
+        assert _IntervalIndex([]).stab(1) == set()
+
+
+class TestTaskMatchIndex:
+    """Тесты индекса задач."""
+
+    def test_matches_brute_force(self):
+        """Тест: кандидаты совпадают с проверкой каждой задачи по отдельности."""
+        rng = random.Random(42)
+        tasks = {task_id: _random_filters(rng) for task_id in range(1, 61)}
+        index = TaskMatchIndex()
+        index.rebuild(tasks.items())
+
+        for _ in range(500):
+            item_type = "keychain" if rng.random() < 0.1 else "skin"
+            price = rng.choice([None, float(rng.randint(1, 120))])
+            float_value = None if item_type == "keychain" or rng.random() < 0.05 else rng.randint(0, 100) / 100.0
+            pattern = rng.choice([None, rng.randint(0, 999)])
+            sticker_count = rng.randint(0, 4)
+            expected = _brute_force(tasks, price, float_value, pattern, item_type, sticker_count)
+            assert index.candidates(HASH_NAME, price, float_value, pattern, item_type, sticker_count) == expected
+
+    def test_other_item_and_name_normalization(self):
+        """Тест: задачи группируются по нормализованному названию предмета."""
+        index = TaskMatchIndex()
+        index.upsert(1, SearchFilters(item_name=HASH_NAME, max_price=10.0))
+        assert index.candidates("StatTrak™ AK-47 | Case Hardened (Minimal Wear)", price=5.0) == {1}
+        assert index.candidates("M4A1-S | Hot Rod (Factory New)", price=5.0) == set()
+
+    def test_incremental_updates(self):
+        """Тест: изменение и удаление задачи обновляют индекс."""
+        index = TaskMatchIndex()
+        index.upsert(1, SearchFilters(item_name=HASH_NAME, float_range=FloatRange(min=0.1, max=0.2)))
+        index.upsert(2, SearchFilters(item_name=HASH_NAME, float_range=FloatRange(min=0.3, max=0.4)))
+        assert index.candidates(HASH_NAME, float_value=0.15) == {1}
+
+        index.upsert(2, SearchFilters(item_name=HASH_NAME, float_range=FloatRange(min=0.1, max=0.4)))
+        assert index.candidates(HASH_NAME, float_value=0.15) == {1, 2}
+
+        index.upsert(1, SearchFilters(item_name="M4A1-S | Hot Rod (Factory New)"))
+        assert index.candidates(HASH_NAME, float_value=0.15) == {2}
+        assert index.tasks_for_item("M4A1-S | Hot Rod (Factory New)") == {1}
+
+        index.remove(2)
+        index.remove(1)
+        assert len(index) == 0
+        assert index.tasks_for_item(HASH_NAME) == set()
+
+
+class _FakeRedisService:
+    """Сервис Redis, запоминающий публикации."""
+
+    def __init__(self):
+        self.published = []
+
+    def is_connected(self):
+        return True
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+class TestTaskMatchIndexSync:
+    """Тесты обновления индекса в процессах через канал и БД."""
+
+    def test_publish_applies_locally_and_broadcasts(self):
+        """Тест: событие применяется в своем процессе и уходит в канал, другой процесс его применяет."""
+        index = TaskMatchIndex()
+        other = TaskMatchIndex()
+        redis = _FakeRedisService()
+        filters = SearchFilters(item_name=HASH_NAME, max_price=10.0, appid=730)
+
+        asyncio.run(index.publish(redis, 3, filters, "Case Hardened"))
+        assert index.candidates(HASH_NAME, price=5.0) == {3}
+        channel, message = redis.published[-1]
+        assert channel == INDEX_CHANNEL
+
+        other.apply(message)
+        assert other.candidates(HASH_NAME, price=5.0) == {3}
+        assert other.task(3).name == "Case Hardened"
+        assert other.task(3).item_name == HASH_NAME
+
+        asyncio.run(index.publish(redis, 3))
+        other.apply(redis.published[-1][1])
+        assert len(index) == 0 and len(other) == 0
+        assert other.task(3) is None
+
+    def test_load_from_db(self):
+        """Тест: загрузка из БД перестраивает индекс по активным задачам."""
+        tasks = [
+            SimpleNamespace(id=1, name="first", item_name=HASH_NAME, appid=730, currency=1, filters_json='{"max_price": 10.0}'),
+            SimpleNamespace(id=2, name="broken", item_name=HASH_NAME, appid=730, currency=1, filters_json="{"),
+        ]
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = tasks
+        session = MagicMock()
+        session.execute = AsyncMock(return_value=result)
+        session.close = AsyncMock()
+        db_manager = MagicMock()
+        db_manager.get_session = AsyncMock(return_value=session)
+
+        index = TaskMatchIndex()
+        index.upsert(5, SearchFilters(item_name=HASH_NAME))
+        assert asyncio.run(index.load(db_manager)) == 1
+        assert index.tasks_for_item(HASH_NAME) == {1}
+        assert index.task(1).name == "first"
+        session.close.assert_awaited_once()
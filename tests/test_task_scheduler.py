@@ -0,0 +1,280 @@
+"""
+Тесты для единого планировщика проверок задач (TaskScheduler).
+"""
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from services.rabbitmq_service import FairShare
+from services.task_scheduler import PUBLISH_RETRY_DELAY, TaskScheduler, claim_due_tasks_query, task_priority
+
+
+NOW = datetime(2026, 10, 18, 12, 0, 0)
+
+
+def _row(task_id, interval=60, late=0, max_price=10.0):
+    return SimpleNamespace(
+        id=task_id, item_name=f"Item {task_id}", appid=730, currency=1,
+        filters_json={"max_price": max_price}, check_interval=interval,
+        next_check=NOW + timedelta(seconds=interval), due_at=NOW - timedelta(seconds=late)
+    )
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return list(self._rows)
+
+
+class _FakeSession:
+    """Сессия: захват возвращает заранее заданные пачки, select - сроки задач."""
+
+    def __init__(self, claim_batches, refresh_rows=()):
+        self.claim_batches = list(claim_batches)
+        self.refresh_rows = list(refresh_rows)
+        self.statements = []
+        self.commits = 0
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        if stmt.is_update and stmt._returning:
+            return _Result(self.claim_batches.pop(0) if self.claim_batches else [])
+        if stmt.is_select:
+            return _Result(self.refresh_rows)
+        return _Result([])
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+class _FakeDbManager:
+    def __init__(self, session):
+        self.session = session
+        self.sessions = 0
+
+    async def get_session(self):
+        self.sessions += 1
+        return self.session
+
+
+class _FakeRabbit:
+    def __init__(self, fail_ids=()):
+        self.fail_ids = set(fail_ids)
+        self.published = []
+        self.priorities = {}
+
+    async def ensure_connected(self):
+        return True
+
+    async def publish_tasks(self, tasks_data, priorities=None):
+        self.published.extend(message["task_id"] for message in tasks_data)
+        self.priorities.update(zip((message["task_id"] for message in tasks_data), priorities or []))
+        return [message for message in tasks_data if message["task_id"] in self.fail_ids]
+
+
+class _FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def get(self, key):
+        self.commands.append(self.client.flags.get(key))
+
+    def ttl(self, key):
+        self.commands.append(3000 if key in self.client.flags else -2)
+
+    async def execute(self):
+        return self.commands
+
+
+class _FakeRedisClient:
+    def __init__(self, flags):
+        self.flags = dict(flags)
+        self.pipelines = 0
+
+    def pipeline(self, transaction=True):
+        self.pipelines += 1
+        return _FakePipeline(self)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.flags.pop(key, None)
+
+
+class _FakeRedisService:
+    def __init__(self, flags):
+        self._client = _FakeRedisClient(flags)
+
+    def is_connected(self):
+        return True
+
+
+def _scheduler(session, rabbit=None, redis=None, batch_size=500):
+    return TaskScheduler(
+        _FakeDbManager(session), rabbit or _FakeRabbit(), redis_service=redis,
+        batch_size=batch_size, max_sleep=60, clock=lambda: NOW
+    )
+
+
+class TestSchedule:
+    """Тесты кучи сроков."""
+
+    def test_nearest_deadline_and_lazy_removal(self):
+        """Тест: ближайший срок учитывает перенос и удаление задач."""
+        scheduler = _scheduler(_FakeSession([]))
+        scheduler.schedule(1, NOW + timedelta(seconds=30))
+        scheduler.schedule(2, NOW + timedelta(seconds=10))
+        scheduler.schedule(3, NOW + timedelta(seconds=20))
+        assert scheduler.next_deadline() == NOW + timedelta(seconds=10)
+
+        scheduler.schedule(2, NOW + timedelta(seconds=90))
+        scheduler.unschedule(3)
+        assert scheduler.next_deadline() == NOW + timedelta(seconds=30)
+        assert len(scheduler) == 2
+
+    def test_pop_due_returns_only_expired(self):
+        """Тест: снимаются только наступившие задачи, None - проверить сразу."""
+        scheduler = _scheduler(_FakeSession([]))
+        scheduler.schedule(1, None)
+        scheduler.schedule(2, NOW - timedelta(seconds=5))
+        scheduler.schedule(3, NOW + timedelta(seconds=5))
+        assert sorted(scheduler.pop_due(NOW)) == [1, 2]
+        assert 3 in scheduler and 1 not in scheduler
+
+    def test_earlier_deadline_wakes_loop(self):
+        """Тест: задача с более ранним сроком будит цикл."""
+        scheduler = _scheduler(_FakeSession([]))
+        scheduler.schedule(1, NOW + timedelta(seconds=30))
+        scheduler._wakeup.clear()
+        scheduler.schedule(2, NOW + timedelta(seconds=60))
+        assert not scheduler._wakeup.is_set()
+        scheduler.schedule(3, NOW + timedelta(seconds=5))
+        assert scheduler._wakeup.is_set()
+
+
+class TestClaim:
+    """Тесты захвата и публикации."""
+
+    def test_claim_query_skips_locked_rows(self):
+        """Тест: захват - один UPDATE с CTE FOR UPDATE SKIP LOCKED, RETURNING отдает прежний срок."""
+        sql = str(claim_due_tasks_query(NOW, 500).compile(dialect=postgresql.dialect()))
+        assert sql.startswith("WITH due AS")
+        assert "UPDATE monitoring_tasks SET next_check=" in sql
+        assert "FOR UPDATE SKIP LOCKED" in sql
+        assert "make_interval" in sql
+        assert "RETURNING monitoring_tasks.id" in sql
+        assert sql.endswith("due.due_at")
+
+    def test_due_index_matches_migration(self):
+        """Тест: индекс модели совпадает с индексом миграции 007."""
+        from sqlalchemy.schema import CreateIndex
+        from core.database import MonitoringTask
+        index = next(i for i in MonitoringTask.__table__.indexes if i.name == "ix_monitoring_tasks_due")
+        sql = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+        assert sql == "CREATE INDEX ix_monitoring_tasks_due ON monitoring_tasks (next_check NULLS FIRST) WHERE is_active"
+
+    def test_tick_claims_in_batches_and_publishes_once(self):
+        """Тест: наступившие задачи забираются пачками и публикуются одной пачкой."""
+        session = _FakeSession([[_row(1), _row(2)], [_row(3)]])
+        rabbit = _FakeRabbit()
+        scheduler = _scheduler(session, rabbit, batch_size=2)
+
+        assert asyncio.run(scheduler.tick()) == 3
+        assert rabbit.published == [1, 2, 3]
+        assert scheduler.next_deadline() == NOW + timedelta(seconds=60)
+        assert scheduler._session is session
+
+    def test_running_tasks_skipped_and_stuck_flags_cleared(self):
+        """Тест: выполняющаяся задача пропускается, зависший флаг удаляется и задача публикуется."""
+        redis = _FakeRedisService({
+            "parsing_task_running:1": (NOW - timedelta(minutes=2)).isoformat(),
+            "parsing_task_running:2": (NOW - timedelta(minutes=30)).isoformat(),
+        })
+        rabbit = _FakeRabbit()
+        scheduler = _scheduler(_FakeSession([[_row(1), _row(2), _row(3)]]), rabbit, redis)
+
+        asyncio.run(scheduler.tick())
+        assert rabbit.published == [2, 3]
+        assert scheduler.skipped_running == 1
+        assert "parsing_task_running:2" not in redis._client.flags
+        assert redis._client.pipelines == 1
+
+    def test_failed_publish_retried_sooner(self):
+        """Тест: неопубликованная задача повторяется через PUBLISH_RETRY_DELAY."""
+        session = _FakeSession([[_row(1, interval=3600), _row(2, interval=3600)]])
+        scheduler = _scheduler(session, _FakeRabbit(fail_ids=[2]))
+
+        assert asyncio.run(scheduler.tick()) == 1
+        assert scheduler._deadlines[2] == NOW + timedelta(seconds=PUBLISH_RETRY_DELAY)
+        assert scheduler._deadlines[1] == NOW + timedelta(seconds=3600)
+        assert any(stmt.is_update and not stmt._returning for stmt in session.statements)
+
+    def test_unclaimed_expected_task_rescheduled_from_db(self):
+        """Тест: ожидаемая, но не захваченная задача (next_check перенес воркер) получает срок из БД."""
+        later = NOW + timedelta(seconds=45)
+        session = _FakeSession([[]], refresh_rows=[(5, later)])
+        scheduler = _scheduler(session)
+        scheduler.schedule(5, NOW - timedelta(seconds=1))
+        scheduler.schedule(6, NOW - timedelta(seconds=1))
+
+        assert asyncio.run(scheduler.tick()) == 0
+        assert scheduler._deadlines == {5: later}
+
+
+class TestPriority:
+    """Тесты приоритета задач и справедливой доли очередей."""
+
+    def test_lateness_relative_to_interval(self):
+        """Тест: опоздание считается в интервалах задачи и ограничено сверху."""
+        assert task_priority(0, 60, max_priority=10) == 0
+        assert task_priority(60, 60, max_priority=10) > task_priority(60, 3600, max_priority=10)
+        assert task_priority(600, 60, max_priority=10) == task_priority(120, 60, max_priority=10) == 5
+
+    def test_value_and_hit_rate_raise_priority(self):
+        """Тест: дорогой предмет и частые находки повышают приоритет до максимума."""
+        assert task_priority(0, 60, max_price=1.0, max_priority=10) < task_priority(0, 60, max_price=500.0, max_priority=10)
+        assert task_priority(0, 60, hit_rate=0.5, max_priority=10) == 1
+        assert task_priority(10 ** 6, 60, max_price=10 ** 6, hit_rate=3.0, max_priority=10) == 10
+
+    def test_scheduler_publishes_priorities(self):
+        """Тест: опоздавшая дорогая задача получает более высокий приоритет."""
+        rabbit = _FakeRabbit()
+        scheduler = _scheduler(_FakeSession([[_row(1), _row(2, late=120, max_price=900.0)]]), rabbit)
+
+        asyncio.run(scheduler.tick())
+        assert rabbit.priorities[2] > rabbit.priorities[1]
+        assert rabbit.priorities[2] >= 7
+
+    def test_fair_share_ratio_and_no_starvation(self):
+        """Тест: при весах 3:1 на три срочные задачи приходится одна обычная."""
+        fair_share = FairShare({"urgent": 3, "normal": 1})
+        served = []
+        for _ in range(8):
+            lane = fair_share.order()[0]
+            fair_share.served(lane)
+            served.append(lane)
+        assert served.count("urgent") == 6
+        assert served.count("normal") == 2
+        assert "normal" in served[:4]
+
+    def test_fair_share_empty_lane_does_not_accumulate(self):
+        """Тест: пустая очередь не копит кредит и после простоя не получает всплеск."""
+        fair_share = FairShare({"urgent": 3, "normal": 1})
+        for _ in range(10):
+            fair_share.served("normal", empty=["urgent"])
+        served = []
+        for _ in range(4):
+            lane = fair_share.order()[0]
+            fair_share.served(lane)
+            served.append(lane)
+        assert served.count("urgent") == 3
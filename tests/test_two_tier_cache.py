@@ -0,0 +1,217 @@
+"""
+Тесты для двухуровневого кэша справочных данных (TwoTierCache).
+"""
+import asyncio
+
+import pytest
+
+from core.utils.two_tier_cache import TwoTierCache
+
+
+class _Clock:
+    """Управляемое время."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _FakeRedis:
+    """Redis в памяти с подсчетом запросов."""
+
+    def __init__(self):
+        self.data = {}
+        self.gets = 0
+
+    def is_connected(self):
+        return True
+
+    async def get_json(self, key):
+        self.gets += 1
+        return self.data.get(key)
+
+    async def set_json(self, key, data, ex=None):
+        self.data[key] = data
+
+    async def get_json_many(self, keys):
+        self.gets += 1
+        return [self.data.get(key) for key in keys]
+
+    async def set_json_many(self, items, ex=None):
+        self.data.update(items)
+
+    async def delete_key(self, key):
+        self.data.pop(key, None)
+
+
+class _CountingLoader:
+    """Загрузчик с подсчетом вызовов."""
+
+    def __init__(self, value, delay: float = 0.0):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self.value
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+class TestTwoTierCache:
+    """Тесты кэша."""
+
+    def test_memory_hit(self):
+        """Тест: повторный запрос обслуживается из памяти процесса."""
+        cache = TwoTierCache("t", ttl=60)
+        loader = _CountingLoader(1.5)
+
+        async def _scenario():
+            return [await cache.get_or_load("a", loader) for _ in range(3)]
+
+        assert _run(_scenario()) == [1.5, 1.5, 1.5]
+        assert loader.calls == 1
+        assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+
+    def test_lru_bound(self):
+        """Тест: в памяти хранится не больше max_items записей, вытесняются давно не читанные."""
+        cache = TwoTierCache("t", ttl=60, max_items=2)
+
+        async def _scenario():
+            await cache.set("a", 1)
+            await cache.set("b", 2)
+            cache.peek("a")
+            await cache.set("c", 3)
+
+        _run(_scenario())
+        assert len(cache) == 2
+        assert cache.peek("a") == 1 and cache.peek("b") is None and cache.peek("c") == 3
+        assert cache.evictions == 1
+
+    def test_concurrent_misses_coalesced(self):
+        """Тест: одновременные промахи по одному ключу вызывают загрузчик один раз."""
+        cache = TwoTierCache("t", ttl=60)
+        loader = _CountingLoader({"THB": 35.5}, delay=0.05)
+
+        async def _scenario():
+            return await asyncio.gather(*(cache.get_or_load("rates", loader) for _ in range(5)))
+
+        results = _run(_scenario())
+        assert all(result == {"THB": 35.5} for result in results)
+        assert loader.calls == 1
+        assert cache.coalesced == 4
+
+    def test_stale_while_revalidate(self):
+        """Тест: устаревшее значение отдается сразу, обновление идет в фоне."""
+        clock = _Clock()
+        cache = TwoTierCache("t", ttl=10, stale_ttl=10, clock=clock)
+
+        async def _scenario():
+            await cache.get_or_load("a", _CountingLoader(1))
+            clock.now += 15
+            refresher = _CountingLoader(2)
+            stale = await cache.get_or_load("a", refresher)
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            return stale, refresher.calls, cache.peek("a")
+
+        stale, refresh_calls, refreshed = _run(_scenario())
+        assert stale == 1
+        assert refresh_calls == 1
+        assert refreshed == 2
+        assert cache.stale_hits == 1
+
+    def test_expired_after_stale_window(self):
+        """Тест: после окна stale значение загружается заново."""
+        clock = _Clock()
+        cache = TwoTierCache("t", ttl=10, stale_ttl=10, clock=clock)
+
+        async def _scenario():
+            await cache.get_or_load("a", _CountingLoader(1))
+            clock.now += 25
+            return await cache.get_or_load("a", _CountingLoader(2))
+
+        assert _run(_scenario()) == 2
+
+    def test_negative_caching(self):
+        """Тест: отрицательный результат кэшируется на negative_ttl."""
+        clock = _Clock()
+        cache = TwoTierCache("t", ttl=100, negative_ttl=5, clock=clock)
+        loader = _CountingLoader([])
+
+        async def _scenario():
+            await cache.get_or_load("unknown", loader, negative=lambda value: not value)
+            await cache.get_or_load("unknown", loader, negative=lambda value: not value)
+            clock.now += 6
+            await cache.get_or_load("unknown", loader, negative=lambda value: not value)
+
+        _run(_scenario())
+        assert loader.calls == 2
+        assert cache.negative_hits == 1
+
+    def test_not_cacheable_and_errors(self):
+        """Тест: некэшируемые значения и ошибки загрузки не сохраняются."""
+        cache = TwoTierCache("t", ttl=60)
+        failing = _CountingLoader(None)
+
+        async def _boom():
+            raise RuntimeError("boom")
+
+        async def _scenario():
+            await cache.get_or_load("a", failing, cacheable=lambda value: value is not None)
+            await cache.get_or_load("a", failing, cacheable=lambda value: value is not None)
+            with pytest.raises(RuntimeError):
+                await cache.get_or_load("b", _boom)
+
+        _run(_scenario())
+        assert failing.calls == 2
+        assert cache.load_errors == 1
+        assert len(cache) == 0
+
+    def test_redis_tier_shared_between_processes(self):
+        """Тест: значение, загруженное одним процессом, читается другим из Redis."""
+        redis = _FakeRedis()
+        first = TwoTierCache("t", ttl=60)
+        second = TwoTierCache("t", ttl=60)
+        loader = _CountingLoader([{"market_hash_name": "AK-47 | Redline (Field-Tested)"}])
+
+        async def _scenario():
+            await first.get_or_load("AK-47 | Redline", loader, redis_service=redis)
+            return await second.get_or_load("AK-47 | Redline", loader, redis_service=redis)
+
+        assert _run(_scenario()) == loader.value
+        assert loader.calls == 1
+        assert second.redis_hits == 1
+        assert "t:AK-47 | Redline" in redis.data
+
+    def test_legacy_redis_value_is_miss(self):
+        """Тест: значение в старом формате (без обертки) считается промахом."""
+        redis = _FakeRedis()
+        redis.data["t:a"] = {"price": 1.0}
+        cache = TwoTierCache("t", ttl=60)
+        loader = _CountingLoader(2.0)
+
+        assert _run(cache.get_or_load("a", loader, redis_service=redis)) == 2.0
+        assert loader.calls == 1
+
+    def test_get_many_and_set_many(self):
+        """Тест: пакетное чтение - память процесса, остальное одним MGET."""
+        redis = _FakeRedis()
+        writer = TwoTierCache("t", ttl=60)
+        reader = TwoTierCache("t", ttl=60)
+
+        async def _scenario():
+            await writer.set_many({"a": 1.0, "b": 2.0}, redis_service=redis)
+            await reader.set("c", 3.0)
+            return await reader.get_many(["a", "b", "c", "d"], redis_service=redis)
+
+        assert _run(_scenario()) == {"a": 1.0, "b": 2.0, "c": 3.0}
+        assert redis.gets == 1
+        assert reader.misses == 1